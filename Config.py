@@ -18,9 +18,57 @@ class BotSettings(EnvBaseSettings):
 
 
 class DBSettings(EnvBaseSettings):
+    DATABASE_PATH: str = "/home/timur/Documents/Languages/Python/Freelance/tutikovstanislav1/GymLegend/gym_legend.db"
+    # Как часто отметки активности игроков записываются в базу
+    LAST_ACTIVE_FLUSH_SECONDS: int = 30
+
     @property
     def database_path(self) -> str: 
-        return "/home/timur/Documents/Languages/Python/Freelance/tutikovstanislav1/GymLegend/gym_legend.db"
+        return self.DATABASE_PATH
+
+
+class MetricsSettings(EnvBaseSettings):
+    METRICS_ENABLED: bool = True
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9100
+    # Запросы дольше порога попадают в журнал медленных запросов
+    SLOW_QUERY_MS: int = 50
+    SLOW_QUERY_TOP: int = 20
+
+
+class BackupSettings(EnvBaseSettings):
+    # Каталог снимков базы (по умолчанию backups рядом с базой)
+    BACKUP_DIR: str = ""
+    # Сколько последних снимков хранить
+    BACKUP_KEEP: int = 14
+    # Автоматический снимок раз в N часов (0 - выключен)
+    BACKUP_INTERVAL_HOURS: int = 24
+    # Копирование шагами по N страниц с паузой между шагами, чтобы не задерживать игру
+    BACKUP_PAGES_PER_STEP: int = 256
+    BACKUP_STEP_PAUSE_MS: int = 5
+
+    @property
+    def backup_dir(self) -> str:
+        return self.BACKUP_DIR or str(Path(self.DATABASE_PATH).absolute().parent / "backups")
+
+
+class ReplicaSettings(EnvBaseSettings):
+    # Отчеты администрации читают снимок базы, а не рабочий файл
+    REPLICA_ENABLED: bool = True
+    REPLICA_REFRESH_SECONDS: int = 300
+    REPLICA_MMAP_MB: int = 512
+    REPLICA_CACHE_MB: int = 64
+
+    @property
+    def replica_path(self) -> str:
+        return f"{self.DATABASE_PATH}.replica"
+
+
+class EconomySettings(EnvBaseSettings):
+    # Как часто новые транзакции добавляются в экономические сводки
+    ECONOMY_ROLLUP_SECONDS: int = 60
+    # Пауза между пачками при пересчете истории
+    ECONOMY_BACKFILL_PAUSE_MS: int = 50
 
 
 class GameSettings(EnvBaseSettings):
@@ -107,7 +155,7 @@ class GameSettings(EnvBaseSettings):
     ADMIN_USERS: list[int] = [1, 322615766, 768764050]
 
 
-class Settings(BotSettings, DBSettings, GameSettings):
+class Settings(BotSettings, DBSettings, MetricsSettings, BackupSettings, ReplicaSettings, EconomySettings, GameSettings):
     DEBUG: bool = False
 
 
@@ -1,3 +1,4 @@
+import os
 import re
 import random
 import asyncio
@@ -9,77 +10,19 @@ from vkbottle.dispatch.rules import ABCRule
 from vkbottle import API
 
 from bot.core.config import settings
-from bot.db import (
-    ban_player,
-    count_admins,
-    count_banned_players,
-    count_clans,
-    count_players,
-    count_table_rows,
-    count_total_balance,
-    create_promo_code,
-    delete_clan,
-    delete_player,
-    delete_promo_code,
-    get_clan_by_tag,
-    get_clan_member_count,
-    get_clan_members,
-    get_clan_treasury_log,
-    get_player,
-    get_promo_info,
-    get_recent_players,
-    increment_admin_stat,
-    make_admin,
-    remove_admin,
-    reset_all,
-    set_admin_nickname,
-    set_custom_income,
-    set_dumbbell_level,
-    set_total_lifts,
-    sum_column,
-    sum_promo_uses,
-    unban_player,
-    update_clan_name,
-    update_player_balance,
-    update_username,
-    update_player_power,
-    get_all_clans,
-    get_all_players,
-    get_player_clan,
-    set_info_access,
-    remove_info_access,
-    get_info_access_status,
-    get_info_access_details,
-    get_all_info_access,
-    extend_info_access,
-    add_admin_log,
-    get_admin_logs,
-    cleanup_old_logs,
-    create_request,
-    get_pending_requests,
-    get_request_by_id,
-    approve_request,
-    reject_request,
-    delete_request,
-    get_request_stats,
-    get_requests_by_admin,
-    get_admin_usage_stats,
-    get_broadcast_usage,
-    increment_broadcast_usage,
-    reset_broadcast_usage,
-    check_broadcast_limit,
-    get_admin_level,
-    get_moderator_promo_stats,
-    update_moderator_promo_stats,
-    get_promo_usage_stats,
-    update_promo_usage_stats,
-    cleanup_old_requests,
-    update_fitness_halls,
-    get_player_fitness_halls,
-)
+from bot.storage import get_storage
 
 from bot.services.clans import get_clan_bonuses
-from bot.services.users import is_admin
+from bot.services.users import is_admin, get_admin_access_level, can_use_command
+from bot.services.backup import create_backup, list_backups
+from bot.services.maintenance import start_player_deletion, start_reset_all, get_jobs, format_job
+from bot.services.replica import refresh_replica, freshness_line
+from bot.services.economy import parse_period, transaction_title, start_backfill
+from bot.services.fraud import get_suspects, RULE_TITLES
+from bot.services.slow_queries import (
+    get_slow_queries, format_slow_queries, dump_slow_queries, reset_slow_queries,
+    get_lock_waits, format_lock_waits
+)
 from bot.utils import format_number, pointer_to_screen_name, parse_amount_string
 
 
@@ -97,39 +40,19 @@ PENDING_RESETS = {}
 PENDING_REQUESTS = {}
 REQUEST_COUNTER = 1
 
+# Курсоры постраничного просмотра логов: admin_id -> (log_type, title, (created_at, id))
+LOG_PAGE_SIZE = 50
+LOG_PAGE_CURSORS = {}
+
+# Курсоры лога казны в "Акинфо": admin_id -> (clan_id, tag, (created_at, id))
+TREASURY_LOG_PAGE_SIZE = 10
+TREASURY_LOG_CURSORS = {}
+
 # ======================
 # СИСТЕМА УРОВНЕЙ АДМИНИСТРАЦИИ
 # ======================
 
-async def get_admin_access_level(user_id: int) -> int:
-    """Получить уровень доступа администратора"""
-    if user_id == settings.CREATOR_ID:
-        return 1
-    
-    player = await get_player(user_id)
-    if player:
-        return player.get("admin_level", 0)
-    return 0
-
-async def can_use_command(user_id: int, command_category: str) -> bool:
-    """Проверка доступа к команде по категории"""
-    admin_level = await get_admin_access_level(user_id)
-    
-    if admin_level == 1:
-        return True
-    
-    if admin_level == 2:
-        allowed_categories = [
-            "main", "senior_admin", "economy", "clans", 
-            "donat_services", "info", "players", "broadcast", "halls"
-        ]
-        return command_category in allowed_categories
-    
-    if admin_level == 3:
-        allowed_categories = ["main", "economy", "clans", "broadcast", "info", "halls"]
-        return command_category in allowed_categories
-    
-    return False
+# Проверки прав - поиск в снимке bot.services.users (без обращения к базе)
 
 async def log_admin_action(
     user_id: int, 
@@ -139,7 +62,7 @@ async def log_admin_action(
     request_id: int = None
 ):
     """Логирование действий администратора"""
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_level = await get_admin_access_level(user_id)
     
     admin_name = admin.get("admin_nickname", admin["username"]) if admin else "Неизвестно"
@@ -148,7 +71,7 @@ async def log_admin_action(
     log_details = details
     
     if target_id:
-        target_player = await get_player(target_id)
+        target_player = await get_storage().get_player(target_id)
         target_name = target_player["username"] if target_player else str(target_id)
         log_details = f"{details} | Цель: [id{target_id}|{target_name}]"
     
@@ -189,7 +112,7 @@ async def log_admin_action(
     
     log_type = log_type_map.get(action_type, "other")
     
-    await add_admin_log(
+    await get_storage().add_admin_log(
         user_id=user_id,
         admin_name=admin_name,
         admin_level=admin_level_name,
@@ -208,7 +131,7 @@ async def generate_request_id() -> int:
     request_id = REQUEST_COUNTER
     REQUEST_COUNTER += 1
     
-    pending_requests = await get_pending_requests()
+    pending_requests = await get_storage().get_pending_requests()
     if pending_requests:
         max_id = max(r["id"] for r in pending_requests)
         if max_id >= request_id:
@@ -225,13 +148,13 @@ async def create_moderator_request(
     additional_info: dict = None
 ) -> dict:
     """Создание заявки от модератора"""
-    admin = await get_player(admin_id)
+    admin = await get_storage().get_player(admin_id)
     request_id = await generate_request_id()
     
     if not admin:
         return {"success": False, "error": "Администратор не найден"}
     
-    result = await create_request(
+    result = await get_storage().create_request(
         request_id=request_id,
         admin_id=admin_id,
         admin_name=admin.get("admin_nickname", admin["username"]),
@@ -300,6 +223,10 @@ def create_logging_keyboard():
     keyboard.add(Text("📝 Заявкилоги"), color=KeyboardButtonColor.POSITIVE)
     keyboard.add(Text("🚫 Банлоги"), color=KeyboardButtonColor.POSITIVE)
     keyboard.row()
+    keyboard.add(Text("🕵️ Фродлоги"), color=KeyboardButtonColor.POSITIVE)
+    keyboard.row()
+    keyboard.add(Text("➡️ Логи дальше"), color=KeyboardButtonColor.PRIMARY)
+    keyboard.row()
     keyboard.add(Text("🔙 Назад"), color=KeyboardButtonColor.SECONDARY)
     
     return keyboard
@@ -455,11 +382,20 @@ async def creator_help_handler(message: Message):
         
         "Основные команды создателя:\n"
         "• Сбросвсех+ - подтвердить массовый сброс всех аккаунтов\n"
+        "• Сбросвсех+ новый - сброс заменой файла базы (мгновенно, старая база - архив)\n"
         "• Сбросвсех- - отменить массовый сброс\n"
+        "• Задачи - ход фоновых удалений и сбросов\n"
         "• Обновить статистику - обновить данные после массового сброса\n"
         "• Спринять [номер] - принять заявку от старшей администрации\n"
         "• Сотклонить [номер] - отклонить заявку от старшей администрации\n"
-        "• Ссписок - список непринятых заявок на массовый сброс\n\n"
+        "• Ссписок - список непринятых заявок на массовый сброс\n"
+        "• Медзапросы - топ медленных запросов к базе\n"
+        "• Медзапросы файл - сохранить топ с планами запросов в файл\n"
+        "• Медзапросы сброс - очистить журнал медленных запросов\n"
+        "• Сверка кланов - проверить счетчики кланов (участники, вклады, залы, сила)\n"
+        "• Сверка кланов исправить - пересчитать расходящиеся счетчики\n"
+        "• Бэкап - снять резервную копию базы и показать последние\n"
+        "• Экономика пересчет [заново] - догнать экономические сводки по истории транзакций\n\n"
         
         "💡 Используйте кнопки для доступа к специальным командам"
     )
@@ -479,26 +415,25 @@ async def refresh_statistics_handler(message: Message):
         return "❌ Эта команда доступна только создателю!"
     
     try:
+        # Свежий снимок базы, чтобы отчет не ждал планового обновления реплики
+        await refresh_replica()
+        
         # Получаем актуальную статистику
-        total_players = await count_players(False)
-        banned_players = await count_banned_players()
-        admin_players = await count_admins()
-        total_balance = await count_total_balance()
-        total_lifts = await sum_column("players", "total_lifts")
-        total_earned = await sum_column("players", "total_earned")
-        total_clans = await count_table_rows("clans")
-        total_clan_treasury = await sum_column("clans", "treasury")
-        total_promos = await count_table_rows("promo_codes")
-        total_promo_uses = await sum_promo_uses()
-        
-        # Получаем статистику по фитнес-залам
-        all_players = await get_all_players()
-        total_halls = 0
-        for player in all_players:
-            halls = await get_player_fitness_halls(player["user_id"])
-            total_halls += halls
-        
-        recent_players = await get_recent_players(limit=5)
+        total_players = await get_storage().count_players(False)
+        banned_players = await get_storage().count_banned_players()
+        admin_players = await get_storage().count_admins()
+        total_balance = await get_storage().count_total_balance()
+        total_lifts = await get_storage().sum_column("players", "total_lifts")
+        total_earned = await get_storage().sum_column("players", "total_earned")
+        total_clans = await get_storage().count_table_rows("clans")
+        total_clan_treasury = await get_storage().sum_column("clans", "treasury")
+        total_promos = await get_storage().count_table_rows("promo_codes")
+        total_promo_uses = await get_storage().sum_promo_uses()
+        
+        # Залы всех игроков одним запросом к реплике
+        total_halls = await get_storage().sum_column("players", "fitness_halls")
+        
+        recent_players = await get_storage().get_recent_players(limit=5)
         
         # Логируем действие
         await log_admin_action(
@@ -535,7 +470,8 @@ async def refresh_statistics_handler(message: Message):
             f"🎫 Промокоды 🎫\n"
             f" Создано промокодов: {total_promos}\n"
             f" Всего активаций: {total_promo_uses}\n\n"
-            f"📊 Последние регистрации 📊\n{recent_text}"
+            f"📊 Последние регистрации 📊\n{recent_text}\n"
+            f"{freshness_line()}"
         )
         
         return stats_text
@@ -596,6 +532,7 @@ async def info_button_handler(message: Message):
         "📊 ИНФОРМАЦИОННЫЕ КОМАНДЫ\n\n"
         "• Аигроки - полный список всех игроков\n"
         "• Акинфо [тег] - подробная информация о клане\n"
+        "• Казна дальше - следующие операции с казной из Акинфо\n"
         "• Промоинфо [код] - информация о промокоде\n"
     )
     
@@ -670,7 +607,9 @@ async def senior_admin_button_handler(message: Message):
         "• Снять [айди] - снять с должности администратора\n\n"
         
         "📊 Статистика:\n"
-        "• Статистика - полная статистика бота\n\n"
+        "• Статистика - полная статистика бота\n"
+        "• Экономика [период] - обороты по типам и денежная масса (24ч, 7д, неделя)\n"
+        "• Подозреваемые - игроки, на которых сработал антифрод\n\n"
         
         "📋 Управление заявками:\n"
         "• Апринять [номер] - принять заявку от модератора\n"
@@ -709,7 +648,8 @@ async def logging_button_handler(message: Message):
         "• Кланлоги - логи использования админ команд связанных с кланом\n"
         "• Залылоги - логи использования команд управления фитнес-залами\n"
         "• Заявкилоги - логи о созданных заявках\n"
-        "• Банлоги - логи о использовании команд блокировок\n\n"
+        "• Банлоги - логи о использовании команд блокировок\n"
+        "• Фродлоги - срабатывания антифрода (переводы и промокоды)\n\n"
         
         "ℹ️ Логи автоматически очищаются каждые 15 дней"
     )
@@ -735,7 +675,9 @@ async def creator_commands_button_handler(message: Message):
         
         "Массовые операции:\n"
         "• Сбросвсех+ - подтвердить массовый сброс всех аккаунтов\n"
+        "• Сбросвсех+ новый - сброс заменой файла базы (мгновенно, старая база - архив)\n"
         "• Сбросвсех- - отменить массовый сброс\n"
+        "• Задачи - ход фоновых удалений и сбросов\n"
         "• Обновить статистику - обновить данные после массового сброса\n\n"
         
         "Управление заявками:\n"
@@ -791,22 +733,22 @@ async def give_fitness_halls_handler(message: Message, cmd_args: str):
     except ValueError:
         return "❌ Количество залов должно быть числом!"
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
     
     target_username = target_player["username"]
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     try:
         # Получаем текущее количество залов
-        current_halls = await get_player_fitness_halls(target_id)
+        current_halls = await get_storage().get_player_fitness_halls(target_id)
         
         # Выдаем залы (бесплатно, без списания баланса)
-        new_halls_count = await update_fitness_halls(target_id, halls_to_give, 0)
+        new_halls_count = await get_storage().update_fitness_halls(target_id, halls_to_give, 0)
         
         # Логируем действие
         await log_admin_action(
@@ -859,25 +801,25 @@ async def take_fitness_halls_handler(message: Message, cmd_args: str):
     except ValueError:
         return "❌ Количество залов должно быть числом!"
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
     
     target_username = target_player["username"]
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     # Получаем текущее количество залов
-    current_halls = await get_player_fitness_halls(target_id)
+    current_halls = await get_storage().get_player_fitness_halls(target_id)
     
     if current_halls < halls_to_take:
         return f"❌ У игрока недостаточно залов! Всего: {format_number(current_halls)}, требуется забрать: {format_number(halls_to_take)}"
     
     try:
         # Забираем залы (отрицательное количество)
-        new_halls_count = await update_fitness_halls(target_id, -halls_to_take, 0)
+        new_halls_count = await get_storage().update_fitness_halls(target_id, -halls_to_take, 0)
         
         # Логируем действие
         await log_admin_action(
@@ -907,6 +849,52 @@ async def take_fitness_halls_handler(message: Message, cmd_args: str):
 # КОМАНДЫ ЛОГИРОВАНИЯ (ТОЛЬКО ДЛЯ СОЗДАТЕЛЯ)
 # ======================
 
+def remember_logs_page(user_id: int, log_type: str, title: str, logs: list) -> str:
+    """Запомнить курсор последней записи страницы и вернуть подсказку"""
+    if len(logs) < LOG_PAGE_SIZE:
+        LOG_PAGE_CURSORS.pop(user_id, None)
+        return ""
+    
+    last = logs[-1]
+    LOG_PAGE_CURSORS[user_id] = (log_type, title, (last["created_at"], last["id"]))
+    return "\n➡️ Следующая страница: Логи дальше"
+
+@admin_labeler.message(text=["Логи дальше", "логи дальше", "➡️ Логи дальше"])
+async def next_logs_page_handler(message: Message):
+    user_id = message.from_id
+    
+    admin_level = await get_admin_access_level(user_id)
+    if admin_level != 1:
+        return "❌ Эти команды доступны только создателю!"
+    
+    cursor = LOG_PAGE_CURSORS.get(user_id)
+    if not cursor:
+        return "📭 Больше страниц нет. Откройте нужный раздел логов заново."
+    
+    log_type, title, before = cursor
+    logs = await get_storage().get_admin_logs(log_type=log_type, limit=LOG_PAGE_SIZE, before=before)
+    
+    if not logs:
+        LOG_PAGE_CURSORS.pop(user_id, None)
+        return "📭 Больше записей нет!"
+    
+    logs_text = f"{title} (продолжение)\n\n"
+    
+    for log in logs:
+        log_time = datetime.fromisoformat(log["created_at"]).strftime("%d.%m.%Y %H:%M:%S")
+        logs_text += f"⏰ {log_time}\n"
+        logs_text += f"👤 {log['admin_name']} ({log['admin_level']})\n"
+        logs_text += f"📝 Действие: {log['action_type']}\n"
+        logs_text += f"ℹ️ Детали: {log['details']}\n"
+        logs_text += "─" * 30 + "\n"
+    
+    logs_text += f"\n📊 Записей на странице: {len(logs)}"
+    logs_text += f"\n{freshness_line()}"
+    logs_text += remember_logs_page(user_id, log_type, title, logs)
+    
+    keyboard = create_logging_keyboard()
+    await message.answer(logs_text, keyboard=keyboard)
+
 @admin_labeler.message(text=["Алоги", "алоги"])
 async def admin_logs_handler(message: Message):
     user_id = message.from_id
@@ -918,7 +906,7 @@ async def admin_logs_handler(message: Message):
     if admin_level != 1:
         return "❌ Эти команды доступны только создателю!"
     
-    logs = await get_admin_logs(log_type="senior_admin", limit=50)
+    logs = await get_storage().get_admin_logs(log_type="senior_admin", limit=LOG_PAGE_SIZE)
     
     if not logs:
         return "📭 Логи команд Старшей администрации отсутствуют!"
@@ -934,6 +922,8 @@ async def admin_logs_handler(message: Message):
         logs_text += "─" * 30 + "\n"
     
     logs_text += f"\n📊 Всего записей: {len(logs)}"
+    logs_text += f"\n{freshness_line()}"
+    logs_text += remember_logs_page(user_id, "senior_admin", "📋 ЛОГИ СТАРШЕЙ АДМИНИСТРАЦИИ", logs)
     
     keyboard = create_logging_keyboard()
     await message.answer(logs_text, keyboard=keyboard)
@@ -949,7 +939,7 @@ async def economy_logs_handler(message: Message):
     if admin_level != 1:
         return "❌ Эти команды доступны только создателю!"
     
-    logs = await get_admin_logs(log_type="economy", limit=50)
+    logs = await get_storage().get_admin_logs(log_type="economy", limit=LOG_PAGE_SIZE)
     
     if not logs:
         return "📭 Логи экономических команд отсутствуют!"
@@ -965,6 +955,8 @@ async def economy_logs_handler(message: Message):
         logs_text += "─" * 30 + "\n"
     
     logs_text += f"\n📊 Всего записей: {len(logs)}"
+    logs_text += f"\n{freshness_line()}"
+    logs_text += remember_logs_page(user_id, "economy", "💰 ЛОГИ ЭКОНОМИЧЕСКИХ КОМАНД", logs)
     
     keyboard = create_logging_keyboard()
     await message.answer(logs_text, keyboard=keyboard)
@@ -980,7 +972,7 @@ async def broadcast_logs_handler(message: Message):
     if admin_level != 1:
         return "❌ Эти команды доступны только создателю!"
     
-    logs = await get_admin_logs(log_type="broadcast", limit=50)
+    logs = await get_storage().get_admin_logs(log_type="broadcast", limit=LOG_PAGE_SIZE)
     
     if not logs:
         return "📭 Логи рассылок отсутствуют!"
@@ -996,6 +988,8 @@ async def broadcast_logs_handler(message: Message):
         logs_text += "─" * 30 + "\n"
     
     logs_text += f"\n📊 Всего записей: {len(logs)}"
+    logs_text += f"\n{freshness_line()}"
+    logs_text += remember_logs_page(user_id, "broadcast", "📢 ЛОГИ РАССЫЛОК", logs)
     
     keyboard = create_logging_keyboard()
     await message.answer(logs_text, keyboard=keyboard)
@@ -1011,7 +1005,7 @@ async def access_logs_handler(message: Message):
     if admin_level != 1:
         return "❌ Эти команды доступны только создателю!"
     
-    logs = await get_admin_logs(log_type="donat_services", limit=50)
+    logs = await get_storage().get_admin_logs(log_type="donat_services", limit=LOG_PAGE_SIZE)
     
     if not logs:
         return "📭 Логи управления доступом отсутствуют!"
@@ -1027,6 +1021,8 @@ async def access_logs_handler(message: Message):
         logs_text += "─" * 30 + "\n"
     
     logs_text += f"\n📊 Всего записей: {len(logs)}"
+    logs_text += f"\n{freshness_line()}"
+    logs_text += remember_logs_page(user_id, "donat_services", "🔓 ЛОГИ УПРАВЛЕНИЯ ДОСТУПОМ К ИНФА", logs)
     
     keyboard = create_logging_keyboard()
     await message.answer(logs_text, keyboard=keyboard)
@@ -1042,7 +1038,7 @@ async def clan_logs_handler(message: Message):
     if admin_level != 1:
         return "❌ Эти команды доступны только создателю!"
     
-    logs = await get_admin_logs(log_type="clans", limit=50)
+    logs = await get_storage().get_admin_logs(log_type="clans", limit=LOG_PAGE_SIZE)
     
     if not logs:
         return "📭 Логи клановых команд отсутствуют!"
@@ -1058,6 +1054,8 @@ async def clan_logs_handler(message: Message):
         logs_text += "─" * 30 + "\n"
     
     logs_text += f"\n📊 Всего записей: {len(logs)}"
+    logs_text += f"\n{freshness_line()}"
+    logs_text += remember_logs_page(user_id, "clans", "🏰 ЛОГИ КЛАНОВЫХ КОМАНД", logs)
     
     keyboard = create_logging_keyboard()
     await message.answer(logs_text, keyboard=keyboard)
@@ -1073,7 +1071,7 @@ async def halls_logs_handler(message: Message):
     if admin_level != 1:
         return "❌ Эти команды доступны только создателю!"
     
-    logs = await get_admin_logs(log_type="halls", limit=50)
+    logs = await get_storage().get_admin_logs(log_type="halls", limit=LOG_PAGE_SIZE)
     
     if not logs:
         return "📭 Логи управления фитнес-залами отсутствуют!"
@@ -1089,6 +1087,8 @@ async def halls_logs_handler(message: Message):
         logs_text += "─" * 30 + "\n"
     
     logs_text += f"\n📊 Всего записей: {len(logs)}"
+    logs_text += f"\n{freshness_line()}"
+    logs_text += remember_logs_page(user_id, "halls", "🏢 ЛОГИ УПРАВЛЕНИЯ ФИТНЕС-ЗАЛАМИ", logs)
     
     keyboard = create_logging_keyboard()
     await message.answer(logs_text, keyboard=keyboard)
@@ -1104,7 +1104,7 @@ async def request_logs_handler(message: Message):
     if admin_level != 1:
         return "❌ Эти команды доступны только создателю!"
     
-    logs = await get_admin_logs(log_type="requests", limit=50)
+    logs = await get_storage().get_admin_logs(log_type="requests", limit=LOG_PAGE_SIZE)
     
     if not logs:
         return "📭 Логи заявок отсутствуют!"
@@ -1120,6 +1120,8 @@ async def request_logs_handler(message: Message):
         logs_text += "─" * 30 + "\n"
     
     logs_text += f"\n📊 Всего записей: {len(logs)}"
+    logs_text += f"\n{freshness_line()}"
+    logs_text += remember_logs_page(user_id, "requests", "📝 ЛОГИ ЗАЯВОК", logs)
     
     keyboard = create_logging_keyboard()
     await message.answer(logs_text, keyboard=keyboard)
@@ -1135,7 +1137,7 @@ async def ban_logs_handler(message: Message):
     if admin_level != 1:
         return "❌ Эти команды доступны только создателю!"
     
-    logs = await get_admin_logs(log_type="bans", limit=50)
+    logs = await get_storage().get_admin_logs(log_type="bans", limit=LOG_PAGE_SIZE)
     
     if not logs:
         return "📭 Логи блокировок отсутствуют!"
@@ -1151,10 +1153,74 @@ async def ban_logs_handler(message: Message):
         logs_text += "─" * 30 + "\n"
     
     logs_text += f"\n📊 Всего записей: {len(logs)}"
+    logs_text += f"\n{freshness_line()}"
+    logs_text += remember_logs_page(user_id, "bans", "🚫 ЛОГИ БЛОКИРОВОК", logs)
+    
+    keyboard = create_logging_keyboard()
+    await message.answer(logs_text, keyboard=keyboard)
+
+@admin_labeler.message(text=["Фродлоги", "фродлоги", "🕵️ Фродлоги"])
+async def fraud_logs_handler(message: Message):
+    user_id = message.from_id
+    
+    if not await is_admin(user_id):
+        return "❌ У вас нет прав администратора!"
+    
+    admin_level = await get_admin_access_level(user_id)
+    if admin_level != 1:
+        return "❌ Эти команды доступны только создателю!"
+    
+    logs = await get_storage().get_admin_logs(log_type="fraud", limit=LOG_PAGE_SIZE)
+    
+    if not logs:
+        return "📭 Срабатываний антифрода нет!"
+    
+    logs_text = "🕵️ ЛОГИ АНТИФРОДА\n\n"
+    
+    for log in logs:
+        log_time = datetime.fromisoformat(log["created_at"]).strftime("%d.%m.%Y %H:%M:%S")
+        logs_text += f"⏰ {log_time}\n"
+        logs_text += f"👤 [id{log['user_id']}|Игрок]\n"
+        logs_text += f"📝 Правило: {log['action_type']}\n"
+        logs_text += f"ℹ️ Детали: {log['details']}\n"
+        logs_text += "─" * 30 + "\n"
+    
+    logs_text += f"\n📊 Всего записей: {len(logs)}"
+    logs_text += f"\n{freshness_line()}"
+    logs_text += remember_logs_page(user_id, "fraud", "🕵️ ЛОГИ АНТИФРОДА", logs)
     
     keyboard = create_logging_keyboard()
     await message.answer(logs_text, keyboard=keyboard)
 
+@admin_labeler.message(text=["Подозреваемые", "подозреваемые"])
+async def fraud_suspects_handler(message: Message):
+    """Игроки, на которых сработал антифрод за последние сутки"""
+    user_id = message.from_id
+    
+    if not await is_admin(user_id):
+        return "❌ Только администраторы могут использовать эту команду!"
+    
+    admin_level = await get_admin_access_level(user_id)
+    if admin_level not in [1, 2]:
+        return "❌ Эта команда доступна только Старшей администрации!"
+    
+    suspects = get_suspects()
+    if not suspects:
+        return "✅ Подозрительной активности не замечено"
+    
+    text = f"🕵️ ПОДОЗРЕВАЕМЫЕ ({len(suspects)})\n\n"
+    for i, suspect in enumerate(suspects[:20], 1):
+        rules = ", ".join(RULE_TITLES[rule] for rule in sorted(suspect["rules"]))
+        last_alert = datetime.fromtimestamp(suspect["last_alert"]).strftime("%d.%m %H:%M")
+        text += (
+            f"{i}. [id{suspect['user_id']}|Игрок] - срабатываний: {suspect['score']} ({last_alert})\n"
+            f"   📝 {rules}\n"
+            f"   ℹ️ {suspect['details']}\n"
+        )
+    
+    text += "\n💡 Подробности: Фродлоги"
+    return text
+
 # ======================
 # КОМАНДЫ СТАРШЕЙ АДМИНИСТРАЦИИ
 # ======================
@@ -1192,7 +1258,7 @@ async def make_admin_handler(message: Message, cmd_args: str):
         if new_admin_level != 3:
             return "❌ Старший администратор может назначать только на уровень 3 (Модератор)!"
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
@@ -1202,10 +1268,10 @@ async def make_admin_handler(message: Message, cmd_args: str):
     if target_player.get("admin_level", 0) > 0:
         return f'❌ Игрок "{target_username}" уже является администратором!'
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
-    admin_id = await make_admin(target_id, user_id, new_admin_level)
+    admin_id = await get_storage().make_admin(target_id, user_id, new_admin_level)
     
     level_name = "⭐ Старший администратор" if new_admin_level == 2 else "👮 Модератор"
     
@@ -1243,7 +1309,7 @@ async def remove_admin_handler(message: Message, cmd_args: str):
     except ValueError:
         return "❌ Айди игрока должно быть числом!"
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
@@ -1267,9 +1333,9 @@ async def remove_admin_handler(message: Message, cmd_args: str):
     if target_admin_level < admin_level:
         return "❌ Вы не можете снять администратора высшего уровня!"
     
-    await remove_admin(target_id, user_id)
+    await get_storage().remove_admin(target_id, user_id)
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     await log_admin_action(
@@ -1300,28 +1366,24 @@ async def bot_statistics_handler(message: Message):
     if admin_level not in [1, 2]:
         return "❌ Эта команда доступна только Старшей администрации!"
     
-    total_players = await count_players(False)
-    banned_players = await count_banned_players()
-    admin_players = await count_admins()
-    total_balance = await count_total_balance()
+    total_players = await get_storage().count_players(False)
+    banned_players = await get_storage().count_banned_players()
+    admin_players = await get_storage().count_admins()
+    total_balance = await get_storage().count_total_balance()
     
-    total_lifts = await sum_column("players", "total_lifts")
-    total_earned = await sum_column("players", "total_earned")
+    total_lifts = await get_storage().sum_column("players", "total_lifts")
+    total_earned = await get_storage().sum_column("players", "total_earned")
     
-    total_clans = await count_table_rows("clans")
-    total_clan_treasury = await sum_column("clans", "treasury")
+    total_clans = await get_storage().count_table_rows("clans")
+    total_clan_treasury = await get_storage().sum_column("clans", "treasury")
     
-    total_promos = await count_table_rows("promo_codes")
-    total_promo_uses = await sum_promo_uses()
+    total_promos = await get_storage().count_table_rows("promo_codes")
+    total_promo_uses = await get_storage().sum_promo_uses()
     
-    # Получаем статистику по фитнес-залам
-    all_players = await get_all_players()
-    total_halls = 0
-    for player in all_players:
-        halls = await get_player_fitness_halls(player["user_id"])
-        total_halls += halls
+    # Залы всех игроков одним запросом к реплике
+    total_halls = await get_storage().sum_column("players", "fitness_halls")
     
-    recent_players = await get_recent_players()
+    recent_players = await get_storage().get_recent_players()
     
     recent_text = ""
     for i, (username, created_at) in enumerate(recent_players, 1):
@@ -1348,11 +1410,162 @@ async def bot_statistics_handler(message: Message):
         f"🎫 Промокоды 🎫\n"
         f" Создано промокодов: {total_promos}\n"
         f" Всего активаций: {total_promo_uses}\n\n"
-        f"📊 Последние регистрации 📊\n{recent_text}"
+        f"📊 Последние регистрации 📊\n{recent_text}\n"
+        f"{freshness_line()}"
     )
     
     return stats_text
 
+@admin_labeler.message(text=["Медзапросы", "медзапросы", "Медзапросы <action>", "медзапросы <action>"])
+async def slow_queries_handler(message: Message, action: Optional[str] = None):
+    user_id = message.from_id
+    
+    if not await is_admin(user_id):
+        return "❌ Только администраторы могут использовать эту команду!"
+    
+    admin_level = await get_admin_access_level(user_id)
+    if admin_level != 1:
+        return "❌ Эта команда доступна только создателю!"
+    
+    action = (action or "").strip().lower()
+    
+    if action == "файл":
+        path = dump_slow_queries()
+        return f"✅ Медленные запросы с планами сохранены в файл:\n{path}"
+    
+    if action == "сброс":
+        reset_slow_queries()
+        return "✅ Журнал медленных запросов и ожиданий транзакций очищен"
+    
+    entries = get_slow_queries(limit=10)
+    return (
+        f"🐢 МЕДЛЕННЫЕ ЗАПРОСЫ (от {settings.SLOW_QUERY_MS} мс) 🐢\n\n"
+        f"{format_slow_queries(entries)}\n\n"
+        f"🔒 Ожидания транзакций (BEGIN, COMMIT):\n"
+        f"{format_lock_waits(get_lock_waits())}"
+    )
+
+@admin_labeler.message(text=["Сверка кланов", "сверка кланов", "Сверка кланов <action>", "сверка кланов <action>"])
+async def clan_counters_check_handler(message: Message, action: Optional[str] = None):
+    user_id = message.from_id
+    
+    if not await is_admin(user_id):
+        return "❌ Только администраторы могут использовать эту команду!"
+    
+    admin_level = await get_admin_access_level(user_id)
+    if admin_level != 1:
+        return "❌ Эта команда доступна только создателю!"
+    
+    fix = (action or "").strip().lower() == "исправить"
+    mismatches = await get_storage().check_clan_counters(fix=fix)
+    
+    if not mismatches:
+        return "✅ Счетчики всех кланов совпадают с данными участников"
+    
+    lines = []
+    for item in mismatches[:10]:
+        diffs = ", ".join(
+            f"{counter}: {item['stored'][counter]} → {item['actual'][counter]}"
+            for counter in item["stored"]
+            if item["stored"][counter] != item["actual"][counter]
+        )
+        lines.append(f"• [{item['tag']}] {diffs}")
+    if len(mismatches) > 10:
+        lines.append(f"...и ещё {len(mismatches) - 10} кланов")
+    
+    header = "✅ Исправлены счетчики кланов" if fix else "⚠️ Расхождения в счетчиках кланов"
+    footer = "" if fix else "\n\n💡 Исправить: Сверка кланов исправить"
+    return f"{header} ({len(mismatches)}):\n\n" + "\n".join(lines) + footer
+
+@admin_labeler.message(text=["Бэкап", "бэкап"])
+async def backup_handler(message: Message):
+    """Снимок базы без остановки бота"""
+    user_id = message.from_id
+    
+    if not await is_admin(user_id):
+        return "❌ Только администраторы могут использовать эту команду!"
+    
+    admin_level = await get_admin_access_level(user_id)
+    if admin_level != 1:
+        return "❌ Эта команда доступна только создателю!"
+    
+    await message.answer("⏳ Снимаю резервную копию базы...")
+    result = await create_backup("manual")
+    if not result["success"]:
+        return f"❌ {result['error']}"
+    
+    backups = list_backups()[-5:]
+    lines = [f"• {os.path.basename(path)}" for path in reversed(backups)]
+    return (
+        f"💾 Резервная копия готова за {result['seconds']:.1f} с\n"
+        f"📦 Размер: {result['size'] / 1024 / 1024:.1f} МБ\n\n"
+        f"Последние копии ({settings.backup_dir}):\n" + "\n".join(lines)
+    )
+
+@admin_labeler.message(text=["Экономика", "экономика", "Экономика <period>", "экономика <period>"])
+async def economy_report_handler(message: Message, period: Optional[str] = None):
+    """Экономика за период по почасовым сводкам"""
+    user_id = message.from_id
+    
+    if not await is_admin(user_id):
+        return "❌ Только администраторы могут использовать эту команду!"
+    
+    admin_level = await get_admin_access_level(user_id)
+    
+    if period and period.strip().lower().startswith("пересчет"):
+        if admin_level != 1:
+            return "❌ Эта команда доступна только создателю!"
+        rebuild = period.strip().lower().endswith("заново")
+        if not start_backfill(message.peer_id, rebuild):
+            return "⏳ Пересчет сводок уже идет"
+        return "⏳ Пересчет экономических сводок запущен, о ходе сообщу сюда"
+    
+    if admin_level not in [1, 2]:
+        return "❌ Эта команда доступна только Старшей администрации!"
+    
+    hours = parse_period(period)
+    if hours is None:
+        return "❌ Неверный период! Примеры: 24ч, 7д, 2н, неделя, месяц (не больше 90 дней)"
+    
+    by_type = await get_storage().get_economy_by_type(hours)
+    supply = await get_storage().get_money_supply_range(hours)
+    top_earners = await get_storage().get_top_earners_period(max(1, hours // 24))
+    
+    period_text = f"{hours} ч" if hours < 48 else f"{hours // 24} дн"
+    issued = sum(row["sum"] for row in by_type if row["sum"] > 0)
+    withdrawn = -sum(row["sum"] for row in by_type if row["sum"] < 0)
+    
+    report = f"📈 ЭКОНОМИКА ЗА {period_text}\n\n"
+    
+    if by_type:
+        report += "💸 Обороты по типам:\n"
+        for row in by_type[:15]:
+            sign = "+" if row["sum"] >= 0 else "-"
+            report += f"• {transaction_title(row['type'])}: {sign}{format_number(abs(row['sum']))} ({row['count']} оп.)\n"
+        report += (
+            f"\n➕ Начислено: {format_number(issued)} монет\n"
+            f"➖ Списано: {format_number(withdrawn)} монет\n"
+            f"📊 Чистая эмиссия: {format_number(issued - withdrawn)} монет\n\n"
+        )
+    else:
+        report += "📭 Транзакций за период нет\n\n"
+    
+    if supply:
+        report += f"💰 Денежная масса: {format_number(supply['end'])} монет у {supply['players']} игроков\n"
+        if supply["start_hour"] != supply["end_hour"] and supply["start"] > 0:
+            growth = (supply["end"] - supply["start"]) / supply["start"] * 100
+            report += f"📉 Инфляция с {supply['start_hour']}: {growth:+.2f}%\n"
+        report += "\n"
+    
+    if top_earners:
+        report += "🏆 Больше всех заработали:\n"
+        for i, player in enumerate(top_earners, 1):
+            report += f"{i}. {player['username']}: +{format_number(player['earned'])} / -{format_number(player['spent'])}\n"
+        report += "\n"
+    
+    report += freshness_line()
+    return report
+
 @admin_labeler.message(text=["Апринять <request_id>", "апринять <request_id>"])
 async def approve_moderator_request_handler(message: Message, request_id: str):
     """Принять заявку от модератора"""
@@ -1371,7 +1584,7 @@ async def approve_moderator_request_handler(message: Message, request_id: str):
     except ValueError:
         return "❌ Номер заявки должен быть числом!"
     
-    request_info = await get_request_by_id(request_id_int)
+    request_info = await get_storage().get_request_by_id(request_id_int)
     
     if not request_info:
         return f"❌ Заявка #{request_id} не найдена!"
@@ -1382,7 +1595,7 @@ async def approve_moderator_request_handler(message: Message, request_id: str):
     if admin_level == 2 and request_info["request_type"] == "reset_all":
         return "❌ Старший администратор не может принимать заявки на массовый сброс!"
     
-    result = await approve_request(request_id_int, user_id)
+    result = await get_storage().approve_request(request_id_int, user_id)
     
     if result["success"]:
         await log_admin_action(
@@ -1394,21 +1607,22 @@ async def approve_moderator_request_handler(message: Message, request_id: str):
         )
         
         if request_info["request_type"] == "delete_player":
-            await delete_player(request_info["target_id"], user_id)
-            await increment_admin_stat(user_id, "deletions")
+            job = start_player_deletion(request_info["target_id"], user_id, message.peer_id)
+            await get_storage().increment_admin_stat(user_id, "deletions")
             
             response_text = (
-                f"✅ Заявка #{request_id} принята и выполнена!\n\n"
+                f"✅ Заявка #{request_id} принята!\n\n"
                 f"📋 Тип заявки: Удаление игрока\n"
                 f"👤 Создал: {request_info['admin_name']}\n"
                 f"🎯 Игрок: [id{request_info['target_id']}|{request_info['additional_info'].get('username', 'Неизвестно')}]\n"
                 f"📝 Причина: {request_info['reason']}\n"
-                f"✅ Принял: {'Создатель' if admin_level == 1 else 'Старший администратор'}"
+                f"✅ Принял: {'Создатель' if admin_level == 1 else 'Старший администратор'}\n\n"
+                f"⏳ Удаление идет в фоне (задача #{job['id']}), о завершении придет сообщение"
             )
         
         elif request_info["request_type"] == "delete_clan":
             tag = request_info["additional_info"].get("tag", "")
-            result_delete = await delete_clan(tag, user_id)
+            result_delete = await get_storage().delete_clan(tag, user_id)
             
             if result_delete["success"]:
                 response_text = (
@@ -1453,7 +1667,7 @@ async def reject_moderator_request_handler(message: Message, request_id: str):
     except ValueError:
         return "❌ Номер заявки должен быть числом!"
     
-    request_info = await get_request_by_id(request_id_int)
+    request_info = await get_storage().get_request_by_id(request_id_int)
     
     if not request_info:
         return f"❌ Заявка #{request_id} не найдена!"
@@ -1464,7 +1678,7 @@ async def reject_moderator_request_handler(message: Message, request_id: str):
     if admin_level == 2 and request_info["request_type"] == "reset_all":
         return "❌ Старший администратор не может обрабатывать заявки на массовый сброс!"
     
-    result = await reject_request(request_id_int, user_id, "Отклонено администратором")
+    result = await get_storage().reject_request(request_id_int, user_id, "Отклонено администратором")
     
     if result["success"]:
         await log_admin_action(
@@ -1499,7 +1713,7 @@ async def pending_requests_handler(message: Message):
     if admin_level not in [1, 2]:
         return "❌ Эта команда доступна только Старшей администрации!"
     
-    pending_requests = await get_pending_requests()
+    pending_requests = await get_storage().get_pending_requests()
     
     if admin_level == 2:
         pending_requests = [r for r in pending_requests if r["request_type"] != "reset_all"]
@@ -1516,7 +1730,7 @@ async def pending_requests_handler(message: Message):
         requests_text += f"👤 Создал: {request['admin_name']}\n"
         
         if request["target_id"]:
-            target_player = await get_player(request["target_id"])
+            target_player = await get_storage().get_player(request["target_id"])
             if target_player:
                 requests_text += f"🎯 Цель: [id{request['target_id']}|{target_player['username']}]\n"
         
@@ -1567,8 +1781,8 @@ async def reset_all_accounts_handler(message: Message):
         else:
             return f"❌ Ошибка при создании заявки: {result['error']}"
     
-    regular_players = await count_players(regular_only=True)
-    total_clans = await count_clans()
+    regular_players = await get_storage().count_players(regular_only=True)
+    total_clans = await get_storage().count_clans()
     
     PENDING_RESETS[user_id] = {"timestamp": datetime.now()}
     
@@ -1593,6 +1807,14 @@ async def reset_all_accounts_handler(message: Message):
 
 @admin_labeler.message(text=["Сбросвсех+", "сбросвсех+"])
 async def confirm_reset_all_handler(message: Message):
+    return await confirm_reset_all(message, swap=False)
+
+@admin_labeler.message(text=["Сбросвсех+ новый", "сбросвсех+ новый"])
+async def confirm_reset_all_swap_handler(message: Message):
+    """Сброс заменой файла базы: мгновенно, старая база остается архивом"""
+    return await confirm_reset_all(message, swap=True)
+
+async def confirm_reset_all(message: Message, swap: bool):
     user_id = message.from_id
     
     if not await is_admin(user_id):
@@ -1605,11 +1827,13 @@ async def confirm_reset_all_handler(message: Message):
     if user_id not in PENDING_RESETS:
         return "❌ Нет ожидающих подтверждения сбросов!"
     
-    deleted_players = await count_players(regular_only=True)
-    deleted_clans = await count_clans()
-    deleted_balance = await count_total_balance()
+    deleted_players = await get_storage().count_players(regular_only=True)
+    deleted_clans = await get_storage().count_clans()
+    deleted_balance = await get_storage().count_total_balance()
     
-    await reset_all()
+    job = start_reset_all(user_id, message.peer_id, swap=swap)
+    if job is None:
+        return "❌ Массовый сброс уже выполняется! Ход: Задачи"
     
     del PENDING_RESETS[user_id]
     
@@ -1622,14 +1846,15 @@ async def confirm_reset_all_handler(message: Message):
     )
     
     return (
-        f"🔄 Все аккаунты сброшены!\n\n"
-        f"📊 Статистика удаления:\n"
-        f" Удалено игроков: {deleted_players}\n"
-        f" Удалено кланов: {deleted_clans}\n"
-        f" Утеряно монет: {format_number(deleted_balance)}\n"
+        f"🔄 Сброс всех аккаунтов запущен (задача #{job['id']})!\n\n"
+        f"📊 Будет удалено:\n"
+        f" Игроков: {deleted_players}\n"
+        f" Кланов: {deleted_clans}\n"
+        f" Монет: {format_number(deleted_balance)}\n"
         f" Администраторы: Сохранены\n\n"
-        f"✅ Бот готов к новому сезону!\n\n"
-        f"💡 Для обновления статистики используйте команду:\n"
+        f"⏳ {'Создается новый файл базы' if swap else 'Удаление идет пачками, бот продолжает работать'}, "
+        f"о ходе и завершении придут сообщения\n\n"
+        f"💡 После завершения обновите статистику командой:\n"
         f"Обновить статистику"
     )
 
@@ -1651,6 +1876,24 @@ async def cancel_reset_all_handler(message: Message):
     
     return "✅ Сброс всех аккаунтов отменен!"
 
+@admin_labeler.message(text=["Задачи", "задачи"])
+async def maintenance_jobs_handler(message: Message):
+    """Ход фоновых удалений и сбросов"""
+    user_id = message.from_id
+    
+    if not await is_admin(user_id):
+        return "❌ Только администраторы могут использовать эту команду!"
+    
+    admin_level = await get_admin_access_level(user_id)
+    if admin_level not in [1, 2]:
+        return "❌ Эта команда доступна только Старшей администрации!"
+    
+    jobs = get_jobs()
+    if not jobs:
+        return "📋 Фоновых задач не было"
+    
+    return "📋 Фоновые задачи:\n\n" + "\n".join(format_job(job) for job in jobs)
+
 @admin_labeler.message(text=["Спринять <request_id>", "спринять <request_id>"])
 async def approve_senior_request_handler(message: Message, request_id: str):
     """Принять заявку от старшей администрации"""
@@ -1668,7 +1911,7 @@ async def approve_senior_request_handler(message: Message, request_id: str):
     except ValueError:
         return "❌ Номер заявки должен быть числом!"
     
-    request_info = await get_request_by_id(request_id_int)
+    request_info = await get_storage().get_request_by_id(request_id_int)
     
     if not request_info:
         return f"❌ Заявка #{request_id} не найдена!"
@@ -1679,14 +1922,16 @@ async def approve_senior_request_handler(message: Message, request_id: str):
     if request_info["request_type"] != "reset_all":
         return f"❌ Заявка #{request_id} не требует подтверждения создателя!"
     
-    result = await approve_request(request_id_int, user_id)
+    result = await get_storage().approve_request(request_id_int, user_id)
     
     if result["success"]:
-        deleted_players = await count_players(regular_only=True)
-        deleted_clans = await count_clans()
-        deleted_balance = await count_total_balance()
+        deleted_players = await get_storage().count_players(regular_only=True)
+        deleted_clans = await get_storage().count_clans()
+        deleted_balance = await get_storage().count_total_balance()
         
-        await reset_all()
+        job = start_reset_all(user_id, message.peer_id)
+        if job is None:
+            return f"✅ Заявка #{request_id} принята, но массовый сброс уже выполняется! Ход: Задачи"
         
         await log_admin_action(
             user_id,
@@ -1697,15 +1942,15 @@ async def approve_senior_request_handler(message: Message, request_id: str):
         )
         
         return (
-            f"✅ Заявка #{request_id} принята и выполнена!\n\n"
+            f"✅ Заявка #{request_id} принята!\n\n"
             f"📋 Тип заявки: {request_info['request_type']}\n"
             f"👤 Создал: {request_info['admin_name']} (Старший администратор)\n"
             f"✅ Принял: Создатель\n\n"
-            f"📊 Результат:\n"
-            f" Удалено игроков: {deleted_players}\n"
-            f" Удалено кланов: {deleted_clans}\n"
-            f" Утеряно монет: {format_number(deleted_balance)}\n\n"
-            f"✅ Бот готов к новому сезону!\n\n"
+            f"📊 Будет удалено:\n"
+            f" Игроков: {deleted_players}\n"
+            f" Кланов: {deleted_clans}\n"
+            f" Монет: {format_number(deleted_balance)}\n\n"
+            f"⏳ Сброс идет в фоне (задача #{job['id']}), о завершении придет сообщение\n\n"
             f"💡 Для обновления статистики используйте команду:\n"
             f"Обновить статистику"
         )
@@ -1729,7 +1974,7 @@ async def reject_senior_request_handler(message: Message, request_id: str):
     except ValueError:
         return "❌ Номер заявки должен быть числом!"
     
-    request_info = await get_request_by_id(request_id_int)
+    request_info = await get_storage().get_request_by_id(request_id_int)
     
     if not request_info:
         return f"❌ Заявка #{request_id} не найдена!"
@@ -1740,7 +1985,7 @@ async def reject_senior_request_handler(message: Message, request_id: str):
     if request_info["request_type"] != "reset_all":
         return f"❌ Заявка #{request_id} не требует подтверждения создателя!"
     
-    result = await reject_request(request_id_int, user_id, "Отклонено создателем")
+    result = await get_storage().reject_request(request_id_int, user_id, "Отклонено создателем")
     
     if result["success"]:
         await log_admin_action(
@@ -1774,7 +2019,7 @@ async def creator_pending_requests_handler(message: Message):
     if admin_level != 1:
         return "❌ Эта команда доступна только создателю!"
     
-    pending_requests = await get_pending_requests()
+    pending_requests = await get_storage().get_pending_requests()
     
     reset_requests = [r for r in pending_requests if r["request_type"] == "reset_all"]
     
@@ -1829,17 +2074,17 @@ async def set_dumbbell_handler(message: Message, cmd_args: str):
     except:
         return "❌ Уровень гантели должен быть числом!"
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
     
     target_username = target_player["username"]
     
-    if await set_dumbbell_level(target_id, new_level, user_id):
+    if await get_storage().set_dumbbell_level(target_id, new_level, user_id):
         dumbbell_info = settings.DUMBBELL_LEVELS[new_level]
         
-        admin = await get_player(user_id)
+        admin = await get_storage().get_player(user_id)
         admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
         
         await log_admin_action(
@@ -1887,7 +2132,7 @@ async def remove_balance_handler(message: Message, cmd_args: str):
     except:
         return "❌ Сумма должна быть числом!"
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
@@ -1897,7 +2142,7 @@ async def remove_balance_handler(message: Message, cmd_args: str):
     if target_player["balance"] < amount:
         amount = target_player["balance"]
     
-    await update_player_balance(
+    await get_storage().update_player_balance(
         target_id,
         -amount,
         "admin_remove_balance",
@@ -1905,7 +2150,7 @@ async def remove_balance_handler(message: Message, cmd_args: str):
         user_id,
     )
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     await log_admin_action(
@@ -1953,14 +2198,14 @@ async def add_balance_handler(message: Message, cmd_args: str):
     if amount > 2_147_483_647:
         return "❌ Сумма слишком большая!"
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
     
     target_username = target_player["username"]
     
-    await update_player_balance(
+    await get_storage().update_player_balance(
         target_id,
         amount,
         "admin_add_balance",
@@ -1968,7 +2213,7 @@ async def add_balance_handler(message: Message, cmd_args: str):
         user_id,
     )
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     await log_admin_action(
@@ -2014,16 +2259,16 @@ async def admin_set_power_handler(message: Message, cmd_args: str):
     except:
         return "❌ Количество силы должно быть числом!"
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
     
     target_username = target_player["username"]
     
-    await update_player_power(target_id, power, user_id)
+    await get_storage().update_player_power(target_id, power, user_id)
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     await log_admin_action(
@@ -2062,14 +2307,14 @@ async def set_custom_income_handler(message: Message, cmd_args: str):
     
     income_str = parts[1]
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
     
     target_username = target_player["username"]
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     if income_str.lower() == "сброс":
@@ -2086,7 +2331,7 @@ async def set_custom_income_handler(message: Message, cmd_args: str):
         except:
             return '❌ Доход должен быть числом или "сброс"!'
     
-    await set_custom_income(target_id, custom_income, user_id)
+    await get_storage().set_custom_income(target_id, custom_income, user_id)
     
     await log_admin_action(
         user_id,
@@ -2124,16 +2369,16 @@ async def set_lifts_handler(message: Message, cmd_args: str):
     except:
         return "❌ Количество поднятий должно быть числом!"
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
     
     target_username = target_player["username"]
     
-    await set_total_lifts(target_id, new_total, user_id)
+    await get_storage().set_total_lifts(target_id, new_total, user_id)
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     await log_admin_action(
@@ -2189,7 +2434,7 @@ async def create_promo_handler(message: Message, cmd_args: str):
         return "❌ Сумма награды должна быть числом!"
     
     if admin_level == 3:
-        promo_stats = await get_moderator_promo_stats(user_id)
+        promo_stats = await get_storage().get_moderator_promo_stats(user_id)
         
         if reward_type == "монеты" and reward_amount > 500:
             return "❌ Модератор не может создавать промокоды с наградой больше 500 монет!"
@@ -2197,7 +2442,7 @@ async def create_promo_handler(message: Message, cmd_args: str):
         if reward_type == "сила" and reward_amount > 300:
             return "❌ Модератор не может создавать промокоды с наградой больше 300 силы!"
         
-        await update_moderator_promo_stats(user_id, reward_type, reward_amount)
+        await get_storage().update_moderator_promo_stats(user_id, reward_type, reward_amount)
     
     expires_days = None
     if len(parts) > 4:
@@ -2208,7 +2453,7 @@ async def create_promo_handler(message: Message, cmd_args: str):
         except:
             return "❌ Срок действия должен быть числом дней!"
     
-    if await create_promo_code(
+    if await get_storage().create_promo_code(
         code, uses_total, reward_type, reward_amount, user_id, expires_days
     ):
         if expires_days:
@@ -2219,7 +2464,7 @@ async def create_promo_handler(message: Message, cmd_args: str):
         else:
             expires_text = "⏳ Срок действия: Не ограничен"
         
-        admin = await get_player(user_id)
+        admin = await get_storage().get_player(user_id)
         admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
         
         await log_admin_action(
@@ -2256,14 +2501,14 @@ async def delete_promo_handler(message: Message, code: str):
         return "❌ Команды промокодов доступны только для Старшей администрации и выше!"
     
     code = code.upper()
-    promo_info = await get_promo_info(code)
+    promo_info = await get_storage().get_promo_info(code)
     
     if not promo_info:
         return f"❌ Промокод {code} не найден!"
     
-    await delete_promo_code(code, user_id)
+    await get_storage().delete_promo_code(code, user_id)
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     await log_admin_action(
@@ -2296,7 +2541,7 @@ async def admin_all_players_handler(message: Message):
     if not await can_use_command(user_id, "info"):
         return "❌ У вас нет доступа к информационным командам!"
     
-    all_players = await get_all_players(limit=100)
+    all_players = await get_storage().get_all_players(limit=100)
     
     if not all_players:
         return "❌ Игроков не найдено!"
@@ -2307,7 +2552,7 @@ async def admin_all_players_handler(message: Message):
         admin = "👑" if player.get("admin_level", 0) == 1 else "⭐" if player.get("admin_level", 0) == 2 else "👮" if player.get("admin_level", 0) == 3 else ""
         players_text += f"{i}. {admin}{banned}[id{player['user_id']}|{player['username']}] | 💰{format_number(player['balance'])} | 💪{player['power']}\n"
     
-    total_players = await count_players(False)
+    total_players = await get_storage().count_players(False)
     shown_players = min(50, len(all_players))
     
     keyboard = create_info_keyboard()
@@ -2319,6 +2564,68 @@ async def admin_all_players_handler(message: Message):
         f"{players_text}"
     )
 
+def format_treasury_log(log: list) -> str:
+    """Строки лога операций с казной клана"""
+    log_text = ""
+    for entry in log:
+        action_emoji = (
+            "➕"
+            if entry["action_type"] == "deposit"
+            else (
+                "⬆️"
+                if entry["action_type"] == "upgrade"
+                else (
+                    "💰"
+                    if entry["action_type"] == "lift_income"
+                    else ("📊" if entry["action_type"] == "distribution" else "📝")
+                )
+            )
+        )
+        username = entry["username"] or "Система"
+        time_str = datetime.fromisoformat(entry["created_at"]).strftime("%d.%m %H:%M")
+        log_text += (
+            f"• {action_emoji} {entry['description']} - {username} ({time_str})\n"
+        )
+    return log_text
+
+def remember_treasury_log_page(user_id: int, clan: dict, log: list) -> str:
+    """Запомнить курсор последней операции с казной и вернуть подсказку"""
+    if len(log) < TREASURY_LOG_PAGE_SIZE:
+        TREASURY_LOG_CURSORS.pop(user_id, None)
+        return ""
+    
+    last = log[-1]
+    TREASURY_LOG_CURSORS[user_id] = (clan["id"], clan["tag"], (last["created_at"], last["id"]))
+    return "\n➡️ Следующие операции: Казна дальше"
+
+@admin_labeler.message(text=["Казна дальше", "казна дальше"])
+async def treasury_log_next_page_handler(message: Message):
+    """Следующая страница лога казны клана из Акинфо"""
+    user_id = message.from_id
+    
+    if not await is_admin(user_id):
+        return "❌ Только администраторы могут использовать эту команду!"
+    
+    if not await can_use_command(user_id, "info"):
+        return "❌ У вас нет доступа к информационным командам!"
+    
+    cursor = TREASURY_LOG_CURSORS.get(user_id)
+    if not cursor:
+        return "📭 Больше страниц нет. Откройте клан заново: Акинфо [тег]"
+    
+    clan_id, tag, before = cursor
+    log = await get_storage().get_clan_treasury_log(clan_id, TREASURY_LOG_PAGE_SIZE, before=before)
+    
+    if not log:
+        TREASURY_LOG_CURSORS.pop(user_id, None)
+        return "📭 Больше операций с казной нет!"
+    
+    response_text = f"📜 ОПЕРАЦИИ С КАЗНОЙ [{tag}] (продолжение)\n\n{format_treasury_log(log)}"
+    response_text += remember_treasury_log_page(user_id, {"id": clan_id, "tag": tag}, log)
+    
+    keyboard = create_info_keyboard()
+    await message.answer(response_text, keyboard=keyboard)
+
 @admin_labeler.message(text=["Акинфо <tag>", "акинфо <tag>"])
 async def admin_clan_info_command(message: Message, tag: str):
     """Подробная информация о клане для администратора"""
@@ -2330,15 +2637,15 @@ async def admin_clan_info_command(message: Message, tag: str):
     if not await can_use_command(user_id, "info"):
         return "❌ У вас нет доступа к информационным командам!"
     
-    clan = await get_clan_by_tag(tag)
+    clan = await get_storage().get_clan_by_tag(tag)
     if not clan:
         return f"❌ Клан с тегом [{tag.upper()}] не найден!"
     
-    members = await get_clan_members(clan["id"], 50)
+    members = await get_storage().get_clan_members(clan["id"], 50)
     
-    owner = await get_player(clan["owner_id"])
+    owner = await get_storage().get_player(clan["owner_id"])
     
-    log = await get_clan_treasury_log(clan["id"], 10)
+    log = await get_storage().get_clan_treasury_log(clan["id"], TREASURY_LOG_PAGE_SIZE)
     
     clan_bonuses = get_clan_bonuses(clan["level"])
     
@@ -2352,26 +2659,7 @@ async def admin_clan_info_command(message: Message, tag: str):
         join_date = datetime.fromisoformat(member["joined_at"]).strftime("%d.%m")
         members_text += f"{i}. {role_emoji} {member['username']} (ID: {member['user_id']}) - {format_number(member['contributions'])} монет ({join_date})\n"
     
-    log_text = ""
-    for entry in log:
-        action_emoji = (
-            "➕"
-            if entry["action_type"] == "deposit"
-            else (
-                "⬆️"
-                if entry["action_type"] == "upgrade"
-                else (
-                    "💰"
-                    if entry["action_type"] == "lift_income"
-                    else ("📊" if entry["action_type"] == "distribution" else "📝")
-                )
-            )
-        )
-        username = entry["username"] or "Система"
-        time_str = datetime.fromisoformat(entry["created_at"]).strftime("%d.%m %H:%M")
-        log_text += (
-            f"• {action_emoji} {entry['description']} - {username} ({time_str})\n"
-        )
+    log_text = format_treasury_log(log)
     
     created_date = datetime.fromisoformat(clan["created_at"]).strftime("%d.%m.%Y %H:%M")
     days_exist = (datetime.now() - datetime.fromisoformat(clan["created_at"])).days
@@ -2391,6 +2679,7 @@ async def admin_clan_info_command(message: Message, tag: str):
         f"🏆 Участники (топ-15):\n{members_text}\n"
         f"📜 Последние операции с казной:\n{log_text}"
     )
+    response_text += remember_treasury_log_page(user_id, clan, log)
     
     keyboard = create_info_keyboard()
     await message.answer(response_text, keyboard=keyboard)
@@ -2407,13 +2696,13 @@ async def promo_info_handler(message: Message, code: str):
         return "❌ У вас нет доступа к информационным командам!"
     
     code = code.upper()
-    promo_info = await get_promo_info(code)
+    promo_info = await get_storage().get_promo_info(code)
     
     if not promo_info:
         return f"❌ Промокод {code} не найден!"
     
     created_date = datetime.fromisoformat(promo_info["created_at"]).strftime("%d.%m.%Y %H:%M")
-    creator = await get_player(promo_info["created_by"])
+    creator = await get_storage().get_player(promo_info["created_by"])
     creator_name = creator["username"] if creator else "Неизвестно"
     
     expires_text = "Не ограничен"
@@ -2456,14 +2745,13 @@ async def admin_player_info_handler(message: Message, cmd_args: str):
     except ValueError:
         return "❌ Айди игрока должно быть числом!"
 
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
 
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
 
     try:
-        from bot.db import get_player_fitness_halls
-        fitness_halls = await get_player_fitness_halls(target_id)
+        fitness_halls = await get_storage().get_player_fitness_halls(target_id)
         daily_income_from_halls = fitness_halls * 10
         fitness_halls_text = f"🔸 Фитнес-залы: {format_number(fitness_halls)}\n"
         daily_income_text = f"🔸 Ежедневный доход с залов: {format_number(daily_income_from_halls)}\n"
@@ -2471,7 +2759,7 @@ async def admin_player_info_handler(message: Message, cmd_args: str):
         fitness_halls_text = ""
         daily_income_text = ""
     
-    clan = await get_player_clan(target_id)
+    clan = await get_storage().get_player_clan(target_id)
 
     created_date = datetime.fromisoformat(target_player["created_at"]).strftime("%d.%m.%Y %H:%M")
     last_active = target_player.get("last_active")
@@ -2566,7 +2854,7 @@ async def grant_info_access_handler(message: Message, cmd_args: str):
     except:
         return "❌ Срок должен быть числом!"
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
@@ -2576,14 +2864,14 @@ async def grant_info_access_handler(message: Message, cmd_args: str):
     if target_player.get("admin_level", 0) > 0:
         return f"❌ Игрок [id{target_id}|{target_username}] уже является администратором и имеет безграничный доступ к команде Инфа!"
     
-    current_access = await get_info_access_details(target_id)
+    current_access = await get_storage().get_info_access_details(target_id)
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     if days == 0:
         if current_access:
-            await remove_info_access(target_id, user_id)
+            await get_storage().remove_info_access(target_id, user_id)
             expires_date = datetime.fromisoformat(current_access["expires_at"]).strftime("%d.%m.%Y")
             
             await log_admin_action(
@@ -2604,12 +2892,12 @@ async def grant_info_access_handler(message: Message, cmd_args: str):
             return f"❌ У игрока [id{target_id}|{target_username}] нет доступа к команде Инфа!"
     else:
         if current_access:
-            await extend_info_access(target_id, days, user_id)
+            await get_storage().extend_info_access(target_id, days, user_id)
             new_expires_at = (datetime.fromisoformat(current_access["expires_at"]) + timedelta(days=days))
             expires_date = new_expires_at.strftime("%d.%m.%Y")
             action_text = "продлён"
         else:
-            await set_info_access(target_id, days, user_id)
+            await get_storage().set_info_access(target_id, days, user_id)
             expires_date = (datetime.now() + timedelta(days=days)).strftime("%d.%m.%Y")
             action_text = "выдан"
         
@@ -2642,7 +2930,7 @@ async def list_info_access_handler(message: Message):
     if not await can_use_command(user_id, "donat_services"):
         return "❌ У вас нет доступа к управлению доступом!"
     
-    all_access = await get_all_info_access()
+    all_access = await get_storage().get_all_info_access()
     
     if not all_access:
         return "❌ Ни у кого нет доступа к команде Инфа!"
@@ -2651,8 +2939,8 @@ async def list_info_access_handler(message: Message):
     current_time = datetime.now()
     
     for i, access in enumerate(all_access, 1):
-        player = await get_player(access["user_id"])
-        admin = await get_player(access["admin_id"])
+        player = await get_storage().get_player(access["user_id"])
+        admin = await get_storage().get_player(access["admin_id"])
         
         if not player:
             continue
@@ -2707,7 +2995,7 @@ async def delete_player_handler(message: Message, cmd_args: str):
     
     reason = " ".join(parts[1:])
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
@@ -2765,7 +3053,7 @@ async def delete_player_handler(message: Message, cmd_args: str):
         f"💰 Баланс: {format_number(target_player['balance'])} монет\n"
         f"⚖️ Гантеля: {target_player['dumbbell_name']}\n"
         f"💪 Поднятий: {format_number(target_player['total_lifts'])}\n"
-        f"🏢 Фитнес-залы: {format_number(await get_player_fitness_halls(target_id))}\n"
+        f"🏢 Фитнес-залы: {format_number(await get_storage().get_player_fitness_halls(target_id))}\n"
         f"📅 Зарегистрирован: {created_date} ({days_exist} дней)\n\n"
         f"📝 Причина удаления:\n{reason}\n\n"
         f"❗ ВНИМАНИЕ❗ Это действие необратимо❗\n"
@@ -2788,7 +3076,7 @@ async def admin_delete_clan_command(message: Message, tag: str):
     if not await can_use_command(user_id, "clans"):
         return "❌ У вас нет доступа к клановым командам!"
     
-    clan = await get_clan_by_tag(tag)
+    clan = await get_storage().get_clan_by_tag(tag)
     if not clan:
         return f"❌ Клан с тегом [{tag.upper()}] не найден!"
     
@@ -2802,7 +3090,7 @@ async def admin_delete_clan_command(message: Message, tag: str):
                 "tag": clan["tag"],
                 "name": clan["name"],
                 "treasury": clan["treasury"],
-                "members_count": await get_clan_member_count(clan["id"])
+                "members_count": await get_storage().get_clan_member_count(clan["id"])
             }
         )
         
@@ -2811,7 +3099,7 @@ async def admin_delete_clan_command(message: Message, tag: str):
                 f"📝 Заявка #{result['request_id']} создана!\n\n"
                 f"🏰 Клан: [{clan['tag']}] {clan['name']}\n"
                 f"💰 Казна: {format_number(clan['treasury'])} монет\n"
-                f"👥 Участников: {await get_clan_member_count(clan['id'])}\n\n"
+                f"👥 Участников: {await get_storage().get_clan_member_count(clan['id'])}\n\n"
                 f"💡 Старший администратор может принять заявку командой:\n"
                 f"Апринять {result['request_id']}"
             )
@@ -2819,10 +3107,10 @@ async def admin_delete_clan_command(message: Message, tag: str):
             return f"❌ Ошибка при создании заявки: {result['error']}"
     
     if tag.upper() in PENDING_DELETIONS:
-        result = await delete_clan(tag, user_id)
+        result = await get_storage().delete_clan(tag, user_id)
         
         if result["success"]:
-            admin = await get_player(user_id)
+            admin = await get_storage().get_player(user_id)
             admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
             
             await log_admin_action(
@@ -2852,7 +3140,7 @@ async def admin_delete_clan_command(message: Message, tag: str):
             "timestamp": datetime.now(),
         }
         
-        member_count = await get_clan_member_count(clan["id"])
+        member_count = await get_storage().get_clan_member_count(clan["id"])
         
         response_text = (
             f"⚠️ ПОДТВЕРЖДЕНИЕ УДАЛЕНИЯ КЛАНА\n\n"
@@ -2890,7 +3178,7 @@ async def broadcast_message_handler(message: Message, cmd_args: str):
         return "❌ Укажите текст сообщения для рассылки!"
     
     if admin_level == 3:
-        can_broadcast, stats = await check_broadcast_limit(user_id)
+        can_broadcast, stats = await get_storage().check_broadcast_limit(user_id)
         if not can_broadcast:
             reset_time = stats.get("reset_time")
             if reset_time:
@@ -2899,7 +3187,7 @@ async def broadcast_message_handler(message: Message, cmd_args: str):
             else:
                 return "❌ Лимит рассылок исчерпан! Вы использовали 5/5 рассылок за сутки."
     
-    all_players = await get_all_players()
+    all_players = await get_storage().get_all_players()
     
     if not all_players:
         return "❌ Нет игроков для рассылки!"
@@ -2909,9 +3197,9 @@ async def broadcast_message_handler(message: Message, cmd_args: str):
     failed_sends = 0
     
     if admin_level == 3:
-        await increment_broadcast_usage(user_id)
+        await get_storage().increment_broadcast_usage(user_id)
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     for player in all_players:
@@ -2963,7 +3251,7 @@ async def set_admin_nickname_handler(message: Message, nickname: str):
     if len(nickname) > 30:
         return "❌ Ник слишком длинный! Максимум 30 символов."
     
-    await set_admin_nickname(user_id, nickname)
+    await get_storage().set_admin_nickname(user_id, nickname)
     
     await log_admin_action(
         user_id,
@@ -3002,7 +3290,7 @@ async def ban_player_handler(message: Message, cmd_args: str):
     
     reason = " ".join(parts[2:])
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
@@ -3015,9 +3303,9 @@ async def ban_player_handler(message: Message, cmd_args: str):
     if target_player.get("is_banned", 0) == 1:
         return f'❌ Игрок "{target_username}" уже забанен!'
     
-    await ban_player(target_id, user_id, days, reason)
+    await get_storage().ban_player(target_id, user_id, days, reason)
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     await log_admin_action(
@@ -3054,7 +3342,7 @@ async def permaban_player_handler(message: Message, cmd_args: str):
     
     reason = " ".join(parts[1:])
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
@@ -3067,9 +3355,9 @@ async def permaban_player_handler(message: Message, cmd_args: str):
     if target_player.get("is_banned", 0) == 1:
         return f'❌ Игрок "{target_username}" уже забанен!'
     
-    await ban_player(target_id, user_id, 36500, f"ПЕРМАНЕНТНО: {reason}")
+    await get_storage().ban_player(target_id, user_id, 36500, f"ПЕРМАНЕНТНО: {reason}")
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     await log_admin_action(
@@ -3100,7 +3388,7 @@ async def unban_player_handler(message: Message, user_id: str):
     except ValueError:
         return "❌ Айди игрока должно быть числом!"
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
@@ -3110,9 +3398,9 @@ async def unban_player_handler(message: Message, user_id: str):
     if target_player.get("is_banned", 0) == 0:
         return f'❌ Игрок "{target_username}" не забанен!'
     
-    await unban_player(target_id, admin_id)
+    await get_storage().unban_player(target_id, admin_id)
     
-    admin = await get_player(admin_id)
+    admin = await get_storage().get_player(admin_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     await log_admin_action(
@@ -3153,16 +3441,16 @@ async def change_username_handler(message: Message, cmd_args: str):
     if len(new_username) > 50:
         return "❌ Ник слишком длинный! Максимум 50 символов."
     
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
     
     old_username = target_player["username"]
     
-    await update_username(target_id, new_username, user_id)
+    await get_storage().update_username(target_id, new_username, user_id)
     
-    admin = await get_player(user_id)
+    admin = await get_storage().get_player(user_id)
     admin_nickname = admin.get("admin_nickname", admin["username"]) if admin else "Администратор"
     
     await log_admin_action(
@@ -3190,8 +3478,8 @@ async def auto_cleanup_logs():
     while True:
         try:
             await asyncio.sleep(15 * 24 * 60 * 60)
-            cleaned_logs = await cleanup_old_logs(15)
-            cleaned_requests = await cleanup_old_requests(15)
+            cleaned_logs = await get_storage().cleanup_old_logs(15)
+            cleaned_requests = await get_storage().cleanup_old_requests(15)
             print(f"✅ Автоочистка логов выполнена: {cleaned_logs} логов, {cleaned_requests} заявок")
         except Exception as e:
             print(f"❌ Ошибка автоочистки логов: {e}")
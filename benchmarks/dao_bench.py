@@ -0,0 +1,483 @@
+# bot/benchmarks/dao_bench.py
+"""
+Микробенчмарки горячих вызовов db и Storage на синтетической базе.
+
+Каждый бенчмарк - async-функция одного вызова. Раннер делает прогрев,
+затем rounds замеров и считает min/max/mean/median/stddev и ops/s (как
+pytest-benchmark), а также сколько SQL-запросов делает один вызов. Результаты сохраняются в JSON вместе с коммитом и
+объемами базы; --compare сравнивает медианы с прошлым прогоном и
+возвращает код 1 при регрессии больше порога.
+
+Примеры:
+    python -m bot.benchmarks.dataset --db /tmp/gym_legend_bench.db --scale 0.1
+    python -m bot.benchmarks.dao_bench --db /tmp/gym_legend_bench.db --output before.json
+    python -m bot.benchmarks.dao_bench --db /tmp/gym_legend_bench.db --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from bot.core.config import settings
+from bot import db
+from bot.storage import get_storage
+from bot.services.clans import get_player_context
+from bot.services import users, bans
+from bot.services.slow_queries import SlowQueryConnection
+from bot.benchmarks.dataset import FIRST_USER_ID, BENCH_PROMO_CODE
+
+# Глубина страницы для сравнения OFFSET и курсора в admin_logs
+ADMIN_LOGS_DEPTH = 10_000
+
+BENCHMARKS: List[Dict[str, Any]] = []
+
+# Число выполненных SQL-запросов (без BEGIN/COMMIT)
+QUERY_COUNTER = {"value": 0}
+
+
+class CountingConnection(SlowQueryConnection):
+    """Соединение, считающее запросы: показывает число обращений к базе на вызов"""
+
+    def execute(self, sql, parameters=()):
+        if not sql.lstrip().upper().startswith(("BEGIN", "COMMIT", "ROLLBACK")):
+            QUERY_COUNTER["value"] += 1
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        QUERY_COUNTER["value"] += 1
+        return super().executemany(sql, parameters)
+
+
+def benchmark(group: str, rounds: int = 200):
+    """Зарегистрировать бенчмарк"""
+    def decorator(func: Callable):
+        BENCHMARKS.append({"name": func.__name__, "group": group, "rounds": rounds, "func": func})
+        return func
+    return decorator
+
+
+class BenchContext:
+    """Общее состояние прогона: объемы базы и воспроизводимый генератор"""
+
+    def __init__(self, players: int, clans: int, seed: int):
+        self.players = players
+        self.clans = clans
+        self.rng = random.Random(seed)
+        self.next_user = 0
+        self.admin_logs_cursor = None
+
+    def random_user(self) -> int:
+        return FIRST_USER_ID + self.rng.randrange(self.players)
+
+    def fresh_user(self) -> int:
+        """Каждый вызов - новый игрок (для операций, которые нельзя повторять)"""
+        self.next_user = (self.next_user + 1) % self.players
+        return FIRST_USER_ID + self.next_user
+
+    def random_clan(self) -> int:
+        return 1 + self.rng.randrange(self.clans)
+
+
+# ======================
+# ИГРОКИ
+# ======================
+
+@benchmark("players")
+async def get_player(ctx: BenchContext):
+    await db.get_player(ctx.random_user())
+
+
+@benchmark("players")
+async def update_player_balance(ctx: BenchContext):
+    await db.update_player_balance(ctx.random_user(), 10, "bench", "Бенчмарк")
+
+
+@benchmark("players")
+async def add_daily_fitness_hall_income(ctx: BenchContext):
+    await db.add_daily_fitness_hall_income(ctx.random_user(), 50, "Бенчмарк")
+
+
+# ======================
+# КОНТЕКСТ ИГРОКА (гантели, прокачка)
+# ======================
+
+@benchmark("context")
+async def player_and_clan_separately(ctx: BenchContext):
+    """Как раньше делали обработчики гантелей: игрок и клан отдельными вызовами"""
+    user_id = ctx.random_user()
+    await db.get_player(user_id)
+    await db.get_player_clan(user_id)
+
+
+@benchmark("context")
+async def player_context_joined(ctx: BenchContext):
+    """Игрок, клан, роль и бонусы клана одним запросом"""
+    await get_player_context(ctx.random_user())
+
+
+# ======================
+# ПРАВА АДМИНИСТРАЦИИ
+# ======================
+
+@benchmark("acl")
+async def admin_level_from_db(ctx: BenchContext):
+    """Как проверялись права раньше: get_player на каждую проверку"""
+    await db.get_admin_level(ctx.random_user())
+
+
+@benchmark("acl")
+async def admin_level_from_acl(ctx: BenchContext):
+    user_id = ctx.random_user()
+    await users.is_admin(user_id)
+    await users.get_admin_access_level(user_id)
+    await users.can_use_command(user_id, "economy")
+
+
+# ======================
+# БАНЫ
+# ======================
+
+@benchmark("bans")
+async def ban_check_from_db(ctx: BenchContext):
+    """Как пришлось бы проверять бан на каждое сообщение: get_player"""
+    player = await db.get_player(ctx.random_user())
+    return bool(player and player["is_banned"])
+
+
+@benchmark("bans")
+async def ban_check_from_registry(ctx: BenchContext):
+    bans.is_banned(ctx.random_user())
+
+
+# ======================
+# ТОПЫ
+# ======================
+
+@benchmark("tops", rounds=20)
+async def get_top_balance(ctx: BenchContext):
+    await db.get_top_balance(10)
+
+
+@benchmark("tops", rounds=20)
+async def get_top_lifts(ctx: BenchContext):
+    await db.get_top_lifts(10)
+
+
+@benchmark("tops", rounds=20)
+async def get_top_earners(ctx: BenchContext):
+    await db.get_top_earners(10)
+
+
+@benchmark("tops", rounds=20)
+async def get_top_players_by_power(ctx: BenchContext):
+    await db.get_top_players_by_power(10)
+
+
+@benchmark("tops", rounds=20)
+async def get_top_players_by_halls(ctx: BenchContext):
+    await db.get_top_players_by_halls(10)
+
+
+@benchmark("tops", rounds=20)
+async def get_top_clans(ctx: BenchContext):
+    await db.get_top_clans(10)
+
+
+@benchmark("tops", rounds=20)
+async def get_top_clans_by_power(ctx: BenchContext):
+    await db.get_top_clans(10, "power")
+
+
+@benchmark("tops", rounds=20)
+async def get_top_clans_by_halls(ctx: BenchContext):
+    await db.get_top_clans(10, "halls")
+
+
+# ======================
+# КЛАНЫ И ПРОМОКОДЫ
+# ======================
+
+@benchmark("clans")
+async def get_clan_members(ctx: BenchContext):
+    await db.get_clan_members(ctx.random_clan(), 50)
+
+
+@benchmark("clans")
+async def get_clan_member_count(ctx: BenchContext):
+    await db.get_clan_member_count(ctx.random_clan())
+
+
+@benchmark("clans", rounds=3)
+async def check_clan_counters(ctx: BenchContext):
+    await db.check_clan_counters()
+
+
+@benchmark("clans")
+async def distribute_treasury_all(ctx: BenchContext):
+    clan_id = ctx.random_clan()
+    await db.distribute_treasury(clan_id, "all", 1, FIRST_USER_ID + clan_id - 1)
+
+
+@benchmark("promo")
+async def use_promo_code(ctx: BenchContext):
+    await db.use_promo_code(ctx.fresh_user(), BENCH_PROMO_CODE)
+
+
+# ======================
+# НОЧНЫЕ ВЫПЛАТЫ
+# ======================
+
+@benchmark("nightly", rounds=3)
+async def get_all_players_with_halls(ctx: BenchContext):
+    await db.get_all_players_with_halls()
+
+
+@benchmark("nightly", rounds=3)
+async def nightly_payout_1000_players(ctx: BenchContext):
+    """Выплата 1000 игрокам так, как это делает daily_income_task"""
+    for _ in range(1000):
+        await db.add_daily_fitness_hall_income(ctx.fresh_user(), 50, "Бенчмарк")
+
+
+# ======================
+# ЛОГИ АДМИНИСТРАЦИИ
+# ======================
+
+@benchmark("admin_logs", rounds=20)
+async def admin_logs_first_page(ctx: BenchContext):
+    await db.get_admin_logs(log_type="economy", limit=50)
+
+
+@benchmark("admin_logs", rounds=20)
+async def admin_logs_deep_offset(ctx: BenchContext):
+    await db.get_admin_logs(log_type="economy", limit=50, offset=ADMIN_LOGS_DEPTH)
+
+
+@benchmark("admin_logs", rounds=20)
+async def admin_logs_deep_keyset(ctx: BenchContext):
+    await db.get_admin_logs(log_type="economy", limit=50, before=ctx.admin_logs_cursor)
+
+
+# ======================
+# STORAGE
+# ======================
+
+@benchmark("storage")
+async def storage_get_player(ctx: BenchContext):
+    await get_storage().get_player(ctx.random_user())
+
+
+@benchmark("storage")
+async def storage_get_player_clan(ctx: BenchContext):
+    await get_storage().get_player_clan(ctx.random_user())
+
+
+@benchmark("storage")
+async def storage_get_player_context(ctx: BenchContext):
+    await get_storage().get_player_context(ctx.random_user())
+
+
+@benchmark("storage")
+async def storage_update_player_balance(ctx: BenchContext):
+    await get_storage().update_player_balance(ctx.random_user(), 10, "bench", "Бенчмарк")
+
+
+@benchmark("storage")
+async def storage_record_dumbbell_lift(ctx: BenchContext):
+    await get_storage().record_dumbbell_lift(ctx.random_user(), 1)
+
+
+@benchmark("storage")
+async def storage_get_inspection_context(ctx: BenchContext):
+    await get_storage().get_inspection_context(ctx.random_user(), ctx.random_user(), 1)
+
+
+@benchmark("storage")
+async def storage_reserve_inspection(ctx: BenchContext):
+    await get_storage().reserve_inspection(ctx.random_user(), 1000, 0)
+
+
+@benchmark("storage")
+async def storage_resolve_inspection(ctx: BenchContext):
+    await get_storage().resolve_inspection(ctx.random_user(), ctx.random_user(), 1, 3)
+
+
+# ======================
+# ЗАПУСК
+# ======================
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def _load_meta(path: str) -> Dict[str, Any]:
+    try:
+        with open(f"{path}.meta.json", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        conn = sqlite3.connect(path)
+        try:
+            players = conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+            clans = conn.execute("SELECT COUNT(*) FROM clans").fetchone()[0]
+        finally:
+            conn.close()
+        return {"volumes": {"players": players, "clans": clans}}
+
+
+def _admin_logs_cursor(path: str):
+    """Курсор (created_at, id) на глубине ADMIN_LOGS_DEPTH - та же страница, что и по OFFSET"""
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute(
+            """
+            SELECT created_at, id FROM admin_logs WHERE log_type = 'economy'
+            ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?
+            """,
+            (ADMIN_LOGS_DEPTH - 1,),
+        ).fetchone()
+    finally:
+        conn.close()
+    return tuple(row) if row else ("9999-12-31", 0)
+
+
+async def run_benchmark(bench: Dict[str, Any], ctx: BenchContext, rounds: Optional[int]) -> Dict[str, Any]:
+    func = bench["func"]
+    rounds = rounds or bench["rounds"]
+
+    await func(ctx)  # прогрев
+    timings = []
+    QUERY_COUNTER["value"] = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await func(ctx)
+        timings.append(time.perf_counter() - started)
+    queries = QUERY_COUNTER["value"] / rounds
+
+    mean = statistics.fmean(timings)
+    return {
+        "name": bench["name"],
+        "group": bench["group"],
+        "rounds": rounds,
+        "min": min(timings),
+        "max": max(timings),
+        "mean": mean,
+        "median": statistics.median(timings),
+        "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "ops": 1 / mean if mean else 0.0,
+        "queries": queries,
+    }
+
+
+async def run_all(args: argparse.Namespace) -> Dict[str, Any]:
+    settings.DATABASE_PATH = args.db
+    # Журнал медленных запросов не должен печатать каждый тяжелый замер
+    settings.SLOW_QUERY_MS = 10 ** 9
+    db.CONNECTION_FACTORY = CountingConnection
+    # Config.py из репозитория не задает CREATOR_ID, а проверка прав сверяется с ним
+    if not hasattr(settings, "CREATOR_ID"):
+        object.__setattr__(settings, "CREATOR_ID", FIRST_USER_ID)
+
+    meta = _load_meta(args.db)
+    volumes = meta["volumes"]
+    ctx = BenchContext(volumes["players"], max(1, volumes.get("clans", 1)), args.seed)
+    ctx.admin_logs_cursor = _admin_logs_cursor(args.db)
+    await users.load_acl()
+    await bans.load_bans()
+
+    results = []
+    for bench in BENCHMARKS:
+        if args.group and bench["group"] not in args.group:
+            continue
+        if args.filter and args.filter not in bench["name"]:
+            continue
+        result = await run_benchmark(bench, ctx, args.rounds)
+        results.append(result)
+        print(
+            f"{result['group']:<12} {result['name']:<36} "
+            f"median {result['median'] * 1000:9.3f} мс  "
+            f"mean {result['mean'] * 1000:9.3f} мс  "
+            f"ops {result['ops']:10.1f}  "
+            f"запросов {result['queries']:6.1f}"
+        )
+
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "database": os.path.abspath(args.db),
+        "dataset": meta,
+        "benchmarks": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> bool:
+    """Сравнить медианы с базовым прогоном, вернуть True при регрессии"""
+    previous = {bench["name"]: bench for bench in baseline["benchmarks"]}
+    regressed = False
+
+    print(f"\nСравнение с {baseline.get('commit') or 'базовым прогоном'} (порог {threshold:.0%}):")
+    for bench in current["benchmarks"]:
+        old = previous.get(bench["name"])
+        if not old or not old["median"]:
+            print(f"  {bench['name']:<36} новый")
+            continue
+
+        change = bench["median"] / old["median"] - 1
+        queries = ""
+        if "queries" in old and old["queries"] != bench["queries"]:
+            queries = f", запросов {old['queries']:.1f} -> {bench['queries']:.1f}"
+        mark = ""
+        if change > threshold:
+            mark = "  ⚠️ РЕГРЕССИЯ"
+            regressed = True
+        elif change < -threshold:
+            mark = "  ✅ быстрее"
+        print(
+            f"  {bench['name']:<36} {old['median'] * 1000:9.3f} -> "
+            f"{bench['median'] * 1000:9.3f} мс ({change:+.1%}{queries}){mark}"
+        )
+    return regressed
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Бенчмарки слоя db/Storage")
+    parser.add_argument("--db", required=True, help="база от bot.benchmarks.dataset")
+    parser.add_argument("--group", nargs="*", help="запустить только эти группы")
+    parser.add_argument("--filter", help="подстрока в имени бенчмарка")
+    parser.add_argument("--rounds", type=int, help="переопределить число замеров")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="файл результатов JSON (по умолчанию bench-<commit>.json)")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.10, help="допустимое замедление медианы")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    report = asyncio.run(run_all(args))
+
+    output = args.output or f"bench-{report['commit'] or 'local'}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ Результаты сохранены в {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
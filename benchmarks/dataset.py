@@ -0,0 +1,213 @@
+# bot/benchmarks/dataset.py
+"""
+Генератор синтетической базы для бенчмарков.
+
+Схема берется из create_tables(), строки генерируются внутри SQLite
+рекурсивными CTE пачками по CHUNK_SIZE: это быстрее executemany из Python и
+не зависит от random() - при одинаковом масштабе база получается одинаковой.
+
+Объемы при --scale 1:
+    1 000 000 игроков, 50 000 000 транзакций, 20 000 кланов (половина игроков
+    в кланах), 10 000 промокодов и 1 000 000 активаций, 5 000 000 проверок,
+    10 000 000 записей admin_logs.
+
+Пример:
+    python -m bot.benchmarks.dataset --db /tmp/gym_legend_bench.db --scale 0.01
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import asyncio
+import argparse
+from typing import Dict, List
+
+from bot.core.config import settings
+from bot import db
+
+FIRST_USER_ID = 1_000_000
+BENCH_PROMO_CODE = "BENCH"
+CHUNK_SIZE = 1_000_000
+
+# Начало временных меток (формат как у datetime.isoformat())
+START_TIME = "2025-01-01 00:00:00"
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+BASE_VOLUMES = {
+    "players": 1_000_000,
+    "transactions": 50_000_000,
+    "clans": 20_000,
+    "promo_codes": 10_000,
+    "promo_uses": 1_000_000,
+    "inspections": 5_000_000,
+    "admin_logs": 10_000_000,
+}
+
+ADMIN_LOG_TYPES = ["senior_admin", "economy", "broadcast", "donat_services", "clans", "halls", "requests", "bans"]
+# Типы, которые пишет бот (user.py, db.py): сводки и антифрод группируют по ним
+TRANSACTION_TYPES = [
+    "dumbbell_lift", "money_transfer_sent", "money_transfer_received", "daily_hall_income", "fitness_hall_purchase",
+]
+
+# Псевдослучайный, но воспроизводимый номер игрока для строки i
+PLAYER_HASH = "((i * 2654435761) % {players})"
+
+
+def scaled_volumes(scale: float) -> Dict[str, int]:
+    """Объемы таблиц для масштаба scale (не меньше 1 строки)"""
+    return {table: max(1, int(count * scale)) for table, count in BASE_VOLUMES.items()}
+
+
+def _series(count: int, offset: int) -> str:
+    """CTE s(i) с числами offset..offset+count-1"""
+    return (
+        f"WITH RECURSIVE s(i) AS (SELECT {offset} UNION ALL SELECT i + 1 FROM s WHERE i < {offset + count - 1}) "
+    )
+
+
+def _timestamp(total_rows: int, days: int = 90) -> str:
+    """Метка времени строки i: равномерно за days дней от START_TIME"""
+    return f"strftime('{TIME_FORMAT}', '{START_TIME}', '+' || (i * {days * 86400} / {max(total_rows, 1)}) || ' seconds')"
+
+
+def _case(values: List[str], expr: str) -> str:
+    branches = " ".join(f"WHEN {n} THEN '{value}'" for n, value in enumerate(values))
+    return f"CASE {expr} % {len(values)} {branches} END"
+
+
+def _fill(conn: sqlite3.Connection, table: str, total: int, build_sql) -> None:
+    """Заполнить таблицу пачками и показать прогресс"""
+    started = time.perf_counter()
+    for offset in range(0, total, CHUNK_SIZE):
+        count = min(CHUNK_SIZE, total - offset)
+        conn.execute(build_sql(count, offset))
+        conn.commit()
+        print(f"  {table}: {offset + count}/{total}", end="\r", flush=True)
+    print(f"  {table}: {total} строк за {time.perf_counter() - started:.1f} с")
+
+
+def fill_database(path: str, volumes: Dict[str, int]) -> None:
+    """Заполнить пустую базу со схемой create_tables()"""
+    players = volumes["players"]
+    clans = min(volumes["clans"], players)
+    members = players // 2
+    player_hash = PLAYER_HASH.format(players=players)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+
+    try:
+        _fill(conn, "players", players, lambda count, offset: (
+            _series(count, offset)
+            + "INSERT INTO players (user_id, username, balance, power, total_lifts, total_earned, "
+            "dumbbell_level, fitness_halls, clan_id, clan_role, is_new, last_dumbbell_use, created_at, last_active) "
+            f"SELECT {FIRST_USER_ID} + i, 'Игрок ' || i, (i * 7919) % 10000000, (i * 31) % 100000, "
+            "(i * 104729) % 50000, (i * 7907) % 20000000, 1 + i % 20, "
+            "CASE WHEN i % 5 = 0 THEN i % 100 ELSE 0 END, "
+            f"CASE WHEN i < {members} THEN 1 + i % {clans} END, "
+            f"CASE WHEN i < {clans} THEN 'owner' WHEN i < {members} THEN 'member' END, "
+            f"0, '2000-01-01T00:00:00', {_timestamp(players)}, {_timestamp(players)} FROM s"
+        ))
+
+        _fill(conn, "clans", clans, lambda count, offset: (
+            _series(count, offset)
+            + "INSERT INTO clans (id, tag, name, owner_id, level, treasury, member_count, total_lifts, experience) "
+            f"SELECT i + 1, 'T' || i, 'Клан ' || i, {FIRST_USER_ID} + i, 1 + i % 10, (i * 7919) % 5000000, 0, "
+            "(i * 104729) % 1000000, (i * 31) % 100000 FROM s"
+        ))
+
+        _fill(conn, "clan_members", members, lambda count, offset: (
+            _series(count, offset)
+            + "INSERT INTO clan_members (clan_id, user_id, role, contributions, joined_at) "
+            f"SELECT 1 + i % {clans}, {FIRST_USER_ID} + i, "
+            f"CASE WHEN i < {clans} THEN 'owner' ELSE 'member' END, (i * 7919) % 100000, "
+            f"{_timestamp(members)} FROM s"
+        ))
+
+        transactions = volumes["transactions"]
+        _fill(conn, "transactions", transactions, lambda count, offset: (
+            _series(count, offset)
+            + "INSERT INTO transactions (user_id, type, amount, description, created_at) "
+            f"SELECT {FIRST_USER_ID} + {player_hash}, {_case(TRANSACTION_TYPES, 'i')}, "
+            f"1 + (i * 7919) % 10000, 'bench', {_timestamp(transactions)} FROM s"
+        ))
+
+        promo_codes = volumes["promo_codes"]
+        _fill(conn, "promo_codes", promo_codes, lambda count, offset: (
+            _series(count, offset)
+            + "INSERT INTO promo_codes (code, uses_total, uses_left, reward_type, reward_amount, created_by) "
+            f"SELECT 'PROMO' || i, 1000, 1000 - i % 1000, 'монеты', 100, {FIRST_USER_ID} FROM s"
+        ))
+        # Промокод для бенчмарка активаций: хватает на всех игроков
+        conn.execute(
+            "INSERT INTO promo_codes (code, uses_total, uses_left, reward_type, reward_amount, created_by) "
+            "VALUES (?, ?, ?, 'монеты', 100, ?)",
+            (BENCH_PROMO_CODE, players, players, FIRST_USER_ID),
+        )
+        conn.commit()
+
+        promo_uses = volumes["promo_uses"]
+        _fill(conn, "promo_uses", promo_uses, lambda count, offset: (
+            _series(count, offset)
+            + "INSERT INTO promo_uses (user_id, promo_code, used_at) "
+            f"SELECT {FIRST_USER_ID} + {player_hash}, 'PROMO' || (i % {promo_codes}), {_timestamp(promo_uses)} FROM s"
+        ))
+
+        inspections = volumes["inspections"]
+        _fill(conn, "inspections", inspections, lambda count, offset: (
+            _series(count, offset)
+            + "INSERT INTO inspections (inspector_id, target_id, successful, halls_closed, created_at) "
+            f"SELECT {FIRST_USER_ID} + {player_hash}, {FIRST_USER_ID} + (i * 40503) % {players}, "
+            f"CASE WHEN i % 3 = 0 THEN 0 ELSE 1 END, i % 4, {_timestamp(inspections)} FROM s"
+        ))
+
+        admin_logs = volumes["admin_logs"]
+        _fill(conn, "admin_logs", admin_logs, lambda count, offset: (
+            _series(count, offset)
+            + "INSERT INTO admin_logs (user_id, admin_name, admin_level, action_type, details, log_type, created_at) "
+            f"SELECT {FIRST_USER_ID} + i % 100, 'Админ ' || (i % 100), '2', 'bench', 'Действие ' || i, "
+            f"{_case(ADMIN_LOG_TYPES, 'i')}, {_timestamp(admin_logs)} FROM s"
+        ))
+
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+async def generate_dataset(path: str, scale: float = 1.0) -> Dict[str, int]:
+    """Создать базу со схемой бота и синтетическими данными, вернуть объемы"""
+    for suffix in ("", "-journal", ".meta.json"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    settings.DATABASE_PATH = path
+    await db.create_tables()
+
+    volumes = scaled_volumes(scale)
+    started = time.perf_counter()
+    print(f"Генерация {path} (масштаб {scale})")
+    fill_database(path, volumes)
+    # Счетчики кланов: игроки вставлены раньше кланов, пересчитываем разом
+    await db.check_clan_counters(fix=True)
+    print(f"✅ База готова за {time.perf_counter() - started:.1f} с")
+
+    # Объемы рядом с базой: бенчмарки пишут их в результаты
+    with open(f"{path}.meta.json", "w", encoding="utf-8") as f:
+        json.dump({"scale": scale, "first_user_id": FIRST_USER_ID, "volumes": volumes}, f, indent=2)
+    return volumes
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Синтетическая база для бенчмарков")
+    parser.add_argument("--db", default="gym_legend_bench.db", help="путь к создаваемой базе")
+    parser.add_argument("--scale", type=float, default=1.0, help="доля от полных объемов")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    asyncio.run(generate_dataset(args.db, args.scale))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# bot/benchmarks/fake_vk.py
+"""
+Локальный двойник VK API для нагрузочного стенда.
+
+Отдает long-poll события message_new, которые генерирует стенд, и принимает
+messages.send от бота. Время ответа считается от выдачи события до первого
+messages.send в тот же диалог.
+"""
+import time
+import asyncio
+import itertools
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+GROUP_ID = 1
+
+
+class FakeVK:
+    """Фейковый сервер VK: long-poll источник событий и приемник messages.send"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, batch_size: int = 100):
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._new_events = asyncio.Event()
+        self._ts = 1
+        self._message_ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+
+        # peer_id -> очередь (время отправки, future ответа)
+        self._pending: Dict[int, Deque[Tuple[float, asyncio.Future]]] = defaultdict(deque)
+        self.sent = 0
+        self.replies = 0
+        self.unsolicited = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route("*", "/method/{name}", self._method_view)
+        app.router.add_route("*", "/lp", self._longpoll_view)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    # ======================
+    # СОБЫТИЯ ОТ ИГРОКОВ
+    # ======================
+
+    def send_message(self, peer_id: int, text: str) -> asyncio.Future:
+        """Отправить боту сообщение от игрока, вернуть future с задержкой ответа (сек)"""
+        message_id = next(self._message_ids)
+        self._events.append({
+            "type": "message_new",
+            "event_id": f"lt{message_id}",
+            "v": "5.199",
+            "group_id": GROUP_ID,
+            "object": {
+                "message": {
+                    "date": int(time.time()),
+                    "from_id": peer_id,
+                    "peer_id": peer_id,
+                    "id": message_id,
+                    "conversation_message_id": message_id,
+                    "out": 0,
+                    "text": text,
+                    "attachments": [],
+                    "fwd_messages": [],
+                    "important": False,
+                    "is_hidden": False,
+                    "random_id": 0,
+                    "version": message_id,
+                },
+                "client_info": {
+                    "button_actions": ["text", "callback"],
+                    "keyboard": True,
+                    "inline_keyboard": True,
+                    "carousel": True,
+                    "lang_id": 0,
+                },
+            },
+        })
+        self._new_events.set()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[peer_id].append((time.perf_counter(), future))
+        self.sent += 1
+        return future
+
+    def _on_reply(self, peer_id: int):
+        pending = self._pending.get(peer_id)
+        if not pending:
+            # Уведомление другому игроку (например, о проверке)
+            self.unsolicited += 1
+            return
+
+        sent_at, future = pending.popleft()
+        self.replies += 1
+        if not future.done():
+            future.set_result(time.perf_counter() - sent_at)
+
+    # ======================
+    # ОБРАБОТЧИКИ HTTP
+    # ======================
+
+    async def _params(self, request: web.Request) -> Dict[str, Any]:
+        params: Dict[str, Any] = dict(request.query)
+        if request.can_read_body:
+            params.update(await request.post())
+        return params
+
+    async def _method_view(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        params = await self._params(request)
+
+        if name == "groups.getById":
+            group = {"id": GROUP_ID, "name": "Gym Legend (load test)", "screen_name": "club1", "is_closed": 0, "type": "group"}
+            response: Any = {"groups": [group], "profiles": []}
+        elif name == "groups.getLongPollServer":
+            response = {"key": "loadtest", "server": f"{self.url}/lp", "ts": str(self._ts)}
+        elif name == "messages.send":
+            peer_ids = params.get("peer_ids")
+            if peer_ids:
+                response = []
+                for peer_id in str(peer_ids).split(","):
+                    self._on_reply(int(peer_id))
+                    response.append({"peer_id": int(peer_id), "message_id": next(self._message_ids)})
+            else:
+                self._on_reply(int(params.get("peer_id") or params.get("user_id") or 0))
+                response = next(self._message_ids)
+        elif name == "users.get":
+            user_ids = str(params.get("user_ids", "1")).split(",")
+            response = [
+                {"id": int(user_id), "first_name": "Игрок", "last_name": str(user_id), "can_access_closed": True, "is_closed": False}
+                for user_id in user_ids if user_id.strip().lstrip("-").isdigit()
+            ]
+        else:
+            response = 1
+
+        return web.json_response({"response": response})
+
+    async def _longpoll_view(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        wait = min(float(params.get("wait", 25)), 25)
+
+        if not self._events:
+            self._new_events.clear()
+            try:
+                await asyncio.wait_for(self._new_events.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+        updates: List[Dict[str, Any]] = []
+        while self._events and len(updates) < self.batch_size:
+            updates.append(self._events.popleft())
+        self._ts += 1
+        return web.json_response({"ts": str(self._ts), "updates": updates})
@@ -0,0 +1,358 @@
+# bot/benchmarks/loadtest.py
+"""
+Нагрузочный стенд: настоящие лейблеры бота против локального двойника VK API.
+
+Стенд создает временную базу по схеме create_tables(), заполняет ее игроками,
+поднимает FakeVK (long-poll + messages.send), запускает бота на этом сервере
+и гоняет сценарий: каждый игрок шлет команду, ждет ответ и повторяет через
+интервал. В конце печатает (и при --output сохраняет в JSON) отчет:
+команд в секунду, задержки ответа p50/p95/p99, ожидание блокировок БД и
+долю ошибок.
+
+Примеры:
+    python -m bot.benchmarks.loadtest --scenario lifts --players 10000 --interval 30 --duration 120
+    python -m bot.benchmarks.loadtest --scenario mixed --players 2000 --interval 5 --output mixed.json
+    python -m bot.benchmarks.loadtest --scenario lifts --players 5000 --interval 5 --backup-interval 20
+
+С --backup-interval во время прогона снимаются резервные копии (services/backup.py):
+сравнение задержек с прогоном без них показывает, во что снимок обходится игре.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+import threading
+import importlib
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Tuple
+
+from bot.core.config import settings
+from bot import db
+from bot.services import metrics
+from bot.services.backup import create_backup
+from bot.services.slow_queries import SlowQueryConnection
+from bot.benchmarks.fake_vk import FakeVK
+
+FIRST_USER_ID = 100_000
+PROMO_CODE = "LOADTEST"
+
+DEFAULT_LABELERS = [
+    "bot.dumbbells:dumbbell_labeler",
+    "bot.user:user_labeler",
+    "bot.clan:clan_labeler",
+    "bot.top:top_labeler",
+    "bot.promocodes:promocode_labeler",
+    "bot.inspection_system:user_labeler",
+]
+DEFAULT_INIT = ["bot.inspection_system:init_inspection_system"]
+
+
+def _mention(user_id: int) -> str:
+    return f"[id{user_id}|@id{user_id}]"
+
+
+def _random_target(user_id: int, rng: random.Random, players: int) -> int:
+    target = FIRST_USER_ID + rng.randrange(players)
+    return target if target != user_id else FIRST_USER_ID + (target - FIRST_USER_ID + 1) % players
+
+
+# Сценарий: список (название, вес, построитель текста команды)
+CommandBuilder = Callable[[int, random.Random, int], str]
+
+SCENARIOS: Dict[str, List[Tuple[str, float, CommandBuilder]]] = {
+    "lifts": [
+        ("поднять", 1, lambda user_id, rng, players: "поднять"),
+    ],
+    "transfers": [
+        ("перевод", 1, lambda user_id, rng, players: f"перевод {_mention(_random_target(user_id, rng, players))} 100"),
+    ],
+    "inspections": [
+        ("проверить", 1, lambda user_id, rng, players: f"проверить {_mention(_random_target(user_id, rng, players))} 1"),
+    ],
+    "mixed": [
+        ("поднять", 6, lambda user_id, rng, players: "поднять"),
+        ("профиль", 2, lambda user_id, rng, players: "профиль"),
+        ("баланс", 1, lambda user_id, rng, players: "баланс"),
+        ("топ", 1, lambda user_id, rng, players: "топ монет"),
+        ("перевод", 1, lambda user_id, rng, players: f"перевод {_mention(_random_target(user_id, rng, players))} 100"),
+        ("проверить", 1, lambda user_id, rng, players: f"проверить {_mention(_random_target(user_id, rng, players))} 1"),
+        ("клан", 1, lambda user_id, rng, players: "к"),
+        ("промо", 0.2, lambda user_id, rng, players: f"промо {PROMO_CODE}"),
+    ],
+}
+
+
+# ======================
+# ОЖИДАНИЕ БЛОКИРОВОК БД
+# ======================
+
+LOCK_STATS = {"wait_seconds": 0.0, "locked_errors": 0}
+_lock_stats_lock = threading.Lock()
+
+
+class LockTimingConnection(SlowQueryConnection):
+    """Соединение, считающее время захвата записи (BEGIN, COMMIT) и ошибки 'database is locked'"""
+
+    def _timed(self, call: Callable, *args):
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e):
+                with _lock_stats_lock:
+                    LOCK_STATS["locked_errors"] += 1
+            raise
+        finally:
+            with _lock_stats_lock:
+                LOCK_STATS["wait_seconds"] += time.perf_counter() - started
+
+    def execute(self, sql, parameters=()):
+        if sql.lstrip().upper().startswith("BEGIN"):
+            return self._timed(super().execute, sql, parameters)
+        try:
+            return super().execute(sql, parameters)
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e):
+                with _lock_stats_lock:
+                    LOCK_STATS["locked_errors"] += 1
+            raise
+
+    def commit(self):
+        return self._timed(super().commit)
+
+
+# ======================
+# ПОДГОТОВКА БАЗЫ
+# ======================
+
+async def prepare_database(path: str, players: int):
+    """Создать схему и заполнить игроками"""
+    settings.DATABASE_PATH = path
+    db.CONNECTION_FACTORY = LockTimingConnection
+    await db.create_tables()
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.executemany(
+            """
+            INSERT INTO players (user_id, username, balance, fitness_halls, last_dumbbell_use, is_new)
+            VALUES (?, ?, 1000000, 50, '2000-01-01 00:00:00', 0)
+            """,
+            ((FIRST_USER_ID + i, f"Игрок {i}") for i in range(players)),
+        )
+        conn.executemany(
+            "INSERT INTO player_inspectors (user_id, level) VALUES (?, 1)",
+            ((FIRST_USER_ID + i,) for i in range(players)),
+        )
+        conn.execute(
+            """
+            INSERT INTO promo_codes (code, uses_total, uses_left, reward_type, reward_amount, created_by)
+            VALUES (?, ?, ?, 'монеты', 100, ?)
+            """,
+            (PROMO_CODE, players, players, FIRST_USER_ID),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ======================
+# ИГРОКИ
+# ======================
+
+def _percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def run_player(
+    fake: FakeVK,
+    user_id: int,
+    commands: List[Tuple[str, float, CommandBuilder]],
+    rng: random.Random,
+    players: int,
+    interval: float,
+    deadline: float,
+    timeout: float,
+    stats: Dict[str, Any],
+):
+    """Один игрок: команда -> ответ -> пауза до следующего периода"""
+    names = [name for name, _, _ in commands]
+    weights = [weight for _, weight, _ in commands]
+    builders = {name: builder for name, _, builder in commands}
+
+    # Разносим старт игроков по первому интервалу
+    await asyncio.sleep(rng.uniform(0, interval))
+
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        name = rng.choices(names, weights)[0]
+        future = fake.send_message(user_id, builders[name](user_id, rng, players))
+        stats["sent"][name] += 1
+
+        try:
+            latency = await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+            stats["latencies"][name].append(latency)
+        except asyncio.TimeoutError:
+            stats["timeouts"][name] += 1
+
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+async def run_backups(interval: float, deadline: float, durations: List[float]):
+    """Снимать резервные копии каждые interval секунд до конца прогона"""
+    while time.perf_counter() + interval < deadline:
+        await asyncio.sleep(interval)
+        result = await create_backup("loadtest")
+        if result["success"]:
+            durations.append(result["seconds"])
+
+
+def _load_objects(paths: List[str]) -> List[Any]:
+    objects = []
+    for path in paths:
+        module_name, attr = path.split(":")
+        objects.append(getattr(importlib.import_module(module_name), attr))
+    return objects
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    from vkbottle import API, Bot
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="gym_legend_loadtest_")
+    db_path = os.path.join(workdir, "loadtest.db")
+    await prepare_database(db_path, args.players)
+    print(f"✅ База {db_path}: {args.players} игроков")
+
+    fake = FakeVK()
+    await fake.start()
+    API.API_URL = f"{fake.url}/method/"
+
+    bot = Bot(token="loadtest")
+    for labeler in _load_objects(args.labelers):
+        bot.labeler.load(labeler)
+    metrics.setup_metrics(bot.labeler)
+    for init in _load_objects(args.init):
+        await init()
+
+    polling_task = asyncio.create_task(bot.run_polling())
+    print(f"✅ FakeVK на {fake.url}, сценарий '{args.scenario}'")
+
+    stats: Dict[str, Any] = {
+        "sent": defaultdict(int),
+        "timeouts": defaultdict(int),
+        "latencies": defaultdict(list),
+    }
+    started = time.perf_counter()
+    deadline = started + args.duration
+
+    backup_seconds: List[float] = []
+    backup_task = None
+    if args.backup_interval:
+        settings.BACKUP_DIR = os.path.join(workdir, "backups")
+        backup_task = asyncio.create_task(run_backups(args.backup_interval, deadline, backup_seconds))
+    await asyncio.gather(*[
+        run_player(
+            fake, FIRST_USER_ID + i, SCENARIOS[args.scenario], random.Random(rng.random()),
+            args.players, args.interval, deadline, args.timeout, stats,
+        )
+        for i in range(args.players)
+    ])
+    elapsed = time.perf_counter() - started
+    if backup_task is not None:
+        await backup_task
+
+    # Дожидаемся обработки последних команд перед остановкой сервера
+    drain_deadline = time.perf_counter() + args.timeout
+    while metrics.IN_FLIGHT["value"] > 0 and time.perf_counter() < drain_deadline:
+        await asyncio.sleep(0.1)
+
+    polling_task.cancel()
+    await fake.stop()
+
+    all_latencies = [latency for samples in stats["latencies"].values() for latency in samples]
+    sent = sum(stats["sent"].values())
+    timeouts = sum(stats["timeouts"].values())
+    handler_errors = sum(metrics.HANDLER_ERRORS.values())
+
+    report = {
+        "scenario": args.scenario,
+        "players": args.players,
+        "interval": args.interval,
+        "duration": round(elapsed, 2),
+        "seed": args.seed,
+        "commands_sent": sent,
+        "replies": len(all_latencies),
+        "commands_per_sec": round(len(all_latencies) / elapsed, 2) if elapsed else 0,
+        "latency_ms": {
+            "p50": round(_percentile(all_latencies, 0.5) * 1000, 2),
+            "p95": round(_percentile(all_latencies, 0.95) * 1000, 2),
+            "p99": round(_percentile(all_latencies, 0.99) * 1000, 2),
+            "max": round(max(all_latencies, default=0) * 1000, 2),
+        },
+        "timeouts": timeouts,
+        "handler_errors": handler_errors,
+        "error_rate": round((timeouts + handler_errors) / sent, 4) if sent else 0,
+        "db_lock_wait_seconds": round(LOCK_STATS["wait_seconds"], 3),
+        "db_locked_errors": LOCK_STATS["locked_errors"],
+        "unsolicited_messages": fake.unsolicited,
+        "backups": {
+            "count": len(backup_seconds),
+            "seconds": [round(seconds, 3) for seconds in backup_seconds],
+        },
+        "per_command": {
+            name: {
+                "sent": stats["sent"][name],
+                "timeouts": stats["timeouts"][name],
+                "p50_ms": round(_percentile(stats["latencies"][name], 0.5) * 1000, 2),
+                "p95_ms": round(_percentile(stats["latencies"][name], 0.95) * 1000, 2),
+            }
+            for name in stats["sent"]
+        },
+    }
+
+    if not args.keep_db:
+        shutil.rmtree(workdir)
+
+    return report
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный стенд Gym Legend")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="lifts")
+    parser.add_argument("--players", type=int, default=1000, help="число игроков")
+    parser.add_argument("--interval", type=float, default=30, help="период команд одного игрока, сек")
+    parser.add_argument("--duration", type=float, default=60, help="длительность прогона, сек")
+    parser.add_argument("--timeout", type=float, default=10, help="сколько ждать ответа, сек")
+    parser.add_argument("--seed", type=int, default=1, help="зерно генератора для повторяемости")
+    parser.add_argument("--labelers", nargs="+", default=DEFAULT_LABELERS, help="модуль:лейблер")
+    parser.add_argument("--init", nargs="*", default=DEFAULT_INIT, help="модуль:функция инициализации")
+    parser.add_argument("--backup-interval", type=float, default=0, help="снимать резервную копию каждые N сек")
+    parser.add_argument("--output", help="сохранить отчет в JSON")
+    parser.add_argument("--keep-db", action="store_true", help="не удалять временную базу")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    report = asyncio.run(run_load_test(args))
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"✅ Отчет сохранен в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
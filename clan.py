@@ -6,35 +6,8 @@ from vkbottle.bot import BotLabeler, Message
 from vkbottle import Keyboard, Text, KeyboardButtonColor
 
 from bot.core.config import settings
-from bot.db import (
-    create_clan,
-    create_player,
-    deposit_to_clan_treasury,
-    get_clan_member_count,
-    get_clan_members,
-    get_clan_treasury_log,
-    get_member_clan_role,
-    get_player,
-    get_player_clan,
-    get_top_clans,
-    log_collection_with_user,
-    subtract_treasury,
-    update_player_balance,
-    upgrade_clan,
-    update_clan_name,
-    get_clan_by_tag,
-    delete_clan,
-    update_clan_description,
-    get_clan_log,
-    log_clan_action,
-    get_clan_requirements,
-    get_player_contributions,
-    update_clan_settings,
-    get_all_clans,
-    get_player_fitness_halls,
-    update_clan_daily_income,
-)
 from bot.services.clans import get_clan_bonuses
+from bot.storage import get_storage
 from bot.utils import format_number
 from bot.utils.clan_helpers import (
     check_clan_permissions,
@@ -48,6 +21,10 @@ clan_labeler.vbml_ignore_case = True
 # Глобальная переменная для хранения ID последнего сообщения помощи
 last_help_message_id = None
 
+# Курсоры постраничного просмотра лога клана: user_id -> (clan_id, (created_at, id))
+CLAN_LOG_PAGE_SIZE = 15
+CLAN_LOG_CURSORS = {}
+
 # ======================
 # СИСТЕМА ЕЖЕДНЕВНОГО ДОХОДА КЛАНА
 # ======================
@@ -56,17 +33,11 @@ async def calculate_and_add_daily_clan_income():
     """Рассчитать и добавить ежедневный доход клана от фитнесс-залов участников"""
     try:
         # Получаем все кланы
-        all_clans = await get_all_clans()
+        all_clans = await get_storage().get_all_clans()
         
         for clan in all_clans:
-            # Получаем всех участников клана
-            members = await get_clan_members(clan["id"])
-            total_halls = 0
-            
-            # Считаем общее количество фитнесс-залов у всех участников
-            for member in members:
-                halls_count = await get_player_fitness_halls(member["user_id"])
-                total_halls += halls_count
+            # Сумма залов участников - счетчик клана, без запроса на каждого
+            total_halls = clan["total_halls"]
             
             # Рассчитываем доход: всего залов × уровень клана
             clan_level = clan["level"]
@@ -74,10 +45,10 @@ async def calculate_and_add_daily_clan_income():
             
             if daily_income > 0:
                 # Добавляем доход в казну
-                await update_clan_daily_income(clan["id"], daily_income)
+                await get_storage().update_clan_daily_income(clan["id"], daily_income)
                 
                 # Логируем операцию
-                await log_collection_with_user(
+                await get_storage().log_collection_with_user(
                     clan["id"],
                     0,  # system
                     "daily_income",
@@ -173,9 +144,9 @@ async def create_clan_handler(message: Message, cmd_args: str):
     tag = parts[0]
     clan_name = parts[1]
 
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     if not player:
-        player = await create_player(user_id, str(message.from_id))
+        player = await get_storage().create_player(user_id, str(message.from_id))
 
     # Проверяем баланс - 350 монет
     CLAN_CREATE_COST = 350
@@ -195,11 +166,11 @@ async def create_clan_handler(message: Message, cmd_args: str):
         return "❌ Вы уже состоите в клане! Сначала выйдите из текущего клана."
 
     # Создаем клан
-    result = await create_clan(tag, clan_name, user_id)
+    result = await get_storage().create_clan(tag, clan_name, user_id)
 
     if result["success"]:
         # Снимаем деньги за создание клана
-        await update_player_balance(
+        await get_storage().update_player_balance(
             user_id,
             -CLAN_CREATE_COST,
             "clan_creation",
@@ -231,7 +202,7 @@ async def create_clan_handler(message: Message, cmd_args: str):
 async def upgrade_clan_handler(message: Message, option: str = "1"):
     """Улучшение уровня клана"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
 
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -257,7 +228,7 @@ async def upgrade_clan_handler(message: Message, option: str = "1"):
             return f"❌ Недостаточно средств в казне!\n💰 Нужно: {format_number(upgrade_cost)} монет\n🏦 В казне: {format_number(clan['treasury'])} монет"
         
         # Улучшаем на 1 уровень
-        result = await upgrade_clan(clan["id"], upgrade_one_level=True, cost=upgrade_cost)
+        result = await get_storage().upgrade_clan(clan["id"], upgrade_one_level=True, cost=upgrade_cost)
         
         if result["success"]:
             # Получаем новые бонусы
@@ -298,7 +269,7 @@ async def upgrade_clan_handler(message: Message, option: str = "1"):
             return "❌ Недостаточно средств в казне даже для одного улучшения!"
         
         # Улучшаем клан
-        result = await upgrade_clan(clan["id"], upgrade_one_level=False, cost=total_cost, levels=levels_upgraded)
+        result = await get_storage().upgrade_clan(clan["id"], upgrade_one_level=False, cost=total_cost, levels=levels_upgraded)
         
         if result["success"]:
             # Получаем новые бонусы
@@ -324,21 +295,21 @@ async def upgrade_clan_handler(message: Message, option: str = "1"):
 async def clan_profile_handler(message: Message):
     """Профиль клана"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
 
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
 
-    # Получаем количество участников
-    member_count = await get_clan_member_count(clan["id"])
+    # Счетчики клана хранятся в самой строке клана
+    member_count = clan["member_count"]
 
     # Получаем владельца
-    owner = await get_player(clan["owner_id"])
+    owner = await get_storage().get_player(clan["owner_id"])
     owner_id = owner["user_id"]
     owner_name = owner["username"] if owner else "Неизвестно"
 
     # Получаем офицеров (заместителей)
-    members = await get_clan_members(clan["id"])
+    members = await get_storage().get_clan_members(clan["id"])
     officers = [m for m in members if m["role"] == "officer"]
     
     # Форматируем список заместителей
@@ -355,7 +326,7 @@ async def clan_profile_handler(message: Message):
     created_date = datetime.fromisoformat(clan["created_at"]).strftime("%d.%m.%Y")
     
     # Получаем требования
-    requirements = await get_clan_requirements(clan["id"])
+    requirements = await get_storage().get_clan_requirements(clan["id"])
     min_level = requirements.get("min_level", 1)
 
     # Получаем описание
@@ -371,6 +342,8 @@ async def clan_profile_handler(message: Message):
         f"🎮 Заместители: {officers_text}",
         f"👨‍💻 Уровень клана: {clan['level']}",
         f"🪪 Участников: {member_count}",
+        f"🏢 Фитнес-залов у участников: {format_number(clan['total_halls'])}",
+        f"🦾 Общая сила: {format_number(clan['total_power'])}",
         f"💲 Казна: {format_number(clan['treasury'])} монет",
         f"📅 Основан: {created_date}",
         f"🎯 Требования: {min_level}+ уровень гантели",
@@ -383,15 +356,32 @@ async def clan_profile_handler(message: Message):
     await message.answer("\n".join(response_parts), disable_mentions=True)
 
 
-@clan_labeler.message(text=["к топ", "/к топ"])
-async def clan_top_handler(message: Message):
-    """Топ кланов"""
-    clans = await get_top_clans(10)
+# Топы кланов: сортировка и строка со значением рейтинга
+CLAN_TOPS = {
+    "level": {
+        "title": "🏆 ТОП КЛАНОВ GYM LEGEND",
+        "line": lambda clan: f"   🏦 Казна: {format_number(clan['treasury'])} монет\n",
+    },
+    "power": {
+        "title": "🦾 ТОП КЛАНОВ ПО СИЛЕ",
+        "line": lambda clan: f"   🦾 Сила участников: {format_number(clan['total_power'])}\n",
+    },
+    "halls": {
+        "title": "🏢 ТОП КЛАНОВ ПО ФИТНЕС-ЗАЛАМ",
+        "line": lambda clan: f"   🏢 Залов у участников: {format_number(clan['total_halls'])}\n",
+    },
+}
+
+
+async def render_clan_top(order: str) -> str:
+    """Текст топа кланов по уровню, силе или залам"""
+    clans = await get_storage().get_top_clans(10, order)
 
     if not clans:
         return "🏆 Пока нет созданных кланов. Создайте первый!"
 
-    top_text = "🏆 ТОП КЛАНОВ GYM LEGEND\n\n"
+    top = CLAN_TOPS[order]
+    top_text = f"{top['title']}\n\n"
 
     for i, clan in enumerate(clans, 1):
         medal = "🥇" if i == 1 else ("🥈" if i == 2 else ("🥉" if i == 3 else "🔸"))
@@ -402,15 +392,34 @@ async def clan_top_handler(message: Message):
         top_text += (
             f"{medal} {i}. [{clan['tag']}] {clan['name']}\n"
             f"   ⭐ Уровень: {clan['level']} | 👥 {clan['member_count']} участников\n"
-            f"   🏦 Казна: {format_number(clan['treasury'])} монет\n"
+            + top["line"](clan) +
             f"   🎯 Бонусы: +{clan_bonuses['lift_bonus_coins']} монет за поднятия\n\n"
         )
 
+    top_text += "💡 Другие топы: К топ сила, К топ залы\n"
     top_text += "💡 Создать клан: К создать [ТЭГ] [название]"
 
     return top_text
 
 
+@clan_labeler.message(text=["к топ", "/к топ"])
+async def clan_top_handler(message: Message):
+    """Топ кланов"""
+    return await render_clan_top("level")
+
+
+@clan_labeler.message(text=["к топ сила", "/к топ сила"])
+async def clan_top_power_handler(message: Message):
+    """Топ кланов по суммарной силе участников"""
+    return await render_clan_top("power")
+
+
+@clan_labeler.message(text=["к топ залы", "/к топ залы"])
+async def clan_top_halls_handler(message: Message):
+    """Топ кланов по фитнес-залам участников"""
+    return await render_clan_top("halls")
+
+
 @clan_labeler.message(text=["к положить <amount>", "/к положить <amount>"])
 async def clan_deposit_handler(message: Message, amount: str):
     """Внесение денег в казну клана"""
@@ -422,18 +431,18 @@ async def clan_deposit_handler(message: Message, amount: str):
         return "❌ Сумма должна быть числом!"
 
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
 
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
 
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
 
     # Проверяем баланс игрока
     if player["balance"] < amount:
         return f"❌ Недостаточно средств на балансе!\n💰 Нужно: {format_number(amount)} монет\n💳 У вас: {format_number(player['balance'])} монет"
 
-    result = await deposit_to_clan_treasury(user_id, amount)
+    result = await get_storage().deposit_to_clan_treasury(user_id, amount)
 
     if result["success"]:
         return (
@@ -459,7 +468,7 @@ async def withdraw_from_clan_treasury_handler(message: Message, amount: str):
         return "❌ Сумма должна быть числом!"
     
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -479,10 +488,10 @@ async def withdraw_from_clan_treasury_handler(message: Message, amount: str):
         )
     
     # Снимаем деньги с казны
-    await subtract_treasury(clan["id"], amount)
+    await get_storage().subtract_treasury(clan["id"], amount)
     
     # Зачисляем игроку
-    await update_player_balance(
+    await get_storage().update_player_balance(
         user_id,
         amount,
         "clan_withdrawal",
@@ -491,7 +500,7 @@ async def withdraw_from_clan_treasury_handler(message: Message, amount: str):
     )
     
     # Логируем операцию
-    await log_collection_with_user(
+    await get_storage().log_collection_with_user(
         clan["id"],
         user_id,
         "withdrawal",
@@ -499,12 +508,12 @@ async def withdraw_from_clan_treasury_handler(message: Message, amount: str):
         f"Снятие {format_number(amount)} монет из казны",
     )
     
-    await log_clan_action(
+    await get_storage().log_clan_action(
         clan["id"], user_id, "withdraw",
         f"Снял {format_number(amount)} монет из казны"
     )
     
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     
     return (
         f"💰 Деньги сняты из казны!\n\n"
@@ -519,7 +528,7 @@ async def withdraw_from_clan_treasury_handler(message: Message, amount: str):
 async def disband_clan_handler(message: Message):
     """Распустить клан"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -536,7 +545,7 @@ async def disband_clan_handler(message: Message):
         f"⚠️ ВНИМАНИЕ: Вы собираетесь распустить клан!\n\n"
         f"🏰 Клан: [{clan['tag']}] {clan['name']}\n"
         f"💰 Казна: {format_number(clan['treasury'])} монет\n"
-        f"👥 Участников: {await get_clan_member_count(clan['id'])}\n\n"
+        f"👥 Участников: {await get_storage().get_clan_member_count(clan['id'])}\n\n"
         f"❗ Это действие необратимо!\n"
         f"❓ Для подтверждения напишите: К распустить подтвердить"
     )
@@ -546,7 +555,7 @@ async def disband_clan_handler(message: Message):
 async def disband_clan_confirm_handler(message: Message):
     """Подтверждение роспуска клана"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -558,7 +567,7 @@ async def disband_clan_confirm_handler(message: Message):
         return error_msg
     
     # Удаляем клан
-    await delete_clan(clan["id"])
+    await get_storage().delete_clan(clan["id"])
     
     return (
         f"💥 Клан распущен!\n\n"
@@ -573,7 +582,7 @@ async def disband_clan_confirm_handler(message: Message):
 async def rename_clan_handler(message: Message, new_name: str):
     """Переименовать клан"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -589,8 +598,8 @@ async def rename_clan_handler(message: Message, new_name: str):
         return "❌ Название клана должно быть от 3 до 20 символов!"
     
     old_name = clan["name"]
-    await update_clan_name(clan["id"], new_name)
-    await log_clan_action(
+    await get_storage().update_clan_name(clan["id"], new_name)
+    await get_storage().log_clan_action(
         clan["id"], user_id, "rename",
         f"Изменено название с '{old_name}' на '{new_name}'"
     )
@@ -607,7 +616,7 @@ async def rename_clan_handler(message: Message, new_name: str):
 async def transfer_clan_handler(message: Message, user: str):
     """Передача клана другому игроку"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -637,47 +646,34 @@ async def transfer_clan_handler(message: Message, user: str):
         return "❌ Вы уже являетесь владельцем!"
     
     # Проверяем что цель состоит в том же клане
-    target_clan = await get_player_clan(target_id)
+    target_clan = await get_storage().get_player_clan(target_id)
     if not target_clan or target_clan["id"] != clan["id"]:
         return "❌ Этот игрок не состоит в вашем клане!"
     
     # Получаем информацию об игроках
-    player = await get_player(user_id)
-    target_player = await get_player(target_id)
+    player = await get_storage().get_player(user_id)
+    target_player = await get_storage().get_player(target_id)
     
-    # Проверяем баланс игрока
+    # Оплата, смена владельца и ролей - одной транзакцией
     TRANSFER_COST = 500
-    if player["balance"] < TRANSFER_COST:
-        return f"❌ Недостаточно монет для передачи клана!\n💵 Нужно: {format_number(TRANSFER_COST)} монет\n💰 У вас: {format_number(player['balance'])} монет"
-    
-    # Снимаем деньги за передачу клана
-    await update_player_balance(
+    result = await get_storage().transfer_clan_ownership(
+        clan["id"],
         user_id,
-        -TRANSFER_COST,
-        "clan_transfer",
+        target_id,
+        TRANSFER_COST,
         f"Передача клана [{clan['tag']}] игроку {target_player['username']}",
-        None,
-    )
-    
-    # Передаем клан
-    await db.clans.update_one(
-        {"_id": clan["id"]},
-        {"$set": {"owner_id": target_id}}
-    )
-    
-    # Меняем роли
-    await db.players.update_one(
-        {"user_id": user_id},
-        {"$set": {"clan_role": "officer"}}  # Бывший владелец становится офицером
-    )
-    
-    await db.players.update_one(
-        {"user_id": target_id},
-        {"$set": {"clan_role": "owner"}}  # Новый владелец
     )
+    if not result["success"]:
+        if result["error"] == "insufficient_funds":
+            return f"❌ Недостаточно монет для передачи клана!\n💵 Нужно: {format_number(TRANSFER_COST)} монет\n💰 У вас: {format_number(player['balance'])} монет"
+        if result["error"] == "not_member":
+            return "❌ Этот игрок не состоит в вашем клане!"
+        if result["error"] == "not_owner":
+            return "❌ Вы больше не владелец этого клана!"
+        return f"❌ Ошибка при передаче клана: {result['error']}"
     
     # Логируем передачу
-    await log_clan_action(
+    await get_storage().log_clan_action(
         clan["id"], user_id, "transfer",
         f"Передал клан игроку [id{target_id}|{target_player['username']}] за {format_number(TRANSFER_COST)} монет"
     )
@@ -688,7 +684,7 @@ async def transfer_clan_handler(message: Message, user: str):
         f"👑 Новый владелец: [id{target_id}|{target_player['username']}]\n"
         f"💼 Бывший владелец: [id{user_id}|{player['username']}]\n"
         f"💰 Стоимость передачи: {format_number(TRANSFER_COST)} монет\n"
-        f"💳 Ваш баланс: {format_number(player['balance'] - TRANSFER_COST)} монет\n\n"
+        f"💳 Ваш баланс: {format_number(result['balance'])} монет\n\n"
         f"⚠️ Внимание: Вы больше не владелец клана!\n"
         f"⭐ Ваша новая роль: Офицер"
     )
@@ -698,7 +694,7 @@ async def transfer_clan_handler(message: Message, user: str):
 async def join_clan_handler(message: Message, tag: str):
     """Вступить в клан"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     
     if not player:
         return "❌ Игрок не найден"
@@ -708,12 +704,12 @@ async def join_clan_handler(message: Message, tag: str):
         return "❌ Вы уже состоите в клане! Сначала покиньте текущий клан."
     
     # Ищем клан по тегу
-    clan = await get_clan_by_tag(tag.upper())
+    clan = await get_storage().get_clan_by_tag(tag.upper())
     if not clan:
         return f"❌ Клан с тегом [{tag.upper()}] не найден!"
     
     # Проверяем требования клана
-    requirements = await get_clan_requirements(clan["id"])
+    requirements = await get_storage().get_clan_requirements(clan["id"])
     min_level = requirements.get("min_level", 1)
     
     # Проверяем уровень гантели игрока
@@ -730,27 +726,16 @@ async def join_clan_handler(message: Message, tag: str):
     clan_bonuses = get_clan_bonuses(clan["level"])
     member_limit = clan_bonuses.get("member_limit", 50)
     
-    current_members = await get_clan_member_count(clan["id"])
+    current_members = await get_storage().get_clan_member_count(clan["id"])
     if current_members >= member_limit:
         return f"❌ В клане достигнут лимит участников!\n👥 Максимум: {member_limit}"
     
-    # Вступаем в клан
-    await db.players.update_one(
-        {"user_id": user_id},
-        {"$set": {
-            "clan_id": clan["id"],
-            "clan_role": "member",
-            "clan_joined_at": datetime.now().isoformat()
-        }}
-    )
-    
-    # Увеличиваем счетчик участников
-    await db.clans.update_one(
-        {"_id": clan["id"]},
-        {"$inc": {"member_count": 1}}
-    )
+    # Вступаем в клан (счетчики клана обновляются в той же транзакции)
+    result = await get_storage().join_clan(user_id, clan["id"])
+    if not result["success"]:
+        return f"❌ {result['error']}"
     
-    await log_clan_action(
+    await get_storage().log_clan_action(
         clan["id"], user_id, "join",
         "Вступил в клан"
     )
@@ -781,7 +766,7 @@ async def join_clan_handler(message: Message, tag: str):
 async def kick_member_handler(message: Message, user: str):
     """Исключить участника из клана"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -810,7 +795,7 @@ async def kick_member_handler(message: Message, user: str):
         return "❌ Используйте К покинуть чтобы выйти из клана!"
     
     # Проверяем что цель состоит в том же клане
-    target_clan = await get_player_clan(target_id)
+    target_clan = await get_storage().get_player_clan(target_id)
     if not target_clan or target_clan["id"] != clan["id"]:
         return "❌ Этот игрок не состоит в вашем клане!"
     
@@ -819,35 +804,17 @@ async def kick_member_handler(message: Message, user: str):
         return "❌ Нельзя исключить владельца клана!"
     
     # Проверяем права (офицер не может исключить другого офицера)
-    kicker_role = await get_member_clan_role(user_id, clan["id"])
-    target_role = await get_member_clan_role(target_id, clan["id"])
+    kicker_role = await get_storage().get_member_clan_role(user_id, clan["id"])
+    target_role = await get_storage().get_member_clan_role(target_id, clan["id"])
     
     if kicker_role[0] == "officer" and target_role[0] == "officer":
         return "❌ Офицер не может исключить другого офицера!"
     
-    # Добавляем в список исключенных
-    banned_players = clan.get("banned_players", [])
-    if target_id not in banned_players:
-        banned_players.append(target_id)
-        await db.clans.update_one(
-            {"_id": clan["id"]},
-            {"$set": {"banned_players": banned_players}}
-        )
-    
-    # Исключаем участника
-    await db.players.update_one(
-        {"user_id": target_id},
-        {"$set": {"clan_id": None, "clan_role": None}}
-    )
+    # Исключаем участника и добавляем в список исключенных одной транзакцией
+    await get_storage().kick_clan_member(clan["id"], target_id)
     
-    # Уменьшаем счетчик участников
-    await db.clans.update_one(
-        {"_id": clan["id"]},
-        {"$inc": {"member_count": -1}}
-    )
-    
-    target_player = await get_player(target_id)
-    await log_clan_action(
+    target_player = await get_storage().get_player(target_id)
+    await get_storage().log_clan_action(
         clan["id"], user_id, "kick",
         f"Исключил [id{target_id}|{target_player['username']}]"
     )
@@ -857,7 +824,7 @@ async def kick_member_handler(message: Message, user: str):
         f"🏰 Клан: [{clan['tag']}] {clan['name']}\n"
         f"👤 Исключен: [id{target_id}|{target_player['username']}]\n"
         f"🚫 В списке исключенных: ДА\n"
-        f"👥 Осталось участников: {await get_clan_member_count(clan['id'])}\n\n"
+        f"👥 Осталось участников: {await get_storage().get_clan_member_count(clan['id'])}\n\n"
         f"💡 Для восстановления: К восстановить [id{target_id}|{target_player['username']}]"
     )
 
@@ -866,7 +833,7 @@ async def kick_member_handler(message: Message, user: str):
 async def restore_member_handler(message: Message, user: str):
     """Восстановить возможность входа в клан"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -891,16 +858,9 @@ async def restore_member_handler(message: Message, user: str):
         return "❌ Укажите ID пользователя или упоминание!"
     
     # Убираем из списка исключенных
-    banned_players = clan.get("banned_players", [])
-    if target_id in banned_players:
-        banned_players.remove(target_id)
-        await db.clans.update_one(
-            {"_id": clan["id"]},
-            {"$set": {"banned_players": banned_players}}
-        )
-        
-        target_player = await get_player(target_id)
-        await log_clan_action(
+    if await get_storage().unban_clan_member(clan["id"], target_id):
+        target_player = await get_storage().get_player(target_id)
+        await get_storage().log_clan_action(
             clan["id"], user_id, "restore",
             f"Восстановил [id{target_id}|{target_player['username']}]"
         )
@@ -920,7 +880,7 @@ async def restore_member_handler(message: Message, user: str):
 async def leave_clan_handler(message: Message):
     """Покинуть клан"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -934,21 +894,12 @@ async def leave_clan_handler(message: Message):
             "• К передать [@игрок]\n"
         )
     
-    player = await get_player(user_id)
-    
-    # Покидаем клан
-    await db.players.update_one(
-        {"user_id": user_id},
-        {"$set": {"clan_id": None, "clan_role": None}}
-    )
+    player = await get_storage().get_player(user_id)
     
-    # Уменьшаем счетчик участников
-    await db.clans.update_one(
-        {"_id": clan["id"]},
-        {"$inc": {"member_count": -1}}
-    )
+    # Покидаем клан (счетчики клана обновляются в той же транзакции)
+    await get_storage().leave_clan(user_id, clan["id"])
     
-    await log_clan_action(
+    await get_storage().log_clan_action(
         clan["id"], user_id, "leave",
         "Покинул клан"
     )
@@ -965,12 +916,12 @@ async def leave_clan_handler(message: Message):
 async def clan_members_list_handler(message: Message):
     """Список участников клана"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
     
-    members = await get_clan_members(clan["id"])
+    members = await get_storage().get_clan_members(clan["id"])
     
     # Форматируем список участников
     members_text = "👥 Участники клана:\n\n"
@@ -992,12 +943,12 @@ async def clan_members_list_handler(message: Message):
 async def clan_detailed_roster_handler(message: Message):
     """Подробный состав клана"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
     
-    members = await get_clan_members(clan["id"])
+    members = await get_storage().get_clan_members(clan["id"])
     
     # Группируем по ролям
     owners = [m for m in members if m["role"] == "owner"]
@@ -1050,7 +1001,7 @@ async def clan_detailed_roster_handler(message: Message):
 async def assign_officer_handler(message: Message, user: str):
     """Назначить офицера"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -1080,12 +1031,12 @@ async def assign_officer_handler(message: Message, user: str):
         return "❌ Вы уже являетесь владельцем!"
     
     # Проверяем что цель состоит в том же клане
-    target_clan = await get_player_clan(target_id)
+    target_clan = await get_storage().get_player_clan(target_id)
     if not target_clan or target_clan["id"] != clan["id"]:
         return "❌ Этот игрок не состоит в вашем клане!"
     
     # Проверяем текущую роль
-    target_role = await get_member_clan_role(target_id, clan["id"])
+    target_role = await get_storage().get_member_clan_role(target_id, clan["id"])
     
     if target_role[0] == "owner":
         return "❌ Этот игрок уже является владельцем!"
@@ -1094,13 +1045,11 @@ async def assign_officer_handler(message: Message, user: str):
         return "❌ Этот игрок уже является офицером!"
     
     # Назначаем офицером
-    await db.players.update_one(
-        {"user_id": target_id},
-        {"$set": {"clan_role": "officer"}}
-    )
+    if not await get_storage().set_clan_role(clan["id"], target_id, "officer"):
+        return "❌ Этот игрок не состоит в вашем клане!"
     
-    target_player = await get_player(target_id)
-    await log_clan_action(
+    target_player = await get_storage().get_player(target_id)
+    await get_storage().log_clan_action(
         clan["id"], user_id, "assign_officer",
         f"Назначил офицером [id{target_id}|{target_player['username']}]"
     )
@@ -1121,7 +1070,7 @@ async def assign_officer_handler(message: Message, user: str):
 async def demote_member_handler(message: Message, user: str):
     """Снять участника с должности офицера"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -1151,12 +1100,12 @@ async def demote_member_handler(message: Message, user: str):
         return "❌ Вы не можете снять самого себя!"
     
     # Проверяем что цель состоит в том же клане
-    target_clan = await get_player_clan(target_id)
+    target_clan = await get_storage().get_player_clan(target_id)
     if not target_clan or target_clan["id"] != clan["id"]:
         return "❌ Этот игрок не состоит в вашем клане!"
     
     # Получаем текущую роль
-    target_role = await get_member_clan_role(target_id, clan["id"])
+    target_role = await get_storage().get_member_clan_role(target_id, clan["id"])
     
     # Если уже участник, нечего снимать
     if target_role[0] == "member":
@@ -1167,13 +1116,11 @@ async def demote_member_handler(message: Message, user: str):
         return "❌ Нельзя снять владельца!"
     
     # Снимаем до участника
-    await db.players.update_one(
-        {"user_id": target_id},
-        {"$set": {"clan_role": "member"}}
-    )
+    if not await get_storage().set_clan_role(clan["id"], target_id, "member"):
+        return "❌ Этот игрок не состоит в вашем клане!"
     
-    target_player = await get_player(target_id)
-    await log_clan_action(
+    target_player = await get_storage().get_player(target_id)
+    await get_storage().log_clan_action(
         clan["id"], user_id, "demote",
         f"Снял с должности офицера [id{target_id}|{target_player['username']}]"
     )
@@ -1186,6 +1133,24 @@ async def demote_member_handler(message: Message, user: str):
     )
 
 
+def _distribution_error(result: dict) -> str:
+    """Текст ошибки распределения казны"""
+    if "required" in result:
+        return (
+            f"❌ Недостаточно средств в казне!\n"
+            f"💰 Нужно: {format_number(result['required'])} монет\n"
+            f"🏦 В казне: {format_number(result['treasury'])} монет"
+        )
+    return f"❌ {result['error']}"
+
+
+def _distribution_recipients(result: dict) -> list:
+    return [
+        f"[id{member['user_id']}|{member['username']}]: {format_number(result['amount'])} монет"
+        for member in result["sample"]
+    ]
+
+
 @clan_labeler.message(text=["к распределить всем <amount>", "/к распределить всем <amount>"])
 async def clan_distribute_all_handler(message: Message, amount: str):
     """Распределить казну всем участникам поровну"""
@@ -1197,7 +1162,7 @@ async def clan_distribute_all_handler(message: Message, amount: str):
         return "❌ Сумма должна быть числом!"
     
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -1208,53 +1173,22 @@ async def clan_distribute_all_handler(message: Message, amount: str):
     if not has_permission:
         return error_msg
     
-    # Получаем всех участников
-    members = await get_clan_members(clan["id"])
-    total_amount = amount_per_member * len(members)
-    
-    if clan["treasury"] < total_amount:
-        return f"❌ Недостаточно средств в казне!\n💰 Нужно: {format_number(total_amount)} монет\n🏦 В казне: {format_number(clan['treasury'])} монет"
-    
-    # Распределяем деньги
-    distributed = []
-    for member in members:
-        await update_player_balance(
-            member["user_id"],
-            amount_per_member,
-            "clan_distribution",
-            f"Распределение из казны клана [{clan['tag']}]",
-            None,
-        )
-        distributed.append(
-            f"[id{member['user_id']}|{member['username']}]: {format_number(amount_per_member)} монет"
-        )
+    # Списание казны, выплаты и логи - одной транзакцией
+    result = await get_storage().distribute_treasury(clan["id"], "all", amount_per_member, user_id)
+    if not result["success"]:
+        return _distribution_error(result)
     
-    # Снимаем деньги с казны
-    await subtract_treasury(clan["id"], total_amount)
-    
-    # Логируем операцию
-    await log_collection_with_user(
-        clan["id"],
-        user_id,
-        "distribution",
-        total_amount,
-        f"Распределение {format_number(amount_per_member)} монет каждому участнику",
-    )
-    
-    await log_clan_action(
-        clan["id"], user_id, "distribute_all",
-        f"Распределил {format_number(total_amount)} монет всем участникам"
-    )
+    distributed = _distribution_recipients(result)
     
     return (
         f"💰 Казна распределена всем участникам!\n\n"
         f"🏰 Клан: [{clan['tag']}] {clan['name']}\n"
-        f"👥 Участников: {len(members)}\n"
+        f"👥 Участников: {result['recipients']}\n"
         f"💸 Каждому: {format_number(amount_per_member)} монет\n"
-        f"💰 Всего выдано: {format_number(total_amount)} монет\n"
-        f"🏦 Остаток в казне: {format_number(clan['treasury'] - total_amount)} монет\n\n"
-        f"📋 Получили:\n" + "\n".join(distributed[:5]) + 
-        (f"\n...и ещё {len(distributed) - 5} участников" if len(distributed) > 5 else "")
+        f"💰 Всего выдано: {format_number(result['total_amount'])} монет\n"
+        f"🏦 Остаток в казне: {format_number(result['treasury_left'])} монет\n\n"
+        f"📋 Получили:\n" + "\n".join(distributed) + 
+        (f"\n...и ещё {result['recipients'] - len(distributed)} участников" if result["recipients"] > len(distributed) else "")
     )
 
 
@@ -1269,7 +1203,7 @@ async def clan_distribute_top_handler(message: Message, amount: str):
         return "❌ Сумма должна быть числом!"
     
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -1280,66 +1214,21 @@ async def clan_distribute_top_handler(message: Message, amount: str):
     if not has_permission:
         return error_msg
     
-    # Получаем топ участников по вкладам
-    members = await get_clan_members(clan["id"])
-    if not members:
-        return "❌ В клане нет участников!"
-    
-    # Сортируем по вкладам (по убыванию)
-    members.sort(key=lambda x: x.get("contributions", 0), reverse=True)
-    
-    # Берем топ-3 (или меньше если участников меньше)
-    top_n = min(3, len(members))
-    top_members = members[:top_n]
-    
-    total_amount = amount_per_member * len(top_members)
+    # Топ-3 по вкладам выбирается в том же запросе, что и выплата
+    result = await get_storage().distribute_treasury(clan["id"], "top", amount_per_member, user_id)
+    if not result["success"]:
+        return _distribution_error(result)
     
-    if clan["treasury"] < total_amount:
-        return (
-            f"❌ Недостаточно средств в казне!\n"
-            f"💰 Нужно: {format_number(total_amount)} монет\n"
-            f"🏦 В казне: {format_number(clan['treasury'])} монет"
-        )
-    
-    # Распределяем деньги
-    distributed = []
-    for member in top_members:
-        await update_player_balance(
-            member["user_id"],
-            amount_per_member,
-            "clan_distribution_top",
-            f"Топ-распределение из казны [{clan['tag']}]",
-            None,
-        )
-        distributed.append(
-            f"[id{member['user_id']}|{member['username']}]: {format_number(amount_per_member)} монет"
-        )
-    
-    # Снимаем деньги с казны
-    await subtract_treasury(clan["id"], total_amount)
-    
-    # Логируем операцию
-    await log_collection_with_user(
-        clan["id"],
-        user_id,
-        "distribution_top",
-        total_amount,
-        f"Топ-распределение {format_number(amount_per_member)} монет топ-{top_n} участникам",
-    )
-    
-    await log_clan_action(
-        clan["id"], user_id, "distribute_top",
-        f"Распределил {format_number(total_amount)} монет топ-{top_n} участникам"
-    )
+    top_n = result["recipients"]
     
     return (
         f"💰 Казна распределена топ-участникам!\n\n"
         f"🏰 Клан: [{clan['tag']}] {clan['name']}\n"
         f"👥 Топ-{top_n} участников по вкладам\n"
         f"💸 Каждому: {format_number(amount_per_member)} монет\n"
-        f"💰 Всего выдано: {format_number(total_amount)} монет\n"
-        f"🏦 Остаток в казне: {format_number(clan['treasury'])} монет\n\n"
-        f"🏆 Получили:\n" + "\n".join(distributed)
+        f"💰 Всего выдано: {format_number(result['total_amount'])} монет\n"
+        f"🏦 Остаток в казне: {format_number(result['treasury_left'])} монет\n\n"
+        f"🏆 Получили:\n" + "\n".join(_distribution_recipients(result))
     )
 
 
@@ -1347,7 +1236,7 @@ async def clan_distribute_top_handler(message: Message, amount: str):
 async def player_contributions_handler(message: Message, user: str = ""):
     """Просмотр вкладов игрока в казну клана"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -1365,20 +1254,20 @@ async def player_contributions_handler(message: Message, user: str = ""):
             target_id = int(user)
         
         # Проверяем что цель состоит в том же клане
-        target_clan = await get_player_clan(target_id)
+        target_clan = await get_storage().get_player_clan(target_id)
         if not target_clan or target_clan["id"] != clan["id"]:
             return "❌ Этот игрок не состоит в вашем клане!"
     
     # Получаем вклады игрока
-    contributions = await get_player_contributions(target_id, clan["id"])
+    contributions = await get_storage().get_player_contributions(target_id, clan["id"])
     
     # Получаем информацию об игроке
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
     if not target_player:
         return "❌ Игрок не найден!"
     
     # Получаем место в рейтинге вкладов
-    members = await get_clan_members(clan["id"])
+    members = await get_storage().get_clan_members(clan["id"])
     members.sort(key=lambda x: x.get("contributions", 0), reverse=True)
     
     player_rank = None
@@ -1416,16 +1305,16 @@ async def player_contributions_handler(message: Message, user: str = ""):
 @clan_labeler.message(text=["к инфо <tag>", "/к инфо <tag>"])
 async def clan_info_handler(message: Message, tag: str):
     """Информация о любом клане"""
-    clan = await get_clan_by_tag(tag.upper())
+    clan = await get_storage().get_clan_by_tag(tag.upper())
     if not clan:
         return f"❌ Клан с тегом [{tag.upper()}] не найден!"
     
     # Получаем владельца
-    owner = await get_player(clan["owner_id"])
+    owner = await get_storage().get_player(clan["owner_id"])
     owner_name = owner["username"] if owner else "Неизвестно"
     
     # Получаем участников
-    members = await get_clan_members(clan["id"])
+    members = await get_storage().get_clan_members(clan["id"])
     
     # Получаем бонусы
     clan_bonuses = get_clan_bonuses(clan["level"])
@@ -1434,7 +1323,7 @@ async def clan_info_handler(message: Message, tag: str):
     created_date = datetime.fromisoformat(clan["created_at"]).strftime("%d.%m.%Y")
     
     # Получаем требования
-    requirements = await get_clan_requirements(clan["id"])
+    requirements = await get_storage().get_clan_requirements(clan["id"])
     min_level = requirements.get("min_level", 1)
     
     description = clan.get("description", "Нет описания")
@@ -1467,7 +1356,7 @@ async def clan_info_handler(message: Message, tag: str):
 async def clan_description_handler(message: Message, description: str):
     """Изменить описание клана"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -1483,9 +1372,9 @@ async def clan_description_handler(message: Message, description: str):
         return "❌ Описание не должно превышать 500 символов!"
     
     old_description = clan.get("description", "Нет описания")
-    await update_clan_description(clan["id"], description)
+    await get_storage().update_clan_description(clan["id"], description)
     
-    await log_clan_action(
+    await get_storage().log_clan_action(
         clan["id"], user_id, "update_description",
         f"Обновлено описание клана"
     )
@@ -1502,7 +1391,7 @@ async def clan_description_handler(message: Message, description: str):
 async def clan_requirements_handler(message: Message, level: str):
     """Установить требования для вступления"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -1523,9 +1412,9 @@ async def clan_requirements_handler(message: Message, level: str):
     # Устанавливаем требования
     clan_settings = clan.get("settings", {})
     clan_settings["requirements"] = {"min_level": min_level}
-    await update_clan_settings(clan["id"], clan_settings)
+    await get_storage().update_clan_settings(clan["id"], clan_settings)
     
-    await log_clan_action(
+    await get_storage().log_clan_action(
         clan["id"], user_id, "set_requirements",
         f"Установил требования: {min_level}+ уровень гантели"
     )
@@ -1542,7 +1431,7 @@ async def clan_requirements_handler(message: Message, level: str):
 async def clan_greeting_handler(message: Message, greeting: str):
     """Установить приветственное сообщение"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -1557,9 +1446,9 @@ async def clan_greeting_handler(message: Message, greeting: str):
         # Убираем приветствие
         clan_settings = clan.get("settings", {})
         clan_settings["greeting"] = None
-        await update_clan_settings(clan["id"], clan_settings)
+        await get_storage().update_clan_settings(clan["id"], clan_settings)
         
-        await log_clan_action(
+        await get_storage().log_clan_action(
             clan["id"], user_id, "remove_greeting",
             "Убрал приветственное сообщение"
         )
@@ -1573,9 +1462,9 @@ async def clan_greeting_handler(message: Message, greeting: str):
     # Устанавливаем приветствие
     clan_settings = clan.get("settings", {})
     clan_settings["greeting"] = greeting
-    await update_clan_settings(clan["id"], clan_settings)
+    await get_storage().update_clan_settings(clan["id"], clan_settings)
     
-    await log_clan_action(
+    await get_storage().log_clan_action(
         clan["id"], user_id, "set_greeting",
         "Установил приветственное сообщение"
     )
@@ -1588,11 +1477,55 @@ async def clan_greeting_handler(message: Message, greeting: str):
     )
 
 
+CLAN_LOG_ICONS = {
+    "kick": "👢",
+    "join": "🎉",
+    "leave": "👋",
+    "rename": "🏷️",
+    "assign_officer": "⭐",
+    "demote": "📉",
+    "withdraw": "💰",
+    "update_description": "📝",
+    "set_requirements": "📋",
+    "set_greeting": "👋",
+    "remove_greeting": "❌",
+    "distribute_all": "💰",
+    "distribute_top": "🏆",
+    "restore": "✅",
+    "transfer": "🔄"
+}
+
+
+async def format_clan_log(log_entries: list) -> str:
+    """Строки лога действий клана"""
+    log_text = ""
+    for entry in log_entries:
+        user = await get_storage().get_player(entry["user_id"])
+        username = user["username"] if user else "Неизвестно"
+        
+        time = datetime.fromisoformat(entry["created_at"]).strftime("%d.%m %H:%M")
+        icon = CLAN_LOG_ICONS.get(entry["action_type"], "📝")
+        
+        log_text += f"{icon} {time} [id{entry['user_id']}|{username}]: {entry['details']}\n"
+    return log_text
+
+
+def remember_clan_log_page(user_id: int, clan_id: int, log_entries: list) -> str:
+    """Запомнить курсор последней записи страницы и вернуть подсказку"""
+    if len(log_entries) < CLAN_LOG_PAGE_SIZE:
+        CLAN_LOG_CURSORS.pop(user_id, None)
+        return ""
+    
+    last = log_entries[-1]
+    CLAN_LOG_CURSORS[user_id] = (clan_id, (last["created_at"], last["id"]))
+    return "\n➡️ Следующая страница: К лог дальше"
+
+
 @clan_labeler.message(text=["к лог", "/к лог"])
 async def clan_log_handler(message: Message):
     """Просмотр лога действий клана"""
     user_id = message.from_id
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     
     if not clan:
         return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
@@ -1603,40 +1536,47 @@ async def clan_log_handler(message: Message):
     if not has_permission:
         return error_msg
     
-    log_entries = await get_clan_log(clan["id"], 15)
+    log_entries = await get_storage().get_clan_log(clan["id"], CLAN_LOG_PAGE_SIZE)
     
     if not log_entries:
         return "📜 Лог действий пуст"
     
     log_text = f"📜 ЛОГ ДЕЙСТВИЙ КЛАНА [{clan['tag']}]\n\n"
+    log_text += await format_clan_log(log_entries)
+    log_text += remember_clan_log_page(user_id, clan["id"], log_entries)
     
-    for entry in log_entries:
-        user = await get_player(entry["user_id"])
-        username = user["username"] if user else "Неизвестно"
-        
-        time = datetime.fromisoformat(entry["created_at"]).strftime("%d.%m %H:%M")
-        
-        action_icons = {
-            "kick": "👢",
-            "join": "🎉",
-            "leave": "👋",
-            "rename": "🏷️",
-            "assign_officer": "⭐",
-            "demote": "📉",
-            "withdraw": "💰",
-            "update_description": "📝",
-            "set_requirements": "📋",
-            "set_greeting": "👋",
-            "remove_greeting": "❌",
-            "distribute_all": "💰",
-            "distribute_top": "🏆",
-            "restore": "✅",
-            "transfer": "🔄"
-        }
-        
-        icon = action_icons.get(entry["action_type"], "📝")
-        
-        log_text += f"{icon} {time} [id{entry['user_id']}|{username}]: {entry['details']}\n"
+    await message.answer(log_text, disable_mentions=True)
+
+
+@clan_labeler.message(text=["к лог дальше", "/к лог дальше"])
+async def clan_log_next_page_handler(message: Message):
+    """Следующая страница лога действий клана"""
+    user_id = message.from_id
+    clan = await get_storage().get_player_clan(user_id)
+    
+    if not clan:
+        return "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ]."
+    
+    has_permission, error_msg = await check_clan_permissions(
+        user_id, clan, ["owner", "officer"]
+    )
+    if not has_permission:
+        return error_msg
+    
+    # Курсор от другого клана (игрок сменил клан) не подходит
+    cursor = CLAN_LOG_CURSORS.get(user_id)
+    if not cursor or cursor[0] != clan["id"]:
+        return "📭 Больше страниц нет. Откройте лог заново: К лог"
+    
+    log_entries = await get_storage().get_clan_log(clan["id"], CLAN_LOG_PAGE_SIZE, before=cursor[1])
+    
+    if not log_entries:
+        CLAN_LOG_CURSORS.pop(user_id, None)
+        return "📭 Больше записей нет!"
+    
+    log_text = f"📜 ЛОГ ДЕЙСТВИЙ КЛАНА [{clan['tag']}] (продолжение)\n\n"
+    log_text += await format_clan_log(log_entries)
+    log_text += remember_clan_log_page(user_id, clan["id"], log_entries)
     
     await message.answer(log_text, disable_mentions=True)
 
@@ -1653,16 +1593,16 @@ async def clan_help_handler(message: Message):
     
     # Получаем имя игрока
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     player_name = player["username"] if player else "Игрок"
     
     # Проверяем, состоит ли игрок в клане
     clan_info = ""
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     if clan:
         # Получаем бонусы клана
         clan_bonuses = get_clan_bonuses(clan["level"])
-        member_count = await get_clan_member_count(clan["id"])
+        member_count = clan["member_count"]
         
         clan_info = (
             f"\n📊 Вы состоите в клане [{clan['tag']}] {clan['name']}\n"
@@ -1751,6 +1691,7 @@ async def basic_commands_help_handler(message: Message):
         "👤 Профиль и информация:\n"
         "· Клан - посмотреть профиль клана\n"
         "· К топ – топ-10 кланов по казне\n"
+        "· К топ сила / К топ залы – топ кланов по силе и фитнес-залам участников\n"
         "· К инфо [ТЭГ] – информация о любом клане (например: К инфо LEG)\n\n"
         "💰 Работа с казной:\n"
         "· К положить [сумма] – внести деньги в казну\n"
@@ -1835,6 +1776,7 @@ async def clan_settings_help_handler(message: Message):
         "🎯 К приветствие [текст]\n"
         "🎯 К приветствие нет\n"
         "🎯 К лог\n"
+        "🎯 К лог дальше\n"
         "🎯 К передать [@игрок]\n\n"
         "⭐ Больше монет с фитнесс-залов\n"
         "⭐ Больше монет с поднятий\n"
@@ -1919,16 +1861,16 @@ async def back_to_main_help_handler(message: Message):
     
     # Получаем имя игрока
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     player_name = player["username"] if player else "Игрок"
     
     # Проверяем, состоит ли игрок в клане
     clan_info = ""
-    clan = await get_player_clan(user_id)
+    clan = await get_storage().get_player_clan(user_id)
     if clan:
         # Получаем бонусы клана
         clan_bonuses = get_clan_bonuses(clan["level"])
-        member_count = await get_clan_member_count(clan["id"])
+        member_count = clan["member_count"]
         
         clan_info = (
             f"\n📊 Вы состоите в клане [{clan['tag']}] {clan['name']}\n"
@@ -1,10 +1,7 @@
 # bot/utils/clan_helpers.py
 
-from bot.db import (
-    get_player_clan,
-    get_member_clan_role,
-    format_number,  # из bot.utils
-)
+from bot.utils import format_number
+from bot.storage import get_storage
 
 async def check_clan_permissions(user_id: int, clan: dict, required_roles: list) -> tuple:
     """
@@ -23,7 +20,7 @@ async def check_clan_permissions(user_id: int, clan: dict, required_roles: list)
         return True, ""
     
     # Получаем роль пользователя в клане
-    member_role = await get_member_clan_role(user_id, clan["id"])
+    member_role = await get_storage().get_member_clan_role(user_id, clan["id"])
     
     # member_role возвращает (role, error) или подобное, берем первый элемент
     role = member_role[0] if isinstance(member_role, tuple) else member_role
@@ -46,7 +43,7 @@ async def validate_clan_membership(user_id: int, clan: dict = None) -> tuple:
         tuple: (is_member, error_message, clan_data)
     """
     if not clan:
-        clan = await get_player_clan(user_id)
+        clan = await get_storage().get_player_clan(user_id)
         
     if not clan:
         return False, "❌ Вы не состоите в клане. Используйте К вступить [ТЕГ].", None
@@ -1,21 +1,10 @@
-import random
 import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
 from vkbottle.bot import BotLabeler, Message
 
-from bot.db import (
-    get_player,
-    update_player_balance,
-    get_player_fitness_halls,
-    update_fitness_halls,
-    get_coach_level,
-    update_coach_level,
-    get_last_training_time,
-    set_last_training_time,
-    get_coach_stats,
-)
+from bot.storage import get_storage
 from bot.utils import format_number
 
 coach_labeler = BotLabeler()
@@ -51,12 +40,12 @@ TRAINING_COOLDOWN = timedelta(hours=1)
 async def personal_shop_handler(message: Message):
     """Показать доступные уровни тренерской деятельности"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     
     if not player:
         return "❌ Игрок не найден"
     
-    current_level = await get_coach_level(user_id)
+    current_level = await get_storage().get_coach_level(user_id)
     
     shop_text = "🎓 ПЕРСОНАЛЬНЫЙ МАГАЗИН\n\nДоступные уровни тренерской деятельности:\n\n"
     
@@ -88,12 +77,12 @@ async def personal_shop_handler(message: Message):
 async def upgrade_coach_handler(message: Message):
     """Повысить уровень тренерской деятельности"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     
     if not player:
         return "❌ Игрок не найден"
     
-    current_level = await get_coach_level(user_id)
+    current_level = await get_storage().get_coach_level(user_id)
     
     # Если у игрока нет тренерской деятельности
     if current_level == 0:
@@ -114,7 +103,7 @@ async def upgrade_coach_handler(message: Message):
     
     try:
         # Списываем деньги
-        await update_player_balance(
+        await get_storage().update_player_balance(
             user_id,
             -price,
             "coach_upgrade",
@@ -124,7 +113,7 @@ async def upgrade_coach_handler(message: Message):
         )
         
         # Обновляем уровень тренера
-        await update_coach_level(user_id, next_level)
+        await get_storage().update_coach_level(user_id, next_level)
         
         success_text = (
             f"🎓 ТРЕНЕРСКАЯ ДЕЯТЕЛЬНОСТЬ\n\n"
@@ -144,24 +133,23 @@ async def upgrade_coach_handler(message: Message):
 async def training_handler(message: Message):
     """Провести тренировку"""
     user_id = message.from_id
-    player = await get_player(user_id)
     
-    if not player:
-        return "❌ Игрок не найден"
-    
-    # Проверяем наличие тренерской деятельности
-    current_level = await get_coach_level(user_id)
-    if current_level == 0:
-        return "❌ ОШИБКА\n\nУ вас нет тренерской деятельности!\n\n💡 Используйте: Персональный магазин\n🔹 Просмотреть доступные уровни\n🔹 Купить уровень командой: Стаж"
+    # КД, награда и время тренировки - одной транзакцией
+    result = await get_storage().perform_training(user_id, COACH_LEVELS, TRAINING_COOLDOWN)
     
-    # Проверяем КД
-    last_training = await get_last_training_time(user_id)
-    if last_training:
-        last_time = datetime.fromisoformat(last_training)
-        next_training = last_time + TRAINING_COOLDOWN
+    if not result["success"]:
+        if result["error"] == "not_found":
+            return "❌ Игрок не найден"
         
-        if datetime.now() < next_training:
-            time_left = next_training - datetime.now()
+        # Проверяем наличие тренерской деятельности
+        if result["error"] == "no_coach":
+            return "❌ ОШИБКА\n\nУ вас нет тренерской деятельности!\n\n💡 Используйте: Персональный магазин\n🔹 Просмотреть доступные уровни\n🔹 Купить уровень командой: Стаж"
+        
+        # Проверяем КД
+        if result["error"] == "cooldown":
+            last_time = datetime.fromisoformat(result["last_training"])
+            next_training = last_time + TRAINING_COOLDOWN
+            time_left = max(next_training - datetime.now(), timedelta(0))
             hours_left = time_left.seconds // 3600
             minutes_left = (time_left.seconds % 3600) // 60
             
@@ -174,75 +162,44 @@ async def training_handler(message: Message):
                 f"📅 Можно провести в: {next_time}"
             )
             return cooldown_text
+        
+        return f"❌ Ошибка при проведении тренировки: {result['error']}"
     
-    coach_data = COACH_LEVELS[current_level]
+    if result["bonus_halls"]:
+        success_text = (
+            f"🎮 ТРЕНИРОВКА\n\n"  # ЗАМЕНЕНО: 🏃‍♂️ на 🎮
+            f"Тренировка завершена успешно!\n\n"
+            f"🎁 Бонус: Получено {result['bonus_halls']} фитнес-зала!\n"
+            f"⏰ Следующая тренировка через: 1 час"
+        )
+    else:
+        success_text = (
+            f"🎮 ТРЕНИРОВКА\n\n"  # ЗАМЕНЕНО: 🏃‍♂️ на 🎮
+            f"Тренировка завершена успешно!\n\n"
+            f"💵 Получено: {result['income']} монет\n"
+            f"⏰ Следующая тренировка через: 1 час"
+        )
     
-    try:
-        # Проверяем бонус
-        got_bonus = False
-        if coach_data["bonus_chance"] > 0:
-            bonus_roll = random.randint(1, 100)
-            if bonus_roll <= coach_data["bonus_chance"]:
-                got_bonus = True
-        
-        if got_bonus:
-            # Даем бонусные фитнес-залы
-            bonus_halls = coach_data["bonus_halls"]
-            current_halls = await get_player_fitness_halls(user_id)
-            new_halls_count = await update_fitness_halls(user_id, bonus_halls, 0)  # Цена 0 для бонусных
-            
-            success_text = (
-                f"🎮 ТРЕНИРОВКА\n\n"  # ЗАМЕНЕНО: 🏃‍♂️ на 🎮
-                f"Тренировка завершена успешно!\n\n"
-                f"🎁 Бонус: Получено {bonus_halls} фитнес-зала!\n"
-                f"⏰ Следующая тренировка через: 1 час"
-            )
-        else:
-            # Даем обычный доход
-            income = random.randint(coach_data["min_income"], coach_data["max_income"])
-            
-            await update_player_balance(
-                user_id,
-                income,
-                "training_income",
-                f"Доход от тренировки (уровень {current_level})",
-                None,
-                None,
-            )
-            
-            success_text = (
-                f"🎮 ТРЕНИРОВКА\n\n"  # ЗАМЕНЕНО: 🏃‍♂️ на 🎮
-                f"Тренировка завершена успешно!\n\n"
-                f"💵 Получено: {income} монет\n"
-                f"⏰ Следующая тренировка через: 1 час"
-            )
-        
-        # Обновляем время последней тренировки
-        await set_last_training_time(user_id, datetime.now().isoformat())
-        
-        await message.answer(success_text)
-        
-    except Exception as e:
-        return f"❌ Ошибка при проведении тренировки: {str(e)}"
+    await message.answer(success_text)
 
 
 @coach_labeler.message(text=["портфолио", "/портфолио"])
 async def portfolio_handler(message: Message):
     """Информация о тренерской деятельности"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     
     if not player:
         return "❌ Игрок не найден"
     
-    current_level = await get_coach_level(user_id)
+    current_level = await get_storage().get_coach_level(user_id)
     if current_level == 0:
         return "❌ ОШИБКА\n\nУ вас нет тренерской деятельности!\n\n💡 Используйте: Персональный магазин\n🔹 Просмотреть доступные уровни\n🔹 Купить уровень командой: Стаж"
     
     coach_data = COACH_LEVELS[current_level]
     
     # Проверяем время до следующей тренировки
-    last_training = await get_last_training_time(user_id)
+    last_training = await get_storage().get_last_training_time(user_id)
     time_until_training = "Готова"
     
     if last_training:
@@ -6,14 +6,7 @@ from vkbottle.bot import BotLabeler, Message
 from vkbottle import API
 
 from bot.core.config import settings
-from bot.db import (
-    get_player,
-    get_player_fitness_halls,
-    get_all_players_with_halls,
-    add_daily_fitness_hall_income,
-    get_daily_income_stats,
-    reset_daily_income_stats,
-)
+from bot.storage import get_storage
 from bot.utils import format_number
 
 daily_income_labeler = BotLabeler()
@@ -45,7 +38,7 @@ async def daily_income_task():
             print(f"[DAILY INCOME] Начинаем начисление дохода...")
             
             # Получаем всех игроков, у которых есть фитнес-залы
-            players_with_halls = await get_all_players_with_halls()
+            players_with_halls = await get_storage().get_all_players_with_halls()
             
             total_income_distributed = 0
             total_players_received = 0
@@ -59,7 +52,7 @@ async def daily_income_task():
                     daily_income = fitness_halls * DAILY_HALL_INCOME
                     
                     # Начисляем доход
-                    success = await add_daily_fitness_hall_income(
+                    success = await get_storage().add_daily_fitness_hall_income(
                         user_id, 
                         daily_income, 
                         f"Ежедневный доход с {fitness_halls} фитнес-залов"
@@ -79,6 +72,9 @@ async def daily_income_task():
             print(f"[DAILY INCOME] Получили доход: {total_players_received} игроков")
             print(f"[DAILY INCOME] Распределено: {format_number(total_income_distributed)} монет")
             
+            # Итоги игроков ведутся отдельно, старые строки по дням больше не нужны
+            await get_storage().reset_daily_income_stats()
+            
         except Exception as e:
             print(f"[DAILY INCOME] Критическая ошибка при начислении дохода: {e}")
 
@@ -113,19 +109,20 @@ async def send_daily_income_notification(user_id: int, halls_count: int, income:
 async def daily_income_stats_handler(message: Message):
     """Показать статистику ежедневного дохода с фитнес-залов"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     
     if not player:
         return "❌ Игрок не найден"
     
-    fitness_halls = await get_player_fitness_halls(user_id)
+    fitness_halls = await get_storage().get_player_fitness_halls(user_id)
     daily_income = fitness_halls * DAILY_HALL_INCOME
     
     # Получаем статистику из БД
-    stats = await get_daily_income_stats(user_id)
+    stats = await get_storage().get_daily_income_stats(user_id)
     
     total_received = stats.get("total_received", 0) if stats else 0
     last_received = stats.get("last_received_date", None) if stats else None
+    streak = stats.get("streak", 0) if stats else 0
     
     if last_received:
         last_date = datetime.fromisoformat(last_received).strftime("%d.%m.%Y %H:%M")
@@ -141,7 +138,8 @@ async def daily_income_stats_handler(message: Message):
         f"⏰ Время начисления: каждый день в 00:01\n\n"
         f"📈 Ваша статистика:\n"
         f"💸 Всего получено: {format_number(total_received)} монет\n"
-        f"{last_received_text}\n\n"
+        f"{last_received_text}\n"
+        f"🔥 Дней подряд: {streak}\n\n"
         f"💡 Увеличьте доход:\n"
         f"Покупайте больше залов командой:\n"
         f"Купить зал [количество]"
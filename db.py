@@ -1,12 +1,20 @@
+import os
 import json
 import random
 import re
+import asyncio
+import functools
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 import aiosqlite
 
 from bot.core.config import settings
+from bot.services.slow_queries import SlowQueryConnection
+from bot.services.metrics import statement_counter
+from bot.utils import format_number
 
 # ======================
 # ТАБЛИЦЫ ДЛЯ БАЗЫ ДАННЫХ
@@ -94,6 +102,19 @@ SQL_DAILY_INCOME_STATS_TABLE = """
     )
 """
 
+# Итоги ежедневного дохода игрока: ведутся в транзакции выплаты, детальные
+# строки daily_income_stats можно чистить без потери итогов
+SQL_DAILY_INCOME_TOTALS_TABLE = """
+    CREATE TABLE IF NOT EXISTS daily_income_totals (
+        user_id INTEGER PRIMARY KEY,
+        total_received INTEGER NOT NULL DEFAULT 0,
+        last_received_date TIMESTAMP,
+        last_income_date DATE,
+        streak INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES players(user_id)
+    )
+"""
+
 # Таблица использований гантелей
 SQL_DUMBBELL_USES_TABLE = """
     CREATE TABLE IF NOT EXISTS dumbbell_uses (
@@ -157,7 +178,7 @@ SQL_CLANS_TABLE = """
         owner_id INTEGER NOT NULL,
         level INTEGER DEFAULT 1,
         treasury INTEGER DEFAULT 0,
-        member_count INTEGER DEFAULT 1,
+        member_count INTEGER DEFAULT 0,
         total_income_per_hour INTEGER DEFAULT 0,
         total_lifts INTEGER DEFAULT 0,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -167,6 +188,9 @@ SQL_CLANS_TABLE = """
         description TEXT DEFAULT 'Нет описания',
         hall_income INTEGER DEFAULT 0,
         experience INTEGER DEFAULT 0,
+        total_halls INTEGER DEFAULT 0,
+        total_power INTEGER DEFAULT 0,
+        total_contributions INTEGER DEFAULT 0,
         FOREIGN KEY (owner_id) REFERENCES players (user_id)
     )
 """
@@ -408,22 +432,386 @@ SQL_INFO_ACCESS_TABLE = """
     )
 """
 
+# Экономическая статистика: сводки по транзакциям, которые ведет services/economy.py.
+# Отчеты читают только сводки, а не таблицу transactions
+SQL_ECONOMY_HOURLY_TABLE = """
+    CREATE TABLE IF NOT EXISTS economy_hourly (
+        type TEXT NOT NULL,
+        hour TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        sum INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (hour, type)
+    )
+"""
+
+SQL_ECONOMY_USER_DAILY_TABLE = """
+    CREATE TABLE IF NOT EXISTS economy_user_daily (
+        user_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        earned INTEGER NOT NULL DEFAULT 0,
+        spent INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day)
+    )
+"""
+
+# Денежная масса (сумма балансов) на каждый час, когда работала сводка
+SQL_ECONOMY_SUPPLY_TABLE = """
+    CREATE TABLE IF NOT EXISTS economy_supply (
+        hour TEXT PRIMARY KEY,
+        total_balance INTEGER NOT NULL,
+        players INTEGER NOT NULL
+    )
+"""
+
+# Докуда сводки обработали транзакции (id последней учтенной)
+SQL_ROLLUP_STATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        name TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+# Счетчики изменений рейтингов: растут, только когда меняется видимая часть топа.
+# threshold - значение последнего видимого места при последней сборке (NULL - топ не собран)
+SQL_LEADERBOARD_VERSIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS leaderboard_versions (
+        board TEXT PRIMARY KEY,
+        version INTEGER DEFAULT 0,
+        threshold INTEGER
+    )
+"""
+
+# Размер рейтинга и колонка, по которой он строится
+LEADERBOARD_SIZE = 10
+LEADERBOARD_COLUMNS = {
+    "balance": "balance",
+    "lifts": "total_lifts",
+    "power": "power",
+    "halls": "fitness_halls",
+}
+
+# Порог входа в топ: последнее место, которое видел top.py (он отсеивает забаненных по реестру).
+# Пока порога нет, любое изменение повышает версию
+SQL_LEADERBOARD_THRESHOLD = """
+    COALESCE((SELECT threshold FROM leaderboard_versions WHERE board = '{board}'), -9223372036854775808)
+"""
+
+# Изменение игрока в топе (или входящего/выходящего из него) повышает версию рейтинга
+LEADERBOARD_TRIGGER_EVENTS = ("update", "insert", "delete")
+SQL_LEADERBOARD_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_leaderboard_{board}_update
+    AFTER UPDATE OF {column}, username, dumbbell_name, dumbbell_level, is_banned ON players
+    WHEN NEW.{column} >= {threshold} OR OLD.{column} >= {threshold}
+    BEGIN
+        UPDATE leaderboard_versions SET version = version + 1 WHERE board = '{board}';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_leaderboard_{board}_insert
+    AFTER INSERT ON players
+    WHEN NEW.{column} >= {threshold}
+    BEGIN
+        UPDATE leaderboard_versions SET version = version + 1 WHERE board = '{board}';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_leaderboard_{board}_delete
+    AFTER DELETE ON players
+    WHEN OLD.{column} >= {threshold}
+    BEGIN
+        UPDATE leaderboard_versions SET version = version + 1 WHERE board = '{board}';
+    END
+    """,
+]
+
+
+# Счетчики кланов, которых нет в старых базах (добавляются при запуске)
+CLAN_COUNTER_COLUMNS = {
+    "total_halls": "INTEGER DEFAULT 0",
+    "total_power": "INTEGER DEFAULT 0",
+    "total_contributions": "INTEGER DEFAULT 0",
+}
+
+# Счетчики кланов ведут триггеры в той же транзакции, что и изменение игрока или участника:
+# member_count и total_contributions - по активным строкам clan_members,
+# total_halls и total_power - по игрокам с players.clan_id
+SQL_CLAN_COUNTER_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_clan_members_counters_insert
+    AFTER INSERT ON clan_members
+    WHEN NEW.status = 'active'
+    BEGIN
+        UPDATE clans SET member_count = member_count + 1,
+                         total_contributions = total_contributions + COALESCE(NEW.contributions, 0)
+        WHERE id = NEW.clan_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_clan_members_counters_delete
+    AFTER DELETE ON clan_members
+    WHEN OLD.status = 'active'
+    BEGIN
+        UPDATE clans SET member_count = member_count - 1,
+                         total_contributions = total_contributions - COALESCE(OLD.contributions, 0)
+        WHERE id = OLD.clan_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_clan_members_counters_update
+    AFTER UPDATE OF clan_id, status, contributions ON clan_members
+    BEGIN
+        UPDATE clans SET member_count = member_count - 1,
+                         total_contributions = total_contributions - COALESCE(OLD.contributions, 0)
+        WHERE id = OLD.clan_id AND OLD.status = 'active';
+        UPDATE clans SET member_count = member_count + 1,
+                         total_contributions = total_contributions + COALESCE(NEW.contributions, 0)
+        WHERE id = NEW.clan_id AND NEW.status = 'active';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_players_clan_counters_insert
+    AFTER INSERT ON players
+    WHEN NEW.clan_id IS NOT NULL
+    BEGIN
+        UPDATE clans SET total_halls = total_halls + COALESCE(NEW.fitness_halls, 0),
+                         total_power = total_power + COALESCE(NEW.power, 0)
+        WHERE id = NEW.clan_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_players_clan_counters_delete
+    AFTER DELETE ON players
+    WHEN OLD.clan_id IS NOT NULL
+    BEGIN
+        UPDATE clans SET total_halls = total_halls - COALESCE(OLD.fitness_halls, 0),
+                         total_power = total_power - COALESCE(OLD.power, 0)
+        WHERE id = OLD.clan_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_players_clan_counters_update
+    AFTER UPDATE OF clan_id, fitness_halls, power ON players
+    WHEN (OLD.clan_id IS NOT NULL OR NEW.clan_id IS NOT NULL)
+         AND (OLD.clan_id IS NOT NEW.clan_id
+              OR OLD.fitness_halls IS NOT NEW.fitness_halls
+              OR OLD.power IS NOT NEW.power)
+    BEGIN
+        UPDATE clans SET total_halls = total_halls - COALESCE(OLD.fitness_halls, 0),
+                         total_power = total_power - COALESCE(OLD.power, 0)
+        WHERE id = OLD.clan_id;
+        UPDATE clans SET total_halls = total_halls + COALESCE(NEW.fitness_halls, 0),
+                         total_power = total_power + COALESCE(NEW.power, 0)
+        WHERE id = NEW.clan_id;
+    END
+    """,
+]
+
+# Эталонные значения счетчиков, посчитанные по исходным таблицам
+SQL_CLAN_COUNTERS_ACTUAL = """
+    SELECT c.id, c.tag,
+           c.member_count, COALESCE(m.members, 0),
+           c.total_contributions, COALESCE(m.contributions, 0),
+           c.total_halls, COALESCE(p.halls, 0),
+           c.total_power, COALESCE(p.power, 0)
+    FROM clans c
+    LEFT JOIN (
+        SELECT clan_id, COUNT(*) AS members, SUM(COALESCE(contributions, 0)) AS contributions
+        FROM clan_members WHERE status = 'active' GROUP BY clan_id
+    ) m ON m.clan_id = c.id
+    LEFT JOIN (
+        SELECT clan_id, SUM(COALESCE(fitness_halls, 0)) AS halls, SUM(COALESCE(power, 0)) AS power
+        FROM players WHERE clan_id IS NOT NULL GROUP BY clan_id
+    ) p ON p.clan_id = c.id
+"""
+
+CLAN_COUNTERS = ["member_count", "total_contributions", "total_halls", "total_power"]
+
 
 # ======================
 # ОСНОВНЫЕ ФУНКЦИИ БАЗЫ ДАННЫХ
 # ======================
 
-async def create_tables() -> None:
+# Класс соединения sqlite3 для всех функций модуля (нагрузочный стенд подменяет его своим)
+CONNECTION_FACTORY = SlowQueryConnection
+
+
+def _connection_factory() -> Callable[..., SlowQueryConnection]:
+    """Класс соединения, считающий запросы на текущую команду (services/metrics.py)"""
+    return functools.partial(CONNECTION_FACTORY, on_statement=statement_counter())
+
+
+def connect(path: Optional[str] = None) -> aiosqlite.Connection:
+    """Соединение с базой; каждый запрос замеряется журналом медленных запросов"""
+    return aiosqlite.connect(path or settings.database_path, factory=_connection_factory())
+
+
+def get_replica_refreshed_at() -> Optional[datetime]:
+    """Время снимка аналитической реплики (None - реплики нет, отчеты читают основную базу)"""
+    if not settings.REPLICA_ENABLED:
+        return None
+    try:
+        return datetime.fromtimestamp(os.stat(settings.replica_path).st_mtime)
+    except FileNotFoundError:
+        return None
+
+
+@asynccontextmanager
+async def connect_analytics():
+    """Соединение для отчетов администрации: реплика только на чтение, пока ее нет - основная база"""
+    if get_replica_refreshed_at() is None:
+        async with connect() as db:
+            yield db
+        return
+
+    uri = Path(settings.replica_path).absolute().as_uri() + "?mode=ro"
+    async with aiosqlite.connect(uri, uri=True, factory=_connection_factory()) as db:
+        await db.execute(f"PRAGMA mmap_size = {settings.REPLICA_MMAP_MB * 1024 * 1024}")
+        await db.execute(f"PRAGMA cache_size = -{settings.REPLICA_CACHE_MB * 1024}")
+        yield db
+
+
+# Подписчики на изменение прав администраторов: callback(user_id, admin_level, admin_nickname).
+# Кэш прав (bot.services.users) подписывается при импорте и обновляется после commit.
+ADMIN_CHANGE_LISTENERS: List[Callable[[int, int, Optional[str]], None]] = []
+
+
+def _notify_admin_change(user_id: int, admin_level: int, admin_nickname: Optional[str]) -> None:
+    for listener in ADMIN_CHANGE_LISTENERS:
+        listener(user_id, admin_level or 0, admin_nickname)
+
+
+# Подписчики на баны: callback(user_id, ban_until) при бане и callback(user_id, None, False) при разбане.
+# Реестр банов (bot.services.bans) подписывается при импорте и обновляется после commit.
+BAN_CHANGE_LISTENERS: List[Callable[..., None]] = []
+
+
+def _notify_ban_change(user_id: int, ban_until: Optional[str], banned: bool = True) -> None:
+    for listener in BAN_CHANGE_LISTENERS:
+        listener(user_id, ban_until, banned)
+
+
+# Подписчики на записи в журнал транзакций: callback(user_id, тип, сумма, второй участник).
+# Вызываются после commit и не должны ждать: антифрод (bot.services.fraud) только ставит событие в очередь.
+LEDGER_LISTENERS: List[Callable[[int, str, int, Optional[int]], None]] = []
+
+
+def _notify_ledger(user_id: int, transaction_type: str, amount: int, other_user_id: Optional[int] = None) -> None:
+    for listener in LEDGER_LISTENERS:
+        listener(user_id, transaction_type, amount, other_user_id)
+
+
+# Последняя активность, еще не записанная в базу: user_id -> время (isoformat).
+# Мутаторы отмечают игрока здесь вместо last_active в каждом UPDATE; на диск
+# отметки уходят пачкой раз в LAST_ACTIVE_FLUSH_SECONDS (bot.services.activity).
+LAST_ACTIVE: Dict[int, str] = {}
+
+
+def mark_active(user_id: int) -> None:
+    """Отметить активность игрока (запишется в базу при следующем сбросе)"""
+    LAST_ACTIVE[user_id] = datetime.now().isoformat()
+
+
+def mark_active_many(user_ids: List[int]) -> None:
+    now = datetime.now().isoformat()
+    for user_id in user_ids:
+        LAST_ACTIVE[user_id] = now
+
+
+def get_last_active(user_id: int, stored: Optional[str]) -> Optional[str]:
+    """Последняя активность с учетом еще не записанных отметок"""
+    # Несохраненная отметка всегда новее той, что в базе
+    return LAST_ACTIVE.get(user_id) or stored
+
+
+async def flush_last_active() -> int:
+    """Записать накопленные отметки одним executemany, вернуть число игроков"""
+    if not LAST_ACTIVE:
+        return 0
+    pending = sorted(LAST_ACTIVE.items())
+    async with connect() as db:
+        await db.executemany(
+            "UPDATE players SET last_active = ? WHERE user_id = ?",
+            [(active_at, user_id) for user_id, active_at in pending],
+        )
+        await db.commit()
+    # Отметки, обновленные во время записи, остаются до следующего сброса
+    for user_id, active_at in pending:
+        if LAST_ACTIVE.get(user_id) == active_at:
+            del LAST_ACTIVE[user_id]
+    return len(pending)
+
+
+async def _ensure_columns(db: aiosqlite.Connection, table: str, columns: Dict[str, str]) -> List[str]:
+    """Добавить недостающие колонки в существующую таблицу, вернуть добавленные"""
+    async with db.execute(f"PRAGMA table_info({table})") as cur:
+        existing = {row[1] for row in await cur.fetchall()}
+    
+    added = []
+    for column, definition in columns.items():
+        if column not in existing:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            added.append(column)
+    return added
+
+
+async def _dedupe_daily_hall_purchases(db: aiosqlite.Connection) -> None:
+    """Старые базы: слить дубли (игрок, день) перед созданием уникального индекса"""
+    async with db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_daily_hall_purchases_user_date'"
+    ) as cur:
+        if await cur.fetchone():
+            return
+    await db.execute(
+        """UPDATE daily_hall_purchases SET amount = (
+               SELECT SUM(d.amount) FROM daily_hall_purchases d
+               WHERE d.user_id = daily_hall_purchases.user_id AND d.purchase_date = daily_hall_purchases.purchase_date
+           )
+           WHERE id IN (SELECT MIN(id) FROM daily_hall_purchases GROUP BY user_id, purchase_date HAVING COUNT(*) > 1)"""
+    )
+    await db.execute(
+        "DELETE FROM daily_hall_purchases WHERE id NOT IN (SELECT MIN(id) FROM daily_hall_purchases GROUP BY user_id, purchase_date)"
+    )
+
+
+async def _backfill_daily_income_totals(db: aiosqlite.Connection) -> None:
+    """Заполнить daily_income_totals по daily_income_stats, если итогов еще нет"""
+    async with db.execute("SELECT 1 FROM daily_income_totals LIMIT 1") as cur:
+        if await cur.fetchone():
+            return
+    # Серия - последний непрерывный отрезок дней с выплатами (дата минус номер строки постоянна)
+    await db.execute(
+        """WITH runs AS (
+               SELECT user_id, income_date,
+                      julianday(income_date) - ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY income_date) AS run
+               FROM daily_income_stats
+           ),
+           last_runs AS (
+               SELECT user_id, run FROM runs r
+               WHERE income_date = (SELECT MAX(income_date) FROM runs WHERE user_id = r.user_id)
+           )
+           INSERT OR IGNORE INTO daily_income_totals (user_id, total_received, last_received_date, last_income_date, streak)
+           SELECT s.user_id, SUM(s.amount_received), MAX(s.last_received_date), MAX(s.income_date),
+                  (SELECT COUNT(*) FROM runs r JOIN last_runs l ON l.user_id = r.user_id AND l.run = r.run
+                   WHERE r.user_id = s.user_id)
+           FROM daily_income_stats s
+           GROUP BY s.user_id"""
+    )
+
+
+async def create_tables(path: Optional[str] = None) -> None:
     """Create all database tables if they don't exist"""
     # Creating database file if it doesn't exist
-    with open(settings.database_path, "a"):
+    with open(path or settings.database_path, "a"):
         pass
 
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect(path) as db:
         await db.execute(SQL_PLAYERS_TABLE)
         await db.execute(SQL_TRANSACTIONS_TABLE)
         await db.execute(SQL_DAILY_HALL_PURCHASES_TABLE)
         await db.execute(SQL_DAILY_INCOME_STATS_TABLE)
+        await db.execute(SQL_DAILY_INCOME_TOTALS_TABLE)
         await db.execute(SQL_DUMBBELL_USES_TABLE)
         await db.execute(SQL_ADMIN_ACTIONS_TABLE)
         await db.execute(SQL_PROMO_CODES_TABLE)
@@ -446,6 +834,15 @@ async def create_tables() -> None:
         await db.execute(SQL_PROTECTION_STATS_TABLE)
         await db.execute(SQL_INSPECTION_TIME_MODE_TABLE)
         await db.execute(SQL_INFO_ACCESS_TABLE)
+        await db.execute(SQL_LEADERBOARD_VERSIONS_TABLE)
+        await db.execute(SQL_ECONOMY_HOURLY_TABLE)
+        await db.execute(SQL_ECONOMY_USER_DAILY_TABLE)
+        await db.execute(SQL_ECONOMY_SUPPLY_TABLE)
+        await db.execute(SQL_ROLLUP_STATE_TABLE)
+        
+        # Старые базы: счетчики кланов появляются при обновлении
+        added_clan_counters = await _ensure_columns(db, "clans", CLAN_COUNTER_COLUMNS)
+        await _ensure_columns(db, "leaderboard_versions", {"threshold": "INTEGER"})
         
         # Создание индексов
         await db.execute("CREATE INDEX IF NOT EXISTS idx_info_access_expires ON info_access(expires_at)")
@@ -455,22 +852,62 @@ async def create_tables() -> None:
         await db.execute("CREATE INDEX IF NOT EXISTS idx_players_fitness_halls ON players(fitness_halls)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_players_power ON players(power)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions(user_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_clan_members_user_id ON clan_members(user_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_clan_members_clan_id ON clan_members(clan_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_clan_treasury_log_clan_id ON clan_treasury_log(clan_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_clan_logs_clan_id ON clan_logs(clan_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_inspections_inspector_id ON inspections(inspector_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_daily_hall_purchases_user_id ON daily_hall_purchases(user_id)")
+        # Одна строка на игрока и день: покупки копятся upsert-ом (старый индекс по user_id покрыт новым)
+        await _dedupe_daily_hall_purchases(db)
+        await db.execute("DROP INDEX IF EXISTS idx_daily_hall_purchases_user_id")
+        await db.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_hall_purchases_user_date ON daily_hall_purchases(user_id, purchase_date)"
+        )
+        # Старые базы: итоги дохода собираются один раз из детальных строк
+        await _backfill_daily_income_totals(db)
+        # Составные индексы под постраничный вывод логов (keyset)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_admin_logs_type_created ON admin_logs(log_type, created_at, id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_admin_logs_created ON admin_logs(created_at, id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_clan_logs_clan_created ON clan_logs(clan_id, created_at, id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_clan_treasury_log_clan_created ON clan_treasury_log(clan_id, created_at, id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_inspections_inspector_created ON inspections(inspector_id, created_at, id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_active_protections_expires ON active_protections(expires_at)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_players_clan_id ON players(clan_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_clans_total_power ON clans(total_power)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_clans_total_halls ON clans(total_halls)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_players_banned ON players(ban_until) WHERE is_banned = 1")
+        # Каскадное удаление игрока: каждая таблица каскада ищется по индексу
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_inspections_target_id ON inspections(target_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_dumbbell_uses_user_id ON dumbbell_uses(user_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_clan_members_user_id ON clan_members(user_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_economy_user_daily_day ON economy_user_daily(day)")
         
         # Вставляем дефолтную запись для режима проверок
         await db.execute("INSERT OR IGNORE INTO inspection_time_mode (id, is_active) VALUES (1, 0)")
         
+        # Версии рейтингов и триггеры, которые их повышают
+        for board, column in LEADERBOARD_COLUMNS.items():
+            await db.execute("INSERT OR IGNORE INTO leaderboard_versions (board, version) VALUES (?, 0)", (board,))
+            threshold = SQL_LEADERBOARD_THRESHOLD.format(board=board)
+            # Условие триггеров менялось: пересоздаем их, а не оставляем старые
+            for event in LEADERBOARD_TRIGGER_EVENTS:
+                await db.execute(f"DROP TRIGGER IF EXISTS trg_leaderboard_{board}_{event}")
+            for trigger in SQL_LEADERBOARD_TRIGGERS:
+                await db.execute(trigger.format(board=board, column=column, threshold=threshold))
+        
+        # Счетчики кланов
+        for trigger in SQL_CLAN_COUNTER_TRIGGERS:
+            await db.execute(trigger)
+        
         await db.commit()
+    
+    # Колонки только что добавлены - заполняем их по текущим данным
+    if added_clan_counters:
+        await check_clan_counters(fix=True)
 
 
 async def initialize_admin_ids() -> bool:
     """Initialize admin IDs for existing admins without an ID"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             'SELECT user_id, admin_since FROM players WHERE admin_level > 0 AND (admin_id IS NULL OR admin_id = "") ORDER BY admin_since ASC'
         ) as cur:
@@ -493,67 +930,130 @@ async def initialize_admin_ids() -> bool:
 # ОСНОВНЫЕ ФУНКЦИИ ИГРОКОВ
 # ======================
 
+PLAYER_COLUMNS = [
+    "user_id", "username", "balance", "power", "magnesia", "last_dumbbell_use", "is_new",
+    "dumbbell_level", "dumbbell_name", "total_lifts", "total_earned", "total_spent",
+    "custom_income", "admin_level", "admin_nickname", "admin_since",
+    "admin_id", "bans_given", "permabans_given", "deletions_given",
+    "dumbbell_sets_given", "nickname_changes_given",
+    "is_banned", "ban_reason", "ban_until", "created_at",
+    "clan_id", "used_promo_codes", "clan_role", "contributions", "fitness_halls",
+    "coach_level", "last_training", "has_info_access", "last_active",
+]
+CLAN_COLUMNS = [
+    "id", "tag", "name", "owner_id", "level", "treasury", "description", "created_at",
+    "member_count", "total_halls", "total_power", "total_contributions",
+]
+
+
+def _select_list(alias: str, columns: List[str]) -> str:
+    return ", ".join(f"{alias}.{column}" for column in columns)
+
+
+def _player_from_row(row) -> Dict[str, Any]:
+    """Словарь игрока из строки с колонками PLAYER_COLUMNS"""
+    used_promo_codes = row[27] if row[27] else "[]"
+
+    return {
+        "user_id": row[0],
+        "username": row[1],
+        "balance": row[2],
+        "power": row[3],
+        "magnesia": row[4],
+        "last_dumbbell_use": row[5],
+        "is_new": row[6],
+        "dumbbell_level": row[7],
+        "dumbbell_name": row[8],
+        "total_lifts": row[9],
+        "total_earned": row[10],
+        "total_spent": row[11],
+        "custom_income": row[12],
+        "admin_level": row[13],
+        "admin_nickname": row[14],
+        "admin_since": row[15],
+        "admin_id": row[16],
+        "bans_given": row[17],
+        "permabans_given": row[18],
+        "deletions_given": row[19],
+        "dumbbell_sets_given": row[20],
+        "nickname_changes_given": row[21],
+        "is_banned": row[22],
+        "ban_reason": row[23],
+        "ban_until": row[24],
+        "created_at": row[25],
+        "clan_id": row[26],
+        "used_promo_codes": json.loads(used_promo_codes),
+        "clan_role": row[28],
+        "contributions": row[29] or 0,
+        "fitness_halls": row[30] or 0,
+        "coach_level": row[31] or 0,
+        "last_training": row[32],
+        "has_info_access": bool(row[33]) if row[33] is not None else False,
+        "last_active": get_last_active(row[0], row[34])
+    }
+
+
+def _clan_from_row(row) -> Dict[str, Any]:
+    """Словарь клана из строки с колонками CLAN_COLUMNS"""
+    return {
+        "id": row[0],
+        "tag": row[1],
+        "name": row[2],
+        "owner_id": row[3],
+        "level": row[4],
+        "treasury": row[5],
+        "description": row[6] or "Нет описания",
+        "created_at": row[7],
+        "member_count": row[8] or 0,
+        "total_halls": row[9] or 0,
+        "total_power": row[10] or 0,
+        "total_contributions": row[11] or 0
+    }
+
+
+SQL_GET_PLAYER = f"SELECT {_select_list('p', PLAYER_COLUMNS)} FROM players p WHERE p.user_id = ?"
+
+# Игрок, его клан и роль в клане одним запросом
+SQL_GET_PLAYER_CONTEXT = f"""
+    SELECT {_select_list('p', PLAYER_COLUMNS)},
+           {_select_list('c', CLAN_COLUMNS)},
+           cm.role
+    FROM players p
+    LEFT JOIN clans c ON c.id = p.clan_id
+    LEFT JOIN clan_members cm ON cm.clan_id = p.clan_id AND cm.user_id = p.user_id
+    WHERE p.user_id = ?
+"""
+
+
 async def get_player(user_id: int) -> Optional[Dict[str, Any]]:
     """Get player data by user_id"""
-    async with aiosqlite.connect(settings.database_path) as db:
-        async with db.execute(
-            """
-            SELECT user_id, username, balance, power, magnesia, last_dumbbell_use, is_new,
-                   dumbbell_level, dumbbell_name, total_lifts, total_earned, total_spent,
-                   custom_income, admin_level, admin_nickname, admin_since,
-                   admin_id, bans_given, permabans_given, deletions_given,
-                   dumbbell_sets_given, nickname_changes_given,
-                   is_banned, ban_reason, ban_until, created_at,
-                   clan_id, used_promo_codes, clan_role, contributions, fitness_halls,
-                   coach_level, last_training, has_info_access, last_active
-            FROM players WHERE user_id = ?
-        """,
-            (user_id,),
-        ) as cur:
+    async with connect() as db:
+        async with db.execute(SQL_GET_PLAYER, (user_id,)) as cur:
             row = await cur.fetchone()
 
-        if not row:
-            return None
+    if not row:
+        return None
+    return _player_from_row(row)
 
-        used_promo_codes = row[27] if row[27] else "[]"
 
-        return {
-            "user_id": row[0],
-            "username": row[1],
-            "balance": row[2],
-            "power": row[3],
-            "magnesia": row[4],
-            "last_dumbbell_use": row[5],
-            "is_new": row[6],
-            "dumbbell_level": row[7],
-            "dumbbell_name": row[8],
-            "total_lifts": row[9],
-            "total_earned": row[10],
-            "total_spent": row[11],
-            "custom_income": row[12],
-            "admin_level": row[13],
-            "admin_nickname": row[14],
-            "admin_since": row[15],
-            "admin_id": row[16],
-            "bans_given": row[17],
-            "permabans_given": row[18],
-            "deletions_given": row[19],
-            "dumbbell_sets_given": row[20],
-            "nickname_changes_given": row[21],
-            "is_banned": row[22],
-            "ban_reason": row[23],
-            "ban_until": row[24],
-            "created_at": row[25],
-            "clan_id": row[26],
-            "used_promo_codes": json.loads(used_promo_codes),
-            "clan_role": row[28],
-            "contributions": row[29] or 0,
-            "fitness_halls": row[30] or 0,
-            "coach_level": row[31] or 0,
-            "last_training": row[32],
-            "has_info_access": bool(row[33]) if row[33] is not None else False,
-            "last_active": row[34]
-        }
+async def get_player_context(user_id: int) -> Optional[Dict[str, Any]]:
+    """Игрок, его клан (или None) и роль в клане за один запрос"""
+    async with connect() as db:
+        async with db.execute(SQL_GET_PLAYER_CONTEXT, (user_id,)) as cur:
+            row = await cur.fetchone()
+
+    if not row:
+        return None
+
+    players_count = len(PLAYER_COLUMNS)
+    clan_row = row[players_count:players_count + len(CLAN_COLUMNS)]
+    clan = _clan_from_row(clan_row) if clan_row[0] is not None else None
+
+    return {
+        "player": _player_from_row(row[:players_count]),
+        "clan": clan,
+        "clan_role": (row[-1] or "member") if clan else None,
+    }
 
 
 async def create_player(user_id: int, username: str) -> Optional[Dict[str, Any]]:
@@ -566,7 +1066,7 @@ async def create_player(user_id: int, username: str) -> Optional[Dict[str, Any]]
     if hasattr(settings, 'DUMBBELL_LEVELS') and start_dumbbell_level in settings.DUMBBELL_LEVELS:
         dumbbell_name = settings.DUMBBELL_LEVELS[start_dumbbell_level].get('name', 'Гантеля 1кг')
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             """INSERT OR IGNORE INTO players 
                (user_id, username, balance, dumbbell_level, dumbbell_name, last_active) 
@@ -579,11 +1079,12 @@ async def create_player(user_id: int, username: str) -> Optional[Dict[str, Any]]
 
 async def update_username(user_id: int, new_username: str, admin_id: Optional[int] = None) -> bool:
     """Update player username"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET username = ?, last_active = ? WHERE user_id = ?", 
-            (new_username, datetime.now().isoformat(), user_id)
+            "UPDATE players SET username = ? WHERE user_id = ?", 
+            (new_username, user_id)
         )
+        mark_active(user_id)
         
         if admin_id:
             await db.execute(
@@ -610,11 +1111,12 @@ async def update_player_balance(
     earned = amount if amount > 0 else 0
     spent = -amount if amount < 0 else 0
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET balance = balance + ?, total_earned = total_earned + ?, total_spent = total_spent + ?, last_active = ? WHERE user_id = ?",
-            (amount, earned, spent, datetime.now().isoformat(), user_id),
+            "UPDATE players SET balance = balance + ?, total_earned = total_earned + ?, total_spent = total_spent + ? WHERE user_id = ?",
+            (amount, earned, spent, user_id),
         )
+        mark_active(user_id)
 
         await db.execute(
             """INSERT INTO transactions (user_id, type, amount, description, admin_id, target_user_id, clan_id, other_user_id) 
@@ -623,6 +1125,7 @@ async def update_player_balance(
         )
 
         await db.commit()
+    _notify_ledger(user_id, transaction_type, amount, target_user_id or other_user_id)
     return True
 
 
@@ -631,11 +1134,12 @@ async def set_player_balance(user_id: int, new_balance: int, admin_id: int) -> b
     player = await get_player(user_id)
     old_balance = player["balance"] if player else 0
 
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET balance = ?, last_active = ? WHERE user_id = ?", 
-            (new_balance, datetime.now().isoformat(), user_id)
+            "UPDATE players SET balance = ? WHERE user_id = ?", 
+            (new_balance, user_id)
         )
+        mark_active(user_id)
         await db.execute(
             """INSERT INTO admin_actions (admin_id, action_type, target_user_id, details) 
                VALUES (?, ?, ?, ?)""",
@@ -652,22 +1156,24 @@ async def set_player_balance(user_id: int, new_balance: int, admin_id: int) -> b
 
 async def add_power(user_id: int, amount: int) -> bool:
     """Add power to player"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET power = power + ?, last_active = ? WHERE user_id = ?", 
-            (amount, datetime.now().isoformat(), user_id)
+            "UPDATE players SET power = power + ? WHERE user_id = ?", 
+            (amount, user_id)
         )
+        mark_active(user_id)
         await db.commit()
     return True
 
 
 async def update_player_power(user_id: int, new_power: int, admin_id: Optional[int] = None) -> bool:
     """Update player power to a specific value"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET power = ?, last_active = ? WHERE user_id = ?", 
-            (new_power, datetime.now().isoformat(), user_id)
+            "UPDATE players SET power = ? WHERE user_id = ?", 
+            (new_power, user_id)
         )
+        mark_active(user_id)
         
         if admin_id:
             await db.execute(
@@ -684,11 +1190,12 @@ async def add_magnesia(
     user_id: int, amount: int, admin_id: Optional[int] = None
 ) -> bool:
     """Add magnesia to player"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET magnesia = magnesia + ?, last_active = ? WHERE user_id = ?",
-            (amount, datetime.now().isoformat(), user_id),
+            "UPDATE players SET magnesia = magnesia + ? WHERE user_id = ?",
+            (amount, user_id),
         )
+        mark_active(user_id)
 
         if admin_id:
             await db.execute(
@@ -710,11 +1217,12 @@ async def update_dumbbell_level(
     user_id: int, new_level: int, dumbbell_name: str
 ) -> bool:
     """Update player dumbbell level"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET dumbbell_level = ?, dumbbell_name = ?, last_active = ? WHERE user_id = ?",
-            (new_level, dumbbell_name, datetime.now().isoformat(), user_id),
+            "UPDATE players SET dumbbell_level = ?, dumbbell_name = ? WHERE user_id = ?",
+            (new_level, dumbbell_name, user_id),
         )
+        mark_active(user_id)
         await db.commit()
     return True
 
@@ -726,11 +1234,12 @@ async def set_dumbbell_level(user_id: int, new_level: int, admin_id: int) -> boo
 
     dumbbell_info = settings.DUMBBELL_LEVELS[new_level]
 
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET dumbbell_level = ?, dumbbell_name = ?, last_active = ? WHERE user_id = ?",
-            (new_level, dumbbell_info["name"], datetime.now().isoformat(), user_id),
+            "UPDATE players SET dumbbell_level = ?, dumbbell_name = ? WHERE user_id = ?",
+            (new_level, dumbbell_info["name"], user_id),
         )
+        mark_active(user_id)
 
         await db.execute(
             "UPDATE players SET dumbbell_sets_given = dumbbell_sets_given + 1 WHERE user_id = ?",
@@ -754,33 +1263,50 @@ async def set_dumbbell_level(user_id: int, new_level: int, admin_id: int) -> boo
 
 async def update_dumbbell_use_time(user_id: int) -> bool:
     """Update the last dumbbell use time"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET last_dumbbell_use = ?, last_active = ? WHERE user_id = ?",
-            (datetime.now().isoformat(), datetime.now().isoformat(), user_id),
+            "UPDATE players SET last_dumbbell_use = ? WHERE user_id = ?",
+            (datetime.now().isoformat(), user_id),
         )
+        mark_active(user_id)
         await db.commit()
     return True
 
 
 async def increment_total_lifts(user_id: int) -> bool:
     """Increment total lifts counter"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET total_lifts = total_lifts + 1, last_active = ? WHERE user_id = ?",
-            (datetime.now().isoformat(), user_id),
+            "UPDATE players SET total_lifts = total_lifts + 1 WHERE user_id = ?",
+            (user_id,),
+        )
+        mark_active(user_id)
+        await db.commit()
+    return True
+
+
+async def record_dumbbell_lift(user_id: int, power_gained: int) -> bool:
+    """Записать подход: +1 поднятие, сила и время использования гантели"""
+    now = datetime.now().isoformat()
+    async with connect() as db:
+        await db.execute(
+            """UPDATE players SET total_lifts = total_lifts + 1, power = power + ?, 
+               last_dumbbell_use = ? WHERE user_id = ?""",
+            (power_gained, now, user_id),
         )
+        mark_active(user_id)
         await db.commit()
     return True
 
 
 async def set_total_lifts(user_id: int, new_total: int, admin_id: int) -> bool:
     """Set total lifts to a specific value"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET total_lifts = ?, last_active = ? WHERE user_id = ?", 
-            (new_total, datetime.now().isoformat(), user_id)
+            "UPDATE players SET total_lifts = ? WHERE user_id = ?", 
+            (new_total, user_id)
         )
+        mark_active(user_id)
         await db.execute(
             """INSERT INTO admin_actions (admin_id, action_type, target_user_id, details) 
                VALUES (?, ?, ?, ?)""",
@@ -799,11 +1325,12 @@ async def set_custom_income(
     user_id: int, custom_income: Optional[int], admin_id: int
 ) -> bool:
     """Set custom income for player"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET custom_income = ?, last_active = ? WHERE user_id = ?",
-            (custom_income, datetime.now().isoformat(), user_id),
+            "UPDATE players SET custom_income = ? WHERE user_id = ?",
+            (custom_income, user_id),
         )
+        mark_active(user_id)
         await db.execute(
             """INSERT INTO admin_actions (admin_id, action_type, target_user_id, details) 
                VALUES (?, ?, ?, ?)""",
@@ -820,7 +1347,7 @@ async def set_custom_income(
 
 async def make_admin(user_id: int, admin_id: int, admin_level: int = 1) -> str:
     """Make a player an admin"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             'SELECT MAX(CAST(admin_id AS INTEGER)) FROM players WHERE admin_id IS NOT NULL AND admin_id != ""'
         ) as cur:
@@ -831,12 +1358,15 @@ async def make_admin(user_id: int, admin_id: int, admin_level: int = 1) -> str:
         else:
             new_admin_id = int(result[0]) + 1
 
-        await db.execute(
+        async with db.execute(
             """UPDATE players 
-               SET admin_level = ?, admin_since = ?, admin_id = ?, last_active = ?
-               WHERE user_id = ?""",
-            (admin_level, datetime.now().isoformat(), str(new_admin_id), datetime.now().isoformat(), user_id),
-        )
+               SET admin_level = ?, admin_since = ?, admin_id = ?
+               WHERE user_id = ?
+               RETURNING admin_level, admin_nickname""",
+            (admin_level, datetime.now().isoformat(), str(new_admin_id), user_id),
+        ) as cur:
+            row = await cur.fetchone()
+        mark_active(user_id)
 
         await db.execute(
             """INSERT INTO admin_actions (admin_id, action_type, target_user_id, details) 
@@ -850,6 +1380,8 @@ async def make_admin(user_id: int, admin_id: int, admin_level: int = 1) -> str:
         )
 
         await db.commit()
+    if row:
+        _notify_admin_change(user_id, row[0], row[1])
     return str(new_admin_id)
 
 
@@ -859,15 +1391,16 @@ async def remove_admin(user_id: int, admin_id: int) -> bool:
     if not player_data:
         return False
 
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             """UPDATE players 
                SET admin_level = 0, admin_nickname = NULL, admin_since = NULL, admin_id = NULL,
                    bans_given = 0, permabans_given = 0, deletions_given = 0,
-                   dumbbell_sets_given = 0, nickname_changes_given = 0, last_active = ?
+                   dumbbell_sets_given = 0, nickname_changes_given = 0
                WHERE user_id = ?""",
-            (datetime.now().isoformat(), user_id),
+            (user_id,),
         )
+        mark_active(user_id)
 
         await db.execute(
             """INSERT INTO admin_actions (admin_id, action_type, target_user_id, details) 
@@ -881,17 +1414,22 @@ async def remove_admin(user_id: int, admin_id: int) -> bool:
         )
 
         await db.commit()
+    _notify_admin_change(user_id, 0, None)
     return True
 
 
 async def set_admin_nickname(user_id: int, nickname: str) -> bool:
     """Set admin nickname"""
-    async with aiosqlite.connect(settings.database_path) as db:
-        await db.execute(
-            "UPDATE players SET admin_nickname = ?, last_active = ? WHERE user_id = ?",
-            (nickname, datetime.now().isoformat(), user_id),
-        )
+    async with connect() as db:
+        async with db.execute(
+            "UPDATE players SET admin_nickname = ? WHERE user_id = ? RETURNING admin_level, admin_nickname",
+            (nickname, user_id),
+        ) as cur:
+            row = await cur.fetchone()
+        mark_active(user_id)
         await db.commit()
+    if row:
+        _notify_admin_change(user_id, row[0], row[1])
     return True
 
 
@@ -902,11 +1440,12 @@ async def ban_player(user_id: int, admin_id: int, days: int, reason: str) -> boo
     else:
         ban_until = (datetime.now() + timedelta(days=days)).isoformat()
 
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET is_banned = 1, ban_reason = ?, ban_until = ?, last_active = ? WHERE user_id = ?",
-            (reason, ban_until, datetime.now().isoformat(), user_id),
+            "UPDATE players SET is_banned = 1, ban_reason = ?, ban_until = ? WHERE user_id = ?",
+            (reason, ban_until, user_id),
         )
+        mark_active(user_id)
 
         await db.execute(
             "UPDATE players SET bans_given = bans_given + 1 WHERE user_id = ?",
@@ -920,42 +1459,195 @@ async def ban_player(user_id: int, admin_id: int, days: int, reason: str) -> boo
         )
 
         await db.commit()
+    _notify_ban_change(user_id, ban_until)
     return True
 
 
 async def unban_player(user_id: int, admin_id: int) -> bool:
     """Unban a player"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET is_banned = 0, ban_reason = NULL, ban_until = NULL, last_active = ? WHERE user_id = ?",
-            (datetime.now().isoformat(), user_id),
+            "UPDATE players SET is_banned = 0, ban_reason = NULL, ban_until = NULL WHERE user_id = ?",
+            (user_id,),
         )
+        mark_active(user_id)
         await db.execute(
             """INSERT INTO admin_actions (admin_id, action_type, target_user_id, details) 
                VALUES (?, ?, ?, ?)""",
             (admin_id, "unban", user_id, "Разбан игрока"),
         )
         await db.commit()
+    _notify_ban_change(user_id, None, False)
     return True
 
 
-async def delete_player(user_id: int, admin_id: int) -> bool:
-    """Delete a player"""
+async def get_banned_players() -> List[Tuple[int, Optional[str]]]:
+    """Забаненные игроки: (user_id, ban_until) - для реестра банов"""
+    async with connect() as db:
+        async with db.execute("SELECT user_id, ban_until FROM players WHERE is_banned = 1") as cur:
+            return await cur.fetchall()
+
+
+async def unban_expired_players(user_ids: List[int]) -> List[int]:
+    """Снять истекшие баны одним UPDATE, вернуть фактически разбаненных"""
+    if not user_ids:
+        return []
+
+    now = datetime.now().isoformat()
+    placeholders = ", ".join("?" for _ in user_ids)
+    async with connect() as db:
+        # Условие по ban_until: бан могли продлить после того, как срок попал в очередь
+        async with db.execute(
+            f"""
+            UPDATE players SET is_banned = 0, ban_reason = NULL, ban_until = NULL
+            WHERE user_id IN ({placeholders}) AND is_banned = 1
+              AND ban_until IS NOT NULL AND ban_until <= ?
+            RETURNING user_id
+            """,
+            (*user_ids, now),
+        ) as cur:
+            unbanned = [row[0] for row in await cur.fetchall()]
+
+        if unbanned:
+            await db.executemany(
+                """INSERT INTO admin_actions (admin_id, action_type, target_user_id, details)
+                   VALUES (0, 'auto_unban', ?, 'Срок бана истек')""",
+                [(user_id,) for user_id in unbanned],
+            )
+        await db.commit()
+
+    for user_id in unbanned:
+        _notify_ban_change(user_id, None, False)
+    return unbanned
+
+
+# Таблицы, которые чистятся вместе с игроком: (таблица, колонка с user_id)
+PLAYER_CASCADE = [
+    ("transactions", "user_id"),
+    ("dumbbell_uses", "user_id"),
+    ("daily_hall_purchases", "user_id"),
+    ("daily_income_stats", "user_id"),
+    ("daily_income_totals", "user_id"),
+    ("inspections", "inspector_id"),
+    ("inspections", "target_id"),
+    ("player_inspectors", "user_id"),
+    ("player_protections", "user_id"),
+    ("active_protections", "user_id"),
+    ("protection_stats", "user_id"),
+    ("info_access", "user_id"),
+    ("economy_user_daily", "user_id"),
+    # После передачи кланов игрока (_release_owned_clans): триггеры пересчитают member_count
+    ("clan_members", "user_id"),
+]
+
+# Массовое удаление: строк в одной транзакции и пауза между пачками (секунды)
+DELETE_CHUNK_SIZE = 5000
+DELETE_CHUNK_PAUSE = 0.05
+
+# Отчет о ходе удаления: callback(таблица, удалено строк этой пачкой)
+ProgressCallback = Callable[[str, int], Awaitable[None]]
+
+
+async def get_max_rowid(table: str) -> int:
+    """Верхняя граница rowid таблицы (строки после нее удаление не трогает)"""
+    async with connect() as db:
+        async with db.execute(f"SELECT MAX(rowid) FROM {table}") as cur:
+            row = await cur.fetchone()
+    return row[0] or 0
+
+
+async def delete_rows_chunk(table: str, where: str = "1", params: Tuple = (), max_rowid: Optional[int] = None,
+                            limit: int = DELETE_CHUNK_SIZE) -> int:
+    """Удалить одну пачку строк короткой транзакцией, вернуть число удаленных"""
+    bound = "" if max_rowid is None else "rowid <= ? AND "
+    bound_params = () if max_rowid is None else (max_rowid,)
+    async with connect() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        cur = await db.execute(
+            f"""
+            DELETE FROM {table} WHERE rowid IN (
+                SELECT rowid FROM {table} WHERE {bound}({where}) ORDER BY rowid LIMIT ?
+            )
+            """,
+            (*bound_params, *params, limit),
+        )
+        deleted = cur.rowcount
+        await db.commit()
+    return deleted
+
+
+async def delete_in_chunks(table: str, where: str = "1", params: Tuple = (), max_rowid: Optional[int] = None,
+                           on_progress: Optional[ProgressCallback] = None) -> int:
+    """Удалять пачками до конца, уступая базу другим запросам между пачками"""
+    total = 0
+    while True:
+        deleted = await delete_rows_chunk(table, where, params, max_rowid)
+        total += deleted
+        if deleted and on_progress is not None:
+            await on_progress(table, deleted)
+        if deleted < DELETE_CHUNK_SIZE:
+            return total
+        await asyncio.sleep(DELETE_CHUNK_PAUSE)
+
+
+async def _release_owned_clans(db: aiosqlite.Connection, user_id: int) -> None:
+    """Кланы удаляемого игрока переходят офицеру или самому полезному участнику; клан без участников удаляется"""
+    async with db.execute("SELECT id FROM clans WHERE owner_id = ?", (user_id,)) as cur:
+        clan_ids = [row[0] for row in await cur.fetchall()]
+
+    for clan_id in clan_ids:
+        async with db.execute(
+            """SELECT user_id FROM clan_members
+               WHERE clan_id = ? AND user_id != ? AND status = 'active'
+               ORDER BY role = 'officer' DESC, contributions DESC, joined_at, id
+               LIMIT 1""",
+            (clan_id, user_id)
+        ) as cur:
+            row = await cur.fetchone()
+
+        if row is None:
+            await db.execute("UPDATE players SET clan_id = NULL, clan_role = NULL WHERE clan_id = ?", (clan_id,))
+            await db.execute("DELETE FROM clan_members WHERE clan_id = ?", (clan_id,))
+            await db.execute("DELETE FROM clans WHERE id = ?", (clan_id,))
+            continue
+
+        new_owner_id = row[0]
+        await db.execute(
+            "UPDATE clans SET owner_id = ?, updated_at = ? WHERE id = ?",
+            (new_owner_id, datetime.now().isoformat(), clan_id)
+        )
+        await db.execute(
+            "UPDATE clan_members SET role = 'owner' WHERE clan_id = ? AND user_id = ?",
+            (clan_id, new_owner_id)
+        )
+        await db.execute("UPDATE players SET clan_role = 'owner' WHERE user_id = ?", (new_owner_id,))
+        await db.execute(
+            "INSERT INTO clan_logs (clan_id, user_id, action_type, details) VALUES (?, ?, 'transfer', ?)",
+            (clan_id, new_owner_id, "Клан передан: прежний владелец удален")
+        )
+
+
+async def delete_player(user_id: int, admin_id: int, on_progress: Optional[ProgressCallback] = None) -> bool:
+    """Delete a player: история удаляется пачками, сам игрок - последней короткой транзакцией"""
     player_data = await get_player(user_id)
     if not player_data:
         return False
 
-    async with aiosqlite.connect(settings.database_path) as db:
-        await db.execute("DELETE FROM transactions WHERE user_id = ?", (user_id,))
-        await db.execute("DELETE FROM dumbbell_uses WHERE user_id = ?", (user_id,))
-        await db.execute("DELETE FROM daily_hall_purchases WHERE user_id = ?", (user_id,))
-        await db.execute("DELETE FROM daily_income_stats WHERE user_id = ?", (user_id,))
-        await db.execute("DELETE FROM inspections WHERE inspector_id = ? OR target_id = ?", (user_id, user_id))
-        await db.execute("DELETE FROM player_inspectors WHERE user_id = ?", (user_id,))
-        await db.execute("DELETE FROM player_protections WHERE user_id = ?", (user_id,))
-        await db.execute("DELETE FROM active_protections WHERE user_id = ?", (user_id,))
-        await db.execute("DELETE FROM protection_stats WHERE user_id = ?", (user_id,))
-        await db.execute("DELETE FROM info_access WHERE user_id = ?", (user_id,))
+    # Клан не должен остаться без владельца, пока удаляется история
+    async with connect() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        await _release_owned_clans(db, user_id)
+        await db.commit()
+
+    for table, column in PLAYER_CASCADE:
+        await delete_in_chunks(table, f"{column} = ?", (user_id,), on_progress=on_progress)
+
+    async with connect() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        # Строки, появившиеся за время удаления истории (игрок мог еще играть)
+        await _release_owned_clans(db, user_id)
+        for table, column in PLAYER_CASCADE:
+            await db.execute(f"DELETE FROM {table} WHERE {column} = ?", (user_id,))
         await db.execute("DELETE FROM players WHERE user_id = ?", (user_id,))
 
         await db.execute(
@@ -975,6 +1667,11 @@ async def delete_player(user_id: int, admin_id: int) -> bool:
         )
 
         await db.commit()
+    LAST_ACTIVE.pop(user_id, None)
+    if player_data.get("admin_level"):
+        _notify_admin_change(user_id, 0, None)
+    if player_data.get("is_banned"):
+        _notify_ban_change(user_id, None, False)
     return True
 
 
@@ -982,7 +1679,7 @@ async def log_dumbbell_use(
     user_id: int, dumbbell_level: int, income: int, power_gained: int
 ) -> bool:
     """Log dumbbell use"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             """INSERT INTO dumbbell_uses (user_id, dumbbell_level, income, power_gained) 
                VALUES (?, ?, ?, ?)""",
@@ -1004,40 +1701,80 @@ async def increment_admin_stat(user_id: int, stat_name: str) -> bool:
 
     if stat_name in stats_map:
         column = stats_map[stat_name]
-        async with aiosqlite.connect(settings.database_path) as db:
+        async with connect() as db:
             await db.execute(
-                f"UPDATE players SET {column} = {column} + 1, last_active = ? WHERE user_id = ?",
-                (datetime.now().isoformat(), user_id),
+                f"UPDATE players SET {column} = {column} + 1 WHERE user_id = ?",
+                (user_id,),
             )
+            mark_active(user_id)
             await db.commit()
     return True
 
 
 async def get_top_balance(limit: int = 10) -> List[Tuple]:
-    """Get top players by balance"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    """Get top players by balance (забаненных отсеивает top.py по реестру банов)"""
+    async with connect() as db:
         async with db.execute(
-            "SELECT user_id, username, balance, dumbbell_name FROM players WHERE is_banned = 0 ORDER BY balance DESC LIMIT ?",
+            "SELECT user_id, username, balance, dumbbell_name, dumbbell_level FROM players ORDER BY balance DESC LIMIT ?",
             (limit,),
         ) as cur:
             return await cur.fetchall()
 
 
 async def get_top_lifts(limit: int = 10) -> List[Tuple]:
-    """Get top players by total lifts"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    """Get top players by total lifts (забаненных отсеивает top.py по реестру банов)"""
+    async with connect() as db:
         async with db.execute(
-            "SELECT user_id, username, total_lifts, dumbbell_name FROM players WHERE is_banned = 0 ORDER BY total_lifts DESC LIMIT ?",
+            "SELECT user_id, username, total_lifts, dumbbell_name, dumbbell_level FROM players ORDER BY total_lifts DESC LIMIT ?",
             (limit,),
         ) as cur:
             return await cur.fetchall()
 
 
+async def get_top_power(limit: int = 10) -> List[Tuple]:
+    """Get top players by power (забаненных отсеивает top.py по реестру банов)"""
+    async with connect() as db:
+        async with db.execute(
+            "SELECT user_id, username, power, dumbbell_name, dumbbell_level FROM players ORDER BY power DESC LIMIT ?",
+            (limit,),
+        ) as cur:
+            return await cur.fetchall()
+
+
+async def get_top_fitness_halls(limit: int = 10) -> List[Tuple]:
+    """Get top players by fitness halls (забаненных отсеивает top.py по реестру банов)"""
+    async with connect() as db:
+        async with db.execute(
+            "SELECT user_id, username, fitness_halls, dumbbell_name, dumbbell_level FROM players ORDER BY fitness_halls DESC LIMIT ?",
+            (limit,),
+        ) as cur:
+            return await cur.fetchall()
+
+
+async def get_leaderboard_version(board: str) -> int:
+    """Версия рейтинга: меняется, когда меняется его содержимое"""
+    async with connect() as db:
+        async with db.execute(
+            "SELECT version FROM leaderboard_versions WHERE board = ?", (board,)
+        ) as cur:
+            row = await cur.fetchone()
+    return row[0] if row else 0
+
+
+async def set_leaderboard_threshold(board: str, threshold: Optional[int]) -> None:
+    """Запомнить последнее видимое место рейтинга (None - любое изменение повышает версию)"""
+    async with connect() as db:
+        await db.execute(
+            "UPDATE leaderboard_versions SET threshold = ? WHERE board = ?", (threshold, board)
+        )
+        await db.commit()
+
+
 async def get_top_earners(limit: int = 10) -> List[Tuple]:
-    """Get top players by total earned"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    """Get top players by total earned (забаненных отсеивает вызывающий по реестру банов)"""
+    async with connect() as db:
         async with db.execute(
-            "SELECT user_id, username, dumbbell_name, dumbbell_level, total_earned FROM players WHERE is_banned = 0 ORDER BY total_earned DESC LIMIT ?",
+            "SELECT user_id, username, dumbbell_name, dumbbell_level, total_earned FROM players ORDER BY total_earned DESC LIMIT ?",
             (limit,),
         ) as cur:
             return await cur.fetchall()
@@ -1053,36 +1790,94 @@ async def get_player_fitness_halls(user_id: int) -> int:
     return player.get("fitness_halls", 0) if player else 0
 
 
+# Лимит покупки фитнес-залов в день
+DAILY_HALL_LIMIT = 100
+
+# Покупки за день копятся в одной строке; RETURNING - итог дня после этой покупки
+SQL_ADD_DAILY_PURCHASES = """
+    INSERT INTO daily_hall_purchases (user_id, purchase_date, amount) VALUES (?, ?, ?)
+    ON CONFLICT(user_id, purchase_date) DO UPDATE SET amount = amount + excluded.amount
+    RETURNING amount
+"""
+
+
 async def update_fitness_halls(user_id: int, amount: int, total_price: int = 0) -> int:
     """Обновить количество фитнес-залов у игрока и вернуть новое значение"""
-    async with aiosqlite.connect(settings.database_path) as db:
-        # Обновляем количество залов
-        await db.execute(
-            "UPDATE players SET fitness_halls = fitness_halls + ?, last_active = ? WHERE user_id = ?",
-            (amount, datetime.now().isoformat(), user_id)
-        )
-        
-        # Обновляем статистику ежедневных покупок
-        if amount > 0:
-            await update_daily_purchases(user_id, amount)
-        
-        await db.commit()
-        
-        # Получаем новое количество залов
+    async with connect() as db:
+        await db.execute("BEGIN IMMEDIATE")
         async with db.execute(
-            "SELECT fitness_halls FROM players WHERE user_id = ?", 
-            (user_id,)
+            "UPDATE players SET fitness_halls = fitness_halls + ? WHERE user_id = ? RETURNING fitness_halls",
+            (amount, user_id)
         ) as cur:
             row = await cur.fetchone()
-            return row[0] if row else 0
+        mark_active(user_id)
+        
+        # Статистика ежедневных покупок - в той же транзакции
+        if row and amount > 0:
+            async with db.execute(SQL_ADD_DAILY_PURCHASES, (user_id, datetime.now().date().isoformat(), amount)) as cur:
+                await cur.fetchone()
+        
+        await db.commit()
+    return row[0] if row else 0
+
+
+async def buy_fitness_halls(user_id: int, amount: int, total_price: int,
+                            daily_limit: int = DAILY_HALL_LIMIT) -> Dict[str, Any]:
+    """Купить фитнес-залы одной транзакцией
+
+    Дневной лимит, списание, залы и транзакция покупки проверяются и пишутся
+    под одной блокировкой записи: параллельные покупки не превышают лимит и
+    не уводят баланс в минус.
+    """
+    today = datetime.now().date().isoformat()
+    description = f"Покупка {amount} фитнес залов"
+    try:
+        async with connect() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            
+            async with db.execute(SQL_ADD_DAILY_PURCHASES, (user_id, today, amount)) as cur:
+                bought_today = (await cur.fetchone())[0]
+            if bought_today > daily_limit:
+                await db.rollback()
+                return {
+                    "success": False,
+                    "error": "daily_limit",
+                    "daily_purchases": bought_today - amount,
+                    "daily_limit": daily_limit,
+                }
+            
+            async with db.execute(
+                """UPDATE players SET fitness_halls = fitness_halls + ?, 
+                       balance = balance - ?, total_spent = total_spent + ? 
+                   WHERE user_id = ? AND balance >= ? 
+                   RETURNING fitness_halls, balance""",
+                (amount, total_price, total_price, user_id, total_price)
+            ) as cur:
+                row = await cur.fetchone()
+            if not row:
+                await db.rollback()
+                return {"success": False, "error": "insufficient_funds"}
+            
+            await db.execute(
+                "INSERT INTO transactions (user_id, type, amount, description) VALUES (?, 'fitness_hall_purchase', ?, ?)",
+                (user_id, -total_price, description)
+            )
+            await db.commit()
+    except Exception as e:
+        print(f"Ошибка при покупке фитнес-залов: {e}")
+        return {"success": False, "error": str(e)}
+    
+    mark_active(user_id)
+    _notify_ledger(user_id, "fitness_hall_purchase", -total_price)
+    return {"success": True, "fitness_halls": row[0], "balance": row[1], "daily_purchases": bought_today}
 
 
 async def get_daily_purchases(user_id: int) -> int:
     """Получить количество купленных залов за сегодня"""
     today = datetime.now().date().isoformat()
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
-            "SELECT COALESCE(SUM(amount), 0) as total FROM daily_hall_purchases WHERE user_id = ? AND purchase_date = ?",
+            "SELECT amount FROM daily_hall_purchases WHERE user_id = ? AND purchase_date = ?",
             (user_id, today)
         ) as cur:
             row = await cur.fetchone()
@@ -1091,29 +1886,9 @@ async def get_daily_purchases(user_id: int) -> int:
 
 async def update_daily_purchases(user_id: int, amount: int) -> bool:
     """Обновить статистику ежедневных покупок"""
-    today = datetime.now().date().isoformat()
-    
-    async with aiosqlite.connect(settings.database_path) as db:
-        # Проверяем, есть ли уже запись на сегодня
-        async with db.execute(
-            "SELECT id FROM daily_hall_purchases WHERE user_id = ? AND purchase_date = ?",
-            (user_id, today)
-        ) as cur:
-            existing = await cur.fetchone()
-        
-        if existing:
-            # Обновляем существующую запись
-            await db.execute(
-                "UPDATE daily_hall_purchases SET amount = amount + ? WHERE user_id = ? AND purchase_date = ?",
-                (amount, user_id, today)
-            )
-        else:
-            # Создаем новую запись
-            await db.execute(
-                "INSERT INTO daily_hall_purchases (user_id, purchase_date, amount) VALUES (?, ?, ?)",
-                (user_id, today, amount)
-            )
-        
+    async with connect() as db:
+        async with db.execute(SQL_ADD_DAILY_PURCHASES, (user_id, datetime.now().date().isoformat(), amount)) as cur:
+            await cur.fetchone()
         await db.commit()
         return True
 
@@ -1121,7 +1896,7 @@ async def update_daily_purchases(user_id: int, amount: int) -> bool:
 async def reset_daily_purchases() -> bool:
     """Сбросить счетчики ежедневных покупок (удалить старые записи)"""
     yesterday = (datetime.now() - timedelta(days=1)).date().isoformat()
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "DELETE FROM daily_hall_purchases WHERE purchase_date < ?",
             (yesterday,)
@@ -1136,7 +1911,7 @@ async def reset_daily_purchases() -> bool:
 
 async def get_all_players_with_halls() -> List[Dict[str, Any]]:
     """Получить всех игроков, у которых есть фитнес-залы"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             "SELECT user_id, username, fitness_halls FROM players WHERE fitness_halls > 0 AND is_banned = 0"
         ) as cur:
@@ -1152,14 +1927,41 @@ async def get_all_players_with_halls() -> List[Dict[str, Any]]:
     return players
 
 
+# Строка дня обновляется на месте (INSERT OR REPLACE удалял и вставлял ее заново)
+SQL_ADD_DAILY_INCOME_STATS = """
+    INSERT INTO daily_income_stats (user_id, income_date, amount_received, last_received_date)
+    VALUES (:user_id, :today, :amount, :now)
+    ON CONFLICT(user_id, income_date) DO UPDATE SET
+        amount_received = amount_received + excluded.amount_received,
+        last_received_date = excluded.last_received_date
+"""
+
+# Итоги: сумма за все время, последняя выплата и серия дней подряд.
+# В SET справа стоят старые значения строки, поэтому серия считается от прошлой даты выплаты
+SQL_ADD_DAILY_INCOME_TOTALS = """
+    INSERT INTO daily_income_totals (user_id, total_received, last_received_date, last_income_date, streak)
+    VALUES (:user_id, :amount, :now, :today, 1)
+    ON CONFLICT(user_id) DO UPDATE SET
+        total_received = total_received + excluded.total_received,
+        last_received_date = excluded.last_received_date,
+        streak = CASE
+            WHEN last_income_date = excluded.last_income_date THEN streak
+            WHEN last_income_date = date(excluded.last_income_date, '-1 day') THEN streak + 1
+            ELSE 1
+        END,
+        last_income_date = excluded.last_income_date
+"""
+
+
 async def add_daily_fitness_hall_income(user_id: int, amount: int, description: str) -> bool:
     """Добавить ежедневный доход с фитнес-залов"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Обновляем баланс игрока
         await db.execute(
-            "UPDATE players SET balance = balance + ?, total_earned = total_earned + ?, last_active = ? WHERE user_id = ?",
-            (amount, amount, datetime.now().isoformat(), user_id)
+            "UPDATE players SET balance = balance + ?, total_earned = total_earned + ? WHERE user_id = ?",
+            (amount, amount, user_id)
         )
+        mark_active(user_id)
         
         # Записываем транзакцию
         await db.execute(
@@ -1167,14 +1969,15 @@ async def add_daily_fitness_hall_income(user_id: int, amount: int, description:
             (user_id, amount, description)
         )
         
-        # Обновляем статистику ежедневных выплат
-        today = datetime.now().date().isoformat()
-        await db.execute(
-            """INSERT OR REPLACE INTO daily_income_stats 
-               (user_id, income_date, amount_received, last_received_date) 
-               VALUES (?, ?, ?, ?)""",
-            (user_id, today, amount, datetime.now().isoformat())
-        )
+        # Обновляем статистику ежедневных выплат (строка дня и итоги игрока)
+        params = {
+            "user_id": user_id,
+            "amount": amount,
+            "today": datetime.now().date().isoformat(),
+            "now": datetime.now().isoformat(),
+        }
+        await db.execute(SQL_ADD_DAILY_INCOME_STATS, params)
+        await db.execute(SQL_ADD_DAILY_INCOME_TOTALS, params)
         
         await db.commit()
         return True
@@ -1182,22 +1985,22 @@ async def add_daily_fitness_hall_income(user_id: int, amount: int, description:
 
 async def get_daily_income_stats(user_id: int) -> Optional[Dict[str, Any]]:
     """Получить статистику ежедневного дохода игрока"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    yesterday = (datetime.now() - timedelta(days=1)).date().isoformat()
+    async with connect() as db:
         async with db.execute(
-            """SELECT 
-                COALESCE(SUM(amount_received), 0) as total_received,
-                MAX(last_received_date) as last_received_date
-               FROM daily_income_stats 
-               WHERE user_id = ?
-               GROUP BY user_id""",
-            (user_id,)
+            """SELECT total_received, last_received_date, 
+                      CASE WHEN last_income_date >= ? THEN streak ELSE 0 END
+               FROM daily_income_totals 
+               WHERE user_id = ?""",
+            (yesterday, user_id)
         ) as cur:
             row = await cur.fetchone()
     
     if row:
         return {
             "total_received": row[0],
-            "last_received_date": row[1]
+            "last_received_date": row[1],
+            "streak": row[2]
         }
     return None
 
@@ -1205,7 +2008,7 @@ async def get_daily_income_stats(user_id: int) -> Optional[Dict[str, Any]]:
 async def reset_daily_income_stats() -> bool:
     """Сбросить старые записи статистики ежедневного дохода"""
     month_ago = (datetime.now() - timedelta(days=30)).date().isoformat()
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "DELETE FROM daily_income_stats WHERE income_date < ?",
             (month_ago,)
@@ -1226,11 +2029,12 @@ async def get_coach_level(user_id: int) -> int:
 
 async def update_coach_level(user_id: int, new_level: int) -> bool:
     """Обновить уровень тренерской деятельности"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET coach_level = ?, last_active = ? WHERE user_id = ?",
-            (new_level, datetime.now().isoformat(), user_id)
+            "UPDATE players SET coach_level = ? WHERE user_id = ?",
+            (new_level, user_id)
         )
+        mark_active(user_id)
         await db.commit()
         return True
 
@@ -1246,18 +2050,99 @@ async def set_last_training_time(user_id: int, timestamp: str = None) -> bool:
     if timestamp is None:
         timestamp = datetime.now().isoformat()
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET last_training = ?, last_active = ? WHERE user_id = ?",
-            (timestamp, datetime.now().isoformat(), user_id)
+            "UPDATE players SET last_training = ? WHERE user_id = ?",
+            (timestamp, user_id)
         )
+        mark_active(user_id)
         await db.commit()
         return True
 
 
+async def perform_training(user_id: int, levels: Dict[int, Dict[str, Any]],
+                           cooldown: timedelta) -> Dict[str, Any]:
+    """Провести тренировку одной транзакцией
+
+    КД проверяется в том же UPDATE, который ставит время тренировки, поэтому
+    две одновременные тренировки не пройдут обе. Награда (монеты или бонусные
+    залы) и транзакция дохода пишутся под той же блокировкой.
+    levels - уровни тренера: min_income, max_income, bonus_chance, bonus_halls.
+    """
+    now = datetime.now()
+    try:
+        async with connect() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            
+            async with db.execute(
+                """UPDATE players SET last_training = ? 
+                   WHERE user_id = ? AND coach_level > 0 
+                     AND (last_training IS NULL OR last_training <= ?) 
+                   RETURNING coach_level""",
+                (now.isoformat(), user_id, (now - cooldown).isoformat())
+            ) as cur:
+                row = await cur.fetchone()
+            
+            if not row:
+                async with db.execute(
+                    "SELECT coach_level, last_training FROM players WHERE user_id = ?",
+                    (user_id,)
+                ) as cur:
+                    player = await cur.fetchone()
+                await db.rollback()
+                if not player:
+                    return {"success": False, "error": "not_found"}
+                if not player[0]:
+                    return {"success": False, "error": "no_coach"}
+                return {"success": False, "error": "cooldown", "last_training": player[1]}
+            
+            level = row[0]
+            coach_data = levels[level]
+            got_bonus = coach_data["bonus_chance"] > 0 and random.randint(1, 100) <= coach_data["bonus_chance"]
+            
+            if got_bonus:
+                income = 0
+                bonus_halls = coach_data["bonus_halls"]
+                async with db.execute(
+                    "UPDATE players SET fitness_halls = fitness_halls + ? WHERE user_id = ? RETURNING fitness_halls, balance",
+                    (bonus_halls, user_id)
+                ) as cur:
+                    row = await cur.fetchone()
+            else:
+                income = random.randint(coach_data["min_income"], coach_data["max_income"])
+                bonus_halls = 0
+                async with db.execute(
+                    """UPDATE players SET balance = balance + ?, total_earned = total_earned + ? 
+                       WHERE user_id = ? RETURNING fitness_halls, balance""",
+                    (income, income, user_id)
+                ) as cur:
+                    row = await cur.fetchone()
+                await db.execute(
+                    "INSERT INTO transactions (user_id, type, amount, description) VALUES (?, 'training_income', ?, ?)",
+                    (user_id, income, f"Доход от тренировки (уровень {level})")
+                )
+            await db.commit()
+    except Exception as e:
+        print(f"Ошибка при проведении тренировки: {e}")
+        return {"success": False, "error": str(e)}
+    
+    mark_active(user_id)
+    if income:
+        _notify_ledger(user_id, "training_income", income)
+    return {
+        "success": True,
+        "level": level,
+        "income": income,
+        "bonus_halls": bonus_halls,
+        "fitness_halls": row[0],
+        "balance": row[1],
+        "next_training": (now + cooldown).isoformat(),
+    }
+
+
 async def get_coach_stats(user_id: int) -> Dict[str, Any]:
     """Получить статистику тренерской деятельности"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             """SELECT 
                 COALESCE(SUM(CASE WHEN type = 'training_income' THEN amount ELSE 0 END), 0) as total_earned,
@@ -1282,7 +2167,7 @@ async def get_coach_stats(user_id: int) -> Dict[str, Any]:
 
 async def get_promo_info(code: str) -> Optional[Dict[str, Any]]:
     """Получить информацию о промокоде"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             """SELECT code, uses_total, uses_left, reward_type, reward_amount, 
                       created_by, created_at, expires_at, is_active 
@@ -1322,7 +2207,7 @@ async def create_promo_code(
     else:
         expires_at = None
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         try:
             await db.execute(
                 """INSERT INTO promo_codes 
@@ -1338,7 +2223,7 @@ async def create_promo_code(
 
 async def delete_promo_code(code: str, admin_id: int) -> bool:
     """Удалить промокод"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute("DELETE FROM promo_codes WHERE code = ?", (code.upper(),))
         await db.execute(
             """INSERT INTO admin_actions (admin_id, action_type, target_user_id, details) 
@@ -1370,15 +2255,16 @@ async def use_promo_code(user_id: int, code: str) -> Dict[str, Any]:
     if player and code in player.get("used_promo_codes", []):
         return {"success": False, "error": "Вы уже использовали этот промокод"}
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Обновляем использованные промокоды игрока
         used_codes = player.get("used_promo_codes", []) if player else []
         used_codes.append(code)
         
         await db.execute(
-            "UPDATE players SET used_promo_codes = ?, last_active = ? WHERE user_id = ?",
-            (json.dumps(used_codes), datetime.now().isoformat(), user_id)
+            "UPDATE players SET used_promo_codes = ? WHERE user_id = ?",
+            (json.dumps(used_codes), user_id)
         )
+        mark_active(user_id)
         
         # Начисляем награду
         if promo["reward_type"] == "монеты":
@@ -1416,6 +2302,9 @@ async def use_promo_code(user_id: int, code: str) -> Dict[str, Any]:
         
         await db.commit()
     
+    coins = promo["reward_amount"] if promo["reward_type"] == "монеты" else 0
+    _notify_ledger(user_id, "promo_code", coins)
+    
     return {
         "success": True,
         "reward_type": promo["reward_type"],
@@ -1423,9 +2312,17 @@ async def use_promo_code(user_id: int, code: str) -> Dict[str, Any]:
     }
 
 
+async def count_promo_uses(code: str) -> int:
+    """Число активаций промокода"""
+    async with connect() as db:
+        async with db.execute("SELECT COUNT(*) FROM promo_uses WHERE promo_code = ?", (code.upper(),)) as cur:
+            row = await cur.fetchone()
+    return row[0] if row else 0
+
+
 async def sum_promo_uses() -> int:
     """Получить общее количество использований промокодов"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         async with db.execute("SELECT COUNT(*) FROM promo_uses") as cur:
             result = await cur.fetchone()
             return result[0] if result else 0
@@ -1437,7 +2334,7 @@ async def sum_promo_uses() -> int:
 
 async def create_clan(tag: str, name: str, owner_id: int) -> Dict[str, Any]:
     """Создание клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         try:
             # Проверяем, не существует ли уже клан с таким тегом
             async with db.execute("SELECT id FROM clans WHERE tag = ?", (tag.upper(),)) as cur:
@@ -1447,8 +2344,8 @@ async def create_clan(tag: str, name: str, owner_id: int) -> Dict[str, Any]:
             
             # Создаем клан
             await db.execute(
-                """INSERT INTO clans (tag, name, owner_id, created_at, updated_at) 
-                   VALUES (?, ?, ?, ?, ?)""",
+                """INSERT INTO clans (tag, name, owner_id, member_count, created_at, updated_at) 
+                   VALUES (?, ?, ?, 0, ?, ?)""",
                 (tag.upper(), name, owner_id, datetime.now().isoformat(), datetime.now().isoformat())
             )
             
@@ -1465,9 +2362,10 @@ async def create_clan(tag: str, name: str, owner_id: int) -> Dict[str, Any]:
             
             # Обновляем игрока
             await db.execute(
-                "UPDATE players SET clan_id = ?, clan_role = 'owner', last_active = ? WHERE user_id = ?",
-                (clan_id, datetime.now().isoformat(), owner_id)
+                "UPDATE players SET clan_id = ?, clan_role = 'owner' WHERE user_id = ?",
+                (clan_id, owner_id)
             )
+            mark_active(owner_id)
             
             await db.commit()
             return {"success": True, "clan_id": clan_id}
@@ -1477,11 +2375,12 @@ async def create_clan(tag: str, name: str, owner_id: int) -> Dict[str, Any]:
 
 async def get_clan_by_tag(tag: str) -> Optional[Dict[str, Any]]:
     """Получить клан по тегу"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             """SELECT id, tag, name, owner_id, level, treasury, member_count, 
                       total_income_per_hour, total_lifts, created_at, 
-                      updated_at, settings, description, hall_income, experience 
+                      updated_at, settings, banned_players, description, hall_income, experience, 
+                      total_halls, total_power, total_contributions 
                FROM clans WHERE tag = ?""",
             (tag.upper(),)
         ) as cur:
@@ -1509,17 +2408,21 @@ async def get_clan_by_tag(tag: str) -> Optional[Dict[str, Any]]:
         "banned_players": json.loads(banned_players_json),
         "description": row[13],
         "hall_income": row[14],
-        "experience": row[15]
+        "experience": row[15],
+        "total_halls": row[16] or 0,
+        "total_power": row[17] or 0,
+        "total_contributions": row[18] or 0
     }
 
 
 async def get_clan_by_id(clan_id: int) -> Optional[Dict[str, Any]]:
     """Получить клан по ID"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             """SELECT id, tag, name, owner_id, level, treasury, member_count, 
                       total_income_per_hour, total_lifts, created_at, 
-                      updated_at, settings, description, hall_income, experience 
+                      updated_at, settings, banned_players, description, hall_income, experience, 
+                      total_halls, total_power, total_contributions 
                FROM clans WHERE id = ?""",
             (clan_id,)
         ) as cur:
@@ -1547,15 +2450,18 @@ async def get_clan_by_id(clan_id: int) -> Optional[Dict[str, Any]]:
         "banned_players": json.loads(banned_players_json),
         "description": row[13],
         "hall_income": row[14],
-        "experience": row[15]
+        "experience": row[15],
+        "total_halls": row[16] or 0,
+        "total_power": row[17] or 0,
+        "total_contributions": row[18] or 0
     }
 
 
 async def get_clan_member_count(clan_id: int) -> int:
-    """Получить количество участников клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    """Получить количество участников клана (счетчик ведут триггеры)"""
+    async with connect() as db:
         async with db.execute(
-            "SELECT COUNT(*) FROM clan_members WHERE clan_id = ? AND status = 'active'",
+            "SELECT member_count FROM clans WHERE id = ?",
             (clan_id,)
         ) as cur:
             result = await cur.fetchone()
@@ -1564,7 +2470,7 @@ async def get_clan_member_count(clan_id: int) -> int:
 
 async def get_clan_members(clan_id: int, limit: int = 50) -> List[Dict[str, Any]]:
     """Получить участников клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             """SELECT cm.user_id, p.username, cm.role, cm.contributions, cm.joined_at 
                FROM clan_members cm 
@@ -1596,30 +2502,20 @@ async def get_clan_members(clan_id: int, limit: int = 50) -> List[Dict[str, Any]
 
 async def get_player_clan(user_id: int) -> Optional[Dict[str, Any]]:
     """Получить клан игрока с полной информацией"""
-    player = await get_player(user_id)
-    if not player or not player.get("clan_id"):
-        return None
-    
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
-            "SELECT id, tag, name, owner_id, level, treasury, description, created_at FROM clans WHERE id = ?",
-            (player["clan_id"],)
+            f"""
+            SELECT {_select_list('c', CLAN_COLUMNS)}
+            FROM players p JOIN clans c ON c.id = p.clan_id
+            WHERE p.user_id = ?
+            """,
+            (user_id,)
         ) as cur:
             row = await cur.fetchone()
     
     if not row:
         return None
-    
-    return {
-        "id": row[0],
-        "tag": row[1],
-        "name": row[2],
-        "owner_id": row[3],
-        "level": row[4],
-        "treasury": row[5],
-        "description": row[6] or "Нет описания",
-        "created_at": row[7]
-    }
+    return _clan_from_row(row)
 
 
 async def deposit_to_clan_treasury(user_id: int, amount: int) -> Dict[str, Any]:
@@ -1635,12 +2531,13 @@ async def deposit_to_clan_treasury(user_id: int, amount: int) -> Dict[str, Any]:
     if not clan:
         return {"success": False, "error": "Вы не состоите в клане"}
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Списываем деньги у игрока
         await db.execute(
-            "UPDATE players SET balance = balance - ?, total_spent = total_spent + ?, last_active = ? WHERE user_id = ?",
-            (amount, amount, datetime.now().isoformat(), user_id)
+            "UPDATE players SET balance = balance - ?, total_spent = total_spent + ? WHERE user_id = ?",
+            (amount, amount, user_id)
         )
+        mark_active(user_id)
         
         # Добавляем в казну клана
         await db.execute(
@@ -1682,7 +2579,7 @@ async def deposit_to_clan_treasury(user_id: int, amount: int) -> Dict[str, Any]:
 
 async def subtract_treasury(clan_id: int, amount: int) -> bool:
     """Снять деньги из казны клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "UPDATE clans SET treasury = treasury - ?, updated_at = ? WHERE id = ? AND treasury >= ?",
             (amount, datetime.now().isoformat(), clan_id, amount)
@@ -1691,18 +2588,171 @@ async def subtract_treasury(clan_id: int, amount: int) -> bool:
         return True
 
 
-async def get_clan_treasury_log(clan_id: int, limit: int = 10) -> List[Dict[str, Any]]:
-    """Получить лог операций с казной клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
-        async with db.execute(
-            """SELECT user_id, username, action_type, amount, description, created_at 
-               FROM clan_treasury_log 
-               WHERE clan_id = ? 
-               ORDER BY created_at DESC 
-               LIMIT ?""",
-            (clan_id, limit)
-        ) as cur:
-            rows = await cur.fetchall()
+# Режимы распределения казны: сколько участников получают выплату и как это логируется
+TREASURY_DISTRIBUTION_MODES = {
+    "all": {
+        "limit": -1,
+        "transaction_type": "clan_distribution",
+        "log_type": "distribution",
+        "clan_action": "distribute_all",
+    },
+    "top": {
+        "limit": 3,
+        "transaction_type": "clan_distribution_top",
+        "log_type": "distribution_top",
+        "clan_action": "distribute_top",
+    },
+}
+
+# Получатели: активные участники по убыванию вкладов (для "all" без ограничения)
+SQL_DISTRIBUTION_RECIPIENTS = """
+    SELECT user_id FROM clan_members
+    WHERE clan_id = :clan_id AND status = 'active'
+    ORDER BY contributions DESC, id
+    LIMIT :limit
+"""
+
+
+async def distribute_treasury(clan_id: int, mode: str, amount: int, user_id: int) -> Dict[str, Any]:
+    """Распределить казну участникам одной транзакцией
+
+    amount - сумма каждому получателю. Число запросов не зависит от размера
+    клана: списание казны с проверкой остатка, одно UPDATE игроков, один
+    INSERT ... SELECT в transactions и строки логов. Если списание не прошло,
+    никто ничего не получает.
+    """
+    if mode not in TREASURY_DISTRIBUTION_MODES:
+        return {"success": False, "error": "Неизвестный режим распределения"}
+    if amount <= 0:
+        return {"success": False, "error": "Сумма должна быть положительной!"}
+    
+    mode_settings = TREASURY_DISTRIBUTION_MODES[mode]
+    params = {"clan_id": clan_id, "limit": mode_settings["limit"], "amount": amount, "user_id": user_id}
+    now = datetime.now().isoformat()
+    
+    try:
+        async with connect() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            
+            async with db.execute(
+                f"""SELECT tag, treasury, (SELECT COUNT(*) FROM ({SQL_DISTRIBUTION_RECIPIENTS})) 
+                    FROM clans WHERE id = :clan_id""",
+                params
+            ) as cur:
+                row = await cur.fetchone()
+            if not row:
+                await db.rollback()
+                return {"success": False, "error": "Клан не найден"}
+            
+            tag, treasury, recipients = row
+            total_amount = amount * recipients
+            if recipients == 0:
+                await db.rollback()
+                return {"success": False, "error": "В клане нет участников!"}
+            
+            # Списание только при достаточном остатке
+            async with db.execute(
+                """UPDATE clans SET treasury = treasury - :total, updated_at = :now 
+                   WHERE id = :clan_id AND treasury >= :total 
+                   RETURNING treasury""",
+                {**params, "total": total_amount, "now": now}
+            ) as cur:
+                row = await cur.fetchone()
+            if not row:
+                await db.rollback()
+                return {
+                    "success": False,
+                    "error": "Недостаточно средств в казне!",
+                    "required": total_amount,
+                    "treasury": treasury,
+                }
+            treasury_left = row[0]
+            
+            async with db.execute(
+                f"""UPDATE players SET balance = balance + :amount, total_earned = total_earned + :amount 
+                    WHERE user_id IN ({SQL_DISTRIBUTION_RECIPIENTS})
+                    RETURNING user_id""",
+                params
+            ) as cur:
+                mark_active_many([row[0] for row in await cur.fetchall()])
+            
+            if mode == "top":
+                transaction_description = f"Топ-распределение из казны [{tag}]"
+                log_description = f"Топ-распределение {format_number(amount)} монет топ-{recipients} участникам"
+                action_details = f"Распределил {format_number(total_amount)} монет топ-{recipients} участникам"
+            else:
+                transaction_description = f"Распределение из казны клана [{tag}]"
+                log_description = f"Распределение {format_number(amount)} монет каждому участнику"
+                action_details = f"Распределил {format_number(total_amount)} монет всем участникам"
+            
+            await db.execute(
+                f"""INSERT INTO transactions (user_id, type, amount, description, clan_id) 
+                    SELECT user_id, :type, :amount, :description, :clan_id 
+                    FROM ({SQL_DISTRIBUTION_RECIPIENTS})""",
+                {**params, "type": mode_settings["transaction_type"], "description": transaction_description}
+            )
+            
+            await db.execute(
+                """INSERT INTO clan_treasury_log (clan_id, user_id, username, action_type, amount, description) 
+                   SELECT :clan_id, :user_id, COALESCE((SELECT username FROM players WHERE user_id = :user_id), 'Система'), 
+                          :log_type, :total, :description""",
+                {**params, "log_type": mode_settings["log_type"], "total": total_amount, "description": log_description}
+            )
+            await db.execute(
+                "INSERT INTO clan_logs (clan_id, user_id, action_type, details) VALUES (:clan_id, :user_id, :action, :details)",
+                {**params, "action": mode_settings["clan_action"], "details": action_details}
+            )
+            
+            # Первые получатели для ответа в чат
+            async with db.execute(
+                f"""SELECT r.user_id, COALESCE(p.username, 'Неизвестно') 
+                    FROM ({SQL_DISTRIBUTION_RECIPIENTS}) r LEFT JOIN players p ON p.user_id = r.user_id""",
+                {**params, "limit": 5 if mode_settings["limit"] < 0 else mode_settings["limit"]}
+            ) as cur:
+                sample = [{"user_id": r[0], "username": r[1]} for r in await cur.fetchall()]
+            
+            await db.commit()
+    except Exception as e:
+        print(f"❌ Ошибка распределения казны клана {clan_id}: {e}")
+        return {"success": False, "error": "Ошибка при распределении казны"}
+    
+    return {
+        "success": True,
+        "recipients": recipients,
+        "amount": amount,
+        "total_amount": total_amount,
+        "treasury_left": treasury_left,
+        "sample": sample,
+    }
+
+
+async def get_clan_treasury_log(
+    clan_id: int,
+    limit: int = 10,
+    before: Optional[Tuple[str, int]] = None
+) -> List[Dict[str, Any]]:
+    """Получить лог операций с казной клана (before — курсор (created_at, id) последней записи)"""
+    async with connect() as db:
+        if before:
+            async with db.execute(
+                """SELECT user_id, username, action_type, amount, description, created_at, id 
+                   FROM clan_treasury_log 
+                   WHERE clan_id = ? AND (created_at, id) < (?, ?) 
+                   ORDER BY created_at DESC, id DESC 
+                   LIMIT ?""",
+                (clan_id, before[0], before[1], limit)
+            ) as cur:
+                rows = await cur.fetchall()
+        else:
+            async with db.execute(
+                """SELECT user_id, username, action_type, amount, description, created_at, id 
+                   FROM clan_treasury_log 
+                   WHERE clan_id = ? 
+                   ORDER BY created_at DESC, id DESC 
+                   LIMIT ?""",
+                (clan_id, limit)
+            ) as cur:
+                rows = await cur.fetchall()
     
     logs = []
     for row in rows:
@@ -1712,14 +2762,15 @@ async def get_clan_treasury_log(clan_id: int, limit: int = 10) -> List[Dict[str,
             "action_type": row[2],
             "amount": row[3],
             "description": row[4],
-            "created_at": row[5]
+            "created_at": row[5],
+            "id": row[6]
         })
     return logs
 
 
 async def upgrade_clan(clan_id: int, upgrade_one_level: bool = True, cost: int = 0, levels: int = 1) -> Dict[str, Any]:
     """Улучшение клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Получаем текущий уровень клана
         async with db.execute("SELECT level, treasury FROM clans WHERE id = ?", (clan_id,)) as cur:
             row = await cur.fetchone()
@@ -1751,7 +2802,7 @@ async def upgrade_clan(clan_id: int, upgrade_one_level: bool = True, cost: int =
 
 async def update_clan_name(clan_id: int, new_name: str) -> bool:
     """Обновить название клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "UPDATE clans SET name = ?, updated_at = ? WHERE id = ?",
             (new_name, datetime.now().isoformat(), clan_id)
@@ -1767,15 +2818,17 @@ async def delete_clan(clan_id: int) -> Dict[str, Any]:
     if not clan:
         return {"success": False, "error": "Клан не найден"}
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Получаем количество участников
         member_count = await get_clan_member_count(clan_id)
         
         # Обновляем всех участников клана
-        await db.execute(
-            "UPDATE players SET clan_id = NULL, clan_role = NULL, last_active = ? WHERE clan_id = ?",
-            (datetime.now().isoformat(), clan_id)
-        )
+        async with db.execute(
+            "UPDATE players SET clan_id = NULL, clan_role = NULL WHERE clan_id = ? RETURNING user_id",
+            (clan_id,)
+        ) as cur:
+            mark_active_many([row[0] for row in await cur.fetchall()])
+        await db.execute("DELETE FROM clan_members WHERE clan_id = ?", (clan_id,))
         
         # Удаляем клан (каскадно удалятся все связанные записи)
         await db.execute("DELETE FROM clans WHERE id = ?", (clan_id,))
@@ -1790,7 +2843,7 @@ async def delete_clan(clan_id: int) -> Dict[str, Any]:
 
 async def update_clan_description(clan_id: int, description: str) -> bool:
     """Обновить описание клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "UPDATE clans SET description = ?, updated_at = ? WHERE id = ?",
             (description, datetime.now().isoformat(), clan_id)
@@ -1799,18 +2852,33 @@ async def update_clan_description(clan_id: int, description: str) -> bool:
         return True
 
 
-async def get_clan_log(clan_id: int, limit: int = 15) -> List[Dict[str, Any]]:
-    """Получить лог действий клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
-        async with db.execute(
-            """SELECT user_id, action_type, details, created_at 
-               FROM clan_logs 
-               WHERE clan_id = ? 
-               ORDER BY created_at DESC 
-               LIMIT ?""",
-            (clan_id, limit)
-        ) as cur:
-            rows = await cur.fetchall()
+async def get_clan_log(
+    clan_id: int,
+    limit: int = 15,
+    before: Optional[Tuple[str, int]] = None
+) -> List[Dict[str, Any]]:
+    """Получить лог действий клана (before — курсор (created_at, id) последней записи)"""
+    async with connect() as db:
+        if before:
+            async with db.execute(
+                """SELECT user_id, action_type, details, created_at, id 
+                   FROM clan_logs 
+                   WHERE clan_id = ? AND (created_at, id) < (?, ?) 
+                   ORDER BY created_at DESC, id DESC 
+                   LIMIT ?""",
+                (clan_id, before[0], before[1], limit)
+            ) as cur:
+                rows = await cur.fetchall()
+        else:
+            async with db.execute(
+                """SELECT user_id, action_type, details, created_at, id 
+                   FROM clan_logs 
+                   WHERE clan_id = ? 
+                   ORDER BY created_at DESC, id DESC 
+                   LIMIT ?""",
+                (clan_id, limit)
+            ) as cur:
+                rows = await cur.fetchall()
     
     logs = []
     for row in rows:
@@ -1818,14 +2886,15 @@ async def get_clan_log(clan_id: int, limit: int = 15) -> List[Dict[str, Any]]:
             "user_id": row[0],
             "action_type": row[1],
             "details": row[2],
-            "created_at": row[3]
+            "created_at": row[3],
+            "id": row[4]
         })
     return logs
 
 
 async def log_clan_action(clan_id: int, user_id: int, action_type: str, details: str) -> bool:
     """Логирование действий в клане"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "INSERT INTO clan_logs (clan_id, user_id, action_type, details) VALUES (?, ?, ?, ?)",
             (clan_id, user_id, action_type, details)
@@ -1839,7 +2908,7 @@ async def log_collection_with_user(clan_id: int, user_id: int, action_type: str,
     player = await get_player(user_id) if user_id != 0 else None
     username = player["username"] if player else "Система"
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             """INSERT INTO clan_treasury_log (clan_id, user_id, username, action_type, amount, description) 
                VALUES (?, ?, ?, ?, ?, ?)""",
@@ -1851,7 +2920,7 @@ async def log_collection_with_user(clan_id: int, user_id: int, action_type: str,
 
 async def get_clan_requirements(clan_id: int) -> Dict[str, Any]:
     """Получить требования клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute("SELECT settings FROM clans WHERE id = ?", (clan_id,)) as cur:
             row = await cur.fetchone()
     
@@ -1863,7 +2932,7 @@ async def get_clan_requirements(clan_id: int) -> Dict[str, Any]:
 
 async def get_player_contributions(user_id: int, clan_id: int) -> int:
     """Получить вклады игрока в казну"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             "SELECT contributions FROM clan_members WHERE clan_id = ? AND user_id = ?",
             (clan_id, user_id)
@@ -1874,7 +2943,7 @@ async def get_player_contributions(user_id: int, clan_id: int) -> int:
 
 async def update_clan_settings(clan_id: int, settings_data: dict) -> bool:
     """Обновить настройки клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "UPDATE clans SET settings = ?, updated_at = ? WHERE id = ?",
             (json.dumps(settings_data), datetime.now().isoformat(), clan_id)
@@ -1885,9 +2954,9 @@ async def update_clan_settings(clan_id: int, settings_data: dict) -> bool:
 
 async def get_all_clans(limit: int = 100) -> List[Dict[str, Any]]:
     """Получить все кланы"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
-            """SELECT id, tag, name, owner_id, level, treasury, member_count, created_at 
+            """SELECT id, tag, name, owner_id, level, treasury, member_count, created_at, total_halls 
                FROM clans 
                ORDER BY level DESC, treasury DESC 
                LIMIT ?""",
@@ -1905,18 +2974,27 @@ async def get_all_clans(limit: int = 100) -> List[Dict[str, Any]]:
             "level": row[4],
             "treasury": row[5],
             "member_count": row[6],
-            "created_at": row[7]
+            "created_at": row[7],
+            "total_halls": row[8] or 0
         })
     return clans
 
 
-async def get_top_clans(limit: int = 10) -> List[Dict[str, Any]]:
-    """Получить топ кланов"""
-    async with aiosqlite.connect(settings.database_path) as db:
+# Сортировки топа кланов (по счетчикам, которые ведут триггеры)
+CLAN_TOP_ORDERS = {
+    "level": "level DESC, treasury DESC",
+    "power": "total_power DESC",
+    "halls": "total_halls DESC",
+}
+
+
+async def get_top_clans(limit: int = 10, order: str = "level") -> List[Dict[str, Any]]:
+    """Получить топ кланов (order: level, power или halls)"""
+    async with connect() as db:
         async with db.execute(
-            """SELECT id, tag, name, level, treasury, member_count 
+            f"""SELECT id, tag, name, level, treasury, member_count, total_power, total_halls 
                FROM clans 
-               ORDER BY level DESC, treasury DESC 
+               ORDER BY {CLAN_TOP_ORDERS[order]} 
                LIMIT ?""",
             (limit,)
         ) as cur:
@@ -1930,14 +3008,49 @@ async def get_top_clans(limit: int = 10) -> List[Dict[str, Any]]:
             "name": row[2],
             "level": row[3],
             "treasury": row[4],
-            "member_count": row[5]
+            "member_count": row[5],
+            "total_power": row[6] or 0,
+            "total_halls": row[7] or 0
         })
     return clans
 
 
+async def check_clan_counters(fix: bool = False) -> List[Dict[str, Any]]:
+    """Сверить счетчики кланов с исходными таблицами
+
+    Возвращает кланы, где сохраненное значение расходится с пересчитанным.
+    При fix=True расхождения исправляются в той же транзакции.
+    """
+    async with connect() as db:
+        if fix:
+            await db.execute("BEGIN IMMEDIATE")
+        async with db.execute(SQL_CLAN_COUNTERS_ACTUAL) as cur:
+            rows = await cur.fetchall()
+        
+        mismatches = []
+        for row in rows:
+            stored = {counter: row[2 + i * 2] for i, counter in enumerate(CLAN_COUNTERS)}
+            actual = {counter: row[3 + i * 2] for i, counter in enumerate(CLAN_COUNTERS)}
+            if stored != actual:
+                mismatches.append({"clan_id": row[0], "tag": row[1], "stored": stored, "actual": actual})
+        
+        if fix and mismatches:
+            await db.executemany(
+                """UPDATE clans SET member_count = ?, total_contributions = ?, total_halls = ?, total_power = ? 
+                   WHERE id = ?""",
+                [
+                    (*(item["actual"][counter] for counter in CLAN_COUNTERS), item["clan_id"])
+                    for item in mismatches
+                ]
+            )
+        await db.commit()
+    
+    return mismatches
+
+
 async def get_member_clan_role(user_id: int, clan_id: int) -> Tuple[str, str]:
     """Получить роль участника в клане"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             "SELECT role FROM clan_members WHERE clan_id = ? AND user_id = ?",
             (clan_id, user_id)
@@ -1962,7 +3075,7 @@ async def join_clan(user_id: int, clan_id: int) -> Dict[str, Any]:
     if not clan:
         return {"success": False, "error": "Клан не найден"}
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Добавляем участника
         await db.execute(
             """INSERT INTO clan_members (clan_id, user_id, role, joined_at) 
@@ -1970,52 +3083,185 @@ async def join_clan(user_id: int, clan_id: int) -> Dict[str, Any]:
             (clan_id, user_id, datetime.now().isoformat())
         )
         
-        # Обновляем игрока
+        # Обновляем игрока (счетчики клана обновят триггеры)
+        await db.execute(
+            "UPDATE players SET clan_id = ?, clan_role = 'member' WHERE user_id = ?",
+            (clan_id, user_id)
+        )
+        mark_active(user_id)
+        
+        await db.commit()
+    
+    return {"success": True, "clan_name": clan["name"], "clan_tag": clan["tag"]}
+
+
+async def leave_clan(user_id: int, clan_id: int) -> Dict[str, Any]:
+    """Покинуть клан"""
+    async with connect() as db:
+        # Удаляем участника
         await db.execute(
-            "UPDATE players SET clan_id = ?, clan_role = 'member', last_active = ? WHERE user_id = ?",
-            (clan_id, datetime.now().isoformat(), user_id)
+            "DELETE FROM clan_members WHERE clan_id = ? AND user_id = ?",
+            (clan_id, user_id)
         )
         
-        # Увеличиваем счетчик участников
+        # Обновляем игрока (счетчики клана обновят триггеры)
+        await db.execute(
+            "UPDATE players SET clan_id = NULL, clan_role = NULL WHERE user_id = ?",
+            (user_id,)
+        )
+        mark_active(user_id)
+        
+        await db.commit()
+    
+    return {"success": True}
+
+
+async def kick_clan_member(clan_id: int, user_id: int) -> Dict[str, Any]:
+    """Исключить участника и внести его в список исключенных одной транзакцией"""
+    async with connect() as db:
+        await db.execute(
+            "DELETE FROM clan_members WHERE clan_id = ? AND user_id = ?",
+            (clan_id, user_id)
+        )
+        await db.execute(
+            "UPDATE players SET clan_id = NULL, clan_role = NULL WHERE user_id = ? AND clan_id = ?",
+            (user_id, clan_id)
+        )
+        await db.execute(
+            """UPDATE clans SET banned_players = json_insert(COALESCE(banned_players, '[]'), '$[#]', ?), 
+                   updated_at = ? 
+               WHERE id = ? AND NOT EXISTS (
+                   SELECT 1 FROM json_each(COALESCE(banned_players, '[]')) WHERE value = ?
+               )""",
+            (user_id, datetime.now().isoformat(), clan_id, user_id)
+        )
+        await db.commit()
+    
+    return {"success": True}
+
+
+async def unban_clan_member(clan_id: int, user_id: int) -> bool:
+    """Убрать игрока из списка исключенных клана (False - его там не было)"""
+    async with connect() as db:
+        async with db.execute(
+            """UPDATE clans SET banned_players = (
+                   SELECT json_group_array(value) FROM json_each(COALESCE(banned_players, '[]')) WHERE value != ?
+               ), updated_at = ? 
+               WHERE id = ? AND EXISTS (
+                   SELECT 1 FROM json_each(COALESCE(banned_players, '[]')) WHERE value = ?
+               ) 
+               RETURNING id""",
+            (user_id, datetime.now().isoformat(), clan_id, user_id)
+        ) as cur:
+            row = await cur.fetchone()
+        await db.commit()
+    return row is not None
+
+
+async def set_clan_role(clan_id: int, user_id: int, role: str) -> bool:
+    """Сменить роль участника клана (False - игрок не в этом клане)"""
+    async with connect() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        async with db.execute(
+            "UPDATE clan_members SET role = ? WHERE clan_id = ? AND user_id = ? RETURNING user_id",
+            (role, clan_id, user_id)
+        ) as cur:
+            row = await cur.fetchone()
+        if not row:
+            await db.rollback()
+            return False
         await db.execute(
-            "UPDATE clans SET member_count = member_count + 1, updated_at = ? WHERE id = ?",
-            (datetime.now().isoformat(), clan_id)
+            "UPDATE players SET clan_role = ? WHERE user_id = ? AND clan_id = ?",
+            (role, user_id, clan_id)
         )
-        
         await db.commit()
+    mark_active(user_id)
+    return True
+
+
+async def transfer_clan_ownership(clan_id: int, owner_id: int, new_owner_id: int,
+                                  cost: int, description: str) -> Dict[str, Any]:
+    """Передать клан участнику одной транзакцией
+
+    Оплата, смена владельца и обмен ролями (бывший владелец становится
+    офицером) пишутся вместе: клан не остается без владельца или с двумя.
+    """
+    try:
+        async with connect() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            
+            async with db.execute(
+                "SELECT 1 FROM clan_members WHERE clan_id = ? AND user_id = ?",
+                (clan_id, new_owner_id)
+            ) as cur:
+                if not await cur.fetchone():
+                    await db.rollback()
+                    return {"success": False, "error": "not_member"}
+            
+            async with db.execute(
+                "UPDATE clans SET owner_id = ?, updated_at = ? WHERE id = ? AND owner_id = ? RETURNING id",
+                (new_owner_id, datetime.now().isoformat(), clan_id, owner_id)
+            ) as cur:
+                if not await cur.fetchone():
+                    await db.rollback()
+                    return {"success": False, "error": "not_owner"}
+            
+            async with db.execute(
+                """UPDATE players SET balance = balance - ?, total_spent = total_spent + ? 
+                   WHERE user_id = ? AND balance >= ? 
+                   RETURNING balance""",
+                (cost, cost, owner_id, cost)
+            ) as cur:
+                row = await cur.fetchone()
+            if not row:
+                await db.rollback()
+                return {"success": False, "error": "insufficient_funds"}
+            
+            await db.execute(
+                "INSERT INTO transactions (user_id, type, amount, description, clan_id) VALUES (?, 'clan_transfer', ?, ?, ?)",
+                (owner_id, -cost, description, clan_id)
+            )
+            
+            roles = (owner_id, new_owner_id, clan_id, owner_id, new_owner_id)
+            await db.execute(
+                """UPDATE clan_members SET role = CASE user_id WHEN ? THEN 'officer' WHEN ? THEN 'owner' END 
+                   WHERE clan_id = ? AND user_id IN (?, ?)""",
+                roles
+            )
+            await db.execute(
+                """UPDATE players SET clan_role = CASE user_id WHEN ? THEN 'officer' WHEN ? THEN 'owner' END 
+                   WHERE clan_id = ? AND user_id IN (?, ?)""",
+                roles
+            )
+            await db.commit()
+    except Exception as e:
+        print(f"Ошибка при передаче клана: {e}")
+        return {"success": False, "error": str(e)}
     
-    return {"success": True, "clan_name": clan["name"], "clan_tag": clan["tag"]}
+    mark_active(owner_id)
+    _notify_ledger(owner_id, "clan_transfer", -cost)
+    return {"success": True, "balance": row[0]}
 
 
-async def leave_clan(user_id: int, clan_id: int) -> Dict[str, Any]:
-    """Покинуть клан"""
-    async with aiosqlite.connect(settings.database_path) as db:
-        # Удаляем участника
-        await db.execute(
-            "DELETE FROM clan_members WHERE clan_id = ? AND user_id = ?",
-            (clan_id, user_id)
-        )
-        
-        # Обновляем игрока
+async def add_clan_lift_income(clan_id: int, user_id: int, amount: int, description: str) -> bool:
+    """Начислить в казну клана доход от подхода участника и записать в лог казны одной транзакцией"""
+    async with connect() as db:
         await db.execute(
-            "UPDATE players SET clan_id = NULL, clan_role = NULL, last_active = ? WHERE user_id = ?",
-            (datetime.now().isoformat(), user_id)
+            "UPDATE clans SET treasury = treasury + ?, total_lifts = total_lifts + 1, updated_at = ? WHERE id = ?",
+            (amount, datetime.now().isoformat(), clan_id)
         )
-        
-        # Уменьшаем счетчик участников
         await db.execute(
-            "UPDATE clans SET member_count = member_count - 1, updated_at = ? WHERE id = ? AND member_count > 0",
-            (datetime.now().isoformat(), clan_id)
+            """INSERT INTO clan_treasury_log (clan_id, user_id, username, action_type, amount, description) 
+               VALUES (?, ?, COALESCE((SELECT username FROM players WHERE user_id = ?), 'Система'), 'lift_income', ?, ?)""",
+            (clan_id, user_id, user_id, amount, description)
         )
-        
         await db.commit()
-    
-    return {"success": True}
+        return True
 
 
 async def update_clan_daily_income(clan_id: int, amount: int) -> bool:
     """Обновить ежедневный доход клана"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "UPDATE clans SET hall_income = hall_income + ?, treasury = treasury + ?, updated_at = ? WHERE id = ?",
             (amount, amount, datetime.now().isoformat(), clan_id)
@@ -2030,7 +3276,7 @@ async def update_clan_daily_income(clan_id: int, amount: int) -> bool:
 
 async def count_players(regular_only: bool = False) -> int:
     """Получить количество игроков"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         if regular_only:
             query = "SELECT COUNT(*) FROM players WHERE admin_level = 0"
         else:
@@ -2041,9 +3287,19 @@ async def count_players(regular_only: bool = False) -> int:
             return result[0] if result else 0
 
 
+async def get_admins() -> List[Dict[str, Any]]:
+    """Все администраторы: user_id, уровень и ник (для кэша прав)"""
+    async with connect() as db:
+        async with db.execute(
+            "SELECT user_id, admin_level, admin_nickname FROM players WHERE admin_level > 0"
+        ) as cur:
+            rows = await cur.fetchall()
+    return [{"user_id": row[0], "admin_level": row[1], "admin_nickname": row[2]} for row in rows]
+
+
 async def count_admins() -> int:
     """Получить количество администраторов"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         async with db.execute("SELECT COUNT(*) FROM players WHERE admin_level > 0") as cur:
             result = await cur.fetchone()
             return result[0] if result else 0
@@ -2051,7 +3307,7 @@ async def count_admins() -> int:
 
 async def count_banned_players() -> int:
     """Получить количество забаненных игроков"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         async with db.execute("SELECT COUNT(*) FROM players WHERE is_banned = 1") as cur:
             result = await cur.fetchone()
             return result[0] if result else 0
@@ -2059,7 +3315,7 @@ async def count_banned_players() -> int:
 
 async def count_clans() -> int:
     """Получить количество кланов"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         async with db.execute("SELECT COUNT(*) FROM clans") as cur:
             result = await cur.fetchone()
             return result[0] if result else 0
@@ -2067,7 +3323,7 @@ async def count_clans() -> int:
 
 async def count_table_rows(table_name: str) -> int:
     """Получить количество строк в таблице"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         async with db.execute(f"SELECT COUNT(*) FROM {table_name}") as cur:
             result = await cur.fetchone()
             return result[0] if result else 0
@@ -2075,7 +3331,7 @@ async def count_table_rows(table_name: str) -> int:
 
 async def count_total_balance() -> int:
     """Получить общий баланс всех игроков"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         async with db.execute("SELECT COALESCE(SUM(balance), 0) FROM players") as cur:
             result = await cur.fetchone()
             return result[0] if result else 0
@@ -2083,7 +3339,7 @@ async def count_total_balance() -> int:
 
 async def sum_column(table_name: str, column_name: str) -> int:
     """Получить сумму значений в колонке"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         async with db.execute(f"SELECT COALESCE(SUM({column_name}), 0) FROM {table_name}") as cur:
             result = await cur.fetchone()
             return result[0] if result else 0
@@ -2091,7 +3347,7 @@ async def sum_column(table_name: str, column_name: str) -> int:
 
 async def get_recent_players(limit: int = 10) -> List[Tuple[str, str]]:
     """Получить последних зарегистрированных игроков"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         async with db.execute(
             "SELECT username, created_at FROM players ORDER BY created_at DESC LIMIT ?",
             (limit,)
@@ -2106,7 +3362,7 @@ async def get_recent_players(limit: int = 10) -> List[Tuple[str, str]]:
 
 async def get_all_players(limit: int = 100) -> List[Dict[str, Any]]:
     """Получить всех игроков"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             """SELECT user_id, username, balance, power, admin_level, is_banned, created_at 
                FROM players 
@@ -2131,10 +3387,10 @@ async def get_all_players(limit: int = 100) -> List[Dict[str, Any]]:
 
 
 async def get_top_players_by_power(limit: int = 10) -> List[Dict[str, Any]]:
-    """Получить топ игроков по силе"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    """Получить топ игроков по силе (забаненных отсеивает вызывающий по реестру банов)"""
+    async with connect() as db:
         async with db.execute(
-            "SELECT user_id, username, power FROM players WHERE is_banned = 0 ORDER BY power DESC LIMIT ?",
+            "SELECT user_id, username, power FROM players ORDER BY power DESC LIMIT ?",
             (limit,)
         ) as cur:
             rows = await cur.fetchall()
@@ -2150,10 +3406,10 @@ async def get_top_players_by_power(limit: int = 10) -> List[Dict[str, Any]]:
 
 
 async def get_top_players_by_halls(limit: int = 10) -> List[Dict[str, Any]]:
-    """Получить топ игроков по фитнес-залам"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    """Получить топ игроков по фитнес-залам (забаненных отсеивает вызывающий по реестру банов)"""
+    async with connect() as db:
         async with db.execute(
-            "SELECT user_id, username, fitness_halls FROM players WHERE is_banned = 0 ORDER BY fitness_halls DESC LIMIT ?",
+            "SELECT user_id, username, fitness_halls FROM players ORDER BY fitness_halls DESC LIMIT ?",
             (limit,)
         ) as cur:
             rows = await cur.fetchall()
@@ -2168,6 +3424,143 @@ async def get_top_players_by_halls(limit: int = 10) -> List[Dict[str, Any]]:
     return players
 
 
+# ======================
+# ФУНКЦИИ ДЛЯ ЭКОНОМИЧЕСКОЙ СТАТИСТИКИ
+# ======================
+
+# Сколько транзакций сводка обрабатывает за одну транзакцию базы
+ECONOMY_ROLLUP_BATCH = 20000
+
+SQL_ROLLUP_ECONOMY_HOURLY = """
+    INSERT INTO economy_hourly (type, hour, count, sum)
+    SELECT COALESCE(type, 'unknown'), strftime('%Y-%m-%d %H:00', created_at), COUNT(*), COALESCE(SUM(amount), 0)
+    FROM transactions
+    WHERE id > ? AND id <= ?
+    GROUP BY 1, 2
+    ON CONFLICT(hour, type) DO UPDATE SET
+        count = count + excluded.count,
+        sum = sum + excluded.sum
+"""
+
+SQL_ROLLUP_ECONOMY_USER_DAILY = """
+    INSERT INTO economy_user_daily (user_id, day, count, earned, spent)
+    SELECT user_id, date(created_at), COUNT(*),
+           COALESCE(SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END), 0),
+           COALESCE(SUM(CASE WHEN amount < 0 THEN -amount ELSE 0 END), 0)
+    FROM transactions
+    WHERE id > ? AND id <= ? AND user_id IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT(user_id, day) DO UPDATE SET
+        count = count + excluded.count,
+        earned = earned + excluded.earned,
+        spent = spent + excluded.spent
+"""
+
+
+async def rollup_economy(batch_size: int = ECONOMY_ROLLUP_BATCH) -> Dict[str, int]:
+    """Добавить в сводки следующую пачку транзакций после отметки.
+
+    Отметка и сводки меняются в одной транзакции, поэтому каждая транзакция
+    учитывается ровно один раз. Запись в базу в SQLite идет по очереди, так
+    что транзакция с меньшим id не может появиться после отметки.
+    """
+    async with connect() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        await db.execute("INSERT OR IGNORE INTO rollup_state (name, last_id) VALUES ('economy', 0)")
+        async with db.execute("SELECT last_id FROM rollup_state WHERE name = 'economy'") as cur:
+            last_id = (await cur.fetchone())[0]
+        async with db.execute("SELECT COALESCE(MAX(id), 0) FROM transactions") as cur:
+            max_id = (await cur.fetchone())[0]
+        upper = min(max_id, last_id + batch_size)
+
+        processed = 0
+        if upper > last_id:
+            async with db.execute("SELECT COUNT(*) FROM transactions WHERE id > ? AND id <= ?", (last_id, upper)) as cur:
+                processed = (await cur.fetchone())[0]
+            await db.execute(SQL_ROLLUP_ECONOMY_HOURLY, (last_id, upper))
+            await db.execute(SQL_ROLLUP_ECONOMY_USER_DAILY, (last_id, upper))
+            await db.execute("UPDATE rollup_state SET last_id = ? WHERE name = 'economy'", (upper,))
+        await db.commit()
+
+    return {"processed": processed, "last_id": max(upper, last_id), "remaining": max(0, max_id - upper)}
+
+
+async def record_money_supply() -> None:
+    """Записать денежную массу за текущий час"""
+    async with connect() as db:
+        await db.execute(
+            """INSERT INTO economy_supply (hour, total_balance, players)
+               SELECT strftime('%Y-%m-%d %H:00', 'now'), COALESCE(SUM(balance), 0), COUNT(*) FROM players WHERE 1
+               ON CONFLICT(hour) DO UPDATE SET total_balance = excluded.total_balance, players = excluded.players"""
+        )
+        await db.commit()
+
+
+async def clear_economy_rollups() -> None:
+    """Очистить сводки и отметку (перед полным пересчетом истории)"""
+    async with connect() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        await db.execute("DELETE FROM economy_hourly")
+        await db.execute("DELETE FROM economy_user_daily")
+        await db.execute("DELETE FROM rollup_state WHERE name = 'economy'")
+        await db.commit()
+
+
+async def get_economy_by_type(hours: int) -> List[Dict[str, Any]]:
+    """Обороты по типам транзакций за последние hours часов (из сводки)"""
+    async with connect_analytics() as db:
+        async with db.execute(
+            """SELECT type, SUM(count), SUM(sum) FROM economy_hourly
+               WHERE hour >= strftime('%Y-%m-%d %H:00', 'now', ?)
+               GROUP BY type
+               ORDER BY ABS(SUM(sum)) DESC""",
+            (f"-{hours} hours",)
+        ) as cur:
+            rows = await cur.fetchall()
+    return [{"type": row[0], "count": row[1], "sum": row[2]} for row in rows]
+
+
+async def get_money_supply_range(hours: int) -> Optional[Dict[str, Any]]:
+    """Денежная масса в начале и в конце периода (из почасовых снимков)"""
+    async with connect_analytics() as db:
+        async with db.execute(
+            """SELECT hour, total_balance, players FROM economy_supply
+               WHERE hour >= strftime('%Y-%m-%d %H:00', 'now', ?)
+               ORDER BY hour""",
+            (f"-{hours} hours",)
+        ) as cur:
+            rows = await cur.fetchall()
+    if not rows:
+        return None
+    return {
+        "start_hour": rows[0][0],
+        "start": rows[0][1],
+        "end_hour": rows[-1][0],
+        "end": rows[-1][1],
+        "players": rows[-1][2],
+    }
+
+
+async def get_top_earners_period(days: int, limit: int = 5) -> List[Dict[str, Any]]:
+    """Игроки с наибольшим доходом за последние days дней (из дневной сводки)"""
+    async with connect_analytics() as db:
+        async with db.execute(
+            """SELECT e.user_id, COALESCE(p.username, 'Удален'), SUM(e.earned), SUM(e.spent), SUM(e.count)
+               FROM economy_user_daily e
+               LEFT JOIN players p ON p.user_id = e.user_id
+               WHERE e.day >= date('now', ?)
+               GROUP BY e.user_id
+               ORDER BY SUM(e.earned) DESC
+               LIMIT ?""",
+            (f"-{days - 1} days", limit)
+        ) as cur:
+            rows = await cur.fetchall()
+    return [
+        {"user_id": row[0], "username": row[1], "earned": row[2], "spent": row[3], "count": row[4]}
+        for row in rows
+    ]
+
+
 # ======================
 # ФУНКЦИИ ДЛЯ СИСТЕМЫ ЛОГОВ И ЗАЯВОК
 # ======================
@@ -2181,7 +3574,7 @@ async def add_admin_log(
     log_type: str = "other"
 ) -> bool:
     """Добавить лог действия администратора"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             """INSERT INTO admin_logs 
                (user_id, admin_name, admin_level, action_type, details, log_type) 
@@ -2195,29 +3588,34 @@ async def add_admin_log(
 async def get_admin_logs(
     log_type: str = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    before: Optional[Tuple[str, int]] = None
 ) -> List[Dict[str, Any]]:
-    """Получить логи администраторов"""
-    async with aiosqlite.connect(settings.database_path) as db:
-        if log_type:
-            async with db.execute(
-                """SELECT id, user_id, admin_name, admin_level, action_type, details, log_type, created_at 
-                   FROM admin_logs 
-                   WHERE log_type = ? 
-                   ORDER BY created_at DESC 
-                   LIMIT ? OFFSET ?""",
-                (log_type, limit, offset)
-            ) as cur:
-                rows = await cur.fetchall()
-        else:
-            async with db.execute(
-                """SELECT id, user_id, admin_name, admin_level, action_type, details, log_type, created_at 
-                   FROM admin_logs 
-                   ORDER BY created_at DESC 
-                   LIMIT ? OFFSET ?""",
-                (limit, offset)
-            ) as cur:
-                rows = await cur.fetchall()
+    """Получить логи администраторов
+
+    before — курсор (created_at, id) последней показанной записи: следующая
+    страница читается по индексу без OFFSET. offset оставлен для совместимости.
+    """
+    conditions = []
+    params: List[Any] = []
+    if log_type:
+        conditions.append("log_type = ?")
+        params.append(log_type)
+    if before:
+        conditions.append("(created_at, id) < (?, ?)")
+        params.extend(before)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    async with connect_analytics() as db:
+        async with db.execute(
+            f"""SELECT id, user_id, admin_name, admin_level, action_type, details, log_type, created_at 
+                FROM admin_logs 
+                {where} 
+                ORDER BY created_at DESC, id DESC 
+                LIMIT ? OFFSET ?""",
+            (*params, limit, offset)
+        ) as cur:
+            rows = await cur.fetchall()
     
     logs = []
     for row in rows:
@@ -2237,7 +3635,7 @@ async def get_admin_logs(
 async def cleanup_old_logs(days: int = 15) -> int:
     """Очистка старых логов"""
     cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute("DELETE FROM admin_logs WHERE created_at < ?", (cutoff_date,))
         await db.commit()
         
@@ -2259,7 +3657,7 @@ async def create_request(
     if additional_info is None:
         additional_info = {}
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         try:
             await db.execute(
                 """INSERT INTO admin_requests 
@@ -2275,7 +3673,7 @@ async def create_request(
 
 async def get_pending_requests() -> List[Dict[str, Any]]:
     """Получить ожидающие заявки"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             """SELECT id, admin_id, admin_name, request_type, target_id, reason, 
                       additional_info, created_at 
@@ -2302,7 +3700,7 @@ async def get_pending_requests() -> List[Dict[str, Any]]:
 
 async def get_request_by_id(request_id: int) -> Optional[Dict[str, Any]]:
     """Получить заявку по ID"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             """SELECT id, admin_id, admin_name, request_type, target_id, reason, 
                       additional_info, status, approved_by, approved_at, created_at 
@@ -2332,7 +3730,7 @@ async def get_request_by_id(request_id: int) -> Optional[Dict[str, Any]]:
 
 async def approve_request(request_id: int, approved_by: int) -> Dict[str, Any]:
     """Принять заявку"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         try:
             await db.execute(
                 "UPDATE admin_requests SET status = 'approved', approved_by = ?, approved_at = ? WHERE id = ?",
@@ -2346,7 +3744,7 @@ async def approve_request(request_id: int, approved_by: int) -> Dict[str, Any]:
 
 async def reject_request(request_id: int, rejected_by: int, reject_reason: str = "") -> Dict[str, Any]:
     """Отклонить заявку"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         try:
             additional_info = {"reject_reason": reject_reason}
             await db.execute(
@@ -2364,7 +3762,7 @@ async def reject_request(request_id: int, rejected_by: int, reject_reason: str =
 
 async def delete_request(request_id: int) -> bool:
     """Удалить заявку"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute("DELETE FROM admin_requests WHERE id = ?", (request_id,))
         await db.commit()
     return True
@@ -2372,7 +3770,7 @@ async def delete_request(request_id: int) -> bool:
 
 async def get_request_stats() -> Dict[str, Any]:
     """Получить статистику заявок"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         # Общая статистика
         async with db.execute("SELECT COUNT(*) FROM admin_requests") as cur:
             total = (await cur.fetchone())[0]
@@ -2406,7 +3804,7 @@ async def get_request_stats() -> Dict[str, Any]:
 
 async def get_requests_by_admin(admin_id: int) -> List[Dict[str, Any]]:
     """Получить заявки администратора"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             """SELECT id, request_type, target_id, reason, status, created_at 
                FROM admin_requests 
@@ -2433,7 +3831,7 @@ async def get_requests_by_admin(admin_id: int) -> List[Dict[str, Any]]:
 async def cleanup_old_requests(days: int = 15) -> int:
     """Очистка старых заявок"""
     cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "DELETE FROM admin_requests WHERE created_at < ? AND status != 'pending'",
             (cutoff_date,)
@@ -2451,7 +3849,7 @@ async def cleanup_old_requests(days: int = 15) -> int:
 
 async def get_admin_usage_stats(admin_id: int) -> Dict[str, Any]:
     """Получить статистику использования команд администратора"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         stats = {}
         
         # Статистика из таблицы игроков
@@ -2499,7 +3897,7 @@ async def get_admin_usage_stats(admin_id: int) -> Dict[str, Any]:
 
 async def get_broadcast_usage(admin_id: int) -> Dict[str, Any]:
     """Получить статистику рассылок администратора"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             "SELECT usage_count, last_used, reset_time FROM admin_broadcast_stats WHERE admin_id = ?",
             (admin_id,)
@@ -2531,7 +3929,7 @@ async def get_broadcast_usage(admin_id: int) -> Dict[str, Any]:
 
 async def increment_broadcast_usage(admin_id: int) -> bool:
     """Увеличить счетчик использования рассылок"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Получаем текущую статистику
         stats = await get_broadcast_usage(admin_id)
         
@@ -2559,7 +3957,7 @@ async def reset_broadcast_usage(admin_id: int) -> bool:
     """Сбросить счетчик рассылок"""
     reset_time = (datetime.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "UPDATE admin_broadcast_stats SET usage_count = 0, reset_time = ? WHERE admin_id = ?",
             (reset_time.isoformat(), admin_id)
@@ -2589,7 +3987,7 @@ async def get_admin_level(user_id: int) -> int:
 
 async def get_moderator_promo_stats(admin_id: int) -> Dict[str, Any]:
     """Получить статистику промокодов модератора"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             """SELECT coins_used, magnesia_used, power_used, total_created, last_created 
                FROM moderator_promo_stats WHERE admin_id = ?""",
@@ -2624,7 +4022,7 @@ async def get_moderator_promo_stats(admin_id: int) -> Dict[str, Any]:
 
 async def update_moderator_promo_stats(admin_id: int, reward_type: str, reward_amount: int) -> bool:
     """Обновить статистику промокодов модератора"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Получаем текущую статистику
         stats = await get_moderator_promo_stats(admin_id)
         
@@ -2654,7 +4052,7 @@ async def update_moderator_promo_stats(admin_id: int, reward_type: str, reward_a
 
 async def get_promo_usage_stats() -> Dict[str, Any]:
     """Получить статистику использования промокодов"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect_analytics() as db:
         stats = {}
         
         # Общее количество промокодов
@@ -2688,7 +4086,7 @@ async def get_promo_usage_stats() -> Dict[str, Any]:
 
 async def update_promo_usage_stats(code: str, user_id: int) -> bool:
     """Обновить статистику использования промокода"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Записываем использование
         await db.execute(
             "INSERT INTO promo_uses (user_id, promo_code) VALUES (?, ?)",
@@ -2719,12 +4117,13 @@ async def set_info_access(user_id: int, days: int, admin_id: int) -> bool:
     """Выдать доступ к команде инфа"""
     expires_at = datetime.now() + timedelta(days=days)
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Обновляем таблицу игроков
         await db.execute(
-            "UPDATE players SET has_info_access = 1, last_active = ? WHERE user_id = ?",
-            (datetime.now().isoformat(), user_id)
+            "UPDATE players SET has_info_access = 1 WHERE user_id = ?",
+            (user_id,)
         )
+        mark_active(user_id)
         
         # Обновляем таблицу info_access
         await db.execute(
@@ -2745,12 +4144,13 @@ async def get_info_access_status(user_id: int) -> bool:
 
 async def remove_info_access(user_id: int, admin_id: int) -> bool:
     """Забрать доступ к команде инфа"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Обновляем таблицу игроков
         await db.execute(
-            "UPDATE players SET has_info_access = 0, last_active = ? WHERE user_id = ?",
-            (datetime.now().isoformat(), user_id)
+            "UPDATE players SET has_info_access = 0 WHERE user_id = ?",
+            (user_id,)
         )
+        mark_active(user_id)
         
         # Удаляем из таблицы info_access
         await db.execute("DELETE FROM info_access WHERE user_id = ?", (user_id,))
@@ -2768,7 +4168,7 @@ async def remove_info_access(user_id: int, admin_id: int) -> bool:
 
 async def get_info_access_details(user_id: int) -> Optional[Dict[str, Any]]:
     """Получить детали доступа к команде инфа"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             "SELECT user_id, admin_id, granted_at, expires_at FROM info_access WHERE user_id = ?",
             (user_id,)
@@ -2795,7 +4195,7 @@ async def extend_info_access(user_id: int, days: int, admin_id: int) -> bool:
     current_expires = datetime.fromisoformat(access_details["expires_at"])
     new_expires = current_expires + timedelta(days=days)
     
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "UPDATE info_access SET expires_at = ? WHERE user_id = ?",
             (new_expires.isoformat(), user_id)
@@ -2807,7 +4207,7 @@ async def extend_info_access(user_id: int, days: int, admin_id: int) -> bool:
 
 async def get_all_info_access() -> List[Dict[str, Any]]:
     """Получить список всех доступов к команде инфа"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             "SELECT user_id, admin_id, granted_at, expires_at FROM info_access ORDER BY expires_at DESC"
         ) as cur:
@@ -2827,7 +4227,7 @@ async def get_all_info_access() -> List[Dict[str, Any]]:
 async def cleanup_expired_info_access() -> int:
     """Очистка истекших доступов к команде инфа"""
     current_time = datetime.now().isoformat()
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         # Находим истекшие доступы
         async with db.execute(
             "SELECT user_id FROM info_access WHERE expires_at < ?",
@@ -2856,64 +4256,124 @@ async def cleanup_expired_info_access() -> int:
 # МАССОВЫЕ ОПЕРАЦИИ
 # ======================
 
-async def reset_all() -> Dict[str, Any]:
-    """Массовый сброс всех аккаунтов (администраторы не затрагиваются)"""
+# Что удаляет массовый сброс: (таблица, условие). Кланы раньше участников -
+# триггеры счетчиков не пересчитывают уже удаленные кланы
+RESET_ALL_STEPS = [
+    ("clans", "1"),
+    ("clan_members", "1"),
+    ("players", "admin_level = 0"),
+    ("transactions", "1"),
+    ("promo_codes", "1"),
+    ("promo_uses", "1"),
+    ("inspections", "1"),
+    ("player_inspectors", "1"),
+    ("player_protections", "1"),
+    ("active_protections", "1"),
+    ("inspection_stats", "1"),
+    ("protection_stats", "1"),
+    ("daily_hall_purchases", "1"),
+    ("daily_income_stats", "1"),
+    ("daily_income_totals", "1"),
+    ("info_access", "1"),
+    ("economy_hourly", "1"),
+    ("economy_user_daily", "1"),
+    ("economy_supply", "1"),
+]
+
+# Что переносится в новый файл при сбросе заменой базы (кроме администраторов)
+RESET_SWAP_CARRY_TABLES = {
+    "admin_usage_stats": "1",
+    "admin_broadcast_stats": "1",
+    "moderator_promo_stats": "1",
+    "admin_requests": "status = 'pending'",
+}
+
+
+async def _finish_reset(db: aiosqlite.Connection, schema: str = "main") -> None:
+    # Администраторы остаются, а их кланов больше нет
+    await db.execute(f"UPDATE {schema}.players SET clan_id = NULL, clan_role = NULL WHERE clan_id IS NOT NULL")
+    # Сбрасываем режим проверок
+    await db.execute(f"UPDATE {schema}.inspection_time_mode SET is_active = 0, started_at = NULL, ends_at = NULL WHERE id = 1")
+
+
+async def reset_all(on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Массовый сброс всех аккаунтов (администраторы не затрагиваются).
+
+    Таблицы чистятся пачками по rowid короткими транзакциями: бот продолжает
+    отвечать во время сброса. Строки, созданные после начала сброса, остаются.
+    """
     try:
-        async with aiosqlite.connect(settings.database_path) as db:
-            # Получаем ID администраторов, которых нужно сохранить
-            async with db.execute("SELECT user_id FROM players WHERE admin_level > 0") as cur:
-                admins = await cur.fetchall()
-                admin_ids = [admin[0] for admin in admins]
-            
-            # Удаляем всех обычных игроков
-            if admin_ids:
-                placeholders = ','.join(['?'] * len(admin_ids))
-                await db.execute(f"DELETE FROM players WHERE admin_level = 0 AND user_id NOT IN ({placeholders})", admin_ids)
-            else:
-                await db.execute("DELETE FROM players WHERE admin_level = 0")
-            
-            # Удаляем все кланы
-            await db.execute("DELETE FROM clans")
-            
-            # Удаляем все транзакции
-            await db.execute("DELETE FROM transactions")
-            
-            # Удаляем все промокоды и их использования
-            await db.execute("DELETE FROM promo_codes")
-            await db.execute("DELETE FROM promo_uses")
-            
-            # Удаляем все проверки
-            await db.execute("DELETE FROM inspections")
-            await db.execute("DELETE FROM player_inspectors")
-            await db.execute("DELETE FROM player_protections")
-            await db.execute("DELETE FROM active_protections")
-            await db.execute("DELETE FROM inspection_stats")
-            await db.execute("DELETE FROM protection_stats")
-            
-            # Удаляем все ежедневные покупки и доходы
-            await db.execute("DELETE FROM daily_hall_purchases")
-            await db.execute("DELETE FROM daily_income_stats")
-            
-            # Удаляем все доступы к команде инфа
-            await db.execute("DELETE FROM info_access")
-            
-            # Сбрасываем режим проверок
-            await db.execute("UPDATE inspection_time_mode SET is_active = 0, started_at = NULL, ends_at = NULL WHERE id = 1")
-            
+        bounds = {table: await get_max_rowid(table) for table, _ in RESET_ALL_STEPS}
+        deleted = {}
+        for table, where in RESET_ALL_STEPS:
+            deleted[table] = await delete_in_chunks(table, where, max_rowid=bounds[table], on_progress=on_progress)
+
+        async with connect() as db:
+            await _finish_reset(db)
             await db.commit()
-            
-            return {"success": True, "message": "Все аккаунты сброшены"}
+
+        return {"success": True, "message": "Все аккаунты сброшены", "deleted": deleted}
     except Exception as e:
         return {"success": False, "error": f"Ошибка при массовом сбросе: {str(e)}"}
 
 
+async def _table_columns(db: aiosqlite.Connection, schema: str, table: str) -> List[str]:
+    async with db.execute(f"PRAGMA {schema}.table_info({table})") as cur:
+        return [row[1] for row in await cur.fetchall()]
+
+
+async def reset_all_by_swap() -> Dict[str, Any]:
+    """Массовый сброс заменой файла базы: время не зависит от объема данных.
+
+    Новая база создается рядом, в нее переносятся администраторы и
+    RESET_SWAP_CARRY_TABLES, затем файл подменяется атомарно. Старая база
+    остается архивом сезона (логи и история доступны в нем).
+    """
+    path = settings.database_path
+    fresh_path = f"{path}.fresh"
+    archive_path = f"{path}.season-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    try:
+        for suffix in ("", "-journal"):
+            if os.path.exists(fresh_path + suffix):
+                os.remove(fresh_path + suffix)
+        await create_tables(fresh_path)
+
+        async with connect() as db:
+            await db.execute("ATTACH DATABASE ? AS fresh", (fresh_path,))
+            await db.execute("BEGIN IMMEDIATE")
+            carry = {"players": "admin_level > 0", **RESET_SWAP_CARRY_TABLES}
+            for table, where in carry.items():
+                old_columns = set(await _table_columns(db, "main", table))
+                columns = ", ".join(c for c in await _table_columns(db, "fresh", table) if c in old_columns)
+                await db.execute(
+                    f"INSERT INTO fresh.{table} ({columns}) SELECT {columns} FROM main.{table} WHERE {where}"
+                )
+            await _finish_reset(db, "fresh")
+            async with db.execute("SELECT COUNT(*) FROM fresh.players") as cur:
+                admins = (await cur.fetchone())[0]
+            await db.commit()
+            await db.execute("DETACH DATABASE fresh")
+
+            # Блокировка записи: пока она держится, у старой базы нет горячего журнала
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                os.link(path, archive_path)
+                os.replace(fresh_path, path)
+            finally:
+                await db.rollback()
+
+        return {"success": True, "message": "Все аккаунты сброшены", "archive": archive_path, "admins": admins}
+    except Exception as e:
+        return {"success": False, "error": f"Ошибка при сбросе заменой базы: {str(e)}"}
+
+
 # ======================
 # ФУНКЦИИ ДЛЯ СИСТЕМЫ ПРОВЕРОК
 # ======================
 
-async def get_inspection_stats(user_id: int) -> Optional[Dict[str, Any]]:
+async def get_inspection_stats(user_id: int) -> Dict[str, Any]:
     """Получить статистику проверок игрока"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             "SELECT total_inspections, successful_inspections, failed_inspections, halls_closed, inspections_today, last_inspection FROM inspection_stats WHERE user_id = ?",
             (user_id,)
@@ -2929,12 +4389,19 @@ async def get_inspection_stats(user_id: int) -> Optional[Dict[str, Any]]:
             "inspections_today": row[4],
             "last_inspection": row[5]
         }
-    return None
+    return {
+        "total_inspections": 0,
+        "successful_inspections": 0,
+        "failed_inspections": 0,
+        "halls_closed": 0,
+        "inspections_today": 0,
+        "last_inspection": None
+    }
 
 
 async def get_player_inspectors(user_id: int) -> List[Dict[str, Any]]:
     """Получить инспекторов игрока"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             "SELECT level, purchased_at FROM player_inspectors WHERE user_id = ? ORDER BY level",
             (user_id,)
@@ -2952,7 +4419,7 @@ async def get_player_inspectors(user_id: int) -> List[Dict[str, Any]]:
 
 async def get_active_protection(user_id: int) -> Optional[Dict[str, Any]]:
     """Получить активную защиту игрока"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             "SELECT protection_level, activated_at, expires_at FROM active_protections WHERE user_id = ?",
             (user_id,)
@@ -2970,7 +4437,7 @@ async def get_active_protection(user_id: int) -> Optional[Dict[str, Any]]:
 
 async def get_player_protections(user_id: int) -> List[Dict[str, Any]]:
     """Получить защиты игрока"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             "SELECT level, purchased_at FROM player_protections WHERE user_id = ? ORDER BY level",
             (user_id,)
@@ -2986,9 +4453,67 @@ async def get_player_protections(user_id: int) -> List[Dict[str, Any]]:
     return protections
 
 
-async def get_protection_stats(user_id: int) -> Optional[Dict[str, Any]]:
+async def buy_inspector_level(user_id: int, level: int) -> bool:
+    """Купить уровень инспектора"""
+    async with connect() as db:
+        await db.execute(
+            "INSERT OR IGNORE INTO player_inspectors (user_id, level) VALUES (?, ?)",
+            (user_id, level)
+        )
+        await db.commit()
+        return True
+
+
+async def buy_protection_level(user_id: int, level: int) -> bool:
+    """Купить уровень защиты"""
+    async with connect() as db:
+        await db.execute(
+            "INSERT OR IGNORE INTO player_protections (user_id, level) VALUES (?, ?)",
+            (user_id, level)
+        )
+        await db.commit()
+        return True
+
+
+async def activate_protection(user_id: int, level: int, duration_minutes: int) -> bool:
+    """Активировать защиту (заменяет предыдущую)"""
+    now = datetime.now()
+    expires_at = now + timedelta(minutes=duration_minutes)
+    async with connect() as db:
+        await db.execute(
+            """INSERT INTO active_protections (user_id, protection_level, activated_at, expires_at) 
+               VALUES (?, ?, ?, ?) 
+               ON CONFLICT(user_id) DO UPDATE SET 
+                   protection_level = excluded.protection_level, 
+                   activated_at = excluded.activated_at, 
+                   expires_at = excluded.expires_at""",
+            (user_id, level, now.isoformat(), expires_at.isoformat())
+        )
+        await db.commit()
+        return True
+
+
+async def update_protection_stats(user_id: int, spent: int = 0, blocked: bool = False) -> bool:
+    """Обновить статистику защиты"""
+    if spent <= 0 and not blocked:
+        return True
+    
+    blocked_inc = 1 if blocked else 0
+    async with connect() as db:
+        await db.execute(
+            """INSERT INTO protection_stats (user_id, total_blocked, total_spent_on_protection) VALUES (?, ?, ?) 
+               ON CONFLICT(user_id) DO UPDATE SET 
+                   total_blocked = total_blocked + excluded.total_blocked, 
+                   total_spent_on_protection = total_spent_on_protection + excluded.total_spent_on_protection""",
+            (user_id, blocked_inc, max(spent, 0))
+        )
+        await db.commit()
+        return True
+
+
+async def get_protection_stats(user_id: int) -> Dict[str, Any]:
     """Получить статистику защиты игрока"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         async with db.execute(
             "SELECT total_blocked, total_spent_on_protection FROM protection_stats WHERE user_id = ?",
             (user_id,)
@@ -3000,13 +4525,13 @@ async def get_protection_stats(user_id: int) -> Optional[Dict[str, Any]]:
             "total_blocked": row[0],
             "total_spent_on_protection": row[1]
         }
-    return None
+    return {"total_blocked": 0, "total_spent_on_protection": 0}
 
 
 async def cleanup_expired_protections() -> int:
     """Очистка истекших защит"""
     current_time = datetime.now().isoformat()
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute("DELETE FROM active_protections WHERE expires_at < ?", (current_time,))
         await db.commit()
         
@@ -3015,27 +4540,142 @@ async def cleanup_expired_protections() -> int:
             return changes[0] if changes else 0
 
 
+async def get_inspection_time_mode() -> Dict[str, Any]:
+    """Получить текущий режим проверок"""
+    async with connect() as db:
+        async with db.execute(
+            "SELECT is_active, started_at, ends_at FROM inspection_time_mode WHERE id = 1"
+        ) as cur:
+            row = await cur.fetchone()
+    
+    if not row:
+        return {"is_active": False, "started_at": None, "ends_at": None}
+    
+    return {
+        "is_active": bool(row[0]),
+        "started_at": row[1],
+        "ends_at": row[2]
+    }
+
+
+async def set_inspection_time_mode(is_active: bool, duration_hours: int = 0) -> bool:
+    """Включить/выключить режим проверок"""
+    now = datetime.now()
+    started_at = now.isoformat() if is_active else None
+    ends_at = (now + timedelta(hours=duration_hours)).isoformat() if is_active and duration_hours > 0 else None
+    
+    async with connect() as db:
+        await db.execute(
+            """INSERT INTO inspection_time_mode (id, is_active, started_at, ends_at) VALUES (1, ?, ?, ?) 
+               ON CONFLICT(id) DO UPDATE SET 
+                   is_active = excluded.is_active, 
+                   started_at = excluded.started_at, 
+                   ends_at = excluded.ends_at""",
+            (1 if is_active else 0, started_at, ends_at)
+        )
+        await db.commit()
+    return True
+
+
+async def extend_inspection_time_mode(extra_hours: int) -> Optional[str]:
+    """Продлить активный режим проверок, вернуть новое время окончания"""
+    # Одним UPDATE от текущего ends_at: параллельные продления не теряются
+    async with connect() as db:
+        async with db.execute(
+            """UPDATE inspection_time_mode SET ends_at = strftime('%Y-%m-%dT%H:%M:%f', ends_at, ?) 
+               WHERE id = 1 AND is_active = 1 AND ends_at IS NOT NULL 
+               RETURNING ends_at""",
+            (f"+{int(extra_hours)} hours",)
+        ) as cur:
+            row = await cur.fetchone()
+        await db.commit()
+    return row[0] if row else None
+
+
+async def expire_inspection_time_mode(ends_at: str) -> bool:
+    """Выключить режим, если он все еще заканчивается в ends_at (True - выключил этот вызов)"""
+    async with connect() as db:
+        async with db.execute(
+            """UPDATE inspection_time_mode SET is_active = 0, started_at = NULL, ends_at = NULL 
+               WHERE id = 1 AND is_active = 1 AND ends_at = ? 
+               RETURNING id""",
+            (ends_at,)
+        ) as cur:
+            row = await cur.fetchone()
+        await db.commit()
+    return row is not None
+
+
+async def get_all_active_protections() -> List[Dict[str, Any]]:
+    """Получить все активные защиты (для планировщика истечения)"""
+    async with connect() as db:
+        async with db.execute(
+            "SELECT user_id, protection_level, expires_at FROM active_protections"
+        ) as cur:
+            rows = await cur.fetchall()
+    
+    return [
+        {"user_id": row[0], "protection_level": row[1], "expires_at": row[2]}
+        for row in rows
+    ]
+
+
+async def delete_expired_protections(user_ids: List[int]) -> int:
+    """Удалить истекшие защиты указанных игроков одним запросом"""
+    if not user_ids:
+        return 0
+    
+    current_time = datetime.now().isoformat()
+    placeholders = ','.join(['?'] * len(user_ids))
+    async with connect() as db:
+        # expires_at проверяется повторно: защиту могли продлить после планирования
+        await db.execute(
+            f"DELETE FROM active_protections WHERE user_id IN ({placeholders}) AND expires_at <= ?",
+            (*user_ids, current_time)
+        )
+        async with db.execute("SELECT changes()") as cur:
+            changes = await cur.fetchone()
+        await db.commit()
+    return changes[0] if changes else 0
+
+
 async def reset_daily_inspections() -> bool:
     """Сбросить ежедневные проверки"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute("UPDATE inspection_stats SET inspections_today = 0")
         await db.commit()
         return True
 
 
-async def get_inspections_by_inspector(user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
-    """Получить проверки инспектора"""
-    async with aiosqlite.connect(settings.database_path) as db:
-        async with db.execute(
-            """SELECT i.*, p.username as target_name 
-               FROM inspections i 
-               LEFT JOIN players p ON i.target_id = p.user_id 
-               WHERE inspector_id = ? 
-               ORDER BY created_at DESC 
-               LIMIT ?""",
-            (user_id, limit)
-        ) as cur:
-            rows = await cur.fetchall()
+async def get_inspections_by_inspector(
+    user_id: int,
+    limit: int = 50,
+    before: Optional[Tuple[str, int]] = None
+) -> List[Dict[str, Any]]:
+    """Получить проверки инспектора (before — курсор (created_at, id) последней записи)"""
+    async with connect() as db:
+        if before:
+            async with db.execute(
+                """SELECT i.*, p.username as target_name 
+                   FROM inspections i 
+                   LEFT JOIN players p ON i.target_id = p.user_id 
+                   WHERE i.inspector_id = ? AND (i.created_at, i.id) < (?, ?) 
+                   ORDER BY i.created_at DESC, i.id DESC 
+                   LIMIT ?""",
+                (user_id, before[0], before[1], limit)
+            ) as cur:
+                rows = await cur.fetchall()
+        else:
+            async with db.execute(
+                """SELECT i.*, p.username as target_name 
+                   FROM inspections i 
+                   LEFT JOIN players p ON i.target_id = p.user_id 
+                   WHERE i.inspector_id = ? 
+                   ORDER BY i.created_at DESC, i.id DESC 
+                   LIMIT ?""",
+                (user_id, limit)
+            ) as cur:
+                rows = await cur.fetchall()
     
     inspections = []
     for row in rows:
@@ -3058,10 +4698,167 @@ async def add_inspection(
     halls_closed: int = 0
 ) -> bool:
     """Добавить запись о проверке"""
-    async with aiosqlite.connect(settings.database_path) as db:
+    async with connect() as db:
         await db.execute(
             "INSERT INTO inspections (inspector_id, target_id, successful, halls_closed) VALUES (?, ?, ?, ?)",
             (inspector_id, target_id, 1 if successful else 0, halls_closed)
         )
         await db.commit()
         return True
+
+
+async def get_inspection_context(
+    inspector_id: int,
+    target_id: int,
+    inspector_level: int
+) -> Optional[Dict[str, Any]]:
+    """Все данные для приема проверки одним запросом"""
+    async with connect() as db:
+        async with db.execute(
+            """SELECT a.username, a.clan_id, t.username, t.clan_id, t.fitness_halls,
+                      EXISTS(SELECT 1 FROM player_inspectors pi WHERE pi.user_id = a.user_id AND pi.level = ?),
+                      COALESCE(s.inspections_today, 0), s.last_inspection
+               FROM players a
+               JOIN players t ON t.user_id = ?
+               LEFT JOIN inspection_stats s ON s.user_id = a.user_id
+               WHERE a.user_id = ?""",
+            (inspector_level, target_id, inspector_id)
+        ) as cur:
+            row = await cur.fetchone()
+    
+    if not row:
+        return None
+    
+    return {
+        "inspector_name": row[0],
+        "inspector_clan_id": row[1],
+        "target_name": row[2],
+        "target_clan_id": row[3],
+        "target_halls": row[4],
+        "has_inspector": bool(row[5]),
+        "inspections_today": row[6],
+        "last_inspection": row[7]
+    }
+
+
+async def reserve_inspection(user_id: int, daily_limit: int, cooldown_minutes: int) -> bool:
+    """Занять слот проверки (лимит и кулдаун проверяются в том же запросе)"""
+    now = datetime.now()
+    cooldown_border = (now - timedelta(minutes=cooldown_minutes)).isoformat()
+    async with connect() as db:
+        await db.execute(
+            """INSERT INTO inspection_stats (user_id, inspections_today, last_inspection) 
+               VALUES (?, 1, ?) 
+               ON CONFLICT(user_id) DO UPDATE SET 
+                   inspections_today = inspections_today + 1, 
+                   last_inspection = excluded.last_inspection 
+               WHERE inspections_today < ? 
+                 AND (last_inspection IS NULL OR last_inspection <= ?)""",
+            (user_id, now.isoformat(), daily_limit, cooldown_border)
+        )
+        async with db.execute("SELECT changes()") as cur:
+            changes = await cur.fetchone()
+        await db.commit()
+    return bool(changes and changes[0])
+
+
+async def resolve_inspection(
+    inspector_id: int,
+    target_id: int,
+    damage: int,
+    compensation_per_hall: int,
+    blocked: bool = False
+) -> Dict[str, Any]:
+    """Применить результат проверки одной транзакцией
+
+    Урон ограничивается текущим числом залов прямо в SQL под блокировкой записи,
+    поэтому параллельные проверки одной цели не уводят залы в минус и не
+    выплачивают компенсацию дважды. В той же транзакции пишутся строка
+    inspections, компенсация с транзакцией и статистика проверяющего;
+    protection_stats цели меняется только при блокировке проверки.
+    """
+    try:
+        async with connect() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            
+            if blocked:
+                await db.execute(
+                    "INSERT INTO inspections (inspector_id, target_id, successful, halls_closed) VALUES (?, ?, 0, 0)",
+                    (inspector_id, target_id)
+                )
+                await db.execute(
+                    """INSERT INTO inspection_stats (user_id, total_inspections, failed_inspections) VALUES (?, 1, 1) 
+                       ON CONFLICT(user_id) DO UPDATE SET 
+                           total_inspections = total_inspections + 1, 
+                           failed_inspections = failed_inspections + 1""",
+                    (inspector_id,)
+                )
+                await db.execute(
+                    """INSERT INTO protection_stats (user_id, total_blocked) VALUES (?, 1) 
+                       ON CONFLICT(user_id) DO UPDATE SET total_blocked = total_blocked + 1""",
+                    (target_id,)
+                )
+                await db.commit()
+                return {"success": True, "blocked": True, "halls_closed": 0, "compensation": 0, "halls_left": None}
+            
+            # Сколько залов реально закрывается - считает SQL по актуальному значению
+            async with db.execute(
+                """INSERT INTO inspections (inspector_id, target_id, successful, halls_closed) 
+                   SELECT ?, ?, 1, MIN(MAX(fitness_halls, 0), ?) FROM players WHERE user_id = ? 
+                   RETURNING halls_closed""",
+                (inspector_id, target_id, damage, target_id)
+            ) as cur:
+                row = await cur.fetchone()
+            if not row:
+                await db.rollback()
+                return {"success": False, "error": "Игрок не найден"}
+            
+            halls_closed = row[0]
+            compensation = halls_closed * compensation_per_hall
+            
+            async with db.execute(
+                """UPDATE players SET fitness_halls = MAX(fitness_halls - ?, 0), 
+                       balance = balance + ?, total_earned = total_earned + ? 
+                   WHERE user_id = ? 
+                   RETURNING fitness_halls""",
+                (halls_closed, compensation, compensation, target_id)
+            ) as cur:
+                row = await cur.fetchone()
+            mark_active(target_id)
+            halls_left = row[0] if row else 0
+            
+            if compensation > 0:
+                await db.execute(
+                    """INSERT INTO transactions (user_id, type, amount, description, target_user_id) 
+                       VALUES (?, ?, ?, ?, ?)""",
+                    (target_id, "inspection_compensation", compensation,
+                     "Компенсация за закрытые залы от проверки", inspector_id)
+                )
+            
+            await db.execute(
+                """INSERT INTO inspection_stats (user_id, total_inspections, successful_inspections, halls_closed) 
+                   VALUES (?, 1, 1, ?) 
+                   ON CONFLICT(user_id) DO UPDATE SET 
+                       total_inspections = total_inspections + 1, 
+                       successful_inspections = successful_inspections + 1, 
+                       halls_closed = halls_closed + excluded.halls_closed""",
+                (inspector_id, halls_closed)
+            )
+            await db.commit()
+            
+            return {
+                "success": True,
+                "blocked": False,
+                "halls_closed": halls_closed,
+                "compensation": compensation,
+                "halls_left": halls_left
+            }
+    except Exception as e:
+        print(f"Ошибка при применении проверки: {e}")
+        return {"success": False, "error": str(e)}
+
+
+# Счетчики вызовов и времени функций db по командам (services/metrics.py)
+from bot.services.metrics import instrument_dao
+
+instrument_dao(globals())
@@ -4,15 +4,9 @@ import re
 from vkbottle.bot import BotLabeler, Message
 
 from bot.core.config import settings
-from bot.db import (
-    create_player,
-    get_player,
-    get_player_clan,
-    update_dumbbell_level,
-    update_player_balance,
-)
+from bot.storage import get_storage
 from bot.services.clans import (
-    get_clan_bonuses,
+    get_player_context,
     process_dumbbell_lift_with_clan,
 )
 from bot.utils import format_number
@@ -47,7 +41,8 @@ def get_equipment_type(level: int) -> dict:
 async def get_dumbbell_info_handler(message: Message):
     """Информация о текущем снаряде"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    context = await get_player_context(user_id)
+    player = context["player"]
 
     equipment_type = get_equipment_type(player["dumbbell_level"])
 
@@ -69,10 +64,9 @@ async def get_dumbbell_info_handler(message: Message):
         upgrade_info = "🏆 Вы достигли максимального уровня!"
 
     # Проверяем бонусы клана
-    clan = await get_player_clan(user_id)
+    clan_bonuses = context["clan_bonuses"]
     income_text = ""
-    if clan:
-        clan_bonuses = get_clan_bonuses(clan["level"])
+    if clan_bonuses:
         income_text = f"💰 Доход за подход с бонусом клана: {income_per_use} + {clan_bonuses['lift_bonus_coins']} монет"
     else:
         income_text = f"💰 Доход за подход: {income_per_use} монет"
@@ -93,7 +87,8 @@ async def get_dumbbell_info_handler(message: Message):
 async def use_dumbbell_handler(message: Message):
     """Поднять снаряд"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    context = await get_player_context(user_id)
+    player = context["player"]
     
     equipment_type = get_equipment_type(player["dumbbell_level"])
 
@@ -108,7 +103,7 @@ async def use_dumbbell_handler(message: Message):
             return f'⏳ Время отдыха! Подождите {seconds_left} секунд'
 
     # Обрабатываем поднятие с новой системой кланов
-    income_calculation = await process_dumbbell_lift_with_clan(user_id)
+    income_calculation = await process_dumbbell_lift_with_clan(user_id, context)
 
     # Формируем сообщение
     # Извлекаем только вес из названия снаряда
@@ -130,10 +125,14 @@ async def use_dumbbell_handler(message: Message):
 async def upgrade_dumbbell_handler(message: Message):
     """Прокачать снаряд"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    context = await get_player_context(user_id)
 
-    if not player:
-        player = await create_player(user_id, str(message.from_id))
+    if context:
+        player = context["player"]
+        clan_bonuses = context["clan_bonuses"]
+    else:
+        player = await get_storage().create_player(user_id, str(message.from_id))
+        clan_bonuses = None
 
     current_level = player["dumbbell_level"]
     next_level = current_level + 1
@@ -150,7 +149,7 @@ async def upgrade_dumbbell_handler(message: Message):
         return f"❌ Недостаточно монет. Нужно {format_number(next_dumbbell['price'])} 💰, у вас {format_number(player['balance'])} 💰"
 
     # Прокачиваем снаряд
-    await update_player_balance(
+    await get_storage().update_player_balance(
         user_id,
         -next_dumbbell["price"],
         "dumbbell_upgrade",
@@ -158,14 +157,12 @@ async def upgrade_dumbbell_handler(message: Message):
         None,
     )
 
-    await update_dumbbell_level(user_id, next_level, next_dumbbell["name"])
+    await get_storage().update_dumbbell_level(user_id, next_level, next_dumbbell["name"])
 
-    # Проверяем бонусы клана и рассчитываем общий доход
-    clan = await get_player_clan(user_id)
+    # Бонусы клана (клан при прокачке не меняется) и общий доход
     total_income = next_dumbbell['income_per_use']
     
-    if clan:
-        clan_bonuses = get_clan_bonuses(clan["level"])
+    if clan_bonuses:
         total_income += clan_bonuses['lift_bonus_coins']
 
     equipment_type = get_equipment_type(next_level)
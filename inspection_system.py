@@ -1,42 +1,38 @@
+import heapq
 import random
 import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
 from vkbottle.bot import BotLabeler, Message
-from vkbottle import API
 
 from bot.core.config import (
-    settings, 
     INSPECTOR_LEVELS, 
     PROTECTION_LEVELS,
-    INSPECTION_TIME_SETTINGS,
-    NORMAL_SETTINGS
-)
-from bot.db import (
-    get_player,
-    update_player_balance,
-    get_player_fitness_halls,
-    update_fitness_halls,
-    get_player_inspectors,
-    buy_inspector_level,
-    get_player_protections,
-    buy_protection_level,
-    get_active_protection,
-    activate_protection,
-    get_inspection_stats,
-    update_inspection_stats,
-    get_protection_stats,
-    update_protection_stats,
-    get_inspection_time_mode
 )
+from bot.storage import get_storage
 from bot.utils import format_number, pointer_to_screen_name
-from bot.services.clans import get_player_clan
 from bot.services.users import is_admin
+from bot.services.outbound import enqueue_message, init_outbound_queue
+from bot.services.inspection_mode import (
+    init_inspection_mode,
+    is_inspection_mode_active,
+    get_mode_settings,
+)
 
 user_labeler = BotLabeler()
 user_labeler.vbml_ignore_case = True
 
+# Принятые проверки ждут результата в фоновом обработчике
+INSPECTION_QUEUE: asyncio.Queue = asyncio.Queue()
+INSPECTION_DELAY_SECONDS = 1
+
+# Активные защиты в памяти: user_id -> (уровень, время окончания)
+PROTECTED_UNTIL: Dict[int, tuple] = {}
+# Куча (время окончания, user_id) для планировщика истечения
+_protection_heap: List[tuple] = []
+_protection_wakeup = asyncio.Event()
+
 # ======================
 # ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
 # ======================
@@ -64,12 +60,22 @@ def check_protection_success(protection_level: int, inspector_level: int, inspec
     chance = random.randint(1, 100)
     return chance <= protection_info["chance"]
 
+def schedule_protection(user_id: int, protection_level: int, expires_at: datetime):
+    """Запомнить защиту игрока и поставить ее истечение в планировщик"""
+    PROTECTED_UNTIL[user_id] = (protection_level, expires_at)
+    heapq.heappush(_protection_heap, (expires_at, user_id))
+    _protection_wakeup.set()
+
+def get_protection_until(user_id: int) -> Optional[tuple]:
+    """Активная защита игрока из памяти: (уровень, время окончания) или None"""
+    protection = PROTECTED_UNTIL.get(user_id)
+    if protection and datetime.now() < protection[1]:
+        return protection
+    return None
+
 def get_current_settings():
     """Получить текущие настройки в зависимости от режима"""
-    inspection_mode = get_inspection_time_mode()
-    if inspection_mode["is_active"]:
-        return INSPECTION_TIME_SETTINGS
-    return NORMAL_SETTINGS
+    return get_mode_settings()
 
 # ======================
 # КОМАНДЫ ИГРОКОВ
@@ -105,7 +111,7 @@ async def buy_inspector_handler(message: Message, level: str):
     except ValueError:
         return "❌ Уровень должен быть числом!"
     
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     if not player:
         return "❌ Игрок не найден"
     
@@ -117,13 +123,13 @@ async def buy_inspector_handler(message: Message, level: str):
         return f"❌ НЕДОСТАТОЧНО СРЕДСТВ\n\nНе хватает монет для подкупа инспектора!\n\n💰 Нужно: {price} монет\n💳 У вас: {player['balance']} монет"
     
     # Проверяем, не куплен ли уже этот уровень
-    bought_inspectors = await get_player_inspectors(user_id)
+    bought_inspectors = await get_storage().get_player_inspectors(user_id)
     if inspector_level in bought_inspectors:
         return f"❌ У вас уже есть инспектор уровня {inspector_level}!"
     
     try:
         # Списываем деньги
-        await update_player_balance(
+        await get_storage().update_player_balance(
             user_id,
             -price,
             "inspector_purchase",
@@ -133,7 +139,7 @@ async def buy_inspector_handler(message: Message, level: str):
         )
         
         # Добавляем уровень инспектора
-        success = await buy_inspector_level(user_id, inspector_level)
+        success = await get_storage().buy_inspector_level(user_id, inspector_level)
         if not success:
             return "❌ Ошибка при покупке инспектора"
         
@@ -153,7 +159,7 @@ async def buy_inspector_handler(message: Message, level: str):
 
 @user_labeler.message(text=["проверить <cmd_args>", "/проверить <cmd_args>"])
 async def inspect_handler(message: Message, cmd_args: str):
-    """Проверить игрока"""
+    """Проверить игрока (прием заявки, результат считает фоновый обработчик)"""
     user_id = message.from_id
     
     parts = cmd_args.strip().split()
@@ -174,38 +180,30 @@ async def inspect_handler(message: Message, cmd_args: str):
     if inspector_level not in INSPECTOR_LEVELS:
         return "❌ Неверный уровень инспектора! Доступные уровни: 1-5"
     
+    # Игроки, кланы, инспектор, лимиты, режим и защита цели - одним запросом
+    context = await get_storage().get_inspection_context(user_id, target_id, inspector_level)
+    if not context:
+        return "❌ Игрок не найден"
+    
     # Проверяем, есть ли у игрока этот уровень инспектора
-    bought_inspectors = await get_player_inspectors(user_id)
-    if inspector_level not in bought_inspectors:
+    if not context["has_inspector"]:
         return f"❌ У вас нет инспектора уровня {inspector_level}!\n💡 Купите его в магазине инспекторов"
     
-    # Получаем информацию об игроках
-    player = await get_player(user_id)
-    target_player = await get_player(target_id)
-    
-    if not player or not target_player:
-        return "❌ Игрок не найден"
-    
     # Проверяем, не в одном ли клане
-    player_clan = await get_player_clan(user_id)
-    target_clan = await get_player_clan(target_id)
-    
-    if player_clan and target_clan and player_clan["id"] == target_clan["id"]:
+    if context["inspector_clan_id"] and context["inspector_clan_id"] == context["target_clan_id"]:
         return "❌ Нельзя проверять игроков своего клана!"
     
     # Получаем настройки в зависимости от режима
-    inspection_mode = await get_inspection_time_mode()
-    current_settings = INSPECTION_TIME_SETTINGS if inspection_mode["is_active"] else NORMAL_SETTINGS
+    mode_active = is_inspection_mode_active()
+    current_settings = get_mode_settings()
     
     # Проверяем дневной лимит
-    stats = await get_inspection_stats(user_id)
-    
-    if stats["inspections_today"] >= current_settings["daily_limit"]:
+    if context["inspections_today"] >= current_settings["daily_limit"]:
         return f"❌ Достигнут дневной лимит проверок!\n📊 Максимально в день: {current_settings['daily_limit']} проверок"
     
     # Проверяем кулдаун
-    if stats.get("last_inspection"):
-        last_time = datetime.fromisoformat(stats["last_inspection"])
+    if context["last_inspection"]:
+        last_time = datetime.fromisoformat(context["last_inspection"])
         next_inspection = last_time + timedelta(minutes=current_settings["cooldown"])
         
         if datetime.now() < next_inspection:
@@ -216,48 +214,65 @@ async def inspect_handler(message: Message, cmd_args: str):
                 f"⏰ ПРОВЕРКА НЕДОСТУПНА\n\n"
                 f"Вы недавно проводили проверку!\n\n"
                 f"🕐 Время до следующей проверки: {minutes_left} минут\n"
-                f"📊 Проведено проверок сегодня: {stats['inspections_today']}/{current_settings['daily_limit']}"
+                f"📊 Проведено проверок сегодня: {context['inspections_today']}/{current_settings['daily_limit']}"
             )
     
-    # Запускаем проверку
+    # Занимаем слот: повторная команда до результата не пройдет
+    reserved = await get_storage().reserve_inspection(user_id, current_settings["daily_limit"], current_settings["cooldown"])
+    if not reserved:
+        return "❌ Проверка уже запущена или дневной лимит исчерпан!"
+    
+    INSPECTION_QUEUE.put_nowait({
+        "inspector_id": user_id,
+        "target_id": target_id,
+        "inspector_level": inspector_level,
+        "peer_id": message.peer_id,
+        "context": context,
+        "settings": current_settings,
+        "mode_active": mode_active,
+        "resolve_at": datetime.now() + timedelta(seconds=INSPECTION_DELAY_SECONDS),
+    })
+    
     await message.answer(
         f"🔍 ЗАПУСК ПРОВЕРКИ\n\n"
-        f"Проверка игрока [id{target_id}|{target_player['username']}]\n"
+        f"Проверка игрока [id{target_id}|{context['target_name']}]\n"
         f"с инспектором уровня {inspector_level} начата!\n\n"
         f"🎯 Выбранный инспектор: Уровень {inspector_level}\n"
         f"⏱️ Проверка займет: 1 минута\n"
         f"💪 Максимальный урон: {INSPECTOR_LEVELS[inspector_level]['max_damage']} фитнесс-залов\n\n"
         f"Ожидайте результат в личных сообщениях"
     )
-    
-    # Имитируем задержку проверки
-    await asyncio.sleep(1)
-    
-    # Проверяем защиту цели
-    target_protection = await get_active_protection(target_id)
+
+async def resolve_inspection_job(job: Dict):
+    """Рассчитать и применить результат принятой проверки"""
+    user_id = job["inspector_id"]
+    target_id = job["target_id"]
+    inspector_level = job["inspector_level"]
+    context = job["context"]
+    current_settings = job["settings"]
+    
+    # Проверяем защиту цели (без запроса к базе)
     protection_success = False
-    
-    if target_protection and target_protection["expires_at"]:
-        protection_end = datetime.fromisoformat(target_protection["expires_at"])
-        if datetime.now() < protection_end:
-            protection_success = check_protection_success(
-                target_protection["protection_level"], 
-                inspector_level,
-                inspection_mode["is_active"]
-            )
+    target_protection = get_protection_until(target_id)
+    if target_protection:
+        protection_success = check_protection_success(
+            target_protection[0],
+            inspector_level,
+            job["mode_active"]
+        )
     
     # Если защита сработала
     if protection_success:
-        # Обновляем статистику для атакующего
-        await update_inspection_stats(user_id, successful=False)
-        
-        # Обновляем статистику для защищающегося
-        await update_protection_stats(target_id, blocked=True)
+        result = await get_storage().resolve_inspection(user_id, target_id, 0, 0, blocked=True)
+        if not result["success"]:
+            enqueue_message(job["peer_id"], "❌ Ошибка при проведении проверки")
+            return
         
         # Сообщение атакующему
-        await message.answer(
+        enqueue_message(
+            job["peer_id"],
             f"🛡️ ПРОВЕРКА НЕ УДАЛАСЬ\n\n"
-            f"Проверка игрока [id{target_id}|{target_player['username']}] провалена!\n\n"
+            f"Проверка игрока [id{target_id}|{context['target_name']}] провалена!\n\n"
             f"🎯 Ваш инспектор: Уровень {inspector_level}\n"
             f"🛡️ У игрока активна защита\n"
             f"💪 Все фитнесс-залы в безопасности\n\n"
@@ -267,117 +282,86 @@ async def inspect_handler(message: Message, cmd_args: str):
         )
         
         # Уведомление защищающемуся в ЛС
-        try:
-            api = API(token=settings.VK_TOKEN)
-            protection_name = PROTECTION_LEVELS[target_protection["protection_level"]]["name"]
-            protection_end = datetime.fromisoformat(target_protection["expires_at"])
-            time_left = protection_end - datetime.now()
-            minutes_left = time_left.seconds // 60
-            
-            await api.messages.send(
-                peer_id=target_id,
-                message=(
-                    f"🛡️ ПРОВЕРКА ОТБИТА\n\n"
-                    f"Игрок [id{user_id}|{player['username']}] пытался проверить ваши залы!\n\n"
-                    f"🎯 Уровень инспектора: {inspector_level}\n"
-                    f"🛡️ Активная защита: {protection_name}\n"
-                    f"✅ Проверка провалена благодаря защите\n"
-                    f"💪 Все фитнесс-залы в безопасности\n\n"
-                    f"📊 Ваши потери: 0 фитнесс-залов\n"
-                    f"⏱️ Защита действует еще: {minutes_left} минут"
-                ),
-                random_id=0
-            )
-        except:
-            pass
-            
-    else:
-        # Защита не сработала - наносим урон
-        damage = calculate_damage(inspector_level)
-        current_halls = await get_player_fitness_halls(target_id)
-        
-        # Нельзя закрыть больше залов, чем есть у игрока
-        damage = min(damage, current_halls)
-        
-        # Определяем компенсацию
-        compensation_per_hall = current_settings["compensation_per_hall"]
-        total_compensation = damage * compensation_per_hall
-        
-        if damage > 0:
-            # Закрываем залы у цели
-            await update_fitness_halls(target_id, -damage, 0)
-            
-            # Выплачиваем компенсацию цели
-            await update_player_balance(
-                target_id,
-                total_compensation,
-                "inspection_compensation",
-                f"Компенсация за закрытые залы от проверки",
-                None,
-                user_id,
-            )
-        
-        # Обновляем статистику для атакующего
-        await update_inspection_stats(user_id, successful=True, halls_closed=damage)
-        
-        # Сообщение атакующему
-        mode_note = " (в режиме)" if inspection_mode["is_active"] else ""
-        response_text = (
-            f"✅ РЕЗУЛЬТАТ ПРОВЕРКИ{mode_note}\n\n"
-            f"Проверка игрока [id{target_id}|{target_player['username']}] завершена!\n\n"
+        protection_name = PROTECTION_LEVELS[target_protection[0]]["name"]
+        time_left = target_protection[1] - datetime.now()
+        minutes_left = time_left.seconds // 60
+        enqueue_message(
+            target_id,
+            f"🛡️ ПРОВЕРКА ОТБИТА\n\n"
+            f"Игрок [id{user_id}|{context['inspector_name']}] пытался проверить ваши залы!\n\n"
+            f"🎯 Уровень инспектора: {inspector_level}\n"
+            f"🛡️ Активная защита: {protection_name}\n"
+            f"✅ Проверка провалена благодаря защите\n"
+            f"💪 Все фитнесс-залы в безопасности\n\n"
+            f"📊 Ваши потери: 0 фитнесс-залов\n"
+            f"⏱️ Защита действует еще: {minutes_left} минут"
+        )
+        return
+    
+    # Защита не сработала - наносим урон
+    compensation_per_hall = current_settings["compensation_per_hall"]
+    result = await get_storage().resolve_inspection(
+        user_id,
+        target_id,
+        calculate_damage(inspector_level),
+        compensation_per_hall
+    )
+    if not result["success"]:
+        enqueue_message(job["peer_id"], "❌ Ошибка при проведении проверки")
+        return
+    
+    damage = result["halls_closed"]
+    total_compensation = result["compensation"]
+    halls_left = result["halls_left"]
+    
+    # Сообщение атакующему
+    mode_note = " (в режиме)" if job["mode_active"] else ""
+    response_text = (
+        f"✅ РЕЗУЛЬТАТ ПРОВЕРКИ{mode_note}\n\n"
+        f"Проверка игрока [id{target_id}|{context['target_name']}] завершена!\n\n"
+        f"🎯 Уровень инспектора: {inspector_level}\n"
+        f"💥 Закрыто фитнесс-залов: {damage}\n"
+        f"💰 Компенсация игроку: {total_compensation} монет ({compensation_per_hall} × {damage})\n\n"
+        f"⏱️ Следующая проверка через: {current_settings['cooldown']} минут\n"
+        f"📈 Ваша статистика обновлена"
+    )
+    
+    # Добавляем информацию о залах если они есть
+    if damage > 0:
+        response_text += f"\n📊 У игрока осталось: {halls_left} фитнесс-залов"
+    
+    enqueue_message(job["peer_id"], response_text)
+    
+    # Уведомление цели в ЛС
+    if damage > 0:
+        message_text = (
+            f"⚠️ ПОСТУПИЛА ПРОВЕРКА\n\n"
+            f"Игрок [id{user_id}|{context['inspector_name']}] проверил ваши фитнесс-залы!\n\n"
             f"🎯 Уровень инспектора: {inspector_level}\n"
             f"💥 Закрыто фитнесс-залов: {damage}\n"
-            f"💰 Компенсация игроку: {total_compensation} монет ({compensation_per_hall} × {damage})\n\n"
-            f"⏱️ Следующая проверка через: {current_settings['cooldown']} минут\n"
-            f"📈 Ваша статистика обновлена"
+            f"💰 Ваша компенсация: {total_compensation} монет ({compensation_per_hall} × {damage})\n\n"
+            f"📊 Теперь у вас: {halls_left} фитнесс-залов\n"
+            f"🛡️ Рекомендуем приобрести защиту"
         )
-        
-        # Добавляем информацию о залах если они есть
-        if damage > 0:
-            new_halls_count = current_halls - damage
-            response_text += f"\n📊 У игрока осталось: {new_halls_count} фитнесс-залов"
-        
-        await message.answer(response_text)
-        
-        # Уведомление цели в ЛС
-        try:
-            api = API(token=settings.VK_TOKEN)
-            
-            if damage > 0:
-                message_text = (
-                    f"⚠️ ПОСТУПИЛА ПРОВЕРКА\n\n"
-                    f"Игрок [id{user_id}|{player['username']}] проверил ваши фитнесс-залы!\n\n"
-                    f"🎯 Уровень инспектора: {inspector_level}\n"
-                    f"💥 Закрыто фитнесс-залов: {damage}\n"
-                    f"💰 Ваша компенсация: {total_compensation} монет ({compensation_per_hall} × {damage})\n\n"
-                    f"📊 Теперь у вас: {current_halls - damage} фитнесс-залов\n"
-                    f"🛡️ Рекомендуем приобрести защиту"
-                )
-            else:
-                message_text = (
-                    f"⚠️ ПОСТУПИЛА ПРОВЕРКА\n\n"
-                    f"Игрок [id{user_id}|{player['username']}] проверил ваши фитнесс-залы!\n\n"
-                    f"🎯 Уровень инспектора: {inspector_level}\n"
-                    f"✅ Урон: 0 фитнесс-залов (повезло!)\n"
-                    f"💰 Ваша компенсация: 0 монет\n\n"
-                    f"📊 У вас осталось: {current_halls} фитнесс-залов"
-                )
-            
-            await api.messages.send(
-                peer_id=target_id,
-                message=message_text,
-                random_id=0
-            )
-        except:
-            pass
+    else:
+        message_text = (
+            f"⚠️ ПОСТУПИЛА ПРОВЕРКА\n\n"
+            f"Игрок [id{user_id}|{context['inspector_name']}] проверил ваши фитнесс-залы!\n\n"
+            f"🎯 Уровень инспектора: {inspector_level}\n"
+            f"✅ Урон: 0 фитнесс-залов (повезло!)\n"
+            f"💰 Ваша компенсация: 0 монет\n\n"
+            f"📊 У вас осталось: {halls_left} фитнесс-залов"
+        )
+    
+    enqueue_message(target_id, message_text)
 
 @user_labeler.message(text=["инспекторы", "/инспекторы"])
 async def inspectors_handler(message: Message):
     """Показать информацию об инспекторах игрока"""
     user_id = message.from_id
     
-    bought_inspectors = await get_player_inspectors(user_id)
-    stats = await get_inspection_stats(user_id)
+    bought_inspectors = await get_storage().get_player_inspectors(user_id)
+    stats = await get_storage().get_inspection_stats(user_id)
     
     # Формируем список купленных уровней
     bought_text = "🎯 Арсенал подкупленных инспекторов:\n"
@@ -440,12 +424,12 @@ async def activate_protection_handler(message: Message, level: str):
     except ValueError:
         return "❌ Уровень должен быть числом!"
     
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     if not player:
         return "❌ Игрок не найден"
     
     # Проверяем, куплена ли эта защита
-    bought_protections = await get_player_protections(user_id)
+    bought_protections = await get_storage().get_player_protections(user_id)
     if protection_level not in bought_protections:
         return f"❌ У вас не куплена защита уровня {protection_level}!\n💡 Купите ее в магазине защиты"
     
@@ -457,7 +441,7 @@ async def activate_protection_handler(message: Message, level: str):
         return f"❌ НЕДОСТАТОЧНО СРЕДСТВ\n\nНе хватает монет для активации защиты!\n\n💰 Нужно: {price} монет\n💳 У вас: {player['balance']} монет"
     
     # Проверяем, не активна ли уже защита
-    active_protection = await get_active_protection(user_id)
+    active_protection = await get_storage().get_active_protection(user_id)
     if active_protection and active_protection["expires_at"]:
         end_time = datetime.fromisoformat(active_protection["expires_at"])
         if datetime.now() < end_time:
@@ -469,7 +453,7 @@ async def activate_protection_handler(message: Message, level: str):
     
     try:
         # Списываем деньги
-        await update_player_balance(
+        await get_storage().update_player_balance(
             user_id,
             -price,
             "protection_activation",
@@ -479,16 +463,17 @@ async def activate_protection_handler(message: Message, level: str):
         )
         
         # Активируем защиту
-        success = await activate_protection(user_id, protection_level, protection_info["duration"])
+        success = await get_storage().activate_protection(user_id, protection_level, protection_info["duration"])
         if not success:
             return "❌ Ошибка при активации защиты"
         
         # Обновляем статистику расходов
-        await update_protection_stats(user_id, spent=price)
+        await get_storage().update_protection_stats(user_id, spent=price)
         
         # Получаем обновленную защиту для времени
-        active_protection = await get_active_protection(user_id)
+        active_protection = await get_storage().get_active_protection(user_id)
         end_time = datetime.fromisoformat(active_protection["expires_at"])
+        schedule_protection(user_id, protection_level, end_time)
         formatted_time = end_time.strftime("%H:%M")
         
         success_text = (
@@ -513,9 +498,9 @@ async def protectors_handler(message: Message):
     """Показать арсенал защиты"""
     user_id = message.from_id
     
-    active_protection = await get_active_protection(user_id)
-    bought_protections = await get_player_protections(user_id)
-    protection_stats = await get_protection_stats(user_id)
+    active_protection = await get_storage().get_active_protection(user_id)
+    bought_protections = await get_storage().get_player_protections(user_id)
+    protection_stats = await get_storage().get_protection_stats(user_id)
     
     # Информация об активной защите
     active_text = ""
@@ -556,14 +541,65 @@ async def protectors_handler(message: Message):
 # ПЕРИОДИЧЕСКИЕ ЗАДАЧИ
 # ======================
 
+async def inspection_resolution_worker():
+    """Фоновый обработчик принятых проверок"""
+    while True:
+        job = await INSPECTION_QUEUE.get()
+        try:
+            # Имитируем задержку проверки, не блокируя обработчик команды
+            delay = (job["resolve_at"] - datetime.now()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            
+            await resolve_inspection_job(job)
+        except Exception as e:
+            print(f"Ошибка при обработке проверки: {e}")
+        finally:
+            INSPECTION_QUEUE.task_done()
+
+async def load_active_protections():
+    """Загрузить активные защиты в память при старте"""
+    for protection in await get_storage().get_all_active_protections():
+        schedule_protection(
+            protection["user_id"],
+            protection["protection_level"],
+            datetime.fromisoformat(protection["expires_at"])
+        )
+
 async def check_expired_protections():
-    """Периодически проверять истекшие защиты"""
+    """Снимать защиты точно в момент истечения"""
     while True:
-        await asyncio.sleep(300)  # Проверять каждые 5 минут
+        _protection_wakeup.clear()
         
-        # В реальной реализации здесь был бы вызов функции очистки БД
-        # await cleanup_expired_protections()
-        pass
+        if not _protection_heap:
+            await _protection_wakeup.wait()
+            continue
+        
+        # Спим до ближайшего истечения или до появления более ранней защиты
+        delay = (_protection_heap[0][0] - datetime.now()).total_seconds()
+        if delay > 0:
+            try:
+                await asyncio.wait_for(_protection_wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        
+        # Забираем все истекшие записи и удаляем их одним запросом
+        now = datetime.now()
+        expired = []
+        while _protection_heap and _protection_heap[0][0] <= now:
+            expires_at, user_id = heapq.heappop(_protection_heap)
+            current = PROTECTED_UNTIL.get(user_id)
+            # Устаревшая запись кучи: защиту уже продлили
+            if current and current[1] == expires_at:
+                del PROTECTED_UNTIL[user_id]
+                expired.append(user_id)
+        
+        if expired:
+            try:
+                await get_storage().delete_expired_protections(expired)
+            except Exception as e:
+                print(f"Ошибка при удалении истекших защит: {e}")
 
 async def reset_daily_inspections_task():
     """Сбрасывать дневные счетчики проверок"""
@@ -586,6 +622,10 @@ async def reset_daily_inspections_task():
 async def init_inspection_system():
     """Инициализировать систему проверок"""
     # Запускаем фоновые задачи
+    await init_outbound_queue()
+    await init_inspection_mode()
+    await load_active_protections()
+    asyncio.create_task(inspection_resolution_worker())
     asyncio.create_task(check_expired_protections())
     asyncio.create_task(reset_daily_inspections_task())
     print("✅ Система проверок и защиты инициализирована")
@@ -3,7 +3,7 @@ from datetime import datetime
 from bot.utils import format_number
 from vkbottle.bot import BotLabeler, Message
 
-from bot.db import count_promo_uses, get_player, get_promo_info, use_promo_code
+from bot.storage import get_storage
 from bot.services.users import is_admin
 
 promocode_labeler = BotLabeler()
@@ -20,13 +20,13 @@ async def promo_info_empty_handler(message: Message, code: str):
 async def promo_info_handler(message: Message, code: str):
     """Информация о промокоде"""
     code = code.upper()
-    promo_info = await get_promo_info(code)
+    promo_info = await get_storage().get_promo_info(code)
 
     if not promo_info:
         return f"❌ Промокод {code} не найден!"
 
     # Получаем информацию о создателе
-    creator = await get_player(promo_info["created_by"])
+    creator = await get_storage().get_player(promo_info["created_by"])
     creator_id = promo_info["created_by"]
     
     # Форматируем кликабельное имя создателя
@@ -57,7 +57,7 @@ async def promo_info_handler(message: Message, code: str):
 
     # Если администратор - показываем дополнительную информацию
     if await is_admin(message.from_id):
-        total_uses = await count_promo_uses(code)
+        total_uses = await get_storage().count_promo_uses(code)
         info_text += f"\n\n📊 Статистика (только для админов):\n👥 Всего активаций: {total_uses}"
 
     return info_text
@@ -73,10 +73,10 @@ async def use_promo_empty_handler(message: Message, code: str):
 async def use_promo_handler(message: Message, code: str):
     """Использование промокода"""
     code = code.upper()
-    result = await use_promo_code(message.from_id, code)
+    result = await get_storage().use_promo_code(message.from_id, code)
 
     if result["success"]:
-        player = await get_player(message.from_id)
+        player = await get_storage().get_player(message.from_id)
         new_balance = player["balance"]
         
         return (
@@ -0,0 +1,71 @@
+# bot/services/activity.py
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from bot.storage import get_storage
+from bot.core.config import settings
+from bot.services.metrics import register_collector
+
+# Сбросы отметок активности в базу (для метрик)
+ACTIVITY_STATS: Dict[str, Any] = {
+    "flushes": 0,
+    "flushed_players": 0,
+    "failed": 0,
+    "last_seconds": 0.0,
+}
+
+_worker_task: Optional[asyncio.Task] = None
+
+
+async def flush_activity() -> int:
+    """Записать накопленные отметки last_active, вернуть число игроков"""
+    started = time.perf_counter()
+    try:
+        flushed = await get_storage().flush_last_active()
+    except Exception as e:
+        # Отметки остаются в памяти и уйдут при следующем сбросе
+        ACTIVITY_STATS["failed"] += 1
+        print(f"Ошибка при записи активности игроков: {e}")
+        return 0
+    if flushed:
+        ACTIVITY_STATS["flushes"] += 1
+        ACTIVITY_STATS["flushed_players"] += flushed
+        ACTIVITY_STATS["last_seconds"] = time.perf_counter() - started
+    return flushed
+
+
+def get_activity_stats() -> Dict[str, Any]:
+    """Счетчики записи активности"""
+    return {**ACTIVITY_STATS, "pending": get_storage().count_pending_activity()}
+
+
+@register_collector
+def _export_metrics() -> List[str]:
+    activity_stats = get_activity_stats()
+    return [
+        "# HELP bot_last_active_flushed_total Отметки активности, записанные в базу",
+        "# TYPE bot_last_active_flushed_total counter",
+        f"bot_last_active_flushed_total {activity_stats['flushed_players']}",
+        "# HELP bot_last_active_pending Отметки активности, ожидающие записи",
+        "# TYPE bot_last_active_pending gauge",
+        f"bot_last_active_pending {activity_stats['pending']}",
+        "# HELP bot_last_active_flush_failures_total Ошибки записи активности",
+        "# TYPE bot_last_active_flush_failures_total counter",
+        f"bot_last_active_flush_failures_total {activity_stats['failed']}",
+    ]
+
+
+async def activity_flush_worker():
+    """Записывать отметки раз в LAST_ACTIVE_FLUSH_SECONDS"""
+    while True:
+        await asyncio.sleep(settings.LAST_ACTIVE_FLUSH_SECONDS)
+        await flush_activity()
+
+
+async def init_activity_tracking():
+    """Запустить запись отметок активности"""
+    global _worker_task
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.create_task(activity_flush_worker())
+    print(f"✅ Активность игроков записывается раз в {settings.LAST_ACTIVE_FLUSH_SECONDS} с")
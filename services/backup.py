@@ -0,0 +1,241 @@
+# bot/services/backup.py
+"""
+Горячие снимки базы через SQLite backup API.
+
+Снимок копируется шагами по BACKUP_PAGES_PER_STEP страниц с паузой между
+шагами: игра продолжает писать в базу, а копия получается целостной (в
+отличие от cp во время начислений). Готовый снимок сжимается gzip, старые
+удаляются ротацией. Снимки делаются по расписанию и перед разрушающими
+командами администрации.
+
+Восстановление (бот должен быть остановлен):
+    python -m bot.services.backup list
+    python -m bot.services.backup create
+    python -m bot.services.backup restore backups/gym_legend-20250101-030000-scheduled.db.gz
+"""
+import os
+import sys
+import gzip
+import time
+import shutil
+import sqlite3
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bot.core.config import settings
+from bot.services.metrics import register_collector, format_labels
+
+BACKUP_SUFFIX = ".db.gz"
+
+# Если игра так часто пишет, что постраничная копия все время начинается заново,
+# после стольких перезапусков копируем за один шаг
+BACKUP_MAX_RESTARTS = 5
+
+# Последние снимки (для команды администрации и метрик)
+BACKUP_STATS: Dict[str, Any] = {
+    "created": 0,
+    "failed": 0,
+    "last_path": None,
+    "last_at": None,
+    "last_seconds": 0.0,
+}
+
+_backup_lock: Optional[asyncio.Lock] = None
+_scheduler_task: Optional[asyncio.Task] = None
+
+
+def _backup_name(reason: str) -> str:
+    base = os.path.splitext(os.path.basename(settings.database_path))[0]
+    return f"{base}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{reason}{BACKUP_SUFFIX}"
+
+
+class _BackupRestarted(Exception):
+    pass
+
+
+def copy_database(source_path: str, target_path: str, pages: int, pause: float) -> None:
+    """Постраничная копия живой базы в target_path"""
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(status, remaining, total):
+        # Запись в источник другим соединением начинает копию заново: remaining растет
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > BACKUP_MAX_RESTARTS:
+                raise _BackupRestarted()
+        state["remaining"] = remaining
+        # Пауза после каждого шага отдает блокировку записи игре
+        time.sleep(pause)
+
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress if pages > 0 else None)
+        except _BackupRestarted:
+            print(f"⚠️ Снимок перезапускался {BACKUP_MAX_RESTARTS} раз, копируем за один шаг")
+            source.backup(target, pages=-1)
+    finally:
+        target.close()
+        source.close()
+
+
+def _compress(source_path: str, target_path: str) -> None:
+    with open(source_path, "rb") as src, gzip.open(target_path, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def _make_backup(reason: str) -> str:
+    os.makedirs(settings.backup_dir, exist_ok=True)
+    path = os.path.join(settings.backup_dir, _backup_name(reason))
+    raw_path = path[: -len(".gz")] + ".tmp"
+    try:
+        copy_database(
+            settings.database_path,
+            raw_path,
+            settings.BACKUP_PAGES_PER_STEP,
+            settings.BACKUP_STEP_PAUSE_MS / 1000,
+        )
+        _compress(raw_path, path + ".tmp")
+        os.replace(path + ".tmp", path)
+    finally:
+        for leftover in (raw_path, path + ".tmp"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return path
+
+
+def list_backups() -> List[str]:
+    """Снимки в каталоге бэкапов, старые первыми"""
+    if not os.path.isdir(settings.backup_dir):
+        return []
+    names = [name for name in os.listdir(settings.backup_dir) if name.endswith(BACKUP_SUFFIX)]
+    paths = [os.path.join(settings.backup_dir, name) for name in names]
+    return sorted(paths, key=os.path.getmtime)
+
+
+def rotate_backups(keep: Optional[int] = None) -> List[str]:
+    """Удалить снимки сверх keep последних, вернуть удаленные"""
+    keep = settings.BACKUP_KEEP if keep is None else keep
+    backups = list_backups()
+    removed = backups[:-keep] if keep > 0 else backups
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+async def create_backup(reason: str = "manual") -> Dict[str, Any]:
+    """Снять сжатый снимок базы, не останавливая бота"""
+    global _backup_lock
+    if _backup_lock is None:
+        _backup_lock = asyncio.Lock()
+
+    # Снимки не делаются параллельно: второй ждет первый
+    async with _backup_lock:
+        started = time.perf_counter()
+        try:
+            path = await asyncio.to_thread(_make_backup, reason)
+            await asyncio.to_thread(rotate_backups)
+        except Exception as e:
+            BACKUP_STATS["failed"] += 1
+            print(f"Ошибка при создании резервной копии: {e}")
+            return {"success": False, "error": f"Ошибка при создании резервной копии: {str(e)}"}
+
+        seconds = time.perf_counter() - started
+        BACKUP_STATS["created"] += 1
+        BACKUP_STATS["last_path"] = path
+        BACKUP_STATS["last_at"] = datetime.now().isoformat(timespec="seconds")
+        BACKUP_STATS["last_seconds"] = seconds
+        print(f"💾 Резервная копия {path} за {seconds:.1f} с")
+        return {"success": True, "path": path, "size": os.path.getsize(path), "seconds": seconds}
+
+
+@register_collector
+def _export_metrics() -> List[str]:
+    return [
+        "# HELP bot_backups_total Снимки базы",
+        "# TYPE bot_backups_total counter",
+        f"bot_backups_total{format_labels(result='ok')} {BACKUP_STATS['created']}",
+        f"bot_backups_total{format_labels(result='failed')} {BACKUP_STATS['failed']}",
+        "# HELP bot_backup_last_seconds Длительность последнего снимка",
+        "# TYPE bot_backup_last_seconds gauge",
+        f"bot_backup_last_seconds {BACKUP_STATS['last_seconds']:.3f}",
+    ]
+
+
+async def backup_scheduler():
+    """Снимок раз в BACKUP_INTERVAL_HOURS"""
+    interval = timedelta(hours=settings.BACKUP_INTERVAL_HOURS)
+    while True:
+        await asyncio.sleep(interval.total_seconds())
+        await create_backup("scheduled")
+
+
+async def init_backups():
+    """Запустить снимки по расписанию"""
+    global _scheduler_task
+    if settings.BACKUP_INTERVAL_HOURS <= 0:
+        print("⚠️ Резервные копии по расписанию выключены")
+        return
+    if _scheduler_task is None or _scheduler_task.done():
+        _scheduler_task = asyncio.create_task(backup_scheduler())
+    print(f"✅ Резервные копии: каждые {settings.BACKUP_INTERVAL_HOURS} ч в {settings.backup_dir}")
+
+
+# ======================
+# ВОССТАНОВЛЕНИЕ
+# ======================
+
+def restore_backup(backup_path: str, database_path: Optional[str] = None) -> str:
+    """Восстановить базу из снимка (бот должен быть остановлен), вернуть путь базы"""
+    database_path = database_path or settings.database_path
+    raw_path = f"{database_path}.restore.tmp"
+    try:
+        with gzip.open(backup_path, "rb") as src, open(raw_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+        check = sqlite3.connect(raw_path)
+        try:
+            result = check.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            check.close()
+        if result != "ok":
+            raise ValueError(f"снимок поврежден: {result}")
+
+        # Через backup API, а не заменой файла: журнал и блокировки остаются согласованными
+        copy_database(raw_path, database_path, pages=-1, pause=0)
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+    return database_path
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Резервные копии базы Gym Legend")
+    parser.add_argument("--db", help="путь к базе (по умолчанию из настроек)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="показать снимки")
+    create = commands.add_parser("create", help="снять снимок сейчас")
+    create.add_argument("--reason", default="manual")
+    restore = commands.add_parser("restore", help="восстановить базу из снимка")
+    restore.add_argument("backup", help="файл снимка .db.gz")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.db:
+        settings.DATABASE_PATH = args.db
+
+    if args.command == "list":
+        for path in list_backups():
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{path}  {size_mb:.1f} МБ")
+    elif args.command == "create":
+        result = asyncio.run(create_backup(args.reason))
+        print(result.get("path") or result["error"])
+    elif args.command == "restore":
+        print(f"✅ База {restore_backup(args.backup)} восстановлена из {args.backup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# bot/services/bans.py
+import heapq
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from vkbottle import BaseMiddleware
+from vkbottle.bot import Message
+
+from bot.storage import get_storage
+from bot.services.metrics import register_collector
+
+# Реестр банов на весь процесс: проверка бана идет без обращения к базе.
+# Загружается при старте (load_bans) и обновляется функциями db после commit
+BANNED: Set[int] = set()
+# user_id -> срок бана (None - бессрочно); по нему отсеиваются устаревшие записи очереди
+BAN_UNTIL: Dict[int, Optional[datetime]] = {}
+# Очередь автоснятия: (срок, user_id), ближайший срок сверху
+EXPIRY_HEAP: List[Tuple[datetime, int]] = []
+
+# Подписчики на изменение реестра (например, кэш рейтингов в top.py)
+BAN_LISTENERS: List[Callable[[], None]] = []
+
+# Сколько ждать между проверками очереди, даже если ближайший срок далеко (секунды)
+UNBAN_CHECK_INTERVAL = 300
+
+BAN_STATS: Dict[str, int] = {
+    "dropped_messages": 0,
+    "auto_unbans": 0,
+    "reloads": 0,
+}
+
+_wakeup: Optional[asyncio.Event] = None
+_worker_task: Optional[asyncio.Task] = None
+
+
+def _parse_until(ban_until: Optional[str]) -> Optional[datetime]:
+    if not ban_until:
+        return None
+    try:
+        return datetime.fromisoformat(ban_until)
+    except ValueError:
+        return None
+
+
+def _notify_listeners():
+    for listener in BAN_LISTENERS:
+        listener()
+
+
+def _wake_worker():
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def register_ban(user_id: int, ban_until: Optional[str], banned: bool = True) -> None:
+    """Обновить реестр после бана или разбана одного игрока"""
+    if banned:
+        until = _parse_until(ban_until)
+        BANNED.add(user_id)
+        BAN_UNTIL[user_id] = until
+        if until is not None:
+            heapq.heappush(EXPIRY_HEAP, (until, user_id))
+            _wake_worker()
+    else:
+        BANNED.discard(user_id)
+        BAN_UNTIL.pop(user_id, None)
+    _notify_listeners()
+
+
+async def load_bans() -> int:
+    """Загрузить реестр банов из базы, вернуть число забаненных"""
+    rows = await get_storage().get_banned_players()
+    BANNED.clear()
+    BAN_UNTIL.clear()
+    EXPIRY_HEAP.clear()
+    for user_id, ban_until in rows:
+        until = _parse_until(ban_until)
+        BANNED.add(user_id)
+        BAN_UNTIL[user_id] = until
+        if until is not None:
+            EXPIRY_HEAP.append((until, user_id))
+    heapq.heapify(EXPIRY_HEAP)
+    BAN_STATS["reloads"] += 1
+    _notify_listeners()
+    _wake_worker()
+    print(f"✅ Реестр банов загружен: {len(BANNED)} забаненных")
+    return len(BANNED)
+
+
+def is_banned(user_id: int) -> bool:
+    """Забанен ли игрок (по реестру)"""
+    return user_id in BANNED
+
+
+async def fetch_without_banned(fetch: Callable[[int], Awaitable[List[Any]]], size: int,
+                               user_id: Callable[[Any], int] = lambda row: row[0]) -> List[Any]:
+    """Первые size строк топа без забаненных.
+
+    fetch(limit) - запрос топа без фильтра по бану. Сверх size добираются
+    только забаненные, найденные в уже прочитанном окне, пока не наберется
+    size строк или топ не кончится.
+    """
+    limit = size
+    while True:
+        rows = await fetch(limit)
+        clean = [row for row in rows if user_id(row) not in BANNED]
+        if len(clean) >= size or len(rows) < limit:
+            return clean[:size]
+        limit = size + len(rows) - len(clean)
+
+
+def banned_count() -> int:
+    """Число забаненных игроков в реестре"""
+    return len(BANNED)
+
+
+def get_ban_stats() -> Dict[str, int]:
+    """Счетчики реестра банов"""
+    return {**BAN_STATS, "banned": len(BANNED), "scheduled": len(EXPIRY_HEAP)}
+
+
+@register_collector
+def _export_metrics() -> List[str]:
+    ban_stats = get_ban_stats()
+    return [
+        "# HELP bot_banned_messages_dropped_total Сообщения забаненных, отброшенные до обработчиков",
+        "# TYPE bot_banned_messages_dropped_total counter",
+        f"bot_banned_messages_dropped_total {ban_stats['dropped_messages']}",
+        "# HELP bot_auto_unbans_total Баны, снятые по истечении срока",
+        "# TYPE bot_auto_unbans_total counter",
+        f"bot_auto_unbans_total {ban_stats['auto_unbans']}",
+        "# HELP bot_banned_players Забаненных игроков в реестре",
+        "# TYPE bot_banned_players gauge",
+        f"bot_banned_players {ban_stats['banned']}",
+    ]
+
+
+# ======================
+# АВТОСНЯТИЕ БАНОВ
+# ======================
+
+def _pop_due(now: datetime) -> List[Tuple[datetime, int]]:
+    """Снять с очереди истекшие баны, пропуская устаревшие записи"""
+    due = []
+    while EXPIRY_HEAP and EXPIRY_HEAP[0][0] <= now:
+        until, user_id = heapq.heappop(EXPIRY_HEAP)
+        # Игрока могли разбанить вручную или забанить заново с другим сроком
+        if user_id in BANNED and BAN_UNTIL.get(user_id) == until:
+            due.append((until, user_id))
+    return due
+
+
+async def unban_due_players() -> List[int]:
+    """Разбанить всех, у кого истек срок, одним запросом"""
+    due = _pop_due(datetime.now())
+    if not due:
+        return []
+
+    try:
+        unbanned = await get_storage().unban_expired_players([user_id for _, user_id in due])
+    except Exception as e:
+        print(f"Ошибка при автоснятии банов: {e}")
+        for entry in due:
+            heapq.heappush(EXPIRY_HEAP, entry)
+        return []
+
+    BAN_STATS["auto_unbans"] += len(unbanned)
+    if len(unbanned) < len(due):
+        # Часть банов изменили в обход реестра (другой процесс) - сверяемся с базой
+        await load_bans()
+    if unbanned:
+        print(f"🔓 Сняты истекшие баны: {len(unbanned)}")
+    return unbanned
+
+
+async def auto_unban_worker():
+    """Снимать баны ровно в ban_until; новый бан с ближним сроком будит воркер"""
+    while True:
+        await unban_due_players()
+
+        delay = UNBAN_CHECK_INTERVAL
+        if EXPIRY_HEAP:
+            delay = min(delay, max(0.0, (EXPIRY_HEAP[0][0] - datetime.now()).total_seconds()))
+
+        _wakeup.clear()
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ======================
+# ОТСЕВ СООБЩЕНИЙ
+# ======================
+
+class BanMiddleware(BaseMiddleware[Message]):
+    """Сообщения забаненных игроков не доходят до обработчиков"""
+
+    async def pre(self):
+        if self.event.from_id in BANNED:
+            BAN_STATS["dropped_messages"] += 1
+            self.stop("Игрок забанен")
+
+
+def setup_bans(labeler) -> None:
+    """Подключить отсев забаненных к основному лейблеру (первым среди middleware)"""
+    view = labeler.message_view
+    if BanMiddleware not in view.middlewares:
+        # Первым: остальные middleware не увидят отброшенное сообщение
+        view.middlewares.insert(0, BanMiddleware)
+
+
+async def init_ban_registry():
+    """Загрузить реестр банов и запустить автоснятие"""
+    global _wakeup, _worker_task
+    _wakeup = asyncio.Event()
+    await load_bans()
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.create_task(auto_unban_worker())
+    print("✅ Автоснятие банов запущено")
+
+
+# Функции db, меняющие баны, сообщают об этом после commit
+get_storage().add_ban_listener(register_ban)
@@ -1,19 +1,10 @@
 """
 Сервисы для работы с кланами
 """
-from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
 from bot.core.config import settings
-from bot.db import (
-    get_player,
-    get_player_clan,
-    get_clan_bonuses as get_clan_bonuses_db,
-    get_clan_members,
-    update_player_balance,
-    log_collection_with_user,
-    db,
-)
+from bot.storage import get_storage
 from bot.utils import format_number
 
 
@@ -32,19 +23,39 @@ def get_clan_bonuses(level: int) -> dict:
     }
 
 
-async def process_dumbbell_lift_with_clan(user_id: int) -> dict:
+async def get_player_context(user_id: int) -> Optional[dict]:
+    """
+    Игрок, клан, роль в клане и бонусы клана за один запрос к базе
+    
+    Returns:
+        dict: {"player", "clan", "clan_role", "clan_bonuses"} или None, если игрока нет
+    """
+    context = await get_storage().get_player_context(user_id)
+    if not context:
+        return None
+    
+    clan = context["clan"]
+    context["clan_bonuses"] = get_clan_bonuses(clan.get("level", 1)) if clan else None
+    return context
+
+
+async def process_dumbbell_lift_with_clan(user_id: int, context: Optional[dict] = None) -> dict:
     """
     Обрабатывает поднятие гантели с учетом бонусов клана
     
     Args:
         user_id: ID игрока
+        context: уже загруженный get_player_context (чтобы не читать игрока повторно)
         
     Returns:
         dict: Словарь с информацией о начисленных монетах
     """
     try:
         # Получаем игрока и его клан
-        player = await get_player(user_id)
+        storage = get_storage()
+        if context is None:
+            context = await get_player_context(user_id)
+        player = context["player"] if context else None
         if not player:
             return {
                 "player_income": 1,
@@ -54,7 +65,7 @@ async def process_dumbbell_lift_with_clan(user_id: int) -> dict:
                 "error": "Игрок не найден"
             }
         
-        clan = await get_player_clan(user_id)
+        clan = context["clan"]
         
         # Базовый доход от гантели
         base_income = 1  # Значение по умолчанию
@@ -72,7 +83,7 @@ async def process_dumbbell_lift_with_clan(user_id: int) -> dict:
         clan_income = 0
         
         if clan:
-            bonuses = get_clan_bonuses(clan.get("level", 1))
+            bonuses = context.get("clan_bonuses") or get_clan_bonuses(clan.get("level", 1))
             clan_bonus = bonuses.get("player_lift_bonus", 0)  # Бонус игроку
             clan_income = bonuses.get("lift_bonus_coins", 0)  # Бонус клану
         
@@ -87,7 +98,7 @@ async def process_dumbbell_lift_with_clan(user_id: int) -> dict:
                 power_gained = settings.DUMBBELL_LEVELS[dumbbell_level].get("power_per_use", 1)
         
         # Обновляем баланс игрока
-        await update_player_balance(
+        await storage.update_player_balance(
             user_id,
             player_income,
             "dumbbell_lift",
@@ -97,41 +108,16 @@ async def process_dumbbell_lift_with_clan(user_id: int) -> dict:
         
         # Начисляем доход клану
         if clan and clan_income > 0:
-            clan_id = clan["id"]
-            
-            # Добавляем деньги в казну клана
-            await db.clans.update_one(
-                {"_id": clan_id},
-                {"$inc": {"treasury": clan_income}}
-            )
-            
-            # Логируем операцию
-            await log_collection_with_user(
-                clan_id,
+            # Добавляем деньги в казну клана и логируем операцию
+            await storage.add_clan_lift_income(
+                clan["id"],
                 user_id,
-                "lift_income",
                 clan_income,
                 f"Доход от поднятия гантели игроком [id{user_id}] (уровень клана {clan.get('level', 1)})",
             )
-            
-            # Обновляем общий доход клана
-            await db.clans.update_one(
-                {"_id": clan_id},
-                {"$inc": {"total_income": clan_income}}
-            )
         
-        # Обновляем статистику игрока
-        await db.players.update_one(
-            {"user_id": user_id},
-            {
-                "$inc": {
-                    "total_lifts": 1,
-                    "power": power_gained,
-                    "total_earned": player_income
-                },
-                "$set": {"last_dumbbell_use": datetime.now().isoformat()}
-            }
-        )
+        # Обновляем статистику игрока (total_earned уже учтен в update_player_balance)
+        await storage.record_dumbbell_lift(user_id, power_gained)
         
         return {
             "player_income": player_income,
@@ -152,14 +138,3 @@ async def process_dumbbell_lift_with_clan(user_id: int) -> dict:
             "error": str(e),
             "success": False
         }
-
-
-async def is_admin(user_id: int) -> bool:
-    """Проверка, является ли пользователь администратором"""
-    try:
-        player = await get_player(user_id)
-        if not player:
-            return False
-        return player.get("admin_level", 0) > 0
-    except Exception:
-        return False
@@ -0,0 +1,222 @@
+# bot/services/economy.py
+"""
+Экономические сводки: транзакции по отметке (id последней учтенной)
+добавляются в economy_hourly (тип, час, количество, сумма) и
+economy_user_daily (игрок, день, доход, расходы). Отчеты администрации
+читают только сводки, таблица transactions целиком не сканируется.
+
+Пересчет истории (например, на базе, где сводок еще не было):
+    python -m bot.services.economy backfill
+    python -m bot.services.economy backfill --rebuild
+"""
+import re
+import sys
+import time
+import asyncio
+import argparse
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bot.storage import get_storage
+from bot.core.config import settings
+from bot.services.outbound import enqueue_message
+from bot.services.metrics import register_collector
+
+# Названия типов транзакций для отчета
+TRANSACTION_TITLES = {
+    "dumbbell_lift": "Поднятия гантели",
+    "dumbbell_upgrade": "Улучшение гантели",
+    "fitness_hall_purchase": "Покупка залов",
+    "daily_hall_income": "Доход с залов",
+    "money_transfer_sent": "Переводы (отправлено)",
+    "money_transfer_received": "Переводы (получено)",
+    "training_income": "Тренерский доход",
+    "coach_upgrade": "Улучшение тренера",
+    "clan_creation": "Создание кланов",
+    "clan_transfer": "Взносы в казну",
+    "clan_withdrawal": "Снятия из казны",
+    "clan_distribution": "Распределение казны",
+    "clan_distribution_top": "Распределение казны (топ)",
+    "inspector_purchase": "Покупка инспекторов",
+    "protection_activation": "Защита от проверок",
+    "inspection_compensation": "Компенсации за проверки",
+    "admin_add_balance": "Выдано администрацией",
+    "admin_remove_balance": "Снято администрацией",
+}
+
+# Периоды отчета: слово -> часы
+PERIOD_WORDS = {
+    "час": 1,
+    "сутки": 24,
+    "день": 24,
+    "неделя": 24 * 7,
+    "месяц": 24 * 30,
+}
+PERIOD_UNITS = {"ч": 1, "д": 24, "н": 24 * 7}
+MAX_PERIOD_HOURS = 24 * 90
+
+# Работа сводок (для метрик)
+ECONOMY_STATS: Dict[str, Any] = {
+    "processed": 0,
+    "runs": 0,
+    "failed": 0,
+    "last_id": 0,
+    "backlog": 0,
+}
+
+# Отчет о ходе пересчета: callback(обработано всего, осталось)
+BackfillProgress = Callable[[int, int], Awaitable[None]]
+
+_rollup_lock: Optional[asyncio.Lock] = None
+_worker_task: Optional[asyncio.Task] = None
+_backfill_task: Optional[asyncio.Task] = None
+
+
+def _lock() -> asyncio.Lock:
+    global _rollup_lock
+    if _rollup_lock is None:
+        _rollup_lock = asyncio.Lock()
+    return _rollup_lock
+
+
+def parse_period(text: Optional[str]) -> Optional[int]:
+    """Период отчета в часах: "24ч", "7д", "2н", "неделя"... (None - не разобран)"""
+    text = (text or "сутки").strip().lower()
+    if text in PERIOD_WORDS:
+        return PERIOD_WORDS[text]
+    match = re.fullmatch(r"(\d+)\s*([чдн])", text)
+    if not match:
+        return None
+    hours = int(match.group(1)) * PERIOD_UNITS[match.group(2)]
+    return hours if 0 < hours <= MAX_PERIOD_HOURS else None
+
+
+def transaction_title(transaction_type: str) -> str:
+    return TRANSACTION_TITLES.get(transaction_type, transaction_type)
+
+
+async def run_rollup() -> Dict[str, int]:
+    """Одна пачка новых транзакций в сводки"""
+    async with _lock():
+        result = await get_storage().rollup_economy()
+    ECONOMY_STATS["runs"] += 1
+    ECONOMY_STATS["processed"] += result["processed"]
+    ECONOMY_STATS["last_id"] = result["last_id"]
+    ECONOMY_STATS["backlog"] = result["remaining"]
+    return result
+
+
+async def rollup_worker():
+    """Раз в ECONOMY_ROLLUP_SECONDS: новые транзакции и денежная масса за час"""
+    while True:
+        try:
+            # Если накопилось больше пачки, остаток дойдет на следующих запусках
+            await run_rollup()
+            await get_storage().record_money_supply()
+        except Exception as e:
+            ECONOMY_STATS["failed"] += 1
+            print(f"Ошибка при обновлении экономических сводок: {e}")
+        await asyncio.sleep(settings.ECONOMY_ROLLUP_SECONDS)
+
+
+@register_collector
+def _export_metrics() -> List[str]:
+    return [
+        "# HELP bot_economy_rollup_transactions_total Транзакции, учтенные в экономических сводках",
+        "# TYPE bot_economy_rollup_transactions_total counter",
+        f"bot_economy_rollup_transactions_total {ECONOMY_STATS['processed']}",
+        "# HELP bot_economy_rollup_backlog Транзакции, которые сводки еще не обработали",
+        "# TYPE bot_economy_rollup_backlog gauge",
+        f"bot_economy_rollup_backlog {ECONOMY_STATS['backlog']}",
+        "# HELP bot_economy_rollup_failures_total Ошибки обновления сводок",
+        "# TYPE bot_economy_rollup_failures_total counter",
+        f"bot_economy_rollup_failures_total {ECONOMY_STATS['failed']}",
+    ]
+
+
+async def backfill_economy(rebuild: bool = False, on_progress: Optional[BackfillProgress] = None) -> Dict[str, Any]:
+    """Догнать сводки по всей истории пачками, с паузой между пачками"""
+    started = time.perf_counter()
+    try:
+        if rebuild:
+            async with _lock():
+                await get_storage().clear_economy_rollups()
+
+        total = 0
+        while True:
+            result = await run_rollup()
+            total += result["processed"]
+            if on_progress is not None and result["processed"]:
+                await on_progress(total, result["remaining"])
+            if result["remaining"] == 0:
+                break
+            await asyncio.sleep(settings.ECONOMY_BACKFILL_PAUSE_MS / 1000)
+
+        await get_storage().record_money_supply()
+    except Exception as e:
+        print(f"Ошибка при пересчете экономических сводок: {e}")
+        return {"success": False, "error": f"Ошибка при пересчете сводок: {str(e)}"}
+
+    return {"success": True, "processed": total, "seconds": time.perf_counter() - started}
+
+
+def start_backfill(peer_id: int, rebuild: bool = False) -> bool:
+    """Пересчет истории в фоне с отчетом в peer_id (False - пересчет уже идет)"""
+    global _backfill_task
+    if _backfill_task is not None and not _backfill_task.done():
+        return False
+
+    last_report = {"at": time.monotonic()}
+
+    async def on_progress(processed: int, remaining: int):
+        now = time.monotonic()
+        if now - last_report["at"] >= 15:
+            last_report["at"] = now
+            enqueue_message(peer_id, f"⏳ Пересчет сводок: обработано {processed}, осталось {remaining}")
+
+    async def run():
+        result = await backfill_economy(rebuild, on_progress)
+        if result["success"]:
+            text = f"✅ Сводки пересчитаны: {result['processed']} транзакций за {result['seconds']:.0f} с"
+        else:
+            text = f"❌ {result['error']}"
+        enqueue_message(peer_id, text)
+
+    _backfill_task = asyncio.create_task(run())
+    return True
+
+
+async def init_economy():
+    """Запустить обновление экономических сводок"""
+    global _worker_task
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.create_task(rollup_worker())
+    print(f"✅ Экономические сводки: обновление каждые {settings.ECONOMY_ROLLUP_SECONDS} с")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Экономические сводки Gym Legend")
+    parser.add_argument("--db", help="путь к базе (по умолчанию из настроек)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill = commands.add_parser("backfill", help="обработать всю историю транзакций")
+    backfill.add_argument("--rebuild", action="store_true", help="очистить сводки и посчитать заново")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.db:
+        settings.DATABASE_PATH = args.db
+
+    async def progress(processed: int, remaining: int):
+        print(f"обработано {processed}, осталось {remaining}")
+
+    async def run():
+        await get_storage().create_tables()
+        return await backfill_economy(args.rebuild, progress)
+
+    result = asyncio.run(run())
+    if result["success"]:
+        print(f"✅ Обработано {result['processed']} транзакций за {result['seconds']:.1f} с")
+    else:
+        print(result["error"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# bot/services/fraud.py
+"""
+Потоковый поиск мультиаккаунтов: переводы и промокоды приходят сюда из
+функций db после commit (LEDGER_LISTENERS). Обработчик только кладет событие
+в очередь, разбор идет в фоновом воркере - перевод не ждет детектора.
+
+Окна скользящие (FRAUD_WINDOW), все словари ограничены по размеру: при
+переполнении вытесняются игроки, о которых дольше всего не было событий.
+Сработавшие правила пишутся в admin_logs с log_type "fraud".
+"""
+import time
+import asyncio
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from bot.storage import get_storage
+from bot.services.metrics import register_collector, format_labels
+
+# Скользящее окно агрегатов (секунды)
+FRAUD_WINDOW = 3600
+# Пороги правил
+FAN_IN_SENDERS = 5              # разных отправителей одному получателю за окно
+NEW_ACCOUNT_SENDERS = 3         # из них новых аккаунтов
+NEW_ACCOUNT_AGE = 48 * 3600     # аккаунт моложе - новый
+PROMO_FUNNEL_SENDERS = 3        # отправителей, недавно активировавших промокод
+PAIR_TRANSFERS = 10             # переводов в одной паре за окно
+DRAIN_SHARE = 0.9               # отправитель перевел почти все, что получил за окно
+DRAIN_MIN_AMOUNT = 10000
+
+# Ограничения памяти
+MAX_TRACKED_USERS = 50000
+MAX_TRACKED_PAIRS = 100000
+MAX_EVENTS_PER_KEY = 200
+MAX_SUSPECTS = 500
+FRAUD_QUEUE_SIZE = 10000
+
+# Одно и то же правило по одному игроку - не чаще раза в ALERT_COOLDOWN
+ALERT_COOLDOWN = 3600
+# Сколько игрок остается в списке подозреваемых после последнего срабатывания
+SUSPECT_TTL = 24 * 3600
+
+RULE_TITLES = {
+    "fan_in": "Много отправителей",
+    "new_accounts": "Переводы с новых аккаунтов",
+    "promo_funnel": "Промокоды сливаются одному игроку",
+    "pair_volume": "Частые переводы в паре",
+    "drain": "Все полученное сразу переводится дальше",
+}
+
+FRAUD_STATS: Dict[str, int] = {
+    "events": 0,
+    "dropped_events": 0,
+    "alerts": 0,
+}
+
+# Событие журнала: (user_id, тип, сумма, второй участник, время)
+LedgerEvent = Tuple[int, str, int, Optional[int], float]
+
+_queue: Optional[asyncio.Queue] = None
+_worker_task: Optional[asyncio.Task] = None
+
+
+class _BoundedMap(OrderedDict):
+    """Словарь с вытеснением ключей, которые дольше всего не трогали"""
+
+    def __init__(self, max_size: int, factory):
+        super().__init__()
+        self.max_size = max_size
+        self.factory = factory
+
+    def touch(self, key):
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        value = self[key] = self.factory()
+        if len(self) > self.max_size:
+            self.popitem(last=False)
+        return value
+
+
+def _events() -> Deque[Tuple[float, Any]]:
+    return deque(maxlen=MAX_EVENTS_PER_KEY)
+
+
+def _trim(events: Deque[Tuple[float, Any]], now: float) -> Deque[Tuple[float, Any]]:
+    while events and events[0][0] < now - FRAUD_WINDOW:
+        events.popleft()
+    return events
+
+
+# Получатель -> [(время, (отправитель, сумма))]
+INFLOW = _BoundedMap(MAX_TRACKED_USERS, _events)
+# Отправитель -> [(время, (получатель, сумма))]
+OUTFLOW = _BoundedMap(MAX_TRACKED_USERS, _events)
+# (отправитель, получатель) -> [(время, сумма)]
+PAIRS = _BoundedMap(MAX_TRACKED_PAIRS, _events)
+# Игрок -> время последней активации промокода
+PROMO_USERS = _BoundedMap(MAX_TRACKED_USERS, float)
+# Игрок -> время регистрации (кэш, чтобы не читать игрока на каждый перевод)
+ACCOUNT_CREATED = _BoundedMap(MAX_TRACKED_USERS, float)
+# Подозреваемые: user_id -> {"score", "rules", "last_alert", "details"}
+SUSPECTS = _BoundedMap(MAX_SUSPECTS, dict)
+# (правило, user_id) -> время последнего срабатывания
+_last_alerts = _BoundedMap(MAX_SUSPECTS * 4, float)
+
+
+def observe_ledger(user_id: int, transaction_type: str, amount: int, other_user_id: Optional[int] = None) -> None:
+    """Подписчик журнала монет (Storage.add_ledger_listener): только постановка в очередь"""
+    if _queue is None:
+        return
+    try:
+        _queue.put_nowait((user_id, transaction_type, amount, other_user_id, time.time()))
+    except asyncio.QueueFull:
+        FRAUD_STATS["dropped_events"] += 1
+
+
+async def _account_created(user_id: int) -> Optional[float]:
+    if user_id in ACCOUNT_CREATED:
+        return ACCOUNT_CREATED.touch(user_id)
+    player = await get_storage().get_player(user_id)
+    if not player or not player.get("created_at"):
+        return None
+    try:
+        created_at = datetime.fromisoformat(player["created_at"])
+    except ValueError:
+        return None
+    # created_at пишется CURRENT_TIMESTAMP, то есть в UTC
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    ACCOUNT_CREATED.touch(user_id)
+    ACCOUNT_CREATED[user_id] = created_at.timestamp()
+    return ACCOUNT_CREATED[user_id]
+
+
+async def _alert(rule: str, user_id: int, details: str, now: float) -> None:
+    key = (rule, user_id)
+    if key in _last_alerts and now - _last_alerts[key] < ALERT_COOLDOWN:
+        return
+    _last_alerts.touch(key)
+    _last_alerts[key] = now
+
+    suspect = SUSPECTS.touch(user_id)
+    suspect["score"] = suspect.get("score", 0) + 1
+    suspect.setdefault("rules", set()).add(rule)
+    suspect["last_alert"] = now
+    suspect["details"] = details
+
+    FRAUD_STATS["alerts"] += 1
+    await get_storage().add_admin_log(user_id, "Антифрод", "система", RULE_TITLES[rule], details, log_type="fraud")
+
+
+async def _on_transfer(sender_id: int, receiver_id: int, amount: int, now: float) -> None:
+    inflow = _trim(INFLOW.touch(receiver_id), now)
+    inflow.append((now, (sender_id, amount)))
+    outflow = _trim(OUTFLOW.touch(sender_id), now)
+    outflow.append((now, (receiver_id, amount)))
+    pair = _trim(PAIRS.touch((sender_id, receiver_id)), now)
+    pair.append((now, amount))
+
+    senders = {sender for _, (sender, _) in inflow}
+    if len(senders) >= FAN_IN_SENDERS:
+        total = sum(value for _, (_, value) in inflow)
+        await _alert("fan_in", receiver_id,
+                     f"id{receiver_id} получил {total} монет от {len(senders)} игроков за час", now)
+
+    new_senders = []
+    for sender in senders:
+        created = await _account_created(sender)
+        if created is not None and now - created < NEW_ACCOUNT_AGE:
+            new_senders.append(sender)
+    if len(new_senders) >= NEW_ACCOUNT_SENDERS:
+        await _alert("new_accounts", receiver_id,
+                     f"id{receiver_id} получил переводы от {len(new_senders)} новых аккаунтов: "
+                     + ", ".join(f"id{sender}" for sender in new_senders[:10]), now)
+
+    promo_senders = [
+        sender for sender in senders
+        if sender in PROMO_USERS and now - PROMO_USERS[sender] < FRAUD_WINDOW
+    ]
+    if len(promo_senders) >= PROMO_FUNNEL_SENDERS:
+        await _alert("promo_funnel", receiver_id,
+                     f"id{receiver_id} получил переводы от {len(promo_senders)} игроков сразу после промокода: "
+                     + ", ".join(f"id{sender}" for sender in promo_senders[:10]), now)
+
+    if len(pair) >= PAIR_TRANSFERS:
+        await _alert("pair_volume", sender_id,
+                     f"id{sender_id} -> id{receiver_id}: {len(pair)} переводов на {sum(v for _, v in pair)} монет за час", now)
+
+    # Отправитель сам получил деньги и почти все сразу отправил дальше (цепочка прокладок)
+    received = sum(value for _, (_, value) in _trim(INFLOW.get(sender_id, deque()), now))
+    sent = sum(value for _, (_, value) in outflow)
+    if received >= DRAIN_MIN_AMOUNT and sent >= received * DRAIN_SHARE:
+        await _alert("drain", sender_id,
+                     f"id{sender_id} получил {received} и перевел {sent} монет за час", now)
+
+
+async def _process(event: LedgerEvent) -> None:
+    user_id, transaction_type, amount, other_user_id, now = event
+    if transaction_type == "money_transfer_received" and other_user_id:
+        await _on_transfer(other_user_id, user_id, amount, now)
+    elif transaction_type == "promo_code":
+        PROMO_USERS.touch(user_id)
+        PROMO_USERS[user_id] = now
+
+
+async def fraud_worker():
+    """Разбор событий журнала по одному"""
+    while True:
+        event = await _queue.get()
+        try:
+            FRAUD_STATS["events"] += 1
+            await _process(event)
+        except Exception as e:
+            print(f"Ошибка антифрода: {e}")
+        finally:
+            _queue.task_done()
+
+
+def get_suspects() -> List[Dict[str, Any]]:
+    """Текущие подозреваемые, самые подозрительные первыми"""
+    now = time.time()
+    for user_id in [uid for uid, s in SUSPECTS.items() if now - s["last_alert"] > SUSPECT_TTL]:
+        del SUSPECTS[user_id]
+    suspects = [{"user_id": user_id, **suspect} for user_id, suspect in SUSPECTS.items()]
+    return sorted(suspects, key=lambda s: (len(s["rules"]), s["score"], s["last_alert"]), reverse=True)
+
+
+def get_fraud_stats() -> Dict[str, int]:
+    """Счетчики детектора"""
+    return {
+        **FRAUD_STATS,
+        "queued": _queue.qsize() if _queue is not None else 0,
+        "suspects": len(SUSPECTS),
+        "tracked_users": len(INFLOW) + len(OUTFLOW),
+    }
+
+
+@register_collector
+def _export_metrics() -> List[str]:
+    fraud_stats = get_fraud_stats()
+    return [
+        "# HELP bot_fraud_events_total События журнала, разобранные антифродом",
+        "# TYPE bot_fraud_events_total counter",
+        f"bot_fraud_events_total{format_labels(result='processed')} {fraud_stats['events']}",
+        f"bot_fraud_events_total{format_labels(result='dropped')} {fraud_stats['dropped_events']}",
+        "# HELP bot_fraud_alerts_total Срабатывания правил антифрода",
+        "# TYPE bot_fraud_alerts_total counter",
+        f"bot_fraud_alerts_total {fraud_stats['alerts']}",
+        "# HELP bot_fraud_queue Очередь событий антифрода",
+        "# TYPE bot_fraud_queue gauge",
+        f"bot_fraud_queue {fraud_stats['queued']}",
+        "# HELP bot_fraud_suspects Игроки в списке подозреваемых",
+        "# TYPE bot_fraud_suspects gauge",
+        f"bot_fraud_suspects {fraud_stats['suspects']}",
+    ]
+
+
+async def init_fraud_detector():
+    """Запустить разбор переводов и промокодов"""
+    global _queue, _worker_task
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=FRAUD_QUEUE_SIZE)
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.create_task(fraud_worker())
+    print("✅ Антифрод запущен")
+
+
+# Функции db, пишущие в журнал транзакций, сообщают о записи после commit
+get_storage().add_ledger_listener(observe_ledger)
@@ -0,0 +1,151 @@
+# bot/services/inspection_mode.py
+import os
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from bot.core.config import settings, INSPECTION_TIME_SETTINGS, NORMAL_SETTINGS
+from bot.storage import get_storage
+
+# Состояние режима проверок на весь процесс: читается без обращения к базе
+MODE_STATE: Dict[str, Any] = {
+    "is_active": False,
+    "started_at": None,
+    "ends_at": None,
+}
+
+# Как часто другие процессы проверяют сигнал об изменении режима (секунды)
+SIGNAL_CHECK_INTERVAL = 5
+
+_expiry_task: Optional[asyncio.Task] = None
+_signal_mtime: Optional[int] = None
+
+
+def _signal_path() -> str:
+    """Файл-сигнал рядом с базой: его изменение означает смену режима"""
+    return f"{settings.database_path}.mode"
+
+
+def _read_signal_mtime() -> Optional[int]:
+    try:
+        return os.stat(_signal_path()).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _touch_signal():
+    """Оповестить остальные процессы о смене режима"""
+    global _signal_mtime
+    with open(_signal_path(), "a"):
+        pass
+    os.utime(_signal_path())
+    _signal_mtime = _read_signal_mtime()
+
+
+def get_mode() -> Dict[str, Any]:
+    """Текущий режим проверок из памяти"""
+    return dict(MODE_STATE)
+
+
+def is_inspection_mode_active() -> bool:
+    """Активен ли режим 'Время проверок'"""
+    return MODE_STATE["is_active"]
+
+
+def get_mode_settings() -> Dict[str, int]:
+    """Кулдаун, лимит и компенсация для текущего режима"""
+    return INSPECTION_TIME_SETTINGS if MODE_STATE["is_active"] else NORMAL_SETTINGS
+
+
+def _apply_mode(mode: Dict[str, Any]):
+    """Обновить состояние в памяти и перепланировать автовыключение"""
+    global _expiry_task
+    MODE_STATE["is_active"] = bool(mode["is_active"])
+    MODE_STATE["started_at"] = mode.get("started_at")
+    MODE_STATE["ends_at"] = mode.get("ends_at")
+
+    if (
+        _expiry_task is not None
+        and not _expiry_task.done()
+        and _expiry_task is not asyncio.current_task()
+    ):
+        _expiry_task.cancel()
+    _expiry_task = None
+
+    if MODE_STATE["is_active"] and MODE_STATE["ends_at"]:
+        _expiry_task = asyncio.create_task(_expire_mode_at(MODE_STATE["ends_at"]))
+
+
+async def _expire_mode_at(ends_at: str):
+    """Выключить режим ровно в ends_at"""
+    delay = (datetime.fromisoformat(ends_at) - datetime.now()).total_seconds()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+    # Режим могли продлить или выключить, пока мы спали
+    if not (MODE_STATE["is_active"] and MODE_STATE["ends_at"] == ends_at):
+        return
+
+    # Таймер срабатывает в каждом процессе: пишет только тот, кто выключил первым,
+    # остальные перечитывают режим (его могли и продлить из другого процесса)
+    if await get_storage().expire_inspection_time_mode(ends_at):
+        _apply_mode({"is_active": False, "started_at": None, "ends_at": None})
+        _touch_signal()
+        print("🌙 Режим 'Время проверок' завершен по таймеру")
+    else:
+        await reload_inspection_mode()
+
+
+async def reload_inspection_mode():
+    """Перечитать режим из базы"""
+    _apply_mode(await get_storage().get_inspection_time_mode())
+
+
+async def enable_inspection_mode(duration_hours: int) -> bool:
+    """Включить режим проверок на duration_hours часов"""
+    success = await get_storage().set_inspection_time_mode(True, duration_hours)
+    if success:
+        await reload_inspection_mode()
+        _touch_signal()
+    return success
+
+
+async def disable_inspection_mode() -> bool:
+    """Выключить режим проверок"""
+    success = await get_storage().set_inspection_time_mode(False)
+    if success:
+        _apply_mode({"is_active": False, "started_at": None, "ends_at": None})
+        _touch_signal()
+    return success
+
+
+async def extend_inspection_mode(extra_hours: int) -> Optional[str]:
+    """Продлить режим проверок, вернуть новое время окончания"""
+    new_ends_at = await get_storage().extend_inspection_time_mode(extra_hours)
+    if new_ends_at:
+        await reload_inspection_mode()
+        _touch_signal()
+    return new_ends_at
+
+
+async def watch_mode_signal():
+    """Перечитывать режим, когда его сменил другой процесс"""
+    global _signal_mtime
+    while True:
+        await asyncio.sleep(SIGNAL_CHECK_INTERVAL)
+        mtime = _read_signal_mtime()
+        if mtime != _signal_mtime:
+            _signal_mtime = mtime
+            try:
+                await reload_inspection_mode()
+            except Exception as e:
+                print(f"Ошибка при обновлении режима проверок: {e}")
+
+
+async def init_inspection_mode():
+    """Загрузить режим проверок и запустить отслеживание изменений"""
+    global _signal_mtime
+    _signal_mtime = _read_signal_mtime()
+    await reload_inspection_mode()
+    asyncio.create_task(watch_mode_signal())
+    print("✅ Режим проверок загружен")
@@ -0,0 +1,158 @@
+# bot/services/maintenance.py
+import time
+import asyncio
+import itertools
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bot.storage import get_storage
+from bot.services.bans import load_bans
+from bot.services.backup import create_backup
+from bot.services.replica import refresh_replica
+from bot.services.outbound import enqueue_message
+
+# Фоновые задачи обслуживания: id -> состояние (для отчета и команды "Задачи")
+MAINTENANCE_JOBS: Dict[int, Dict[str, Any]] = {}
+_job_ids = itertools.count(1)
+
+# Как часто присылать администратору ход задачи (секунды)
+PROGRESS_INTERVAL = 15
+
+# Сколько завершенных задач помнить
+FINISHED_JOBS_KEPT = 20
+
+JOB_TITLES = {
+    "delete_player": "Удаление игрока",
+    "reset_all": "Массовый сброс",
+    "reset_all_swap": "Массовый сброс (новый файл базы)",
+}
+
+
+def _new_job(kind: str, admin_id: int, peer_id: int, target: str) -> Dict[str, Any]:
+    job = {
+        "id": next(_job_ids),
+        "kind": kind,
+        "admin_id": admin_id,
+        "peer_id": peer_id,
+        "target": target,
+        "status": "running",
+        "table": None,
+        "deleted": {},
+        "started_at": datetime.now(),
+        "finished_at": None,
+        "error": None,
+        "backup": None,
+        "last_report": time.monotonic(),
+    }
+    MAINTENANCE_JOBS[job["id"]] = job
+
+    finished = [j["id"] for j in MAINTENANCE_JOBS.values() if j["status"] != "running"]
+    for job_id in finished[:-FINISHED_JOBS_KEPT]:
+        del MAINTENANCE_JOBS[job_id]
+    return job
+
+
+def get_running_job(*kinds: str) -> Optional[Dict[str, Any]]:
+    """Выполняющаяся задача одного из видов"""
+    for job in MAINTENANCE_JOBS.values():
+        if job["status"] == "running" and job["kind"] in kinds:
+            return job
+    return None
+
+
+def get_jobs() -> List[Dict[str, Any]]:
+    """Все задачи, последние сверху"""
+    return sorted(MAINTENANCE_JOBS.values(), key=lambda job: job["id"], reverse=True)
+
+
+def _deleted_total(job: Dict[str, Any]) -> int:
+    return sum(job["deleted"].values())
+
+
+def format_job(job: Dict[str, Any]) -> str:
+    """Строка о состоянии задачи"""
+    status = {"running": "⏳ выполняется", "done": "✅ завершена", "failed": "❌ ошибка"}[job["status"]]
+    line = f"#{job['id']} {JOB_TITLES[job['kind']]} ({job['target']}): {status}"
+    # Замена файла базы ничего не удаляет построчно
+    if job["kind"] != "reset_all_swap":
+        line += f", удалено строк: {_deleted_total(job)}"
+    if job["status"] == "running" and job["table"]:
+        line += f", сейчас: {job['table']}"
+    if job["error"]:
+        line += f"\n   {job['error']}"
+    return line
+
+
+def _progress_callback(job: Dict[str, Any]) -> Callable[[str, int], Awaitable[None]]:
+    async def on_progress(table: str, deleted: int):
+        job["table"] = table
+        job["deleted"][table] = job["deleted"].get(table, 0) + deleted
+        now = time.monotonic()
+        if now - job["last_report"] >= PROGRESS_INTERVAL:
+            job["last_report"] = now
+            enqueue_message(job["peer_id"], f"⏳ {format_job(job)}")
+    return on_progress
+
+
+async def _run_job(job: Dict[str, Any], operation: Callable[[], Awaitable[Dict[str, Any]]]):
+    # Перед разрушающей операцией - снимок базы; без него операция не выполняется
+    job["table"] = "резервная копия"
+    backup = await create_backup(job["kind"])
+    if backup["success"]:
+        job["backup"] = backup["path"]
+        try:
+            result = await operation()
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+    else:
+        result = backup
+
+    job["finished_at"] = datetime.now()
+    job["table"] = None
+    if result.get("success"):
+        job["status"] = "done"
+        seconds = (job["finished_at"] - job["started_at"]).total_seconds()
+        text = f"{format_job(job)}\n⏱️ За {seconds:.0f} с"
+        text += f"\n💾 Резервная копия: {job['backup']}"
+        if result.get("archive"):
+            text += f"\n📦 Старая база сохранена: {result['archive']}"
+    else:
+        job["status"] = "failed"
+        job["error"] = result.get("error", "неизвестная ошибка")
+        text = format_job(job)
+        print(f"Ошибка фоновой задачи #{job['id']}: {job['error']}")
+    enqueue_message(job["peer_id"], text)
+
+
+def start_player_deletion(user_id: int, admin_id: int, peer_id: int) -> Dict[str, Any]:
+    """Удалить игрока в фоне пачками, ход задачи присылать в peer_id"""
+    job = _new_job("delete_player", admin_id, peer_id, f"id{user_id}")
+
+    async def operation():
+        deleted = await get_storage().delete_player(user_id, admin_id, on_progress=_progress_callback(job))
+        return {"success": deleted} if deleted else {"success": False, "error": "Игрок не найден"}
+
+    asyncio.create_task(_run_job(job, operation))
+    return job
+
+
+def start_reset_all(admin_id: int, peer_id: int, swap: bool = False) -> Optional[Dict[str, Any]]:
+    """Запустить массовый сброс в фоне (None - сброс уже идет)"""
+    if get_running_job("reset_all", "reset_all_swap"):
+        return None
+    job = _new_job("reset_all_swap" if swap else "reset_all", admin_id, peer_id, "все игроки")
+
+    async def operation():
+        if swap:
+            result = await get_storage().reset_all_by_swap()
+        else:
+            result = await get_storage().reset_all(on_progress=_progress_callback(job))
+        # Забаненные удалены вместе с игроками
+        if result["success"]:
+            await load_bans()
+            # Отчеты не должны показывать игроков, которых уже нет
+            await refresh_replica()
+        return result
+
+    asyncio.create_task(_run_job(job, operation))
+    return job
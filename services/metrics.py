@@ -0,0 +1,261 @@
+# bot/services/metrics.py
+import time
+import inspect
+import functools
+import threading
+import contextvars
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from vkbottle import BaseMiddleware
+from vkbottle.bot import Message
+
+from bot.core.config import settings
+
+# Сколько последних замеров держим на команду для p50/p95/p99
+LATENCY_WINDOW = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+# (лейблер, команда) -> показатели
+HANDLER_LATENCIES: Dict[Tuple[str, str], deque] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+HANDLER_SECONDS: Dict[Tuple[str, str], float] = defaultdict(float)
+HANDLER_CALLS: Dict[Tuple[str, str], int] = defaultdict(int)
+HANDLER_ERRORS: Dict[Tuple[str, str], int] = defaultdict(int)
+IN_FLIGHT = {"value": 0}
+
+# (лейблер, команда) -> выполненные SQL-запросы (без BEGIN/COMMIT)
+DB_QUERIES: Dict[Tuple[str, str], int] = defaultdict(int)
+# Запросы считаются в потоках соединений aiosqlite
+_queries_lock = threading.Lock()
+
+# (лейблер, команда, функция db) -> показатели
+DAO_CALLS: Dict[Tuple[str, str, str], int] = defaultdict(int)
+DAO_SECONDS: Dict[Tuple[str, str, str], float] = defaultdict(float)
+
+# Контекст текущего сообщения: какая команда выполняется
+_event_context: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "metrics_event_context", default=None
+)
+# Глубина вложенных вызовов db, чтобы не считать время дважды
+_dao_depth: contextvars.ContextVar[int] = contextvars.ContextVar("metrics_dao_depth", default=0)
+
+# Экспортеры метрик сервисов: функция -> строки в формате Prometheus
+COLLECTORS: List[Callable[[], List[str]]] = []
+
+BACKGROUND = ("background", "-")
+UNMATCHED = ("unmatched", "-")
+
+
+def _current_command() -> Tuple[str, str]:
+    context = _event_context.get()
+    if context is None:
+        return BACKGROUND
+    return context["command"] or UNMATCHED
+
+
+# ======================
+# ОБРАБОТЧИКИ КОМАНД
+# ======================
+
+class MetricsMiddleware(BaseMiddleware[Message]):
+    """Время обработки сообщения и число сообщений в работе"""
+
+    async def pre(self):
+        IN_FLIGHT["value"] += 1
+        _event_context.set({"command": None, "started": time.perf_counter()})
+
+    async def post(self):
+        IN_FLIGHT["value"] -= 1
+        context = _event_context.get()
+        if context is None:
+            return
+
+        elapsed = time.perf_counter() - context["started"]
+        key = context["command"] or UNMATCHED
+        HANDLER_LATENCIES[key].append(elapsed)
+        HANDLER_SECONDS[key] += elapsed
+        HANDLER_CALLS[key] += 1
+
+
+def _instrument_handler(handler_func: Callable) -> Callable:
+    """Пометить команду в контексте и посчитать ошибки обработчика"""
+    labeler_name = handler_func.__module__.rsplit(".", 1)[-1]
+    key = (labeler_name, handler_func.__name__)
+
+    @functools.wraps(handler_func)
+    async def wrapper(*args, **kwargs):
+        context = _event_context.get()
+        if context is not None:
+            context["command"] = key
+        try:
+            return await handler_func(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS[key] += 1
+            raise
+
+    wrapper.__metrics_wrapped__ = True
+    return wrapper
+
+
+def setup_metrics(labeler) -> None:
+    """Подключить метрики к основному лейблеру (после загрузки всех лейблеров)"""
+    view = labeler.message_view
+    for handler in view.handlers:
+        func = getattr(handler, "handler", None)
+        if func is not None and not getattr(func, "__metrics_wrapped__", False):
+            handler.handler = _instrument_handler(func)
+
+    if MetricsMiddleware not in view.middlewares:
+        view.register_middleware(MetricsMiddleware)
+
+
+# ======================
+# ФУНКЦИИ БАЗЫ ДАННЫХ
+# ======================
+
+def _instrument_dao(func: Callable) -> Callable:
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        depth = _dao_depth.get()
+        token = _dao_depth.set(depth + 1)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _dao_depth.reset(token)
+            # Вложенные вызовы (get_player внутри get_player_clan) уже входят во внешний
+            if depth == 0:
+                command = _current_command()
+                key = (command[0], command[1], func.__name__)
+                DAO_CALLS[key] += 1
+                DAO_SECONDS[key] += time.perf_counter() - started
+
+    return wrapper
+
+
+def instrument_dao(namespace: Dict[str, Any]) -> None:
+    """Обернуть все async-функции модуля db счетчиками вызовов и времени"""
+    module_name = namespace["__name__"]
+    for name, value in list(namespace.items()):
+        if inspect.iscoroutinefunction(value) and value.__module__ == module_name:
+            namespace[name] = _instrument_dao(value)
+
+
+def statement_counter() -> Callable[[], None]:
+    """Счетчик SQL-запросов для соединения, которое открывает текущая команда.
+
+    Соединение aiosqlite выполняет запросы в своем потоке, где контекст
+    сообщения не виден, поэтому команда запоминается при открытии.
+    """
+    key = _current_command()
+
+    def count():
+        with _queries_lock:
+            DB_QUERIES[key] += 1
+
+    return count
+
+
+# ======================
+# ЭКСПОРТ В ФОРМАТЕ PROMETHEUS
+# ======================
+
+def register_collector(collector: Callable[[], List[str]]) -> Callable[[], List[str]]:
+    """Добавить метрики сервиса в /metrics (используется как декоратор)"""
+    if collector not in COLLECTORS:
+        COLLECTORS.append(collector)
+    return collector
+
+
+def format_labels(**labels: str) -> str:
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _quantile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+    return samples[index]
+
+
+def render_metrics() -> str:
+    """Все метрики в текстовом формате Prometheus"""
+    lines = [
+        "# HELP bot_handler_latency_seconds Время обработки команды",
+        "# TYPE bot_handler_latency_seconds summary",
+    ]
+    for (labeler_name, command), samples in HANDLER_LATENCIES.items():
+        ordered = sorted(samples)
+        for q in QUANTILES:
+            labels = format_labels(labeler=labeler_name, command=command, quantile=q)
+            lines.append(f"bot_handler_latency_seconds{labels} {_quantile(ordered, q):.6f}")
+        labels = format_labels(labeler=labeler_name, command=command)
+        lines.append(f"bot_handler_latency_seconds_sum{labels} {HANDLER_SECONDS[(labeler_name, command)]:.6f}")
+        lines.append(f"bot_handler_latency_seconds_count{labels} {HANDLER_CALLS[(labeler_name, command)]}")
+
+    lines += [
+        "# HELP bot_handler_errors_total Ошибки в обработчиках команд",
+        "# TYPE bot_handler_errors_total counter",
+    ]
+    for (labeler_name, command), count in HANDLER_ERRORS.items():
+        lines.append(f"bot_handler_errors_total{format_labels(labeler=labeler_name, command=command)} {count}")
+
+    lines += [
+        "# HELP bot_handlers_in_flight Сообщения в обработке",
+        "# TYPE bot_handlers_in_flight gauge",
+        f"bot_handlers_in_flight {IN_FLIGHT['value']}",
+        "# HELP bot_db_queries_total SQL-запросы по командам (без BEGIN/COMMIT)",
+        "# TYPE bot_db_queries_total counter",
+    ]
+    with _queries_lock:
+        queries = list(DB_QUERIES.items())
+    for (labeler_name, command), count in queries:
+        lines.append(f"bot_db_queries_total{format_labels(labeler=labeler_name, command=command)} {count}")
+
+    lines += [
+        "# HELP bot_db_calls_total Вызовы функций db по командам (не SQL-запросы)",
+        "# TYPE bot_db_calls_total counter",
+    ]
+    for (labeler_name, command, function), count in DAO_CALLS.items():
+        labels = format_labels(labeler=labeler_name, command=command, function=function)
+        lines.append(f"bot_db_calls_total{labels} {count}")
+
+    lines += [
+        "# HELP bot_db_seconds_total Время в функциях db по командам",
+        "# TYPE bot_db_seconds_total counter",
+    ]
+    for (labeler_name, command, function), seconds in DAO_SECONDS.items():
+        labels = format_labels(labeler=labeler_name, command=command, function=function)
+        lines.append(f"bot_db_seconds_total{labels} {seconds:.6f}")
+
+    # Метрики сервисов: каждый сервис регистрирует свой экспортер
+    for collector in list(COLLECTORS):
+        try:
+            lines += collector()
+        except Exception as e:
+            print(f"Ошибка при сборе метрик {collector.__module__}: {e}")
+
+    return "\n".join(lines) + "\n"
+
+
+async def _metrics_view(request: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+
+async def init_metrics_server() -> Optional[web.AppRunner]:
+    """Запустить локальный HTTP-эндпоинт /metrics"""
+    if not settings.METRICS_ENABLED:
+        return None
+
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_view)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, settings.METRICS_HOST, settings.METRICS_PORT).start()
+    print(f"✅ Метрики доступны на http://{settings.METRICS_HOST}:{settings.METRICS_PORT}/metrics")
+    return runner
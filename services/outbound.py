@@ -0,0 +1,49 @@
+# bot/services/outbound.py
+import asyncio
+from typing import Optional
+
+from vkbottle import API
+
+from bot.core.config import settings
+
+# Общая очередь исходящих личных сообщений: (peer_id, текст)
+OUTBOUND_QUEUE: asyncio.Queue = asyncio.Queue()
+
+# Один клиент API на весь процесс вместо API(...) на каждое уведомление
+_api: Optional[API] = None
+_worker_task: Optional[asyncio.Task] = None
+
+
+def get_outbound_api() -> API:
+    """Получить общий клиент API для исходящих сообщений"""
+    global _api
+    if _api is None:
+        _api = API(token=settings.VK_TOKEN)
+    return _api
+
+
+def enqueue_message(peer_id: int, text: str) -> None:
+    """Поставить личное сообщение в очередь на отправку"""
+    OUTBOUND_QUEUE.put_nowait((peer_id, text))
+
+
+async def outbound_worker():
+    """Отправлять сообщения из очереди по одному"""
+    api = get_outbound_api()
+    while True:
+        peer_id, text = await OUTBOUND_QUEUE.get()
+        try:
+            await api.messages.send(peer_id=peer_id, message=text, random_id=0)
+        except Exception as e:
+            print(f"Ошибка отправки сообщения {peer_id}: {e}")
+        finally:
+            OUTBOUND_QUEUE.task_done()
+
+
+async def init_outbound_queue():
+    """Запустить обработчик очереди исходящих сообщений (один на процесс)"""
+    global _worker_task
+    if _worker_task is not None and not _worker_task.done():
+        return
+    _worker_task = asyncio.create_task(outbound_worker())
+    print("✅ Очередь исходящих сообщений запущена")
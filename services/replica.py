@@ -0,0 +1,106 @@
+# bot/services/replica.py
+import os
+import time
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bot.core.config import settings
+from bot.services.backup import copy_database
+from bot.services.metrics import register_collector, format_labels
+from bot.storage import get_storage
+
+# Обновления реплики (для метрик)
+REPLICA_STATS: Dict[str, Any] = {
+    "refreshes": 0,
+    "failed": 0,
+    "last_seconds": 0.0,
+}
+
+_refresh_lock: Optional[asyncio.Lock] = None
+_worker_task: Optional[asyncio.Task] = None
+
+
+def _copy_replica():
+    tmp_path = f"{settings.replica_path}.tmp"
+    try:
+        copy_database(
+            settings.database_path,
+            tmp_path,
+            settings.BACKUP_PAGES_PER_STEP,
+            settings.BACKUP_STEP_PAUSE_MS / 1000,
+        )
+        # Открытые отчеты дочитывают старый файл, новые соединения видят новый
+        os.replace(tmp_path, settings.replica_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+async def refresh_replica() -> bool:
+    """Снять свежий снимок базы для отчетов администрации"""
+    global _refresh_lock
+    if not settings.REPLICA_ENABLED:
+        return False
+    if _refresh_lock is None:
+        _refresh_lock = asyncio.Lock()
+
+    async with _refresh_lock:
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(_copy_replica)
+        except Exception as e:
+            REPLICA_STATS["failed"] += 1
+            print(f"Ошибка при обновлении аналитической реплики: {e}")
+            return False
+        REPLICA_STATS["refreshes"] += 1
+        REPLICA_STATS["last_seconds"] = time.perf_counter() - started
+        return True
+
+
+@register_collector
+def _export_metrics() -> List[str]:
+    return [
+        "# HELP bot_replica_refreshes_total Обновления аналитической реплики",
+        "# TYPE bot_replica_refreshes_total counter",
+        f"bot_replica_refreshes_total{format_labels(result='ok')} {REPLICA_STATS['refreshes']}",
+        f"bot_replica_refreshes_total{format_labels(result='failed')} {REPLICA_STATS['failed']}",
+        "# HELP bot_replica_refresh_seconds Длительность последнего обновления реплики",
+        "# TYPE bot_replica_refresh_seconds gauge",
+        f"bot_replica_refresh_seconds {REPLICA_STATS['last_seconds']:.3f}",
+    ]
+
+
+def freshness_line() -> str:
+    """Подпись к отчету: на какой момент данные"""
+    refreshed_at = get_storage().get_replica_refreshed_at()
+    if refreshed_at is None:
+        return "🕒 Данные: основная база (реплика еще не готова)"
+
+    age = int((datetime.now() - refreshed_at).total_seconds())
+    if age < 60:
+        ago = f"{age} с назад"
+    elif age < 3600:
+        ago = f"{age // 60} мин назад"
+    else:
+        ago = f"{age // 3600} ч {age % 3600 // 60} мин назад"
+    return f"🕒 Данные на {refreshed_at.strftime('%H:%M:%S')} ({ago})"
+
+
+async def replica_worker():
+    """Обновлять реплику раз в REPLICA_REFRESH_SECONDS"""
+    while True:
+        await asyncio.sleep(settings.REPLICA_REFRESH_SECONDS)
+        await refresh_replica()
+
+
+async def init_replica():
+    """Снять первую реплику и запустить обновление"""
+    global _worker_task
+    if not settings.REPLICA_ENABLED:
+        print("⚠️ Аналитическая реплика выключена: отчеты читают основную базу")
+        return
+    await refresh_replica()
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.create_task(replica_worker())
+    print(f"✅ Аналитическая реплика: {settings.replica_path}, обновление каждые {settings.REPLICA_REFRESH_SECONDS} с")
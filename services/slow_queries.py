@@ -0,0 +1,294 @@
+# bot/services/slow_queries.py
+import re
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from bot.core.config import settings
+
+# Нормализованный SQL -> статистика медленных выполнений
+SLOW_QUERIES: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+# Оператор транзакции -> долгие ожидания (блокировка записи, сброс на диск)
+LOCK_WAITS: Dict[str, Dict[str, Any]] = {}
+
+# Для этих операторов план не строится
+_NO_PLAN_PREFIXES = ("BEGIN", "COMMIT", "ROLLBACK", "END", "CREATE", "DROP", "ALTER", "PRAGMA", "VACUUM", "ANALYZE")
+
+# Время этих операторов - ожидание транзакции, а не работа запроса: они учитываются отдельно
+_TRANSACTION_PREFIXES = ("BEGIN", "COMMIT", "END", "ROLLBACK")
+
+
+def _normalize(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _params_shape(parameters: Any) -> str:
+    """Типы параметров вместо значений: (int, str, NoneType)"""
+    if parameters is None:
+        return "()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    try:
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    except TypeError:
+        return type(parameters).__name__
+
+
+def _explain(conn: sqlite3.Connection, sql: str, parameters: Any) -> str:
+    """План выполнения запроса в виде дерева"""
+    if sql.upper().startswith(_NO_PLAN_PREFIXES):
+        return ""
+    try:
+        rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", parameters or ()).fetchall()
+    except sqlite3.Error as e:
+        return f"(план недоступен: {e})"
+
+    depth = {0: 0}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depth[node_id] = depth.get(parent_id, 0) + 1
+        lines.append("  " * (depth[node_id] - 1) + detail)
+    return "\n".join(lines)
+
+
+def _record(conn: Optional[sqlite3.Connection], sql: str, parameters: Any, elapsed_ms: float, many: bool = False):
+    key = _normalize(sql)
+    with _lock:
+        entry = SLOW_QUERIES.get(key)
+        # Без соединения (курсор собран сборщиком мусора) план достроится при следующем замере
+        need_plan = entry is None and conn is not None
+
+    # План строим один раз на запрос, вне блокировки
+    sample = parameters[0] if many and parameters else parameters
+    plan = _explain(conn, key, sample) if need_plan else None
+    shape = _params_shape(sample)
+
+    with _lock:
+        entry = SLOW_QUERIES.setdefault(key, {
+            "sql": key,
+            "count": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "params": shape,
+            "plan": plan or "",
+            "last_seen": None,
+        })
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["params"] = shape
+        entry["last_seen"] = datetime.now().isoformat(timespec="seconds")
+        if plan and not entry["plan"]:
+            entry["plan"] = plan
+
+    print(f"🐢 Медленный запрос {elapsed_ms:.1f} мс {shape}: {key[:200]}")
+    if plan:
+        print("   План:\n   " + plan.replace("\n", "\n   "))
+
+
+def _record_lock_wait(sql: str, elapsed_ms: float):
+    key = _normalize(sql).upper()
+    with _lock:
+        entry = LOCK_WAITS.setdefault(key, {
+            "sql": key,
+            "count": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "last_seen": None,
+        })
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["last_seen"] = datetime.now().isoformat(timespec="seconds")
+
+    print(f"🔒 Долгое ожидание транзакции {elapsed_ms:.1f} мс: {key}")
+
+
+class SlowQueryCursor(sqlite3.Cursor):
+    """Курсор, замеряющий запрос целиком: выполнение и выборку строк.
+
+    SELECT выполняется в основном при чтении первых строк, поэтому время
+    fetchone/fetchmany/fetchall прибавляется к тому же запросу. Запрос
+    записывается, когда выбран до конца, курсор закрыт или выполняет новый.
+    """
+
+    _sql: Optional[str] = None
+    _parameters: Any = None
+    _many = False
+    _elapsed = 0.0
+
+    def _start(self, sql: str, parameters: Any, many: bool = False):
+        self._finish()
+        self._sql, self._parameters, self._many, self._elapsed = sql, parameters, many, 0.0
+
+    def _finish(self, explain: bool = True):
+        if self._sql is None:
+            return
+        sql, elapsed_ms = self._sql, self._elapsed * 1000
+        self._sql = None
+        if elapsed_ms < settings.SLOW_QUERY_MS:
+            return
+        if sql.lstrip().upper().startswith(_TRANSACTION_PREFIXES):
+            _record_lock_wait(sql, elapsed_ms)
+        else:
+            _record(self.connection if explain else None, sql, self._parameters, elapsed_ms, many=self._many)
+
+    def _timed(self, call, *args):
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        try:
+            self._timed(super().execute, sql, parameters)
+        finally:
+            # Без строк результата (INSERT, UPDATE, BEGIN, ошибка) запрос уже завершен
+            if self.description is None:
+                self._finish()
+        return self
+
+    def executemany(self, sql, parameters):
+        parameters = list(parameters)
+        self._start(sql, parameters, many=True)
+        try:
+            self._timed(super().executemany, sql, parameters)
+        finally:
+            self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        try:
+            return self._timed(super().fetchall)
+        finally:
+            self._finish()
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Курсор не закрыт явно; освобождается не в потоке соединения, план не строим
+        self._finish(explain=False)
+
+
+class SlowQueryConnection(sqlite3.Connection):
+    """Соединение sqlite3, замеряющее каждый запрос (factory для aiosqlite.connect).
+
+    on_statement вызывается на каждый запрос, кроме управления транзакцией.
+    """
+
+    def __init__(self, *args, on_statement: Optional[Callable[[], None]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._on_statement = on_statement
+
+    def _count(self, sql: str):
+        if self._on_statement is not None and not sql.lstrip().upper().startswith(_TRANSACTION_PREFIXES):
+            self._on_statement()
+
+    def cursor(self, factory=SlowQueryCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        self._count(sql)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        self._count(sql)
+        return self.cursor().executemany(sql, parameters)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= settings.SLOW_QUERY_MS:
+                _record_lock_wait("COMMIT", elapsed_ms)
+
+
+def get_slow_queries(limit: Optional[int] = None, order_by: str = "total_ms") -> List[Dict[str, Any]]:
+    """Топ медленных запросов (по суммарному или максимальному времени)"""
+    with _lock:
+        entries = [dict(entry) for entry in SLOW_QUERIES.values()]
+    entries.sort(key=lambda entry: entry[order_by], reverse=True)
+    return entries[:limit or settings.SLOW_QUERY_TOP]
+
+
+def get_lock_waits() -> List[Dict[str, Any]]:
+    """Долгие ожидания транзакций (BEGIN, COMMIT), самые затратные первыми"""
+    with _lock:
+        entries = [dict(entry) for entry in LOCK_WAITS.values()]
+    entries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+    return entries
+
+
+def reset_slow_queries():
+    """Очистить таблицу медленных запросов и ожиданий транзакций"""
+    with _lock:
+        SLOW_QUERIES.clear()
+        LOCK_WAITS.clear()
+
+
+def format_slow_queries(entries: List[Dict[str, Any]], with_plan: bool = False) -> str:
+    """Таблица медленных запросов для сообщения или файла"""
+    if not entries:
+        return f"Медленных запросов (от {settings.SLOW_QUERY_MS} мс) не было"
+
+    lines = []
+    for i, entry in enumerate(entries, 1):
+        avg_ms = entry["total_ms"] / entry["count"]
+        lines.append(
+            f"{i}. {entry['count']}× | всего {entry['total_ms']:.0f} мс | "
+            f"сред. {avg_ms:.1f} мс | макс. {entry['max_ms']:.1f} мс\n"
+            f"   {entry['sql'][:300]}\n"
+            f"   Параметры: {entry['params']}"
+        )
+        if with_plan and entry["plan"]:
+            lines.append("   План:\n   " + entry["plan"].replace("\n", "\n   "))
+    return "\n".join(lines)
+
+
+def format_lock_waits(entries: List[Dict[str, Any]]) -> str:
+    """Ожидания транзакций: время блокировки записи, не работа запросов"""
+    if not entries:
+        return f"Ожиданий транзакций (от {settings.SLOW_QUERY_MS} мс) не было"
+
+    return "\n".join(
+        f"{entry['sql']}: {entry['count']}× | всего {entry['total_ms']:.0f} мс | "
+        f"сред. {entry['total_ms'] / entry['count']:.1f} мс | макс. {entry['max_ms']:.1f} мс"
+        for entry in entries
+    )
+
+
+def dump_slow_queries(path: Optional[str] = None) -> str:
+    """Сохранить таблицу медленных запросов с планами в файл, вернуть путь"""
+    path = path or f"{settings.database_path}.slow_queries.txt"
+    entries = get_slow_queries(limit=len(SLOW_QUERIES) or 1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"Медленные запросы на {datetime.now().isoformat(timespec='seconds')} "
+                f"(порог {settings.SLOW_QUERY_MS} мс)\n\n")
+        f.write(format_slow_queries(entries, with_plan=True))
+        f.write("\n\nОжидания транзакций (блокировка записи, COMMIT):\n")
+        f.write(format_lock_waits(get_lock_waits()))
+        f.write("\n")
+    return path
@@ -0,0 +1,117 @@
+# bot/services/users.py
+from typing import Any, Dict, List, Optional
+
+from bot.core.config import settings
+from bot.storage import get_storage
+from bot.services.metrics import register_collector, format_labels
+
+# Категории команд, доступные уровням администрации (создателю - все)
+ADMIN_CATEGORIES: Dict[int, List[str]] = {
+    2: ["main", "senior_admin", "economy", "clans", "donat_services", "info", "players", "broadcast", "halls"],
+    3: ["main", "economy", "clans", "broadcast", "info", "halls"],
+}
+
+# Снимок прав: user_id -> {"level", "nickname", "categories"}.
+# Загружается при старте (load_acl) и обновляется функциями db, меняющими администраторов
+ACL: Dict[int, Dict[str, Any]] = {}
+
+# Сколько проверок прав обслужено из снимка (по функциям) и сколько раз он перезагружался
+ACL_STATS: Dict[str, int] = {
+    "is_admin": 0,
+    "get_admin_access_level": 0,
+    "can_use_command": 0,
+    "reloads": 0,
+    "updates": 0,
+}
+
+
+def _acl_entry(admin_level: int, admin_nickname: Optional[str]) -> Dict[str, Any]:
+    return {
+        "level": admin_level,
+        "nickname": admin_nickname,
+        "categories": frozenset(ADMIN_CATEGORIES.get(admin_level, ())),
+    }
+
+
+def set_acl_entry(user_id: int, admin_level: int, admin_nickname: Optional[str] = None) -> None:
+    """Обновить права одного пользователя в снимке (уровень 0 - убрать)"""
+    if admin_level > 0:
+        ACL[user_id] = _acl_entry(admin_level, admin_nickname)
+    else:
+        ACL.pop(user_id, None)
+    ACL_STATS["updates"] += 1
+
+
+async def load_acl() -> int:
+    """Загрузить снимок прав из базы, вернуть число администраторов"""
+    admins = await get_storage().get_admins()
+    snapshot = {
+        admin["user_id"]: _acl_entry(admin["admin_level"], admin["admin_nickname"])
+        for admin in admins
+    }
+    ACL.clear()
+    ACL.update(snapshot)
+    ACL_STATS["reloads"] += 1
+    print(f"✅ Права администрации загружены: {len(ACL)} администраторов")
+    return len(ACL)
+
+
+def _access_level(user_id: int) -> int:
+    if user_id == settings.CREATOR_ID:
+        return 1
+    entry = ACL.get(user_id)
+    return entry["level"] if entry else 0
+
+
+async def is_admin(user_id: int) -> bool:
+    """Проверка, является ли пользователь администратором"""
+    ACL_STATS["is_admin"] += 1
+    return _access_level(user_id) > 0
+
+
+async def get_admin_access_level(user_id: int) -> int:
+    """Получить уровень доступа администратора"""
+    ACL_STATS["get_admin_access_level"] += 1
+    return _access_level(user_id)
+
+
+async def can_use_command(user_id: int, command_category: str) -> bool:
+    """Проверка доступа к команде по категории"""
+    ACL_STATS["can_use_command"] += 1
+    admin_level = _access_level(user_id)
+    if admin_level == 1:
+        return True
+    entry = ACL.get(user_id)
+    return bool(entry) and command_category in entry["categories"]
+
+
+def get_admin_nickname(user_id: int) -> Optional[str]:
+    """Ник администратора из снимка"""
+    entry = ACL.get(user_id)
+    return entry["nickname"] if entry else None
+
+
+def get_acl_stats() -> Dict[str, int]:
+    """Счетчики проверок прав и размер снимка"""
+    return {**ACL_STATS, "admins": len(ACL)}
+
+
+@register_collector
+def _export_metrics() -> List[str]:
+    acl_stats = get_acl_stats()
+    lines = [
+        "# HELP bot_acl_checks_total Проверки прав, обслуженные из снимка",
+        "# TYPE bot_acl_checks_total counter",
+    ]
+    for check in ("is_admin", "get_admin_access_level", "can_use_command"):
+        lines.append(f"bot_acl_checks_total{format_labels(check=check)} {acl_stats[check]}")
+    lines += [
+        "# HELP bot_acl_admins Администраторов в снимке прав",
+        "# TYPE bot_acl_admins gauge",
+        f"bot_acl_admins {acl_stats['admins']}",
+    ]
+    return lines
+
+
+# Функции db, меняющие администраторов, сообщают об этом после commit
+get_storage().add_admin_listener(set_acl_entry)
@@ -0,0 +1,1255 @@
+"""
+Единый интерфейс хранилища данных бота.
+
+Storage описывает все операции с данными: игроки, тренер, доход с залов,
+рейтинги, кланы и их казна, движение монет (ledger), проверки, промокоды,
+доступ к инфе, администрация, заявки, баны и обслуживание базы. Боевая
+реализация - SQLiteStorage поверх функций bot.db (aiosqlite). Обработчики
+и services берут хранилище через get_storage() и не импортируют bot.db;
+напрямую к bot.db обращаются только эта реализация, бенчмарки и тесты.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bot import db
+
+# Ограничения игры, общие для любого хранилища
+DAILY_HALL_LIMIT = db.DAILY_HALL_LIMIT
+LEADERBOARD_SIZE = db.LEADERBOARD_SIZE
+
+
+class Storage(ABC):
+    """Интерфейс хранилища"""
+
+    # ======================
+    # ИГРОКИ
+    # ======================
+
+    @abstractmethod
+    async def get_player(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Получить игрока"""
+
+    @abstractmethod
+    async def create_player(self, user_id: int, username: str) -> Optional[Dict[str, Any]]:
+        """Создать игрока"""
+
+    @abstractmethod
+    async def update_username(self, user_id: int, new_username: str, admin_id: Optional[int] = None) -> bool:
+        """Сменить ник игрока"""
+
+    @abstractmethod
+    async def get_player_fitness_halls(self, user_id: int) -> int:
+        """Количество фитнес-залов игрока"""
+
+    @abstractmethod
+    async def update_fitness_halls(self, user_id: int, amount: int, total_price: int = 0) -> int:
+        """Изменить количество залов, вернуть новое значение"""
+
+    @abstractmethod
+    async def buy_fitness_halls(self, user_id: int, amount: int, total_price: int) -> Dict[str, Any]:
+        """Купить залы одной транзакцией (дневной лимит, списание, залы)"""
+
+    @abstractmethod
+    async def record_dumbbell_lift(self, user_id: int, power_gained: int) -> bool:
+        """Записать подход с гантелей"""
+
+    @abstractmethod
+    async def update_dumbbell_level(self, user_id: int, new_level: int, dumbbell_name: str) -> bool:
+        """Записать новый уровень и название гантели"""
+
+    @abstractmethod
+    async def get_all_players(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Игроки для списка администрации"""
+
+    @abstractmethod
+    async def get_recent_players(self, limit: int = 10) -> List[Tuple[str, str]]:
+        """Последние зарегистрированные игроки"""
+
+    # ======================
+    # ТРЕНЕР
+    # ======================
+
+    @abstractmethod
+    async def get_coach_level(self, user_id: int) -> int:
+        """Уровень тренерской деятельности"""
+
+    @abstractmethod
+    async def update_coach_level(self, user_id: int, new_level: int) -> bool:
+        """Сменить уровень тренерской деятельности"""
+
+    @abstractmethod
+    async def get_coach_stats(self, user_id: int) -> Dict[str, Any]:
+        """Статистика тренерской деятельности"""
+
+    @abstractmethod
+    async def get_last_training_time(self, user_id: int) -> Optional[str]:
+        """Время последней тренировки"""
+
+    @abstractmethod
+    async def perform_training(
+        self,
+        user_id: int,
+        levels: Dict[int, Dict[str, Any]],
+        cooldown: timedelta,
+    ) -> Dict[str, Any]:
+        """Провести тренировку одной транзакцией"""
+
+    # ======================
+    # ДОХОД С ЗАЛОВ
+    # ======================
+
+    @abstractmethod
+    async def get_all_players_with_halls(self) -> List[Dict[str, Any]]:
+        """Игроки с залами для ночного начисления"""
+
+    @abstractmethod
+    async def add_daily_fitness_hall_income(self, user_id: int, amount: int, description: str) -> bool:
+        """Начислить дневной доход с залов"""
+
+    @abstractmethod
+    async def get_daily_income_stats(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Статистика дневного дохода игрока"""
+
+    @abstractmethod
+    async def reset_daily_income_stats(self) -> bool:
+        """Удалить старые записи дневного дохода"""
+
+    # ======================
+    # РЕЙТИНГИ
+    # ======================
+
+    @abstractmethod
+    async def get_top_balance(self, limit: int = 10) -> List[Tuple]:
+        """Топ по монетам без фильтра по бану"""
+
+    @abstractmethod
+    async def get_top_lifts(self, limit: int = 10) -> List[Tuple]:
+        """Топ по поднятиям без фильтра по бану"""
+
+    @abstractmethod
+    async def get_top_power(self, limit: int = 10) -> List[Tuple]:
+        """Топ по силе без фильтра по бану"""
+
+    @abstractmethod
+    async def get_top_fitness_halls(self, limit: int = 10) -> List[Tuple]:
+        """Топ по залам без фильтра по бану"""
+
+    @abstractmethod
+    async def get_leaderboard_version(self, board: str) -> int:
+        """Версия рейтинга (растет при изменении видимого топа)"""
+
+    @abstractmethod
+    async def set_leaderboard_threshold(self, board: str, threshold: Optional[int]) -> None:
+        """Запомнить последнее видимое место рейтинга"""
+
+    @abstractmethod
+    async def get_top_earners_period(self, days: int, limit: int = 5) -> List[Dict[str, Any]]:
+        """Игроки с наибольшим доходом за days дней"""
+
+    # ======================
+    # КЛАНЫ
+    # ======================
+
+    @abstractmethod
+    async def get_player_clan(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Клан игрока"""
+
+    @abstractmethod
+    async def get_player_context(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Игрок, его клан и роль в клане одним запросом"""
+
+    @abstractmethod
+    async def create_clan(self, tag: str, name: str, owner_id: int) -> Dict[str, Any]:
+        """Создать клан"""
+
+    @abstractmethod
+    async def get_clan_by_tag(self, tag: str) -> Optional[Dict[str, Any]]:
+        """Клан по тегу"""
+
+    @abstractmethod
+    async def get_all_clans(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Все кланы"""
+
+    @abstractmethod
+    async def get_top_clans(self, limit: int = 10, order: str = "level") -> List[Dict[str, Any]]:
+        """Топ кланов (order: level, power или halls)"""
+
+    @abstractmethod
+    async def get_clan_members(self, clan_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        """Участники клана"""
+
+    @abstractmethod
+    async def get_clan_member_count(self, clan_id: int) -> int:
+        """Число участников клана"""
+
+    @abstractmethod
+    async def get_member_clan_role(self, user_id: int, clan_id: int) -> Tuple[str, str]:
+        """Роль участника в клане: (код, название)"""
+
+    @abstractmethod
+    async def join_clan(self, user_id: int, clan_id: int) -> Dict[str, Any]:
+        """Вступить в клан"""
+
+    @abstractmethod
+    async def leave_clan(self, user_id: int, clan_id: int) -> Dict[str, Any]:
+        """Покинуть клан"""
+
+    @abstractmethod
+    async def kick_clan_member(self, clan_id: int, user_id: int) -> Dict[str, Any]:
+        """Исключить участника и внести в список исключенных"""
+
+    @abstractmethod
+    async def add_clan_lift_income(self, clan_id: int, user_id: int, amount: int, description: str) -> bool:
+        """Начислить в казну доход от подхода участника и записать в лог казны"""
+
+    @abstractmethod
+    async def set_clan_role(self, clan_id: int, user_id: int, role: str) -> bool:
+        """Сменить роль участника клана"""
+
+    @abstractmethod
+    async def transfer_clan_ownership(self, clan_id: int, owner_id: int, new_owner_id: int,
+                                      cost: int, description: str) -> Dict[str, Any]:
+        """Передать клан участнику (оплата и обмен ролями одной транзакцией)"""
+
+    @abstractmethod
+    async def unban_clan_member(self, clan_id: int, user_id: int) -> bool:
+        """Убрать игрока из списка исключенных клана"""
+
+    @abstractmethod
+    async def delete_clan(self, clan_id: int) -> Dict[str, Any]:
+        """Удалить клан"""
+
+    @abstractmethod
+    async def upgrade_clan(
+        self,
+        clan_id: int,
+        upgrade_one_level: bool = True,
+        cost: int = 0,
+        levels: int = 1,
+    ) -> Dict[str, Any]:
+        """Улучшить клан"""
+
+    @abstractmethod
+    async def update_clan_name(self, clan_id: int, new_name: str) -> bool:
+        """Переименовать клан"""
+
+    @abstractmethod
+    async def update_clan_description(self, clan_id: int, description: str) -> bool:
+        """Сменить описание клана"""
+
+    @abstractmethod
+    async def update_clan_settings(self, clan_id: int, settings_data: dict) -> bool:
+        """Сохранить настройки клана"""
+
+    @abstractmethod
+    async def get_clan_requirements(self, clan_id: int) -> Dict[str, Any]:
+        """Требования для вступления"""
+
+    @abstractmethod
+    async def update_clan_daily_income(self, clan_id: int, amount: int) -> bool:
+        """Записать дневной доход клана"""
+
+    @abstractmethod
+    async def get_player_contributions(self, user_id: int, clan_id: int) -> int:
+        """Вклады игрока в казну клана"""
+
+    @abstractmethod
+    async def check_clan_counters(self, fix: bool = False) -> List[Dict[str, Any]]:
+        """Сверить счетчики кланов (fix=True - исправить)"""
+
+    # ======================
+    # КАЗНА И ЛОГ КЛАНА
+    # ======================
+
+    @abstractmethod
+    async def deposit_to_clan_treasury(self, user_id: int, amount: int) -> Dict[str, Any]:
+        """Внести монеты в казну своего клана"""
+
+    @abstractmethod
+    async def subtract_treasury(self, clan_id: int, amount: int) -> bool:
+        """Снять монеты из казны"""
+
+    @abstractmethod
+    async def distribute_treasury(self, clan_id: int, mode: str, amount: int, user_id: int) -> Dict[str, Any]:
+        """Распределить казну участникам одной транзакцией"""
+
+    @abstractmethod
+    async def get_clan_treasury_log(
+        self,
+        clan_id: int,
+        limit: int = 10,
+        before: Optional[Tuple[str, int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Страница лога казны (before - курсор последней записи)"""
+
+    @abstractmethod
+    async def log_collection_with_user(
+        self,
+        clan_id: int,
+        user_id: int,
+        action_type: str,
+        amount: int,
+        description: str,
+    ) -> bool:
+        """Записать операцию в лог казны"""
+
+    @abstractmethod
+    async def get_clan_log(
+        self,
+        clan_id: int,
+        limit: int = 15,
+        before: Optional[Tuple[str, int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Страница лога клана (before - курсор последней записи)"""
+
+    @abstractmethod
+    async def log_clan_action(self, clan_id: int, user_id: int, action_type: str, details: str) -> bool:
+        """Записать действие в лог клана"""
+
+    # ======================
+    # ДВИЖЕНИЕ МОНЕТ
+    # ======================
+
+    @abstractmethod
+    async def update_player_balance(
+        self,
+        user_id: int,
+        amount: int,
+        transaction_type: str,
+        description: str,
+        admin_id: Optional[int] = None,
+        target_user_id: Optional[int] = None,
+        clan_id: Optional[int] = None,
+        other_user_id: Optional[int] = None,
+    ) -> bool:
+        """Изменить баланс и записать транзакцию"""
+
+    @abstractmethod
+    def add_ledger_listener(self, listener: Callable[[int, str, int, Optional[int]], None]) -> None:
+        """Подписаться на движение монет: listener(user_id, type, amount, other_user_id)"""
+
+    @abstractmethod
+    async def get_economy_by_type(self, hours: int) -> List[Dict[str, Any]]:
+        """Обороты по типам транзакций за hours часов"""
+
+    @abstractmethod
+    async def get_money_supply_range(self, hours: int) -> Optional[Dict[str, Any]]:
+        """Денежная масса в начале и в конце периода"""
+
+    @abstractmethod
+    async def rollup_economy(self, batch_size: int = 20000) -> Dict[str, int]:
+        """Добавить в сводки следующую пачку транзакций"""
+
+    @abstractmethod
+    async def clear_economy_rollups(self) -> None:
+        """Очистить сводки перед полным пересчетом"""
+
+    @abstractmethod
+    async def record_money_supply(self) -> None:
+        """Записать денежную массу за текущий час"""
+
+    # ======================
+    # ПРОВЕРКИ И ЗАЩИТА
+    # ======================
+
+    @abstractmethod
+    async def get_player_inspectors(self, user_id: int) -> List[int]:
+        """Купленные уровни инспекторов"""
+
+    @abstractmethod
+    async def buy_inspector_level(self, user_id: int, level: int) -> bool:
+        """Купить уровень инспектора"""
+
+    @abstractmethod
+    async def get_player_protections(self, user_id: int) -> List[int]:
+        """Купленные уровни защиты"""
+
+    @abstractmethod
+    async def buy_protection_level(self, user_id: int, level: int) -> bool:
+        """Купить уровень защиты"""
+
+    @abstractmethod
+    async def get_active_protection(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Активная защита игрока"""
+
+    @abstractmethod
+    async def activate_protection(self, user_id: int, level: int, duration_minutes: int) -> bool:
+        """Активировать защиту"""
+
+    @abstractmethod
+    async def get_all_active_protections(self) -> List[Dict[str, Any]]:
+        """Все активные защиты"""
+
+    @abstractmethod
+    async def delete_expired_protections(self, user_ids: List[int]) -> int:
+        """Удалить истекшие защиты"""
+
+    @abstractmethod
+    async def get_inspection_stats(self, user_id: int) -> Dict[str, Any]:
+        """Статистика проверок"""
+
+    @abstractmethod
+    async def get_protection_stats(self, user_id: int) -> Dict[str, Any]:
+        """Статистика защиты"""
+
+    @abstractmethod
+    async def update_protection_stats(self, user_id: int, spent: int = 0, blocked: bool = False) -> bool:
+        """Обновить статистику защиты"""
+
+    @abstractmethod
+    async def get_inspection_context(self, inspector_id: int, target_id: int, inspector_level: int) -> Optional[Dict[str, Any]]:
+        """Данные для приема проверки"""
+
+    @abstractmethod
+    async def reserve_inspection(self, user_id: int, daily_limit: int, cooldown_minutes: int) -> bool:
+        """Занять слот проверки"""
+
+    @abstractmethod
+    async def resolve_inspection(
+        self,
+        inspector_id: int,
+        target_id: int,
+        damage: int,
+        compensation_per_hall: int,
+        blocked: bool = False,
+    ) -> Dict[str, Any]:
+        """Применить результат проверки"""
+
+    @abstractmethod
+    async def get_inspection_time_mode(self) -> Dict[str, Any]:
+        """Режим 'Время проверок'"""
+
+    @abstractmethod
+    async def set_inspection_time_mode(self, is_active: bool, duration_hours: int = 0) -> bool:
+        """Включить/выключить режим проверок"""
+
+    @abstractmethod
+    async def extend_inspection_time_mode(self, extra_hours: int) -> Optional[str]:
+        """Продлить режим проверок"""
+
+    @abstractmethod
+    async def expire_inspection_time_mode(self, ends_at: str) -> bool:
+        """Выключить режим, закончившийся в ends_at (True - выключил этот вызов)"""
+
+    # ======================
+    # ПРОМОКОДЫ
+    # ======================
+
+    @abstractmethod
+    async def get_promo_info(self, code: str) -> Optional[Dict[str, Any]]:
+        """Информация о промокоде"""
+
+    @abstractmethod
+    async def use_promo_code(self, user_id: int, code: str) -> Dict[str, Any]:
+        """Активировать промокод"""
+
+    @abstractmethod
+    async def create_promo_code(
+        self,
+        code: str,
+        uses_total: int,
+        reward_type: str,
+        reward_amount: int,
+        created_by: int,
+        expires_days: Optional[int] = None,
+    ) -> bool:
+        """Создать промокод"""
+
+    @abstractmethod
+    async def delete_promo_code(self, code: str, admin_id: int) -> bool:
+        """Удалить промокод"""
+
+    @abstractmethod
+    async def count_promo_uses(self, code: str) -> int:
+        """Число активаций промокода"""
+
+    @abstractmethod
+    async def sum_promo_uses(self) -> int:
+        """Число активаций всех промокодов"""
+
+    @abstractmethod
+    async def get_promo_usage_stats(self) -> Dict[str, Any]:
+        """Статистика промокодов"""
+
+    @abstractmethod
+    async def update_promo_usage_stats(self, code: str, user_id: int) -> bool:
+        """Учесть активацию промокода"""
+
+    @abstractmethod
+    async def get_moderator_promo_stats(self, admin_id: int) -> Dict[str, Any]:
+        """Статистика промокодов модератора"""
+
+    @abstractmethod
+    async def update_moderator_promo_stats(self, admin_id: int, reward_type: str, reward_amount: int) -> bool:
+        """Учесть промокод, выданный модератором"""
+
+    # ======================
+    # ДОСТУП К КОМАНДЕ ИНФА
+    # ======================
+
+    @abstractmethod
+    async def get_info_access_status(self, user_id: int) -> bool:
+        """Есть ли у игрока доступ"""
+
+    @abstractmethod
+    async def get_info_access_details(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Срок и выдавший доступ"""
+
+    @abstractmethod
+    async def get_all_info_access(self) -> List[Dict[str, Any]]:
+        """Все выданные доступы"""
+
+    @abstractmethod
+    async def set_info_access(self, user_id: int, days: int, admin_id: int) -> bool:
+        """Выдать доступ на days дней"""
+
+    @abstractmethod
+    async def extend_info_access(self, user_id: int, days: int, admin_id: int) -> bool:
+        """Продлить доступ на days дней"""
+
+    @abstractmethod
+    async def remove_info_access(self, user_id: int, admin_id: int) -> bool:
+        """Забрать доступ"""
+
+    # ======================
+    # АДМИНИСТРАЦИЯ
+    # ======================
+
+    @abstractmethod
+    async def get_admins(self) -> List[Dict[str, Any]]:
+        """Администраторы: user_id, admin_level, admin_nickname"""
+
+    @abstractmethod
+    def add_admin_listener(self, listener: Callable[[int, int, Optional[str]], None]) -> None:
+        """Подписаться на смену прав: listener(user_id, admin_level, admin_nickname)"""
+
+    @abstractmethod
+    async def get_admin_level(self, user_id: int) -> int:
+        """Уровень администратора из базы"""
+
+    @abstractmethod
+    async def count_admins(self) -> int:
+        """Число администраторов"""
+
+    @abstractmethod
+    async def make_admin(self, user_id: int, admin_id: int, admin_level: int = 1) -> str:
+        """Назначить администратора"""
+
+    @abstractmethod
+    async def remove_admin(self, user_id: int, admin_id: int) -> bool:
+        """Снять администратора"""
+
+    @abstractmethod
+    async def set_admin_nickname(self, user_id: int, nickname: str) -> bool:
+        """Сменить ник администратора"""
+
+    @abstractmethod
+    async def increment_admin_stat(self, user_id: int, stat_name: str) -> bool:
+        """Увеличить счетчик действий администратора"""
+
+    @abstractmethod
+    async def get_admin_usage_stats(self, admin_id: int) -> Dict[str, Any]:
+        """Статистика команд администратора"""
+
+    @abstractmethod
+    async def add_admin_log(
+        self,
+        user_id: int,
+        admin_name: str,
+        admin_level: str,
+        action_type: str,
+        details: str = "",
+        log_type: str = "other",
+    ) -> bool:
+        """Записать действие администратора в лог"""
+
+    @abstractmethod
+    async def get_admin_logs(
+        self,
+        log_type: str = None,
+        limit: int = 50,
+        offset: int = 0,
+        before: Optional[Tuple[str, int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Страница логов администрации (before - курсор последней записи)"""
+
+    @abstractmethod
+    async def cleanup_old_logs(self, days: int = 15) -> int:
+        """Удалить логи старше days дней"""
+
+    @abstractmethod
+    async def set_custom_income(self, user_id: int, custom_income: Optional[int], admin_id: int) -> bool:
+        """Задать игроку свой доход (None - обычный)"""
+
+    @abstractmethod
+    async def set_dumbbell_level(self, user_id: int, new_level: int, admin_id: int) -> bool:
+        """Задать игроку уровень гантели"""
+
+    @abstractmethod
+    async def set_total_lifts(self, user_id: int, new_total: int, admin_id: int) -> bool:
+        """Задать игроку число поднятий"""
+
+    @abstractmethod
+    async def update_player_power(self, user_id: int, new_power: int, admin_id: Optional[int] = None) -> bool:
+        """Задать игроку силу"""
+
+    @abstractmethod
+    async def check_broadcast_limit(self, admin_id: int) -> Tuple[bool, Dict[str, Any]]:
+        """Проверить лимит рассылок: (можно ли, статистика)"""
+
+    @abstractmethod
+    async def get_broadcast_usage(self, admin_id: int) -> Dict[str, Any]:
+        """Статистика рассылок администратора"""
+
+    @abstractmethod
+    async def increment_broadcast_usage(self, admin_id: int) -> bool:
+        """Учесть рассылку"""
+
+    @abstractmethod
+    async def reset_broadcast_usage(self, admin_id: int) -> bool:
+        """Сбросить счетчик рассылок"""
+
+    # ======================
+    # ЗАЯВКИ
+    # ======================
+
+    @abstractmethod
+    async def create_request(
+        self,
+        request_id: int,
+        admin_id: int,
+        admin_name: str,
+        request_type: str,
+        target_id: int = None,
+        reason: str = "",
+        additional_info: Dict[str, Any] = None,
+    ) -> Dict[str, Any]:
+        """Создать заявку администратора"""
+
+    @abstractmethod
+    async def get_request_by_id(self, request_id: int) -> Optional[Dict[str, Any]]:
+        """Заявка по номеру"""
+
+    @abstractmethod
+    async def get_pending_requests(self) -> List[Dict[str, Any]]:
+        """Заявки на рассмотрении"""
+
+    @abstractmethod
+    async def get_requests_by_admin(self, admin_id: int) -> List[Dict[str, Any]]:
+        """Заявки администратора"""
+
+    @abstractmethod
+    async def approve_request(self, request_id: int, approved_by: int) -> Dict[str, Any]:
+        """Принять заявку"""
+
+    @abstractmethod
+    async def reject_request(
+        self,
+        request_id: int,
+        rejected_by: int,
+        reject_reason: str = "",
+    ) -> Dict[str, Any]:
+        """Отклонить заявку"""
+
+    @abstractmethod
+    async def delete_request(self, request_id: int) -> bool:
+        """Удалить заявку"""
+
+    @abstractmethod
+    async def get_request_stats(self) -> Dict[str, Any]:
+        """Статистика заявок"""
+
+    @abstractmethod
+    async def cleanup_old_requests(self, days: int = 15) -> int:
+        """Удалить заявки старше days дней"""
+
+    # ======================
+    # БАНЫ
+    # ======================
+
+    @abstractmethod
+    def add_ban_listener(self, listener: Callable[..., None]) -> None:
+        """Подписаться на баны: listener(user_id, ban_until, banned)"""
+
+    @abstractmethod
+    async def ban_player(self, user_id: int, admin_id: int, days: int, reason: str) -> bool:
+        """Забанить игрока на days дней"""
+
+    @abstractmethod
+    async def unban_player(self, user_id: int, admin_id: int) -> bool:
+        """Разбанить игрока"""
+
+    @abstractmethod
+    async def count_banned_players(self) -> int:
+        """Число забаненных в базе"""
+
+    @abstractmethod
+    async def get_banned_players(self) -> List[Tuple[int, Optional[str]]]:
+        """Забаненные игроки: (user_id, ban_until)"""
+
+    @abstractmethod
+    async def unban_expired_players(self, user_ids: List[int]) -> List[int]:
+        """Снять истекшие баны, вернуть разбаненных"""
+
+    # ======================
+    # СТАТИСТИКА
+    # ======================
+
+    @abstractmethod
+    async def count_players(self, regular_only: bool = False) -> int:
+        """Число игроков (regular_only - без администрации)"""
+
+    @abstractmethod
+    async def count_clans(self) -> int:
+        """Число кланов"""
+
+    @abstractmethod
+    async def count_total_balance(self) -> int:
+        """Сумма балансов всех игроков"""
+
+    @abstractmethod
+    async def count_table_rows(self, table_name: str) -> int:
+        """Число строк в таблице"""
+
+    @abstractmethod
+    async def sum_column(self, table_name: str, column_name: str) -> int:
+        """Сумма колонки таблицы"""
+
+    @abstractmethod
+    def get_replica_refreshed_at(self) -> Optional[datetime]:
+        """Время снимка для отчетов (None - отчеты читают основную базу)"""
+
+    # ======================
+    # ОБСЛУЖИВАНИЕ
+    # ======================
+
+    @abstractmethod
+    async def create_tables(self, path: Optional[str] = None) -> None:
+        """Создать или обновить схему"""
+
+    @abstractmethod
+    async def flush_last_active(self) -> int:
+        """Записать накопленные отметки активности, вернуть число игроков"""
+
+    @abstractmethod
+    def count_pending_activity(self) -> int:
+        """Отметки активности, ожидающие записи"""
+
+    @abstractmethod
+    async def delete_player(
+        self,
+        user_id: int,
+        admin_id: int,
+        on_progress: Optional[db.ProgressCallback] = None,
+    ) -> bool:
+        """Удалить игрока со всей историей (пачками)"""
+
+    @abstractmethod
+    async def reset_all(self, on_progress: Optional[db.ProgressCallback] = None) -> Dict[str, Any]:
+        """Сбросить все аккаунты, кроме администрации (пачками)"""
+
+    @abstractmethod
+    async def reset_all_by_swap(self) -> Dict[str, Any]:
+        """Сбросить все аккаунты заменой файла базы"""
+
+
+class SQLiteStorage(Storage):
+    """Хранилище на SQLite (aiosqlite, bot.db)"""
+
+    async def get_player(self, user_id):
+        return await db.get_player(user_id)
+
+    async def create_player(self, user_id, username):
+        return await db.create_player(user_id, username)
+
+    async def update_username(self, user_id, new_username, admin_id=None):
+        return await db.update_username(user_id, new_username, admin_id)
+
+    async def get_player_fitness_halls(self, user_id):
+        return await db.get_player_fitness_halls(user_id)
+
+    async def update_fitness_halls(self, user_id, amount, total_price=0):
+        return await db.update_fitness_halls(user_id, amount, total_price)
+
+    async def buy_fitness_halls(self, user_id, amount, total_price):
+        return await db.buy_fitness_halls(user_id, amount, total_price)
+
+    async def record_dumbbell_lift(self, user_id, power_gained):
+        return await db.record_dumbbell_lift(user_id, power_gained)
+
+    async def update_dumbbell_level(self, user_id, new_level, dumbbell_name):
+        return await db.update_dumbbell_level(user_id, new_level, dumbbell_name)
+
+    async def get_all_players(self, limit=100):
+        return await db.get_all_players(limit)
+
+    async def get_recent_players(self, limit=10):
+        return await db.get_recent_players(limit)
+
+    async def get_coach_level(self, user_id):
+        return await db.get_coach_level(user_id)
+
+    async def update_coach_level(self, user_id, new_level):
+        return await db.update_coach_level(user_id, new_level)
+
+    async def get_coach_stats(self, user_id):
+        return await db.get_coach_stats(user_id)
+
+    async def get_last_training_time(self, user_id):
+        return await db.get_last_training_time(user_id)
+
+    async def perform_training(self, user_id, levels, cooldown):
+        return await db.perform_training(user_id, levels, cooldown)
+
+    async def get_all_players_with_halls(self):
+        return await db.get_all_players_with_halls()
+
+    async def add_daily_fitness_hall_income(self, user_id, amount, description):
+        return await db.add_daily_fitness_hall_income(user_id, amount, description)
+
+    async def get_daily_income_stats(self, user_id):
+        return await db.get_daily_income_stats(user_id)
+
+    async def reset_daily_income_stats(self):
+        return await db.reset_daily_income_stats()
+
+    async def get_top_balance(self, limit=10):
+        return await db.get_top_balance(limit)
+
+    async def get_top_lifts(self, limit=10):
+        return await db.get_top_lifts(limit)
+
+    async def get_top_power(self, limit=10):
+        return await db.get_top_power(limit)
+
+    async def get_top_fitness_halls(self, limit=10):
+        return await db.get_top_fitness_halls(limit)
+
+    async def get_leaderboard_version(self, board):
+        return await db.get_leaderboard_version(board)
+
+    async def set_leaderboard_threshold(self, board, threshold):
+        return await db.set_leaderboard_threshold(board, threshold)
+
+    async def get_top_earners_period(self, days, limit=5):
+        return await db.get_top_earners_period(days, limit)
+
+    async def get_player_clan(self, user_id):
+        return await db.get_player_clan(user_id)
+
+    async def get_player_context(self, user_id):
+        return await db.get_player_context(user_id)
+
+    async def create_clan(self, tag, name, owner_id):
+        return await db.create_clan(tag, name, owner_id)
+
+    async def get_clan_by_tag(self, tag):
+        return await db.get_clan_by_tag(tag)
+
+    async def get_all_clans(self, limit=100):
+        return await db.get_all_clans(limit)
+
+    async def get_top_clans(self, limit=10, order="level"):
+        return await db.get_top_clans(limit, order)
+
+    async def get_clan_members(self, clan_id, limit=50):
+        return await db.get_clan_members(clan_id, limit)
+
+    async def get_clan_member_count(self, clan_id):
+        return await db.get_clan_member_count(clan_id)
+
+    async def get_member_clan_role(self, user_id, clan_id):
+        return await db.get_member_clan_role(user_id, clan_id)
+
+    async def join_clan(self, user_id, clan_id):
+        return await db.join_clan(user_id, clan_id)
+
+    async def leave_clan(self, user_id, clan_id):
+        return await db.leave_clan(user_id, clan_id)
+
+    async def kick_clan_member(self, clan_id, user_id):
+        return await db.kick_clan_member(clan_id, user_id)
+
+    async def add_clan_lift_income(self, clan_id, user_id, amount, description):
+        return await db.add_clan_lift_income(clan_id, user_id, amount, description)
+
+    async def set_clan_role(self, clan_id, user_id, role):
+        return await db.set_clan_role(clan_id, user_id, role)
+
+    async def transfer_clan_ownership(self, clan_id, owner_id, new_owner_id, cost, description):
+        return await db.transfer_clan_ownership(clan_id, owner_id, new_owner_id, cost, description)
+
+    async def unban_clan_member(self, clan_id, user_id):
+        return await db.unban_clan_member(clan_id, user_id)
+
+    async def delete_clan(self, clan_id):
+        return await db.delete_clan(clan_id)
+
+    async def upgrade_clan(self, clan_id, upgrade_one_level=True, cost=0, levels=1):
+        return await db.upgrade_clan(clan_id, upgrade_one_level, cost, levels)
+
+    async def update_clan_name(self, clan_id, new_name):
+        return await db.update_clan_name(clan_id, new_name)
+
+    async def update_clan_description(self, clan_id, description):
+        return await db.update_clan_description(clan_id, description)
+
+    async def update_clan_settings(self, clan_id, settings_data):
+        return await db.update_clan_settings(clan_id, settings_data)
+
+    async def get_clan_requirements(self, clan_id):
+        return await db.get_clan_requirements(clan_id)
+
+    async def update_clan_daily_income(self, clan_id, amount):
+        return await db.update_clan_daily_income(clan_id, amount)
+
+    async def get_player_contributions(self, user_id, clan_id):
+        return await db.get_player_contributions(user_id, clan_id)
+
+    async def check_clan_counters(self, fix=False):
+        return await db.check_clan_counters(fix)
+
+    async def deposit_to_clan_treasury(self, user_id, amount):
+        return await db.deposit_to_clan_treasury(user_id, amount)
+
+    async def subtract_treasury(self, clan_id, amount):
+        return await db.subtract_treasury(clan_id, amount)
+
+    async def distribute_treasury(self, clan_id, mode, amount, user_id):
+        return await db.distribute_treasury(clan_id, mode, amount, user_id)
+
+    async def get_clan_treasury_log(self, clan_id, limit=10, before=None):
+        return await db.get_clan_treasury_log(clan_id, limit, before)
+
+    async def log_collection_with_user(self, clan_id, user_id, action_type, amount, description):
+        return await db.log_collection_with_user(clan_id, user_id, action_type, amount, description)
+
+    async def get_clan_log(self, clan_id, limit=15, before=None):
+        return await db.get_clan_log(clan_id, limit, before)
+
+    async def log_clan_action(self, clan_id, user_id, action_type, details):
+        return await db.log_clan_action(clan_id, user_id, action_type, details)
+
+    async def update_player_balance(
+        self,
+        user_id,
+        amount,
+        transaction_type,
+        description,
+        admin_id=None,
+        target_user_id=None,
+        clan_id=None,
+        other_user_id=None,
+    ):
+        return await db.update_player_balance(
+            user_id, amount, transaction_type, description,
+            admin_id, target_user_id, clan_id, other_user_id,
+        )
+
+    def add_ledger_listener(self, listener):
+        db.LEDGER_LISTENERS.append(listener)
+
+    async def get_economy_by_type(self, hours):
+        return await db.get_economy_by_type(hours)
+
+    async def get_money_supply_range(self, hours):
+        return await db.get_money_supply_range(hours)
+
+    async def rollup_economy(self, batch_size=20000):
+        return await db.rollup_economy(batch_size)
+
+    async def clear_economy_rollups(self):
+        return await db.clear_economy_rollups()
+
+    async def record_money_supply(self):
+        return await db.record_money_supply()
+
+    async def get_player_inspectors(self, user_id):
+        return [row["level"] for row in await db.get_player_inspectors(user_id)]
+
+    async def buy_inspector_level(self, user_id, level):
+        return await db.buy_inspector_level(user_id, level)
+
+    async def get_player_protections(self, user_id):
+        return [row["level"] for row in await db.get_player_protections(user_id)]
+
+    async def buy_protection_level(self, user_id, level):
+        return await db.buy_protection_level(user_id, level)
+
+    async def get_active_protection(self, user_id):
+        return await db.get_active_protection(user_id)
+
+    async def activate_protection(self, user_id, level, duration_minutes):
+        return await db.activate_protection(user_id, level, duration_minutes)
+
+    async def get_all_active_protections(self):
+        return await db.get_all_active_protections()
+
+    async def delete_expired_protections(self, user_ids):
+        return await db.delete_expired_protections(user_ids)
+
+    async def get_inspection_stats(self, user_id):
+        return await db.get_inspection_stats(user_id)
+
+    async def get_protection_stats(self, user_id):
+        return await db.get_protection_stats(user_id)
+
+    async def update_protection_stats(self, user_id, spent=0, blocked=False):
+        return await db.update_protection_stats(user_id, spent, blocked)
+
+    async def get_inspection_context(self, inspector_id, target_id, inspector_level):
+        return await db.get_inspection_context(inspector_id, target_id, inspector_level)
+
+    async def reserve_inspection(self, user_id, daily_limit, cooldown_minutes):
+        return await db.reserve_inspection(user_id, daily_limit, cooldown_minutes)
+
+    async def resolve_inspection(self, inspector_id, target_id, damage, compensation_per_hall, blocked=False):
+        return await db.resolve_inspection(inspector_id, target_id, damage, compensation_per_hall, blocked)
+
+    async def get_inspection_time_mode(self):
+        return await db.get_inspection_time_mode()
+
+    async def set_inspection_time_mode(self, is_active, duration_hours=0):
+        return await db.set_inspection_time_mode(is_active, duration_hours)
+
+    async def extend_inspection_time_mode(self, extra_hours):
+        return await db.extend_inspection_time_mode(extra_hours)
+
+    async def expire_inspection_time_mode(self, ends_at):
+        return await db.expire_inspection_time_mode(ends_at)
+
+    async def get_promo_info(self, code):
+        return await db.get_promo_info(code)
+
+    async def use_promo_code(self, user_id, code):
+        return await db.use_promo_code(user_id, code)
+
+    async def create_promo_code(
+        self,
+        code,
+        uses_total,
+        reward_type,
+        reward_amount,
+        created_by,
+        expires_days=None,
+    ):
+        return await db.create_promo_code(
+            code, uses_total, reward_type, reward_amount, created_by, expires_days,
+        )
+
+    async def delete_promo_code(self, code, admin_id):
+        return await db.delete_promo_code(code, admin_id)
+
+    async def count_promo_uses(self, code):
+        return await db.count_promo_uses(code)
+
+    async def sum_promo_uses(self):
+        return await db.sum_promo_uses()
+
+    async def get_promo_usage_stats(self):
+        return await db.get_promo_usage_stats()
+
+    async def update_promo_usage_stats(self, code, user_id):
+        return await db.update_promo_usage_stats(code, user_id)
+
+    async def get_moderator_promo_stats(self, admin_id):
+        return await db.get_moderator_promo_stats(admin_id)
+
+    async def update_moderator_promo_stats(self, admin_id, reward_type, reward_amount):
+        return await db.update_moderator_promo_stats(admin_id, reward_type, reward_amount)
+
+    async def get_info_access_status(self, user_id):
+        return await db.get_info_access_status(user_id)
+
+    async def get_info_access_details(self, user_id):
+        return await db.get_info_access_details(user_id)
+
+    async def get_all_info_access(self):
+        return await db.get_all_info_access()
+
+    async def set_info_access(self, user_id, days, admin_id):
+        return await db.set_info_access(user_id, days, admin_id)
+
+    async def extend_info_access(self, user_id, days, admin_id):
+        return await db.extend_info_access(user_id, days, admin_id)
+
+    async def remove_info_access(self, user_id, admin_id):
+        return await db.remove_info_access(user_id, admin_id)
+
+    async def get_admins(self):
+        return await db.get_admins()
+
+    def add_admin_listener(self, listener):
+        db.ADMIN_CHANGE_LISTENERS.append(listener)
+
+    async def get_admin_level(self, user_id):
+        return await db.get_admin_level(user_id)
+
+    async def count_admins(self):
+        return await db.count_admins()
+
+    async def make_admin(self, user_id, admin_id, admin_level=1):
+        return await db.make_admin(user_id, admin_id, admin_level)
+
+    async def remove_admin(self, user_id, admin_id):
+        return await db.remove_admin(user_id, admin_id)
+
+    async def set_admin_nickname(self, user_id, nickname):
+        return await db.set_admin_nickname(user_id, nickname)
+
+    async def increment_admin_stat(self, user_id, stat_name):
+        return await db.increment_admin_stat(user_id, stat_name)
+
+    async def get_admin_usage_stats(self, admin_id):
+        return await db.get_admin_usage_stats(admin_id)
+
+    async def add_admin_log(
+        self,
+        user_id,
+        admin_name,
+        admin_level,
+        action_type,
+        details="",
+        log_type="other",
+    ):
+        return await db.add_admin_log(user_id, admin_name, admin_level, action_type, details, log_type)
+
+    async def get_admin_logs(self, log_type=None, limit=50, offset=0, before=None):
+        return await db.get_admin_logs(log_type, limit, offset, before)
+
+    async def cleanup_old_logs(self, days=15):
+        return await db.cleanup_old_logs(days)
+
+    async def set_custom_income(self, user_id, custom_income, admin_id):
+        return await db.set_custom_income(user_id, custom_income, admin_id)
+
+    async def set_dumbbell_level(self, user_id, new_level, admin_id):
+        return await db.set_dumbbell_level(user_id, new_level, admin_id)
+
+    async def set_total_lifts(self, user_id, new_total, admin_id):
+        return await db.set_total_lifts(user_id, new_total, admin_id)
+
+    async def update_player_power(self, user_id, new_power, admin_id=None):
+        return await db.update_player_power(user_id, new_power, admin_id)
+
+    async def check_broadcast_limit(self, admin_id):
+        return await db.check_broadcast_limit(admin_id)
+
+    async def get_broadcast_usage(self, admin_id):
+        return await db.get_broadcast_usage(admin_id)
+
+    async def increment_broadcast_usage(self, admin_id):
+        return await db.increment_broadcast_usage(admin_id)
+
+    async def reset_broadcast_usage(self, admin_id):
+        return await db.reset_broadcast_usage(admin_id)
+
+    async def create_request(
+        self,
+        request_id,
+        admin_id,
+        admin_name,
+        request_type,
+        target_id=None,
+        reason="",
+        additional_info=None,
+    ):
+        return await db.create_request(
+            request_id, admin_id, admin_name, request_type, target_id, reason, additional_info,
+        )
+
+    async def get_request_by_id(self, request_id):
+        return await db.get_request_by_id(request_id)
+
+    async def get_pending_requests(self):
+        return await db.get_pending_requests()
+
+    async def get_requests_by_admin(self, admin_id):
+        return await db.get_requests_by_admin(admin_id)
+
+    async def approve_request(self, request_id, approved_by):
+        return await db.approve_request(request_id, approved_by)
+
+    async def reject_request(self, request_id, rejected_by, reject_reason=""):
+        return await db.reject_request(request_id, rejected_by, reject_reason)
+
+    async def delete_request(self, request_id):
+        return await db.delete_request(request_id)
+
+    async def get_request_stats(self):
+        return await db.get_request_stats()
+
+    async def cleanup_old_requests(self, days=15):
+        return await db.cleanup_old_requests(days)
+
+    def add_ban_listener(self, listener):
+        db.BAN_CHANGE_LISTENERS.append(listener)
+
+    async def ban_player(self, user_id, admin_id, days, reason):
+        return await db.ban_player(user_id, admin_id, days, reason)
+
+    async def unban_player(self, user_id, admin_id):
+        return await db.unban_player(user_id, admin_id)
+
+    async def count_banned_players(self):
+        return await db.count_banned_players()
+
+    async def get_banned_players(self):
+        return await db.get_banned_players()
+
+    async def unban_expired_players(self, user_ids):
+        return await db.unban_expired_players(user_ids)
+
+    async def count_players(self, regular_only=False):
+        return await db.count_players(regular_only)
+
+    async def count_clans(self):
+        return await db.count_clans()
+
+    async def count_total_balance(self):
+        return await db.count_total_balance()
+
+    async def count_table_rows(self, table_name):
+        return await db.count_table_rows(table_name)
+
+    async def sum_column(self, table_name, column_name):
+        return await db.sum_column(table_name, column_name)
+
+    def get_replica_refreshed_at(self):
+        return db.get_replica_refreshed_at()
+
+    async def create_tables(self, path=None):
+        return await db.create_tables(path)
+
+    async def flush_last_active(self):
+        return await db.flush_last_active()
+
+    def count_pending_activity(self):
+        return len(db.LAST_ACTIVE)
+
+    async def delete_player(self, user_id, admin_id, on_progress=None):
+        return await db.delete_player(user_id, admin_id, on_progress)
+
+    async def reset_all(self, on_progress=None):
+        return await db.reset_all(on_progress)
+
+    async def reset_all_by_swap(self):
+        return await db.reset_all_by_swap()
+
+
+_storage: Optional[Storage] = None
+
+
+def get_storage() -> Storage:
+    """Текущее хранилище процесса"""
+    global _storage
+    if _storage is None:
+        _storage = SQLiteStorage()
+    return _storage
+
+
+def set_storage(storage: Storage) -> None:
+    """Подменить хранилище (другой движок или тестовый стенд)"""
+    global _storage
+    _storage = storage
@@ -0,0 +1,67 @@
+# bot/tests/conftest.py
+"""
+Общие фикстуры тестов.
+
+Каталог репозитория - это пакет bot (Config.py здесь - bot/core/config.py
+в развернутом боте). Если пакет bot не установлен, он собирается из этого
+каталога, чтобы тесты запускались прямо из checkout:
+    python -m pytest -q
+Каждый тест получает свою временную базу.
+"""
+import os
+import sys
+import types
+import asyncio
+import importlib
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).absolute().parent.parent
+
+os.environ.setdefault("BOT_TOKEN", "test")
+
+
+def _mount_checkout():
+    """Зарегистрировать каталог репозитория как пакет bot"""
+    package = types.ModuleType("bot")
+    package.__path__ = [str(ROOT)]
+    core = types.ModuleType("bot.core")
+    core.__path__ = []
+    sys.modules["bot"] = package
+    sys.modules["bot.core"] = core
+    package.core = core
+
+    spec = importlib.util.spec_from_file_location("bot.core.config", ROOT / "Config.py")
+    config = importlib.util.module_from_spec(spec)
+    sys.modules["bot.core.config"] = config
+    spec.loader.exec_module(config)
+    core.config = config
+
+
+try:
+    importlib.import_module("bot.core.config")
+except ImportError:
+    _mount_checkout()
+
+
+def run(coro):
+    """Выполнить корутину в отдельном цикле событий"""
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Пустая база со всеми таблицами во временном каталоге"""
+    from bot.core.config import settings
+    from bot import db
+
+    path = str(tmp_path / "gym_legend.db")
+    monkeypatch.setattr(settings, "DATABASE_PATH", path)
+    # Отчеты читают основную базу, реплика в тестах не снимается
+    monkeypatch.setattr(settings, "REPLICA_ENABLED", False)
+    db.LAST_ACTIVE.clear()
+    run(db.create_tables())
+    yield path
+    db.LAST_ACTIVE.clear()
@@ -0,0 +1,63 @@
+# bot/tests/test_delete_player.py
+"""
+Каскадное удаление игрока: членство в клане удаляется вместе с ним,
+клан удаленного владельца переходит участнику или удаляется, если пуст.
+"""
+import asyncio
+
+from bot import db
+
+ADMIN_ID = 100
+
+
+async def _clan_with_members(owner_id: int, *member_ids: int) -> int:
+    for user_id in (owner_id, *member_ids, ADMIN_ID):
+        await db.create_player(user_id, f"player{user_id}")
+    clan_id = (await db.create_clan("TST", "Test", owner_id))["clan_id"]
+    for user_id in member_ids:
+        await db.join_clan(user_id, clan_id)
+    return clan_id
+
+
+async def _member_rows(clan_id: int):
+    async with db.connect() as conn:
+        async with conn.execute(
+            "SELECT user_id, role FROM clan_members WHERE clan_id = ? ORDER BY user_id", (clan_id,)
+        ) as cur:
+            return [tuple(row) for row in await cur.fetchall()]
+
+
+def test_deleted_member_leaves_clan(database):
+    async def scenario():
+        clan_id = await _clan_with_members(1, 2, 3)
+        assert await db.delete_player(3, ADMIN_ID)
+        return clan_id, await db.get_clan_by_id(clan_id), await _member_rows(clan_id)
+
+    clan_id, clan, members = asyncio.run(scenario())
+    assert clan["member_count"] == 2
+    assert members == [(1, "owner"), (2, "member")]
+
+
+def test_deleted_owner_hands_clan_to_officer(database):
+    async def scenario():
+        clan_id = await _clan_with_members(1, 2, 3)
+        await db.set_clan_role(clan_id, 3, "officer")
+        assert await db.delete_player(1, ADMIN_ID)
+        return clan_id, await db.get_clan_by_id(clan_id), await _member_rows(clan_id), await db.get_player(3)
+
+    clan_id, clan, members, new_owner = asyncio.run(scenario())
+    assert clan["owner_id"] == 3
+    assert clan["member_count"] == 2
+    assert members == [(2, "member"), (3, "owner")]
+    assert new_owner["clan_role"] == "owner"
+
+
+def test_deleted_sole_owner_removes_clan(database):
+    async def scenario():
+        clan_id = await _clan_with_members(1)
+        assert await db.delete_player(1, ADMIN_ID)
+        return await db.get_clan_by_id(clan_id), await _member_rows(clan_id)
+
+    clan, members = asyncio.run(scenario())
+    assert clan is None
+    assert members == []
@@ -0,0 +1,60 @@
+# bot/tests/test_inspection_concurrency.py
+"""
+Нагрузочная проверка resolve_inspection: много параллельных проверок одной
+цели. Каждое соединение aiosqlite работает в своем потоке, так что проверки
+действительно конкурируют за блокировку записи.
+"""
+import asyncio
+import sqlite3
+
+from bot import db
+
+INSPECTORS = 30
+START_HALLS = 40
+DAMAGE = 3
+COMPENSATION_PER_HALL = 25
+TARGET_ID = 1
+
+
+async def _resolve_in_parallel():
+    for user_id in range(TARGET_ID, TARGET_ID + INSPECTORS + 1):
+        await db.create_player(user_id, f"player{user_id}")
+    await db.update_fitness_halls(TARGET_ID, START_HALLS)
+
+    return await asyncio.gather(*[
+        db.resolve_inspection(inspector_id, TARGET_ID, DAMAGE, COMPENSATION_PER_HALL)
+        for inspector_id in range(TARGET_ID + 1, TARGET_ID + INSPECTORS + 1)
+    ])
+
+
+def test_parallel_inspections_close_each_hall_once(database):
+    results = asyncio.run(_resolve_in_parallel())
+
+    assert all(result["success"] for result in results), results
+    closed = sum(result["halls_closed"] for result in results)
+    # Спрос (30 * 3) больше, чем залов: закрыто ровно столько, сколько было
+    assert closed == START_HALLS
+    assert all(result["halls_left"] >= 0 for result in results)
+    assert sum(result["compensation"] for result in results) == closed * COMPENSATION_PER_HALL
+
+    conn = sqlite3.connect(database)
+    try:
+        halls, balance = conn.execute(
+            "SELECT fitness_halls, balance FROM players WHERE user_id = ?", (TARGET_ID,)
+        ).fetchone()
+        paid, payments = conn.execute(
+            """SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM transactions
+               WHERE user_id = ? AND type = 'inspection_compensation'""",
+            (TARGET_ID,)
+        ).fetchone()
+        logged_closed, inspections = conn.execute(
+            "SELECT SUM(halls_closed), COUNT(*) FROM inspections WHERE target_id = ?", (TARGET_ID,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+    assert halls == 0
+    # Компенсация выплачена ровно один раз за каждый закрытый зал
+    assert paid == balance == START_HALLS * COMPENSATION_PER_HALL
+    assert payments == sum(1 for result in results if result["compensation"] > 0)
+    assert (logged_closed, inspections) == (START_HALLS, INSPECTORS)
@@ -0,0 +1,66 @@
+# bot/tests/test_leaderboards.py
+"""
+Рейтинги без забаненных: запрос добирает места только за баны в окне,
+а кэш текста сбрасывается, когда меняется видимый топ.
+"""
+import asyncio
+
+import pytest
+
+from bot import db
+from bot import top
+from bot.services import bans
+
+PLAYERS = 15
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(bans, "BANNED", set())
+    monkeypatch.setattr(top, "LEADERBOARD_CACHE", {})
+    return bans.BANNED
+
+
+async def _players_with_balances():
+    # Игрок i получает баланс i * 100: первое место - последний игрок
+    async with db.connect() as conn:
+        for user_id in range(1, PLAYERS + 1):
+            await conn.execute(
+                "INSERT INTO players (user_id, username, balance) VALUES (?, ?, ?)",
+                (user_id, f"player{user_id}", user_id * 100),
+            )
+        await conn.commit()
+
+
+def test_fetch_extends_only_by_banned_in_window(database, registry):
+    registry.update({PLAYERS, PLAYERS - 3, 1})
+    limits = []
+
+    async def fetch(limit):
+        limits.append(limit)
+        return await db.get_top_balance(limit)
+
+    async def scenario():
+        await _players_with_balances()
+        return await bans.fetch_without_banned(fetch, 10)
+
+    rows = asyncio.run(scenario())
+    assert [row[0] for row in rows] == [14, 13, 11, 10, 9, 8, 7, 6, 5, 4]
+    # Игрок 1 вне окна и не увеличивает запрос
+    assert limits == [10, 12]
+
+
+def test_leaderboard_rebuilds_when_visible_tail_changes(database, registry):
+    registry.add(PLAYERS)
+
+    async def scenario():
+        await _players_with_balances()
+        before = await top.get_leaderboard_text("balance")
+        # Последнее видимое место (игрок 5) ниже десятого места без учета банов
+        await db.update_player_balance(5, 1, "admin_add_balance", "тест")
+        after = await top.get_leaderboard_text("balance")
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert "player15" not in before
+    assert "501" not in before and "501" in after
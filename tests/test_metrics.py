@@ -0,0 +1,59 @@
+# bot/tests/test_metrics.py
+"""
+Метрики: SQL-запросы считаются на команду, открывшую соединение,
+отдельно от вызовов функций db; сервисы сами регистрируют свои метрики.
+"""
+import time
+import asyncio
+
+from bot import db
+from bot.services import metrics
+
+COMMAND = ("tests", "profile_handler")
+
+
+async def _profile_command():
+    # Так MetricsMiddleware и обертка обработчика размечают сообщение
+    metrics._event_context.set({"command": COMMAND, "started": time.perf_counter()})
+    await db.create_player(1, "player1")
+    return await db.get_player(1)
+
+
+def test_queries_are_counted_per_command(database, monkeypatch):
+    monkeypatch.setattr(metrics, "DB_QUERIES", type(metrics.DB_QUERIES)(int))
+    monkeypatch.setattr(metrics, "DAO_CALLS", type(metrics.DAO_CALLS)(int))
+
+    assert asyncio.run(_profile_command())["username"] == "player1"
+
+    queries = metrics.DB_QUERIES[COMMAND]
+    calls = sum(count for key, count in metrics.DAO_CALLS.items() if key[:2] == COMMAND)
+    assert calls == 2
+    # create_player - несколько запросов, BEGIN/COMMIT не считаются
+    assert queries > calls
+    assert metrics.BACKGROUND not in metrics.DB_QUERIES
+
+    rendered = metrics.render_metrics()
+    assert f'bot_db_queries_total{{labeler="tests",command="profile_handler"}} {queries}' in rendered
+
+
+def test_services_export_their_own_metrics():
+    from bot.services import users, bans, backup, replica, economy, fraud, activity
+
+    rendered = metrics.render_metrics()
+    for service in (users, bans, backup, replica, economy, fraud, activity):
+        assert service._export_metrics in metrics.COLLECTORS
+    for series in ("bot_acl_admins", "bot_banned_players", "bot_backups_total", "bot_replica_refreshes_total",
+                   "bot_economy_rollup_backlog", "bot_fraud_queue", "bot_last_active_pending"):
+        assert f"# TYPE {series} " in rendered
+
+
+def test_failing_collector_does_not_break_export(monkeypatch):
+    monkeypatch.setattr(metrics, "COLLECTORS", [])
+
+    @metrics.register_collector
+    def broken():
+        raise RuntimeError("boom")
+
+    metrics.register_collector(lambda: ["bot_test_gauge 1"])
+
+    assert "bot_test_gauge 1" in metrics.render_metrics()
@@ -0,0 +1,69 @@
+# bot/tests/test_slow_queries.py
+"""
+Журнал медленных запросов: SELECT замеряется вместе с выборкой строк,
+ожидание блокировки на BEGIN учитывается отдельно от запросов.
+"""
+import time
+import sqlite3
+
+import pytest
+
+from bot.core.config import settings
+from bot.services import slow_queries
+from bot.services.slow_queries import SlowQueryConnection, get_slow_queries, get_lock_waits
+
+SLOW_MS = 20
+
+
+@pytest.fixture
+def journal(monkeypatch):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", SLOW_MS)
+    slow_queries.reset_slow_queries()
+    yield
+    slow_queries.reset_slow_queries()
+
+
+def _connect(path, **kwargs):
+    conn = sqlite3.connect(path, factory=SlowQueryConnection, **kwargs)
+    # Медленная функция: SQLite вызывает ее при чтении строк, а не в execute()
+    conn.create_function("pause", 1, lambda ms: time.sleep(ms / 1000) or ms)
+    return conn
+
+
+def test_select_is_timed_with_its_fetch(journal, tmp_path):
+    conn = _connect(str(tmp_path / "slow.db"))
+    try:
+        conn.execute("CREATE TABLE numbers (n INTEGER)")
+        conn.executemany("INSERT INTO numbers VALUES (?)", [(n,) for n in range(5)])
+
+        cursor = conn.execute("SELECT pause(?) FROM numbers", (10,))
+        assert get_slow_queries() == []
+        assert len(cursor.fetchall()) == 5
+    finally:
+        conn.close()
+
+    [entry] = get_slow_queries()
+    assert entry["sql"] == "SELECT pause(?) FROM numbers"
+    assert entry["count"] == 1
+    assert entry["max_ms"] >= 5 * 10
+    assert entry["params"] == "(int)"
+    assert "SCAN numbers" in entry["plan"]
+
+
+def test_begin_lock_wait_is_not_a_slow_query(journal, tmp_path):
+    path = str(tmp_path / "locked.db")
+    holder = sqlite3.connect(path)
+    waiter = _connect(path, timeout=SLOW_MS * 3 / 1000)
+    try:
+        holder.execute("BEGIN IMMEDIATE")
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            waiter.execute("BEGIN IMMEDIATE")
+    finally:
+        holder.rollback()
+        holder.close()
+        waiter.close()
+
+    assert get_slow_queries() == []
+    [wait] = get_lock_waits()
+    assert wait["sql"] == "BEGIN IMMEDIATE"
+    assert wait["max_ms"] >= SLOW_MS
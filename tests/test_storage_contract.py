@@ -0,0 +1,401 @@
+# bot/tests/test_storage_contract.py
+"""
+Контрактные тесты Storage: одни и те же сценарии для каждой реализации.
+
+Новая реализация добавляется в BACKENDS вместе с подготовкой данных,
+которой нет в интерфейсе (создание клана, промокода).
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from bot import db
+from bot.storage import Storage, SQLiteStorage
+
+
+class SQLiteBackend:
+    """SQLiteStorage на временной базе (фикстура database)"""
+
+    name = "sqlite"
+
+    def storage(self) -> Storage:
+        return SQLiteStorage()
+
+    async def create_clan(self, tag: str, name: str, owner_id: int) -> int:
+        result = await db.create_clan(tag, name, owner_id)
+        assert result["success"], result
+        return result["clan_id"]
+
+    async def join_clan(self, user_id: int, clan_id: int):
+        result = await db.join_clan(user_id, clan_id)
+        assert result["success"], result
+
+    async def kick_clan_member(self, clan_id: int, user_id: int):
+        await db.kick_clan_member(clan_id, user_id)
+
+    async def create_promo(self, code: str, uses: int, reward_type: str, amount: int):
+        assert await db.create_promo_code(code, uses, reward_type, amount, created_by=1)
+
+
+BACKENDS = [SQLiteBackend]
+
+
+@pytest.fixture(params=BACKENDS, ids=lambda backend: backend.name)
+def backend(request, database):
+    return request.param()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _players(storage: Storage, *user_ids: int):
+    for user_id in user_ids:
+        await storage.create_player(user_id, f"player{user_id}")
+
+
+# ======================
+# ИГРОКИ
+# ======================
+
+def test_create_and_get_player(backend):
+    async def scenario(storage):
+        created = await storage.create_player(1, "Иван")
+        player = await storage.get_player(1)
+        missing = await storage.get_player(2)
+        return created, player, missing
+
+    created, player, missing = run(scenario(backend.storage()))
+    assert created["user_id"] == 1
+    assert player["username"] == "Иван"
+    assert player["balance"] == 0
+    assert missing is None
+
+
+def test_fitness_halls(backend):
+    async def scenario(storage):
+        await _players(storage, 1)
+        after_add = await storage.update_fitness_halls(1, 5)
+        after_take = await storage.update_fitness_halls(1, -2)
+        return after_add, after_take, await storage.get_player_fitness_halls(1)
+
+    assert run(scenario(backend.storage())) == (5, 3, 3)
+
+
+def test_buy_fitness_halls(backend):
+    async def scenario(storage):
+        await _players(storage, 1)
+        poor = await storage.buy_fitness_halls(1, 2, 100)
+        await storage.update_player_balance(1, 1000, "admin_add_balance", "тест")
+        bought = await storage.buy_fitness_halls(1, 2, 100)
+        over_limit = await storage.buy_fitness_halls(1, db.DAILY_HALL_LIMIT, 0)
+        return poor, bought, over_limit, await storage.get_player(1)
+
+    poor, bought, over_limit, player = run(scenario(backend.storage()))
+    assert poor == {"success": False, "error": "insufficient_funds"}
+    assert bought["success"] and bought["fitness_halls"] == 2 and bought["balance"] == 900
+    assert over_limit["success"] is False and over_limit["error"] == "daily_limit"
+    assert player["fitness_halls"] == 2
+    assert player["balance"] == 900
+
+
+def test_record_dumbbell_lift(backend):
+    async def scenario(storage):
+        await _players(storage, 1)
+        await storage.record_dumbbell_lift(1, 3)
+        await storage.record_dumbbell_lift(1, 4)
+        return await storage.get_player(1)
+
+    player = run(scenario(backend.storage()))
+    assert player["total_lifts"] == 2
+    assert player["power"] >= 7
+
+
+# ======================
+# ДВИЖЕНИЕ МОНЕТ
+# ======================
+
+def test_update_player_balance(backend):
+    async def scenario(storage):
+        await _players(storage, 1)
+        await storage.update_player_balance(1, 500, "admin_add_balance", "выдача")
+        await storage.update_player_balance(1, -200, "admin_remove_balance", "снятие")
+        return await storage.get_player(1)
+
+    player = run(scenario(backend.storage()))
+    assert player["balance"] == 300
+    assert player["total_earned"] == 500
+    assert player["total_spent"] == 200
+
+
+# ======================
+# КЛАНЫ
+# ======================
+
+def test_clan_membership_and_context(backend):
+    async def scenario(storage):
+        await _players(storage, 1, 2)
+        clan_id = await backend.create_clan("TST", "Тест", 1)
+        await backend.join_clan(2, clan_id)
+        return (
+            clan_id,
+            await storage.get_player_clan(2),
+            await storage.get_player_context(1),
+            await storage.get_clan_members(clan_id),
+        )
+
+    clan_id, clan, context, members = run(scenario(backend.storage()))
+    assert clan["id"] == clan_id and clan["tag"] == "TST"
+    assert context["clan"]["id"] == clan_id
+    assert context["clan_role"] == "owner"
+    assert [(m["user_id"], m["role"]) for m in members] == [(1, "owner"), (2, "member")]
+
+
+def test_leave_clan(backend):
+    async def scenario(storage):
+        await _players(storage, 1, 2)
+        clan_id = await backend.create_clan("TST", "Тест", 1)
+        await backend.join_clan(2, clan_id)
+        before = await storage.get_clan_member_count(clan_id)
+        left = await storage.leave_clan(2, clan_id)
+        return (
+            before,
+            left,
+            await storage.get_clan_member_count(clan_id),
+            await storage.get_player_clan(2),
+            await storage.get_clan_by_tag("TST"),
+        )
+
+    before, left, after, clan, by_tag = run(scenario(backend.storage()))
+    assert (before, after) == (2, 1)
+    assert left["success"] is True
+    assert clan is None
+    assert by_tag["name"] == "Тест"
+
+
+def test_clan_lift_income(backend):
+    async def scenario(storage):
+        await _players(storage, 1)
+        clan_id = await backend.create_clan("TST", "Тест", 1)
+        await storage.add_clan_lift_income(clan_id, 1, 15, "подход")
+        await storage.add_clan_lift_income(clan_id, 1, 5, "подход")
+        return await storage.get_player_clan(1)
+
+    clan = run(scenario(backend.storage()))
+    assert clan["treasury"] == 20
+
+
+def test_set_clan_role(backend):
+    async def scenario(storage):
+        await _players(storage, 1, 2, 3)
+        clan_id = await backend.create_clan("TST", "Тест", 1)
+        await backend.join_clan(2, clan_id)
+        promoted = await storage.set_clan_role(clan_id, 2, "officer")
+        outsider = await storage.set_clan_role(clan_id, 3, "officer")
+        context = await storage.get_player_context(2)
+        return promoted, outsider, context
+
+    promoted, outsider, context = run(scenario(backend.storage()))
+    assert promoted is True
+    assert outsider is False
+    assert context["clan_role"] == "officer"
+
+
+def test_transfer_clan_ownership(backend):
+    async def scenario(storage):
+        await _players(storage, 1, 2, 3)
+        clan_id = await backend.create_clan("TST", "Тест", 1)
+        await backend.join_clan(2, clan_id)
+        poor = await storage.transfer_clan_ownership(clan_id, 1, 2, 500, "передача")
+        await storage.update_player_balance(1, 800, "admin_add_balance", "тест")
+        outsider = await storage.transfer_clan_ownership(clan_id, 1, 3, 500, "передача")
+        done = await storage.transfer_clan_ownership(clan_id, 1, 2, 500, "передача")
+        again = await storage.transfer_clan_ownership(clan_id, 1, 2, 500, "передача")
+        return (
+            poor, outsider, done, again,
+            await storage.get_player_clan(2),
+            await storage.get_clan_members(clan_id),
+            await storage.get_player(1),
+        )
+
+    poor, outsider, done, again, clan, members, old_owner = run(scenario(backend.storage()))
+    assert poor["error"] == "insufficient_funds"
+    assert outsider["error"] == "not_member"
+    assert done == {"success": True, "balance": 300}
+    assert again["error"] == "not_owner"
+    assert clan["owner_id"] == 2
+    assert {m["user_id"]: m["role"] for m in members} == {1: "officer", 2: "owner"}
+    assert old_owner["balance"] == 300
+
+
+def test_unban_clan_member(backend):
+    async def scenario(storage):
+        await _players(storage, 1, 2)
+        clan_id = await backend.create_clan("TST", "Тест", 1)
+        await backend.join_clan(2, clan_id)
+        await backend.kick_clan_member(clan_id, 2)
+        return (
+            await storage.get_player_clan(2),
+            await storage.unban_clan_member(clan_id, 2),
+            await storage.unban_clan_member(clan_id, 2),
+        )
+
+    clan, first, second = run(scenario(backend.storage()))
+    assert clan is None
+    assert first is True
+    assert second is False
+
+
+# ======================
+# ПРОВЕРКИ И ЗАЩИТА
+# ======================
+
+def test_inspector_and_protection_levels(backend):
+    async def scenario(storage):
+        await _players(storage, 1)
+        await storage.buy_inspector_level(1, 2)
+        await storage.buy_inspector_level(1, 1)
+        await storage.buy_inspector_level(1, 2)
+        await storage.buy_protection_level(1, 3)
+        return await storage.get_player_inspectors(1), await storage.get_player_protections(1)
+
+    assert run(scenario(backend.storage())) == ([1, 2], [3])
+
+
+def test_active_protection_lifecycle(backend):
+    async def scenario(storage):
+        await _players(storage, 1, 2)
+        await storage.activate_protection(1, 2, 60)
+        await storage.activate_protection(2, 1, 0)
+        active = await storage.get_active_protection(1)
+        everyone = await storage.get_all_active_protections()
+        deleted = await storage.delete_expired_protections([1, 2])
+        return active, everyone, deleted, await storage.get_all_active_protections()
+
+    active, everyone, deleted, left = run(scenario(backend.storage()))
+    assert active["protection_level"] == 2
+    assert datetime.fromisoformat(active["expires_at"]) > datetime.now()
+    assert {p["user_id"] for p in everyone} == {1, 2}
+    # Защита игрока 1 еще действует и не удаляется
+    assert deleted == 1
+    assert [p["user_id"] for p in left] == [1]
+
+
+def test_reserve_inspection_limit_and_cooldown(backend):
+    async def scenario(storage):
+        await _players(storage, 1, 2)
+        limited = [await storage.reserve_inspection(1, 2, 0) for _ in range(3)]
+        first = await storage.reserve_inspection(2, 10, 30)
+        cooldown = await storage.reserve_inspection(2, 10, 30)
+        return limited, first, cooldown, await storage.get_inspection_stats(1)
+
+    limited, first, cooldown, stats = run(scenario(backend.storage()))
+    assert limited == [True, True, False]
+    assert (first, cooldown) == (True, False)
+    assert stats["inspections_today"] == 2
+
+
+def test_inspection_context(backend):
+    async def scenario(storage):
+        await _players(storage, 1, 2)
+        await storage.update_fitness_halls(2, 7)
+        await storage.buy_inspector_level(1, 3)
+        return (
+            await storage.get_inspection_context(1, 2, 3),
+            await storage.get_inspection_context(1, 99, 3),
+        )
+
+    context, missing = run(scenario(backend.storage()))
+    assert context["target_halls"] == 7
+    assert context["has_inspector"] is True
+    assert context["target_name"] == "player2"
+    assert missing is None
+
+
+def test_resolve_inspection(backend):
+    async def scenario(storage):
+        await _players(storage, 1, 2)
+        await storage.update_fitness_halls(2, 3)
+        hit = await storage.resolve_inspection(1, 2, 5, 10)
+        empty = await storage.resolve_inspection(1, 2, 5, 10)
+        blocked = await storage.resolve_inspection(1, 2, 5, 10, blocked=True)
+        return (
+            hit, empty, blocked,
+            await storage.get_player(2),
+            await storage.get_inspection_stats(1),
+            await storage.get_protection_stats(2),
+        )
+
+    hit, empty, blocked, target, stats, protection = run(scenario(backend.storage()))
+    # Урон ограничен числом залов, компенсация - за каждый закрытый зал
+    assert (hit["halls_closed"], hit["compensation"], hit["halls_left"]) == (3, 30, 0)
+    assert (empty["halls_closed"], empty["compensation"]) == (0, 0)
+    assert blocked["blocked"] is True
+    assert target["fitness_halls"] == 0
+    assert target["balance"] == 30
+    assert stats["total_inspections"] == 3
+    assert stats["successful_inspections"] == 2
+    assert stats["failed_inspections"] == 1
+    assert stats["halls_closed"] == 3
+    assert protection["total_blocked"] == 1
+
+
+def test_protection_stats(backend):
+    async def scenario(storage):
+        await _players(storage, 1)
+        await storage.update_protection_stats(1, spent=100)
+        await storage.update_protection_stats(1, spent=50, blocked=True)
+        return await storage.get_protection_stats(1)
+
+    assert run(scenario(backend.storage())) == {"total_blocked": 1, "total_spent_on_protection": 150}
+
+
+def test_inspection_time_mode(backend):
+    async def scenario(storage):
+        off = await storage.get_inspection_time_mode()
+        not_extended = await storage.extend_inspection_time_mode(1)
+        await storage.set_inspection_time_mode(True, 2)
+        on = await storage.get_inspection_time_mode()
+        extended = await storage.extend_inspection_time_mode(1)
+        stale = await storage.expire_inspection_time_mode(on["ends_at"])
+        expired = await storage.expire_inspection_time_mode(extended)
+        return off, not_extended, on, extended, stale, expired, await storage.get_inspection_time_mode()
+
+    off, not_extended, on, extended, stale, expired, final = run(scenario(backend.storage()))
+    assert off["is_active"] is False
+    assert not_extended is None
+    assert on["is_active"] is True
+    delta = datetime.fromisoformat(extended) - datetime.fromisoformat(on["ends_at"])
+    assert abs(delta - timedelta(hours=1)) < timedelta(seconds=1)
+    # Выключает только вызов с актуальным временем окончания
+    assert (stale, expired) == (False, True)
+    assert final["is_active"] is False
+
+
+# ======================
+# ПРОМОКОДЫ
+# ======================
+
+def test_promo_codes(backend):
+    async def scenario(storage):
+        await _players(storage, 1, 2, 3)
+        await backend.create_promo("START", 2, "монеты", 100)
+        info = await storage.get_promo_info("start")
+        first = await storage.use_promo_code(1, "START")
+        repeat = await storage.use_promo_code(1, "START")
+        second = await storage.use_promo_code(2, "START")
+        exhausted = await storage.use_promo_code(3, "START")
+        missing = await storage.use_promo_code(3, "NOPE")
+        uses = await storage.count_promo_uses("start")
+        return info, first, repeat, second, exhausted, missing, uses, await storage.get_player(1)
+
+    info, first, repeat, second, exhausted, missing, uses, player = run(scenario(backend.storage()))
+    assert info["uses_left"] == 2 and info["reward_amount"] == 100
+    assert first == {"success": True, "reward_type": "монеты", "reward_amount": 100}
+    assert repeat["success"] is False
+    assert second["success"] is True
+    assert exhausted["success"] is False
+    assert missing["success"] is False
+    assert uses == 2
+    assert player["balance"] == 100
@@ -1,15 +1,11 @@
+from typing import Dict, Optional, Tuple
+
 from bot.utils import format_number
 from vkbottle.bot import BotLabeler, Message
 
 from bot.core.config import settings
-from bot.db import (
-    create_player,
-    get_player,
-    get_top_balance,
-    get_top_lifts,
-    get_top_fitness_halls,
-    get_top_power,
-)
+from bot.storage import get_storage, LEADERBOARD_SIZE
+from bot.services.bans import BAN_LISTENERS, fetch_without_banned
 
 top_labeler = BotLabeler()
 top_labeler.vbml_ignore_case = True
@@ -41,10 +37,10 @@ def get_equipment_type(level: int) -> dict:
 async def get_top_list_handler(message: Message):
     """Список топов"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
 
     if not player:
-        player = await create_player(user_id, str(message.from_id))
+        player = await get_storage().create_player(user_id, str(message.from_id))
     
     equipment_type = get_equipment_type(player["dumbbell_level"])
 
@@ -67,81 +63,111 @@ async def get_top_list_handler(message: Message):
     return top_text
 
 
-@top_labeler.message(text=["топ монет", "/топ монет"])
-async def get_top_balance_handler(message: Message):
-    """Топ по монетам"""
-    top_players = await get_top_balance(10)
+# ======================
+# РЕЙТИНГИ С КЭШЕМ ОТВЕТОВ
+# ======================
 
-    if not top_players:
-        return "🏆 Рейтинг пока пуст. Будьте первым!"
+EMPTY_LEADERBOARD_TEXT = "🏆 Рейтинг пока пуст. Будьте первым!"
+MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"}
 
-    top_text = "🏆 Рейтинг по монетам:\n\n"
+# Строка рейтинга: value_line подставляется из описания рейтинга
+LEADERBOARD_ROW_TEMPLATE = (
+    "{medal} {place}. [id{user_id}|{username}]\n"
+    "   {value_line}\n"
+    "   🎮 {possessive}: {dumbbell_name} (Ур. {dumbbell_level})\n\n"
+)
 
-    for i, (user_id, username, balance, dumbbell_name, dumbbell_level) in enumerate(top_players, 1):
-        medal = "🥇" if i == 1 else ("🥈" if i == 2 else ("🥉" if i == 3 else "🔸"))
-        equipment_type = get_equipment_type(dumbbell_level)
-        top_text += f"{medal} {i}. [id{user_id}|{username}]\n"
-        top_text += f"   💰 {format_number(balance)} монет\n"
-        top_text += f"   🎮 {equipment_type['possessive']}: {dumbbell_name} (Ур. {dumbbell_level})\n\n"
+# Рейтинг: метод Storage с запросом, заголовок и шаблон строки со значением
+LEADERBOARDS = {
+    "balance": {"fetch": "get_top_balance", "title": "🏆 Рейтинг по монетам:\n\n", "value": "💰 {value} монет"},
+    "lifts": {"fetch": "get_top_lifts", "title": "💪 Рейтинг по поднятиям:\n\n", "value": "🦾 {value} поднятий"},
+    "power": {"fetch": "get_top_power", "title": "💪 Рейтинг по силе:\n\n", "value": "💪 Сила: {value}"},
+    "halls": {"fetch": "get_top_fitness_halls", "title": "🏦 Рейтинг по фитнесс залам:\n\n", "value": "🏦 {value} фитнесс залов"},
+}
 
-    await message.answer(top_text, disable_mentions=True)
+# Готовый текст рейтинга: board -> (версия, текст)
+LEADERBOARD_CACHE: Dict[str, Tuple[int, str]] = {}
 
 
-@top_labeler.message(text=["топ поднятий", "/топ поднятий"])
-async def get_top_lifts_handler(message: Message):
-    """Топ по поднятиям"""
-    top_players = await get_top_lifts(10)
+def render_leaderboard(board: str, rows) -> str:
+    """Собрать текст рейтинга из строк запроса"""
+    if not rows:
+        return EMPTY_LEADERBOARD_TEXT
 
-    if not top_players:
-        return "🏆 Рейтинг пока пуст. Будьте первым!"
+    leaderboard = LEADERBOARDS[board]
+    parts = [leaderboard["title"]]
+    for place, (user_id, username, value, dumbbell_name, dumbbell_level) in enumerate(rows, 1):
+        parts.append(LEADERBOARD_ROW_TEMPLATE.format(
+            medal=MEDALS.get(place, "🔸"),
+            place=place,
+            user_id=user_id,
+            username=username,
+            value_line=leaderboard["value"].format(value=format_number(value)),
+            possessive=get_equipment_type(dumbbell_level)["possessive"],
+            dumbbell_name=dumbbell_name,
+            dumbbell_level=dumbbell_level,
+        ))
+    return "".join(parts)
 
-    top_text = "💪 Рейтинг по поднятиям:\n\n"
 
-    for i, (user_id, username, total_lifts, dumbbell_name, dumbbell_level) in enumerate(top_players, 1):
-        medal = "🥇" if i == 1 else ("🥈" if i == 2 else ("🥉" if i == 3 else "🔸"))
-        equipment_type = get_equipment_type(dumbbell_level)
-        top_text += f"{medal} {i}. [id{user_id}|{username}]\n"
-        top_text += f"   🦾 {format_number(total_lifts)} поднятий\n"
-        top_text += f"   🎮 {equipment_type['possessive']}: {dumbbell_name} (Ур. {dumbbell_level})\n\n"
+async def fetch_leaderboard_rows(board: str):
+    """Строки рейтинга без забаненных: запрос добирает места только за баны, найденные в окне"""
+    fetch = getattr(get_storage(), LEADERBOARDS[board]["fetch"])
+    return await fetch_without_banned(fetch, LEADERBOARD_SIZE)
 
-    await message.answer(top_text, disable_mentions=True)
 
+def invalidate_leaderboards():
+    """Сбросить готовые тексты рейтингов (изменился реестр банов)"""
+    LEADERBOARD_CACHE.clear()
 
-@top_labeler.message(text=["топ силы", "/топ силы"])
-async def get_top_power_handler(message: Message):
-    """Топ по силе"""
-    top_players = await get_top_power(10)
 
-    if not top_players:
-        return "🏆 Рейтинг пока пуст. Будьте первым!"
+# Бан и разбан убирают игрока из рейтингов без фильтра в запросе
+BAN_LISTENERS.append(invalidate_leaderboards)
 
-    top_text = "💪 Рейтинг по силе:\n\n"
 
-    for i, (user_id, username, power, dumbbell_name, dumbbell_level) in enumerate(top_players, 1):
-        medal = "🥇" if i == 1 else ("🥈" if i == 2 else ("🥉" if i == 3 else "🔸"))
-        equipment_type = get_equipment_type(dumbbell_level)
-        top_text += f"{medal} {i}. [id{user_id}|{username}]\n"
-        top_text += f"   💪 Сила: {format_number(power)}\n"
-        top_text += f"   🎮 {equipment_type['possessive']}: {dumbbell_name} (Ур. {dumbbell_level})\n\n"
+async def get_leaderboard_text(board: str) -> str:
+    """Текст рейтинга из кэша; перестраивается только при смене версии"""
+    version = await get_storage().get_leaderboard_version(board)
+    cached: Optional[Tuple[int, str]] = LEADERBOARD_CACHE.get(board)
+    if cached and cached[0] == version:
+        return cached[1]
 
-    await message.answer(top_text, disable_mentions=True)
+    # Версию читаем до запроса: изменение между ними просто перестроит текст еще раз.
+    # Пока топ читается, порога нет - изменение в это время тоже повысит версию
+    await get_storage().set_leaderboard_threshold(board, None)
+    rows = await fetch_leaderboard_rows(board)
+    await get_storage().set_leaderboard_threshold(board, rows[-1][2] if len(rows) == LEADERBOARD_SIZE else None)
+    text = render_leaderboard(board, rows)
+    LEADERBOARD_CACHE[board] = (version, text)
+    return text
 
 
-@top_labeler.message(text=["топ фитнесс залов", "/топ фитнесс залов"])
-async def get_top_fitness_halls_handler(message: Message):
-    """Топ по фитнесс залам"""
-    top_players = await get_top_fitness_halls(10)
+async def answer_leaderboard(message: Message, board: str):
+    text = await get_leaderboard_text(board)
+    if text == EMPTY_LEADERBOARD_TEXT:
+        return text
+    await message.answer(text, disable_mentions=True)
 
-    if not top_players:
-        return "🏆 Рейтинг пока пуст. Будьте первым!"
 
-    top_text = "🏦 Рейтинг по фитнесс залам:\n\n"
+@top_labeler.message(text=["топ монет", "/топ монет"])
+async def get_top_balance_handler(message: Message):
+    """Топ по монетам"""
+    return await answer_leaderboard(message, "balance")
+
+
+@top_labeler.message(text=["топ поднятий", "/топ поднятий"])
+async def get_top_lifts_handler(message: Message):
+    """Топ по поднятиям"""
+    return await answer_leaderboard(message, "lifts")
 
-    for i, (user_id, username, fitness_halls, dumbbell_name, dumbbell_level) in enumerate(top_players, 1):
-        medal = "🥇" if i == 1 else ("🥈" if i == 2 else ("🥉" if i == 3 else "🔸"))
-        equipment_type = get_equipment_type(dumbbell_level)
-        top_text += f"{medal} {i}. [id{user_id}|{username}]\n"
-        top_text += f"   🏦 {format_number(fitness_halls)} фитнесс залов\n"
-        top_text += f"   🎮 {equipment_type['possessive']}: {dumbbell_name} (Ур. {dumbbell_level})\n\n"
 
-    await message.answer(top_text, disable_mentions=True)
+@top_labeler.message(text=["топ силы", "/топ силы"])
+async def get_top_power_handler(message: Message):
+    """Топ по силе"""
+    return await answer_leaderboard(message, "power")
+
+
+@top_labeler.message(text=["топ фитнесс залов", "/топ фитнесс залов"])
+async def get_top_fitness_halls_handler(message: Message):
+    """Топ по фитнесс залам"""
+    return await answer_leaderboard(message, "halls")
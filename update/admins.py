@@ -4,7 +4,12 @@ from vkbottle import API
 from datetime import datetime, timedelta
 
 from bot.core.config import settings
-from bot.db import set_inspection_time_mode, get_inspection_time_mode
+from bot.services.inspection_mode import (
+    get_mode,
+    enable_inspection_mode,
+    disable_inspection_mode,
+    extend_inspection_mode,
+)
 from bot.services.users import is_admin
 
 admin_labeler = BotLabeler()
@@ -63,7 +68,7 @@ async def enable_inspection_mode_handler(message: Message, hours: str):
             return "❌ ОШИБКА\n\nМаксимальная длительность режима - 48 часов!"
         
         # Проверяем, не активен ли уже режим
-        current_mode = await get_inspection_time_mode()
+        current_mode = get_mode()
         if current_mode["is_active"]:
             ends_at = datetime.fromisoformat(current_mode["ends_at"])
             time_left = ends_at - datetime.now()
@@ -78,13 +83,13 @@ async def enable_inspection_mode_handler(message: Message, hours: str):
             )
         
         # Включаем режим
-        success = await set_inspection_time_mode(True, duration)
+        success = await enable_inspection_mode(duration)
         
         if not success:
             return "❌ ОШИБКА\n\nНе удалось активировать режим. Попробуйте позже."
         
         # Получаем информацию о времени окончания
-        mode_info = await get_inspection_time_mode()
+        mode_info = get_mode()
         ends_at = datetime.fromisoformat(mode_info["ends_at"])
         ends_at_formatted = ends_at.strftime("%d.%m.%Y %H:%M")
         
@@ -134,7 +139,7 @@ async def disable_inspection_mode_handler(message: Message):
         return "⛔ ДОСТУП ЗАПРЕЩЕН\n\nДанная команда доступна только администрации проекта!"
     
     # Проверяем, активен ли режим
-    current_mode = await get_inspection_time_mode()
+    current_mode = get_mode()
     if not current_mode["is_active"]:
         return "ℹ️ ИНФОРМАЦИЯ\n\nРежим 'Время проверок' в данный момент не активен."
     
@@ -142,7 +147,7 @@ async def disable_inspection_mode_handler(message: Message):
     ends_at = datetime.fromisoformat(current_mode["ends_at"]) if current_mode["ends_at"] else None
     
     # Выключаем режим
-    success = await set_inspection_time_mode(False)
+    success = await disable_inspection_mode()
     
     if not success:
         return "❌ ОШИБКА\n\nНе удалось деактивировать режим. Попробуйте позже."
@@ -190,7 +195,7 @@ async def admin_mode_status_handler(message: Message):
     if not await is_admin(user_id):
         return "⛔ ДОСТУП ЗАПРЕЩЕН"
     
-    mode_info = await get_inspection_time_mode()
+    mode_info = get_mode()
     
     if mode_info["is_active"]:
         ends_at = datetime.fromisoformat(mode_info["ends_at"])
@@ -238,23 +243,15 @@ async def extend_inspection_mode_handler(message: Message, hours: str):
             return "❌ ОШИБКА\n\nКоличество часов должно быть положительным числом!"
         
         # Проверяем, активен ли режим
-        current_mode = await get_inspection_time_mode()
+        current_mode = get_mode()
         if not current_mode["is_active"]:
             return "❌ Режим не активен. Сначала включите его командой /время проверок"
         
-        # Рассчитываем новое время окончания
-        current_ends_at = datetime.fromisoformat(current_mode["ends_at"])
-        new_ends_at = current_ends_at + timedelta(hours=extra_hours)
-        
-        # Обновляем режим
-        success = await set_inspection_time_mode(True, 0)  # временно
-        if success:
-            # Прямое обновление в БД
-            from bot.db.inspection import settings_collection
-            await settings_collection.update_one(
-                {"key": "inspection_mode"},
-                {"$set": {"ends_at": new_ends_at.isoformat()}}
-            )
+        # Обновляем режим: база, состояние процесса и таймер выключения
+        new_ends_at = await extend_inspection_mode(extra_hours)
+        if not new_ends_at:
+            return "❌ ОШИБКА\n\nНе удалось продлить режим. Попробуйте позже."
+        new_ends_at = datetime.fromisoformat(new_ends_at)
         
         return (
             f"⏱️ РЕЖИМ ПРОДЛЕН\n\n"
@@ -7,20 +7,7 @@ from typing import Optional
 from vkbottle.bot import BotLabeler, Message
 
 from bot.core.config import settings
-from bot.db import (
-    create_player,
-    get_player,
-    get_player_clan,
-    update_player_balance,
-    update_username,
-    set_info_access,
-    get_info_access_status,
-    remove_info_access,
-    update_fitness_halls,
-    get_player_fitness_halls,
-    get_daily_purchases,
-    get_member_clan_role,
-)
+from bot.storage import get_storage, DAILY_HALL_LIMIT
 from bot.services.clans import (
     get_clan_bonuses,
 )
@@ -53,6 +40,135 @@ def get_equipment_type(level: int) -> dict:
         }
 
 
+# ======================
+# ШАБЛОНЫ СООБЩЕНИЙ
+# ======================
+
+PROFILE_TEMPLATE = (
+    "📑 Профиль игрока\n"
+    "\n"
+    "💻 Игровой никнейм: [id{user_id}|{username}]\n"
+    "{clan_info}"
+    "💎 Привилегии: {privileges}\n"
+    "💰 Баланс: {balance}\n"
+    "💪 Сила: {power}\n"
+    "🏦 Фитнесс залы: {fitness_halls}\n"
+    "👨‍💻 Поднятий: {total_lifts}\n"
+    "📅 Дата регистрации: {created_date}"
+)
+PROFILE_CLAN_TEMPLATE = "\n🏰 Клан: [{tag}] {name}\n🎮 {role}\n"
+PROFILE_NO_CLAN = "\n🏰 Клан: ❌ Не состоит\n"
+
+# Роль в клане в профиле (без эмодзи)
+CLAN_ROLE_NAMES = {
+    "owner": "Владелец",
+    "officer": "Заместитель",
+}
+
+HELP_COMMANDS = [
+    "𝐆𝐘𝐌 𝐋𝐄𝐆𝐄𝐍𝐃 - Доступные команды:\n",
+    "📊 Профиль и информация:",
+    "📒 Профиль - ваш профиль",
+    "📒 Баланс - текущий баланс",
+    "📒 Купить зал [кол-во] - купить фитнес-залы",
+    "📒 Гник [ник] - изменить свой ник\n",
+    "🎓 Тренерская деятельность:",
+    "📒 Персональный магазин - доступные уровни",
+    "📒 Стаж - повысить уровень тренера",
+    "📒 Тренировка - провести тренировку",
+    "📒 Портфолио - информация о тренерстве\n",
+    "💪 Гантели:",
+    "🔸 Гантеля - информация о гантеле",
+    "🔸 Поднять - поднять гантелю",
+    "🔸 Прокачаться - улучшить гантелю",
+    "🔸 Магазин - магазин гантелей\n",
+    "🏰 Кланы:",
+    "🔹 К создать [ТЭГ] [название] - создать клан",
+    "🔹 К улучшить - улучшить уровень клана",
+    "🔹 К профиль - информация о клане",
+    "🔹 К помощь - справка по кланам",
+    "🔹 К топ - топ кланов",
+    "🔹 К положить [сумма] - положить деньги в казну\n",
+    "🔍 Проверки:",
+    "🔸 Магазин инспекторов - доступные уровни инспекторов",
+    "🔸 Подкупить проверку [уровень] - купить инспектора",
+    "🔸 Проверить [айди] [уровень] - проверить игрока",
+    "🔸 Инспекторы - информация о ваших инспекторах",
+    "⏰ Время проверки - текущий режим проверок\n",
+    "🛡️ Защита:",
+    "🔹 Магазин защиты - доступные уровни защиты",
+    "🔹 Защита зала [уровень] - активировать защиту",
+    "🔹 Защитники - информация о вашей защите\n",
+    "💰 Ежедневные выплаты:",
+    "📒 Доход залы - статистика ежедневного дохода\n",
+    "💸 Перевод денег:",
+    "📗 Перевод [айди] [сумма] - перевести деньги",
+    "📗 Перевести [айди] [сумма] - перевести деньги\n",
+    "🎫 Промокоды:",
+    "👑 Промо [код] - активировать промокод\n",
+    "🏆 Рейтинги:",
+    "🥇 Топ - общий список рейтингов",
+    "🥇 Топ монет - топ по балансу",
+    "🥇 Топ поднятий - топ по поднятиям",
+    "🥇 Топ заработка - топ по заработку",
+    "🥇 К топ - топ кланов",
+]
+HELP_INFO_COMMAND = "📒 Инфа [айди] - полная информация об игроке"
+
+# Справка не меняется: собираем оба варианта один раз
+HELP_TEXT = "\n".join(HELP_COMMANDS)
+HELP_TEXT_WITH_INFO = "\n".join(HELP_COMMANDS[:6] + [HELP_INFO_COMMAND] + HELP_COMMANDS[6:])
+
+SHOP_TEMPLATE = (
+    "🛒 Магазин {equipment_name}ов 🛍️\n\n"
+    "{levels_info}\n\n"
+    "💰 Ваш баланс: {balance}"
+)
+SHOP_CURRENT_TEMPLATE = (
+    "✅ Текущий снаряд:\n"
+    "📊 Уровень {level}: {name}\n"
+    "   ⚖️ Вес: {weight} | "
+    "💰 Доход: {income_per_use} | "
+    "💪 Сила: {power_per_use}"
+)
+SHOP_NEXT_TEMPLATE = (
+    "\n🔘 Следующий уровень:\n"
+    "📈 Уровень {level}: {name}\n"
+    "   ⚖️ Вес: {weight} | "
+    "💰 Доход: {income_per_use} | "
+    "💪 Сила: {power_per_use} | "
+    "💵 Цена: {price}"
+)
+SHOP_MAX_LEVEL = "\n🎉 Вы достигли максимального уровня!"
+
+# Текущий и следующий снаряд для уровня: уровни не меняются после запуска
+_shop_levels_info = {}
+
+
+def get_shop_levels_info(level: int) -> str:
+    """Блок магазина для уровня (собирается один раз на уровень)"""
+    if level not in _shop_levels_info:
+        current = settings.DUMBBELL_LEVELS[level]
+        text = SHOP_CURRENT_TEMPLATE.format(level=level, **current)
+
+        next_level = level + 1
+        if next_level <= 20:
+            next_dumbbell = settings.DUMBBELL_LEVELS[next_level]
+            text += SHOP_NEXT_TEMPLATE.format(
+                level=next_level,
+                name=next_dumbbell["name"],
+                weight=next_dumbbell["weight"],
+                income_per_use=next_dumbbell["income_per_use"],
+                power_per_use=next_dumbbell["power_per_use"],
+                price=format_number(next_dumbbell["price"]),
+            )
+        else:
+            text += SHOP_MAX_LEVEL
+
+        _shop_levels_info[level] = text
+    return _shop_levels_info[level]
+
+
 # ======================
 # КОМАНДА ИНФА
 # ======================
@@ -62,7 +178,7 @@ async def player_info_handler(message: Message, cmd_args: str):
     """Полная информация об игроке"""
     user_id = message.from_id
     
-    has_access = await get_info_access_status(user_id)
+    has_access = await get_storage().get_info_access_status(user_id)
     
     if not has_access:
         return "❌ У вас нет доступа к этой команде!\n\n💡 Для получения доступа обратитесь к администратору:\n👮 Администратор может выдать доступ командой:\n/доступ_инфа [айди_игрока]"
@@ -72,16 +188,16 @@ async def player_info_handler(message: Message, cmd_args: str):
     except ValueError:
         return "❌ Айди игрока должно быть числом!"
 
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
 
     if not target_player:
         return "❌ Игрок с таким айди не найден!"
 
     # Получаем количество фитнес-залов
-    fitness_halls = await get_player_fitness_halls(target_id)
+    fitness_halls = await get_storage().get_player_fitness_halls(target_id)
     daily_income_from_halls = fitness_halls * 10  # 10 монет за каждый зал в день
     
-    clan = await get_player_clan(target_id)
+    clan = await get_storage().get_player_clan(target_id)
     
     equipment_type = get_equipment_type(target_player["dumbbell_level"])
 
@@ -141,7 +257,7 @@ async def player_info_handler(message: Message, cmd_args: str):
 async def buy_fitness_halls_handler(message: Message, amount: str):
     """Покупка фитнес-залов"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     
     if not player:
         return "❌ Игрок не найден"
@@ -153,11 +269,8 @@ async def buy_fitness_halls_handler(message: Message, amount: str):
     except ValueError:
         return "❌ Укажите число залов для покупки!"
     
-    daily_purchases = await get_daily_purchases(user_id)
-    if daily_purchases + halls_to_buy > 100:
-        return f"❌ Достигнут дневной лимит покупок!\n\n📊 Максимально в день: 100 фитнес залов\n🎯 Вы уже купили: {daily_purchases} сегодня"
-    
-    current_halls = await get_player_fitness_halls(user_id)
+    if halls_to_buy > DAILY_HALL_LIMIT:
+        return f"❌ Достигнут дневной лимит покупок!\n\n📊 Максимально в день: {DAILY_HALL_LIMIT} фитнес залов"
     
     start_price = 35
     price_increment = 5
@@ -167,17 +280,17 @@ async def buy_fitness_halls_handler(message: Message, amount: str):
         return f"❌ Недостаточно средств для покупки!\n\n💰 Нужно: {format_number(total_price)}\n💳 У вас: {format_number(player['balance'])}"
     
     try:
-        new_halls_count = await update_fitness_halls(user_id, halls_to_buy, total_price)
+        # Лимит и баланс окончательно проверяются в транзакции покупки
+        result = await get_storage().buy_fitness_halls(user_id, halls_to_buy, total_price)
         
-        await update_player_balance(
-            user_id,
-            -total_price,
-            "fitness_hall_purchase",
-            f"Покупка {halls_to_buy} фитнес залов",
-            None,
-            None,
-        )
+        if not result["success"]:
+            if result["error"] == "daily_limit":
+                return f"❌ Достигнут дневной лимит покупок!\n\n📊 Максимально в день: {result['daily_limit']} фитнес залов\n🎯 Вы уже купили: {result['daily_purchases']} сегодня"
+            if result["error"] == "insufficient_funds":
+                return f"❌ Недостаточно средств для покупки!\n\n💰 Нужно: {format_number(total_price)}"
+            return f"❌ Ошибка при покупке: {result['error']}"
         
+        new_halls_count = result["fitness_halls"]
         daily_income = new_halls_count * 10
         
         success_text = (
@@ -228,7 +341,7 @@ async def transfer_money_handler(message: Message, cmd_args: str):
     except ValueError as e:
         return f"❌ Ошибка в сумме: {str(e)}\n💡 Примеры: 1000, 1к (тысяча), 1.5к (1500), 2кк (2 млн), 1ккк (1 млрд)"
 
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
 
     if player["balance"] < amount:
         return f"❌ Недостаточно средств для перевода!\n💰 Нужно: {format_number(amount)}\n💳 У вас: {format_number(player['balance'])}"
@@ -236,7 +349,7 @@ async def transfer_money_handler(message: Message, cmd_args: str):
     if amount < 10:
         return "❌ Минимальная сумма перевода - 10 монет!"
 
-    target_player = await get_player(target_id)
+    target_player = await get_storage().get_player(target_id)
 
     if not target_player:
         return '❌ Игрок с таким айди не найден!'
@@ -250,7 +363,7 @@ async def transfer_money_handler(message: Message, cmd_args: str):
     net_amount = amount - commission
 
     try:
-        await update_player_balance(
+        await get_storage().update_player_balance(
             user_id,
             -amount,
             "money_transfer_sent",
@@ -259,7 +372,7 @@ async def transfer_money_handler(message: Message, cmd_args: str):
             target_id,
         )
 
-        await update_player_balance(
+        await get_storage().update_player_balance(
             target_id,
             net_amount,
             "money_transfer_received",
@@ -292,10 +405,10 @@ async def welcome_handler(message: Message):
     """Приветственное сообщение"""
     user_id = message.from_id
 
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
     if not player:
         # При регистрации выдаем ник "Игрок"
-        player = await create_player(user_id, "Игрок")
+        player = await get_storage().create_player(user_id, "Игрок")
 
     welcome_text = (
         f"👋Привет! [id{user_id}|{player['username']}], ты попал в \n"
@@ -321,56 +434,37 @@ async def welcome_handler(message: Message):
 async def get_profile_handler(message: Message):
     """Профиль игрока"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
 
     if not player:
         return "❌ Игрок не найден"
 
-    fitness_halls = await get_player_fitness_halls(user_id)
+    fitness_halls = await get_storage().get_player_fitness_halls(user_id)
     
     # Получаем информацию о клане и роли игрока
-    clan = await get_player_clan(user_id)
-    clan_info = ""
+    clan = await get_storage().get_player_clan(user_id)
     if clan:
         # Получаем роль игрока в клане из базы данных
-        clan_role_data = await get_member_clan_role(user_id, clan["id"])
+        clan_role_data = await get_storage().get_member_clan_role(user_id, clan["id"])
         clan_role = clan_role_data[0] if clan_role_data else "member"  # owner, officer, member
-        
-        # Определяем текст роли (БЕЗ ЭМОДЗИ)
-        role_display = ""
-        if clan_role == "owner":
-            role_display = "Владелец"
-        elif clan_role == "officer":
-            role_display = "Заместитель"
-        else:
-            role_display = "Участник"
-            
-        clan_info = (
-            f"\n🏰 Клан: [{clan['tag']}] {clan['name']}\n"
-            f"🎮 {role_display}\n"
+        clan_info = PROFILE_CLAN_TEMPLATE.format(
+            tag=clan["tag"],
+            name=clan["name"],
+            role=CLAN_ROLE_NAMES.get(clan_role, "Участник"),
         )
     else:
-        clan_info = "\n🏰 Клан: ❌ Не состоит\n"
-
-    admin_level = player.get("admin_level", 0)
-    if admin_level > 0:
-        privileges = "👨‍💻 Администратор"
-    else:
-        privileges = "Игрок"
-
-    created_date = datetime.fromisoformat(player["created_at"]).strftime("%d.%m.%Y")
-
-    profile_text = (
-        f"📑 Профиль игрока\n"
-        f"\n"
-        f"💻 Игровой никнейм: [id{player['user_id']}|{player['username']}]\n"
-        f"{clan_info}"
-        f"💎 Привилегии: {privileges}\n"
-        f"💰 Баланс: {format_number(player['balance'])}\n"
-        f"💪 Сила: {format_number(player['power'])}\n"
-        f"🏦 Фитнесс залы: {format_number(fitness_halls)}\n"
-        f"👨‍💻 Поднятий: {format_number(player['total_lifts'])}\n"
-        f"📅 Дата регистрации: {created_date}"
+        clan_info = PROFILE_NO_CLAN
+
+    profile_text = PROFILE_TEMPLATE.format(
+        user_id=player["user_id"],
+        username=player["username"],
+        clan_info=clan_info,
+        privileges="👨‍💻 Администратор" if player.get("admin_level", 0) > 0 else "Игрок",
+        balance=format_number(player["balance"]),
+        power=format_number(player["power"]),
+        fitness_halls=format_number(fitness_halls),
+        total_lifts=format_number(player["total_lifts"]),
+        created_date=datetime.fromisoformat(player["created_at"]).strftime("%d.%m.%Y"),
     )
 
     await message.answer(profile_text, disable_mentions=True)
@@ -380,7 +474,7 @@ async def get_profile_handler(message: Message):
 async def get_balance_handler(message: Message):
     """Баланс игрока"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
 
     return f"💰 Ваш баланс: {format_number(player['balance'])}"
 
@@ -388,112 +482,26 @@ async def get_balance_handler(message: Message):
 @user_labeler.message(text=["помощь", "/помощь"])
 async def get_help_handler(message: Message):
     """Справка по командам"""
-    commands = [
-        "𝐆𝐘𝐌 𝐋𝐄𝐆𝐄𝐍𝐃 - Доступные команды:\n",
-        "📊 Профиль и информация:",
-        "📒 Профиль - ваш профиль",
-        "📒 Баланс - текущий баланс",
-        "📒 Купить зал [кол-во] - купить фитнес-залы",
-        "📒 Гник [ник] - изменить свой ник\n",
-        "🎓 Тренерская деятельность:",
-        "📒 Персональный магазин - доступные уровни",
-        "📒 Стаж - повысить уровень тренера",
-        "📒 Тренировка - провести тренировку",
-        "📒 Портфолио - информация о тренерстве\n",
-        "💪 Гантели:",
-        "🔸 Гантеля - информация о гантеле",
-        "🔸 Поднять - поднять гантелю",
-        "🔸 Прокачаться - улучшить гантелю",
-        "🔸 Магазин - магазин гантелей\n",
-        "🏰 Кланы:",
-        "🔹 К создать [ТЭГ] [название] - создать клан",
-        "🔹 К улучшить - улучшить уровень клана",
-        "🔹 К профиль - информация о клане",
-        "🔹 К помощь - справка по кланам",
-        "🔹 К топ - топ кланов",
-        "🔹 К положить [сумма] - положить деньги в казну\n",
-        "🔍 Проверки:",
-        "🔸 Магазин инспекторов - доступные уровни инспекторов",
-        "🔸 Подкупить проверку [уровень] - купить инспектора",
-        "🔸 Проверить [айди] [уровень] - проверить игрока",
-        "🔸 Инспекторы - информация о ваших инспекторах",
-        "⏰ Время проверки - текущий режим проверок\n",
-        "🛡️ Защита:",
-        "🔹 Магазин защиты - доступные уровни защиты",
-        "🔹 Защита зала [уровень] - активировать защиту",
-        "🔹 Защитники - информация о вашей защите\n",
-        "💰 Ежедневные выплаты:",
-        "📒 Доход залы - статистика ежедневного дохода\n",
-        "💸 Перевод денег:",
-        "📗 Перевод [айди] [сумма] - перевести деньги",
-        "📗 Перевести [айди] [сумма] - перевести деньги\n",
-        "🎫 Промокоды:",
-        "👑 Промо [код] - активировать промокод\n",
-        "🏆 Рейтинги:",
-        "🥇 Топ - общий список рейтингов",
-        "🥇 Топ монет - топ по балансу",
-        "🥇 Топ поднятий - топ по поднятиям",
-        "🥇 Топ заработка - топ по заработку",
-        "🥇 К топ - топ кланов",
-    ]
-    
-    user_id = message.from_id
-    has_access = await get_info_access_status(user_id)
-    
-    if has_access:
-        commands.insert(6, "📒 Инфа [айди] - полная информация об игроке")
-
-    return "\n".join(commands)
+    has_access = await get_storage().get_info_access_status(message.from_id)
+    return HELP_TEXT_WITH_INFO if has_access else HELP_TEXT
 
 
 @user_labeler.message(text=["магазин", "/магазин"])
 async def get_dumbbell_shop_handler(message: Message):
     """Магазин гантелей"""
     user_id = message.from_id
-    player = await get_player(user_id)
+    player = await get_storage().get_player(user_id)
 
     if not player:
-        player = await create_player(user_id, "Игрок")
+        player = await get_storage().create_player(user_id, "Игрок")
 
     current_level = player["dumbbell_level"]
-    equipment_type = get_equipment_type(current_level)
-    
-    # Находим текущий снаряд
-    current_dumbbell = settings.DUMBBELL_LEVELS[current_level]
-    
-    # Находим следующий снаряд
-    next_level = current_level + 1
-    if next_level <= 20:
-        next_dumbbell = settings.DUMBBELL_LEVELS[next_level]
-        next_equipment_type = get_equipment_type(next_level)
-        next_dumbbell_info = (
-            f"\n🔘 Следующий уровень:\n"
-            f"📈 Уровень {next_level}: {next_dumbbell['name']}\n"
-            f"   ⚖️ Вес: {next_dumbbell['weight']} | "
-            f"💰 Доход: {next_dumbbell['income_per_use']} | "
-            f"💪 Сила: {next_dumbbell['power_per_use']} | "
-            f"💵 Цена: {format_number(next_dumbbell['price'])}"
-        )
-    else:
-        next_dumbbell_info = "\n🎉 Вы достигли максимального уровня!"
-
-    current_dumbbell_info = (
-        f"✅ Текущий снаряд:\n"
-        f"📊 Уровень {current_level}: {current_dumbbell['name']}\n"
-        f"   ⚖️ Вес: {current_dumbbell['weight']} | "
-        f"💰 Доход: {current_dumbbell['income_per_use']} | "
-        f"💪 Сила: {current_dumbbell['power_per_use']}"
-    )
-
-    shop_text = (
-        f"🛒 Магазин {equipment_type['name'].lower()}ов 🛍️\n\n"
-        f"{current_dumbbell_info}"
-        f"{next_dumbbell_info}\n\n"
-        f"💰 Ваш баланс: {format_number(player['balance'])}"
+    return SHOP_TEMPLATE.format(
+        equipment_name=get_equipment_type(current_level)["name"].lower(),
+        levels_info=get_shop_levels_info(current_level),
+        balance=format_number(player["balance"]),
     )
 
-    return shop_text
-
 
 @user_labeler.message(text=["гник <cmd_args>", "/гник <cmd_args>"])
 async def change_username_handler(message: Message, cmd_args: str):
@@ -522,6 +530,6 @@ async def change_username_handler(message: Message, cmd_args: str):
     if not re.match(r"^[a-zA-Zа-яА-ЯёЁ0-9 _-]+$", new_username):
         return "❌ Ник содержит недопустимые символы!\n✅ Разрешены: буквы, цифры, пробелы, дефисы, подчеркивания"
 
-    await update_username(user_id, new_username)
+    await get_storage().update_username(user_id, new_username)
 
     return f"✅ Ваш ник изменен на: {new_username}"